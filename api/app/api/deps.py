@@ -5,11 +5,10 @@ from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 
 from app.db.base import get_db
 from app.models.user import User
-from app.core.security import verify_token
+from app.core.security import get_user_for_token
 
 security = HTTPBearer()
 
@@ -25,18 +24,8 @@ async def get_current_user(
         # Extract token from credentials
         token = credentials.credentials
         
-        # Verify token and get user ID
-        user_id = verify_token(token)
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication credentials",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Get user from database
-        result = await db.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
+        # Verify token and resolve the (cached) user
+        user = await get_user_for_token(token, db)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -414,9 +414,10 @@ async def delete_assignment(
         # Invalidate caches after all database operations are complete
         try:
             from app.services.cache_service import cache_service
-            cache_service.clear_pattern("eligible_users")
-            cache_service.clear_pattern("assignment_validation")
-            cache_service.clear_pattern("assignments:")
+            await cache_service.invalidate_tags(
+                f"{assignment.entity_type}:{assignment.entity_id}",
+                f"user:{assignment.user_id}"
+            )
         except Exception as e:
             # Log cache error but don't fail the deletion
             logger.error(f"Failed to clear cache after assignment deletion: {str(e)}")
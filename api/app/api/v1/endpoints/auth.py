@@ -4,7 +4,7 @@ from sqlalchemy import select
 from app.db.base import get_db
 from app.models.user import User
 from app.schemas.user import LoginRequest, Token, UserResponse
-from app.core.security import verify_password, create_access_token, get_current_user
+from app.core.security import authenticate_password, create_user_access_token, get_current_user
 from datetime import timedelta
 from app.core.config import settings
 
@@ -29,7 +29,7 @@ async def login(
     )
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(credentials.password, user.hashed_password):
+    if not user or not await authenticate_password(user, credentials.password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password"
@@ -43,10 +43,7 @@ async def login(
     
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": str(user.id)},
-        expires_delta=access_token_expires
-    )
+    access_token = create_user_access_token(user, expires_delta=access_token_expires)
     
     # Create user response with string conversion
     user_response = UserResponse(
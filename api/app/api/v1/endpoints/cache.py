@@ -0,0 +1,79 @@
+"""
+Cache administration endpoints for the Worky API (Admin only).
+
+Statistics and hot keys describe the worker that answers the request;
+invalidations apply to the shared tier and are fanned out to every worker.
+Cluster-wide counters are exported to Prometheus on /metrics.
+"""
+from typing import List, Dict, Any
+from fastapi import APIRouter, Depends, Query, HTTPException, status
+
+from app.models.user import User
+from app.schemas.cache import CacheInvalidateRequest, CacheHotKey, CacheStatsResponse
+from app.core.security import require_role
+from app.core.logging import StructuredLogger
+from app.services.cache_service import cache_service
+
+router = APIRouter()
+logger = StructuredLogger(__name__)
+
+
+@router.get("/stats", response_model=CacheStatsResponse)
+async def get_cache_stats(
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Get tier sizes and per-namespace hit/miss/eviction/load statistics."""
+    return cache_service.stats()
+
+
+@router.get("/hot-keys", response_model=List[CacheHotKey])
+async def get_hot_keys(
+    limit: int = Query(20, ge=1, le=200, description="Number of keys to return"),
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Get the most frequently hit cache keys."""
+    return cache_service.metrics.hot_keys(limit)
+
+
+@router.post("/invalidate")
+async def invalidate_cache(
+    request: CacheInvalidateRequest,
+    current_user: User = Depends(require_role(["Admin"]))
+) -> Dict[str, Any]:
+    """Invalidate cache entries by tag, key and/or key pattern."""
+    if not (request.tags or request.keys or request.pattern):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Provide at least one of tags, keys or pattern"
+        )
+    
+    if request.tags:
+        await cache_service.invalidate_tags(*request.tags)
+    for key in request.keys:
+        await cache_service.delete(key)
+    if request.pattern:
+        await cache_service.clear_pattern(request.pattern)
+    
+    logger.log_activity(
+        action="invalidate_cache",
+        entity_type="cache",
+        tags=request.tags,
+        keys=len(request.keys),
+        pattern=request.pattern
+    )
+    
+    return {
+        "message": "Cache entries invalidated",
+        "tags": request.tags,
+        "keys": request.keys,
+        "pattern": request.pattern
+    }
+
+
+@router.delete("", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_cache(
+    current_user: User = Depends(require_role(["Admin"]))
+):
+    """Clear every cache entry on all workers."""
+    await cache_service.clear()
+    logger.log_activity(action="clear_cache", entity_type="cache")
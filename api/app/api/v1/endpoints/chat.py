@@ -5,8 +5,10 @@ This module provides endpoints for the context-aware chat assistant that enables
 users to query project data using natural language, perform safe actions, and
 receive intelligent responses while respecting RBAC.
 """
-from typing import Optional
+import json
+from typing import Optional, Dict, Any
 from fastapi import APIRouter, Depends, Request, status, HTTPException
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime
 
@@ -106,6 +108,79 @@ async def chat_query(
         )
 
 
+def _sse_event(event: str, payload: Dict[str, Any]) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_stream(
+    request_data: ChatRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Process a natural language chat query, streaming the response.
+    
+    Returns a text/event-stream with the same content as POST /chat, sent as
+    soon as each part is ready:
+    - intent: classified intent and confidence
+    - data: retrieved data, entity cards and table (queries and reports)
+    - token: response text chunks as the LLM generates them
+    - response: the final ChatResponse
+    
+    Disconnecting stops the request, including the upstream LLM call.
+    
+    Args:
+        request_data: Chat request containing query and session_id
+        request: FastAPI request object for extracting IP and user agent
+        db: Database session
+        current_user: Authenticated user
+        
+    Returns:
+        StreamingResponse of server-sent events
+    """
+    ip_address = request.client.host if request.client else None
+    user_agent = request.headers.get("user-agent")
+    
+    chat_service = get_chat_service()
+    
+    async def event_stream():
+        events = chat_service.stream_query(
+            db=db,
+            user=current_user,
+            request=request_data,
+            ip_address=ip_address,
+            user_agent=user_agent
+        )
+        try:
+            async for event, payload in events:
+                if event == "response":
+                    logger.log_activity(
+                        action="chat_stream",
+                        user_id=str(current_user.id),
+                        details={
+                            "session_id": request_data.session_id,
+                            "query_length": len(request_data.query),
+                            "status": payload["status"]
+                        }
+                    )
+                yield _sse_event(event, payload)
+        finally:
+            await events.aclose()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # Keep nginx from buffering the stream
+            "X-Accel-Buffering": "no"
+        }
+    )
+
+
 @router.get("/chat/history/{session_id}", response_model=ChatHistoryResponse)
 async def get_chat_history(
     session_id: str,
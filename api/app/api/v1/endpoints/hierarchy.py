@@ -666,6 +666,46 @@ async def get_entity_statistics(
     return statistics
 
 
+@router.get("/{entity_type}/{entity_id}/children/statistics")
+async def get_children_statistics(
+    entity_type: str = Path(..., description="Parent entity type"),
+    entity_id: str = Path(..., description="Parent entity ID"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Get statistics for all direct children of an entity, keyed by child ID."""
+    valid_types = ['client', 'program', 'project', 'usecase', 'userstory', 'task']
+    if entity_type.lower() not in valid_types:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid entity type. Must be one of: {', '.join(valid_types)}"
+        )
+
+    service = HierarchyService(db)
+    statistics = await service.get_children_statistics(entity_type.lower(), entity_id, current_user)
+
+    logger.log_activity(action="view_children_statistics", entity_type=entity_type.lower(), entity_id=str(entity_id))
+    return statistics
+
+
+# ==================== MOVE ENDPOINT ====================
+
+@router.post("/{entity_type}/{entity_id}/move")
+async def move_entity(
+    entity_type: str = Path(..., description="Entity type (program, project, usecase, userstory, task, subtask)"),
+    entity_id: str = Path(..., description="Entity ID"),
+    new_parent_id: str = Query(..., description="ID of the new parent entity"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Move an entity and its subtree under a new parent of the level above it."""
+    service = HierarchyService(db)
+    entity = await service.move_entity(entity_type.lower(), entity_id, new_parent_id, current_user)
+    
+    logger.log_activity(action="move_entity", entity_type=entity_type.lower(), entity_id=str(entity_id), new_parent_id=str(new_parent_id))
+    return _entity_to_dict(entity)
+
+
 # ==================== GLOBAL SEARCH ENDPOINT ====================
 
 @router.get("/search")
@@ -24,8 +24,7 @@ async def get_cache_stats(
 ) -> Dict[str, Any]:
     """Get cache statistics"""
     return {
-        "cache_size": len(cache_service._cache),
-        "ttl_entries": len(cache_service._ttl),
+        **cache_service.stats(),
         "memory_usage_mb": psutil.Process(os.getpid()).memory_info().rss / 1024 / 1024
     }
 
@@ -37,11 +36,10 @@ async def clear_cache(
 ) -> Dict[str, str]:
     """Clear cache entries"""
     if pattern:
-        cache_service.clear_pattern(pattern)
+        await cache_service.clear_pattern(pattern)
         return {"message": f"Cleared cache entries matching pattern: {pattern}"}
     else:
-        cache_service._cache.clear()
-        cache_service._ttl.clear()
+        await cache_service.clear()
         return {"message": "All cache entries cleared"}
 
 
@@ -90,6 +88,6 @@ async def system_health() -> Dict[str, Any]:
         "cpu_percent": psutil.cpu_percent(interval=1),
         "memory_usage_mb": process.memory_info().rss / 1024 / 1024,
         "memory_percent": process.memory_percent(),
-        "cache_entries": len(cache_service._cache),
+        "cache_entries": len(cache_service.l1),
         "uptime_seconds": time.time() - process.create_time()
     }
\ No newline at end of file
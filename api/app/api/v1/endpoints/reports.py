@@ -1,152 +1,218 @@
 """
 Reports API Endpoints
-Handles report generation with PDF and CSV export functionality
+Handles report generation with streaming CSV, XLSX and PDF export, and
+background report jobs for heavy reports
 """
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from typing import Optional, Dict, Any
-from datetime import datetime
-import io
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import FileResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Any, Dict, Optional
+from datetime import date, datetime
 
 from app.db.base import get_db
+from app.core.exceptions import ConflictException, ResourceNotFoundException
 from app.core.security import get_current_user
 from app.models.user import User
-from app.services.report_service import ReportService
+from app.schemas.report import ReportJobCreate, ReportJobResponse
+from app.services.report_service import ReportService, ReportStream
+from app.services.report_export import MEDIA_TYPES, export_stream, gzip_chunks
+from app.services.report_jobs import (
+    COMPLETED, JOB_MEDIA_TYPES, download_url, get_report_job_service
+)
 
 router = APIRouter()
 
 
-def export_report(report_data: Dict[str, Any], format: Optional[str], report_name: str, report_service: ReportService):
+async def export_report(report: ReportStream, format: Optional[str], report_name: str, compress: bool = False):
     """Helper function to export report in requested format"""
     # Return JSON if no format specified or format is json
     if not format or format == "json":
-        return report_data
+        return await report.collect()
     
     # Generate timestamp for filename
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{report_name}_{timestamp}.{format}"
     
-    # Export based on format
-    if format == "pdf":
-        pdf_buffer = report_service.export_to_pdf(report_data, report_data["title"])
-        return StreamingResponse(
-            io.BytesIO(pdf_buffer),
-            media_type="application/pdf",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
-    else:  # csv
-        csv_buffer = report_service.export_to_csv(report_data)
-        return StreamingResponse(
-            io.BytesIO(csv_buffer.encode()),
-            media_type="text/csv",
-            headers={"Content-Disposition": f"attachment; filename={filename}"}
-        )
+    # Rows are read from the database as the response is sent
+    chunks = export_stream(report, format)
+    headers = {"Content-Disposition": f"attachment; filename={filename}"}
+    if compress:
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    
+    return StreamingResponse(chunks, media_type=MEDIA_TYPES[format], headers=headers)
 
 
 @router.get("/utilization")
 async def generate_utilization_report(
-    format: Optional[str] = Query(None, regex="^(pdf|csv|json)$"),
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    db: Session = Depends(get_db),
+    format: Optional[str] = Query(None, regex="^(pdf|csv|xlsx|json)$"),
+    compress: bool = Query(False, description="Gzip the exported file"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Generate Utilization Report - Resource allocation vs actual usage analysis"""
     report_service = ReportService(db)
-    report_data = await report_service.generate_utilization_report(
+    report = await report_service.generate_utilization_report(
         start_date=start_date, end_date=end_date, user_id=current_user.id
     )
-    return export_report(report_data, format, "utilization_report", report_service)
+    return await export_report(report, format, "utilization_report", compress)
 
 
 @router.get("/engagement")
 async def generate_engagement_report(
-    format: Optional[str] = Query(None, regex="^(pdf|csv|json)$"),
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    db: Session = Depends(get_db),
+    format: Optional[str] = Query(None, regex="^(pdf|csv|xlsx|json)$"),
+    compress: bool = Query(False, description="Gzip the exported file"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Generate Engagement Report - Developer activity and contribution metrics"""
     report_service = ReportService(db)
-    report_data = await report_service.generate_engagement_report(
+    report = await report_service.generate_engagement_report(
         start_date=start_date, end_date=end_date, user_id=current_user.id
     )
-    return export_report(report_data, format, "engagement_report", report_service)
+    return await export_report(report, format, "engagement_report", compress)
 
 
 @router.get("/occupancy-forecast")
 async def generate_occupancy_forecast(
-    format: Optional[str] = Query(None, regex="^(pdf|csv|json)$"),
+    format: Optional[str] = Query(None, regex="^(pdf|csv|xlsx|json)$"),
+    compress: bool = Query(False, description="Gzip the exported file"),
     weeks_ahead: int = Query(4, ge=1, le=52),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Generate Occupancy Forecast - Time booking predictions"""
     report_service = ReportService(db)
-    report_data = await report_service.generate_occupancy_forecast(
+    report = await report_service.generate_occupancy_forecast(
         weeks_ahead=weeks_ahead, user_id=current_user.id
     )
-    return export_report(report_data, format, "occupancy_forecast", report_service)
+    return await export_report(report, format, "occupancy_forecast", compress)
 
 
 @router.get("/bug-density")
 async def generate_bug_density_report(
-    format: Optional[str] = Query(None, regex="^(pdf|csv|json)$"),
+    format: Optional[str] = Query(None, regex="^(pdf|csv|xlsx|json)$"),
+    compress: bool = Query(False, description="Gzip the exported file"),
     project_id: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Generate Bug Density Report - Bug trends and resolution metrics"""
     report_service = ReportService(db)
-    report_data = await report_service.generate_bug_density_report(
+    report = await report_service.generate_bug_density_report(
         project_id=project_id, user_id=current_user.id
     )
-    return export_report(report_data, format, "bug_density_report", report_service)
+    return await export_report(report, format, "bug_density_report", compress)
 
 
 @router.get("/sprint-velocity")
 async def generate_sprint_velocity_report(
-    format: Optional[str] = Query(None, regex="^(pdf|csv|json)$"),
+    format: Optional[str] = Query(None, regex="^(pdf|csv|xlsx|json)$"),
+    compress: bool = Query(False, description="Gzip the exported file"),
     project_id: Optional[str] = None,
     sprint_count: int = Query(10, ge=1, le=50),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Generate Sprint Velocity Report - Team velocity and sprint completion trends"""
     report_service = ReportService(db)
-    report_data = await report_service.generate_sprint_velocity_report(
+    report = await report_service.generate_sprint_velocity_report(
         project_id=project_id, sprint_count=sprint_count, user_id=current_user.id
     )
-    return export_report(report_data, format, "sprint_velocity_report", report_service)
+    return await export_report(report, format, "sprint_velocity_report", compress)
 
 
 @router.get("/project-health")
 async def generate_project_health_report(
-    format: Optional[str] = Query(None, regex="^(pdf|csv|json)$"),
+    format: Optional[str] = Query(None, regex="^(pdf|csv|xlsx|json)$"),
+    compress: bool = Query(False, description="Gzip the exported file"),
     project_id: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Generate Project Health Report - Overall project status and risk assessment"""
     report_service = ReportService(db)
-    report_data = await report_service.generate_project_health_report(
+    report = await report_service.generate_project_health_report(
         project_id=project_id, user_id=current_user.id
     )
-    return export_report(report_data, format, "project_health_report", report_service)
+    return await export_report(report, format, "project_health_report", compress)
 
 
 @router.get("/project-tree")
 async def generate_project_tree_report(
-    format: Optional[str] = Query(None, regex="^(pdf|csv|json)$"),
+    format: Optional[str] = Query(None, regex="^(pdf|csv|xlsx|json)$"),
+    compress: bool = Query(False, description="Gzip the exported file"),
     project_id: str = Query(..., description="Project ID is required"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Generate Project Tree Report - Hierarchical view of project structure"""
     report_service = ReportService(db)
-    report_data = await report_service.generate_project_tree_report(
-        project_id=project_id, user_id=current_user.id
+    try:
+        report = await report_service.generate_project_tree_report(
+            project_id=project_id, user_id=current_user.id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return await export_report(report, format, "project_tree_report", compress)
+
+
+# ==================== BACKGROUND JOBS ====================
+
+def _job_response(job: Dict[str, Any]) -> ReportJobResponse:
+    """Job record as returned to its owner"""
+    return ReportJobResponse(
+        **{field: job[field] for field in ReportJobResponse.model_fields if field in job},
+        download_url=download_url(job["job_id"]) if job["status"] == COMPLETED else None
     )
-    return export_report(report_data, format, "project_tree_report", report_service)
+
+
+async def _get_own_job(job_id: str, current_user: User) -> Dict[str, Any]:
+    """Get a job submitted by the current user"""
+    job = await get_report_job_service().get_job(job_id)
+    if job is None or job["user_id"] != current_user.id:
+        raise ResourceNotFoundException("Report job", job_id)
+    return job
+
+
+@router.post("/jobs", response_model=ReportJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def submit_report_job(
+    job_in: ReportJobCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """Submit a report to be generated in the background; poll the job or wait for the notification"""
+    job = await get_report_job_service().submit(
+        current_user.id, job_in.report, job_in.format, job_in.params
+    )
+    return _job_response(job)
+
+
+@router.get("/jobs/{job_id}", response_model=ReportJobResponse)
+async def get_report_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get the status of a report job"""
+    return _job_response(await _get_own_job(job_id, current_user))
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_report_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Download the file of a completed report job"""
+    job = await _get_own_job(job_id, current_user)
+    if job["status"] != COMPLETED:
+        raise ConflictException(f"Report job {job_id} is {job['status']}", {"status": job["status"]})
+    
+    path = get_report_job_service().store.path(job["artifact"])
+    if not path.is_file():
+        raise ResourceNotFoundException("Report file", job_id)
+    
+    filename = f"{job['report'].replace('-', '_')}_{job_id}.{job['format']}"
+    return FileResponse(path, media_type=JOB_MEDIA_TYPES[job["format"]], filename=filename)
@@ -9,15 +9,26 @@ from sqlalchemy import select, text
 from app.db.base import get_db
 from app.models.user import User
 from app.models.audit import AuditLog
+from app.models.team import TeamMember
 from app.schemas.user import UserResponse, UserUpdate, UserCreate, PasswordChangeRequest
-from app.core.security import get_current_user, require_role, get_password_hash, verify_password
+from app.core.security import (
+    get_current_user, require_role, hash_password, authenticate_password, create_user_access_token
+)
 from app.core.exceptions import ResourceNotFoundException, ConflictException
 from app.core.logging import StructuredLogger
+from app.services.cache_service import cache_service
 
 router = APIRouter()
 logger = StructuredLogger(__name__)
 
 
+async def _invalidate_user_caches(db: AsyncSession, user_id: str) -> None:
+    """Invalidate cached entries embedding the user: principal, user tags and their teams' member lists"""
+    result = await db.execute(select(TeamMember.team_id).where(TeamMember.user_id == user_id))
+    team_tags = [f"team:{team_id}" for team_id in set(result.scalars().all())]
+    await cache_service.invalidate_tags(f"principal:{user_id}", f"user:{user_id}", *team_tags)
+
+
 async def create_audit_log(
     db: AsyncSession,
     user_id: str,
@@ -90,6 +101,7 @@ async def update_user_preferences(
     
     await db.commit()
     await db.refresh(current_user)
+    await cache_service.invalidate_principal(current_user.id)
     
     logger.log_activity(
         action="update_preferences",
@@ -109,8 +121,11 @@ async def change_password(
     """Change current user's password."""
     logger.info(f"Password change request received for user: {current_user.id}")
     
+    # The password hash is not part of the cached principal
+    await db.refresh(current_user, ["hashed_password"])
+    
     # Verify current password
-    if not verify_password(password_data.current_password, current_user.hashed_password):
+    if not await authenticate_password(current_user, password_data.current_password):
         logger.warning(f"Password change failed: Incorrect current password for user {current_user.id}")
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -125,11 +140,13 @@ async def change_password(
             detail="New password must be at least 6 characters long"
         )
     
-    # Update password
-    current_user.hashed_password = get_password_hash(password_data.new_password)
+    # Update password and revoke tokens issued with the old one
+    current_user.hashed_password = await hash_password(password_data.new_password)
+    current_user.token_version = User.token_version + 1
     
     await db.commit()
     await db.refresh(current_user)
+    await cache_service.invalidate_principal(current_user.id)
     
     logger.log_activity(
         action="change_password",
@@ -138,7 +155,11 @@ async def change_password(
     )
     
     logger.info(f"Password changed successfully for user: {current_user.id}")
-    return {"message": "Password changed successfully"}
+    return {
+        "message": "Password changed successfully",
+        "access_token": create_user_access_token(current_user),
+        "token_type": "bearer"
+    }
 
 
 @router.post("/", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
@@ -157,7 +178,7 @@ async def create_user(
         raise ConflictException(f"User with email '{user_data.email}' already exists")
     
     # Hash the password
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hash_password(user_data.password)
     
     # Create new user
     # Set primary_role to match role (for backward compatibility)
@@ -290,9 +311,14 @@ async def update_user(
     if user_data.is_active is not None and user_data.is_active != user.is_active:
         changes_dict["is_active"] = {"old": user.is_active, "new": user_data.is_active}
         user.is_active = user_data.is_active
+        if not user_data.is_active:
+            # Tokens issued before deactivation stay revoked after reactivation
+            user.token_version = User.token_version + 1
     
     await db.commit()
     await db.refresh(user)
+    if changes_dict:
+        await _invalidate_user_caches(db, user_id)
     
     # Create audit log if there were changes
     if changes_dict:
@@ -343,12 +369,14 @@ async def delete_user(
         raise ConflictException("User is already inactive")
     
     # Simple direct SQL update - no ORM objects involved
+    # Tokens issued before deactivation stay revoked after reactivation
     await db.execute(
-        text("UPDATE users SET is_active = false WHERE id = :user_id"),
+        text("UPDATE users SET is_active = false, token_version = token_version + 1 WHERE id = :user_id"),
         {"user_id": user_id}
     )
     
     await db.commit()
+    await _invalidate_user_caches(db, user_id)
 
 
 @router.put("/{user_id}/reactivate", response_model=UserResponse)
@@ -382,6 +410,7 @@ async def reactivate_user(
     
     # Refresh the user object to get updated data
     await db.refresh(user)
+    await _invalidate_user_caches(db, user_id)
     
     logger.log_activity(
         action="reactivate_user",
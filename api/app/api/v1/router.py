@@ -121,6 +121,10 @@ api_router.include_router(public_subtasks.router, prefix="/public", tags=["publi
 from app.api.v1.endpoints import notifications
 api_router.include_router(notifications.router, prefix="/notifications", tags=["notifications"])
 
+# Cache - Cache statistics and invalidation (Admin only)
+from app.api.v1.endpoints import cache
+api_router.include_router(cache.router, prefix="/cache", tags=["cache"])
+
 # Performance - Performance monitoring and optimization (temporarily disabled due to missing psutil dependency)
 # from app.api.v1.endpoints import performance
 # api_router.include_router(performance.router, prefix="/performance", tags=["performance"])
@@ -19,6 +19,9 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    PASSWORD_BCRYPT_ROUNDS: int = 12  # existing hashes are upgraded on login
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
     
     # CORS - Can be comma-separated string or list
     CORS_ORIGINS: str = "http://localhost:3007,http://localhost:3008,http://localhost:3000,http://localhost:8007"
@@ -60,16 +63,61 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_DB: int = 1
     REDIS_PASSWORD: Optional[str] = None
+
+    # Cache Configuration
+    CACHE_BACKEND: str = "redis"  # or "memory" (in-process only)
+    CACHE_DEFAULT_TTL_SECONDS: int = 900
+    CACHE_L1_MAX_ENTRIES: int = 2048
+    CACHE_L1_TTL_SECONDS: int = 30
+    CACHE_KEY_PREFIX: str = "worky:cache"
+    CACHE_INVALIDATION_CHANNEL: str = "worky:cache:invalidate"
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60  # authenticated user lookups
+    
+    # QA Metrics Configuration
+    QA_TRENDS_SNAPSHOTS_ENABLED: bool = False  # read long bug trends from bug_daily_snapshots
+    QA_TRENDS_SNAPSHOT_MIN_DAYS: int = 90  # shorter ranges always scan bugs
+    
+    # Report Export Configuration
+    REPORT_STREAM_BATCH_ROWS: int = 1000  # rows per server-side cursor fetch
+    REPORT_CSV_CHUNK_BYTES: int = 65536  # CSV bytes buffered before a chunk is sent
+    REPORT_JOB_WORKERS: int = 2  # background report builds per API worker
+    REPORT_JOB_MAX_QUEUE: int = 32  # builds waiting for a worker; more are rejected
+    REPORT_JOB_TIMEOUT_SECONDS: int = 600
+    REPORT_JOB_FRESHNESS_SECONDS: int = 300  # identical requests reuse the stored file
+    REPORT_JOB_TTL_SECONDS: int = 86400  # job status and files are kept this long
+    REPORT_ARTIFACT_DIR: str = "/tmp/worky_reports"  # shared by every API worker
+    
+    # Rate Limiting Configuration
+    RATE_LIMIT_BACKEND: str = "redis"  # or "memory" (per-worker limits)
+    RATE_LIMIT_LOGIN_PER_MINUTE: int = 20
+    RATE_LIMIT_REPORTS_PER_MINUTE: int = 60
+    RATE_LIMIT_MEMORY_MAX_KEYS: int = 10000
+    RATE_LIMIT_REDIS_RETRY_SECONDS: int = 30
     
     # Chat Configuration
     CHAT_RATE_LIMIT_PER_MINUTE: int = 60
     CHAT_RATE_LIMIT_PER_HOUR: int = 1000
+    CHAT_RATE_LIMIT_LEASE_SIZE: int = 4  # extra tokens served locally per Redis check
+    CHAT_RATE_LIMIT_LEASE_SECONDS: float = 2.0  # unspent leased tokens are refunded after this
     CHAT_SESSION_TTL_MINUTES: int = 30
     CHAT_MAX_QUERY_LENGTH: int = 2000
     CHAT_MAX_CONTEXT_MESSAGES: int = 10
     CHAT_ENABLE_VECTOR_SEARCH: bool = False
     CHAT_ENABLE_ACTIONS: bool = True
     CHAT_ENABLE_AUDIT_LOGGING: bool = True
+    CHAT_AUDIT_QUEUE_MAX_LENGTH: int = 10000  # above this, audits are written inline
+    CHAT_AUDIT_WRITER_BATCH_SIZE: int = 100
+    CHAT_AUDIT_CLAIM_IDLE_SECONDS: int = 60  # redeliver entries left pending by a dead writer
+    CHAT_BOOKKEEPING_MAX_PENDING: int = 256  # above this, session bookkeeping runs inline
+    CHAT_RESPONSE_CACHE_ENABLED: bool = True
+    CHAT_RESPONSE_CACHE_TTL_SECONDS: int = 300  # backstop; writes invalidate earlier
+    CHAT_CLASSIFICATION_CACHE_TTL_SECONDS: int = 3600
+    CHAT_RETRIEVAL_TIMEOUT_SECONDS: float = 2.0  # lookups still running after this are dropped
+    CHAT_RETRIEVAL_MAX_ROWS: int = 60  # shared by the list queries of one request
+    CHAT_RETRIEVAL_MAX_CONCURRENCY: int = 4  # pooled connections one request may use
+    CHAT_PROMPT_MAX_TOKENS: int = 6000  # system prompt, history, query and data
+    CHAT_PROMPT_HISTORY_SHARE: float = 0.25  # of the budget the fixed parts leave
+    CHAT_PROMPT_TABLE_ROWS: int = 20  # rows per table before the budget cuts them
     
     @property
     def database_url(self) -> str:
@@ -0,0 +1,216 @@
+"""
+Password hashing off the event loop.
+
+A bcrypt hash or verify costs ~200-300 ms of CPU. Run inline in an async
+handler it stalls every other request on the worker, so hashing runs on a
+dedicated thread pool instead (bcrypt releases the GIL while it works):
+
+- at most PASSWORD_HASH_WORKERS operations run at once
+- at most PASSWORD_HASH_MAX_QUEUE more wait for a worker; further callers
+  get PasswordHasherBusyException (503) instead of piling up behind them
+- queue depth, in-flight operations, wait and run times and rehashes are
+  exported to Prometheus
+
+Hashes whose cost parameters differ from PASSWORD_BCRYPT_ROUNDS are
+reported by verify_and_update, so callers can rehash transparently on login.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, TypeVar
+
+from fastapi import status
+from passlib.context import CryptContext
+from prometheus_client import Counter, Gauge, Histogram
+
+from app.core.config import settings
+from app.core.exceptions import WorkyException
+from app.core.logging import StructuredLogger
+
+logger = StructuredLogger(__name__)
+
+T = TypeVar("T")
+
+# Password hashing
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=settings.PASSWORD_BCRYPT_ROUNDS
+)
+
+
+# Pool metrics
+password_hash_queue_depth = Gauge(
+    'password_hash_queue_depth',
+    'Password hashing operations waiting for a worker'
+)
+
+password_hash_in_flight = Gauge(
+    'password_hash_in_flight',
+    'Password hashing operations running on a worker'
+)
+
+password_hash_wait_seconds = Histogram(
+    'password_hash_wait_seconds',
+    'Time password hashing operations spent waiting for a worker',
+    ['operation'],
+    buckets=[0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0]
+)
+
+password_hash_duration_seconds = Histogram(
+    'password_hash_duration_seconds',
+    'Time spent hashing or verifying a password on a worker',
+    ['operation'],
+    buckets=[0.01, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.5]
+)
+
+password_hash_rejections_total = Counter(
+    'password_hash_rejections_total',
+    'Password hashing operations rejected because the queue was full',
+    ['operation']
+)
+
+password_rehash_total = Counter(
+    'password_rehash_total',
+    'Password hashes upgraded to the current cost parameters on login'
+)
+
+
+class PasswordHasherBusyException(WorkyException):
+    """Exception raised when the password hashing queue is full."""
+
+    def __init__(self):
+        super().__init__(
+            code="PASSWORD_HASHER_BUSY",
+            message="Too many sign-in attempts in progress. Please retry shortly.",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+
+class PasswordHasher:
+    """Bounded worker pool for bcrypt hashing and verification"""
+
+    def __init__(
+        self,
+        context: CryptContext = pwd_context,
+        workers: int = settings.PASSWORD_HASH_WORKERS,
+        max_queue: int = settings.PASSWORD_HASH_MAX_QUEUE
+    ):
+        self.context = context
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Operations waiting for a worker"""
+        return self._queued
+
+    @property
+    def in_flight(self) -> int:
+        """Operations running on a worker"""
+        return self._running
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="password-hash"
+            )
+        return self._executor
+
+    def _update_gauges(self) -> None:
+        password_hash_queue_depth.set(self._queued)
+        password_hash_in_flight.set(self._running)
+
+    async def _run(self, operation: str, func: Callable[..., T], *args) -> T:
+        """Run func on the pool, rejecting work beyond the queue bound"""
+        with self._lock:
+            full = self._queued + self._running >= self.workers + self.max_queue
+            if not full:
+                self._queued += 1
+                self._update_gauges()
+        if full:
+            password_hash_rejections_total.labels(operation=operation).inc()
+            logger.warning(
+                "Password hashing queue full",
+                operation=operation,
+                queue_depth=self._queued
+            )
+            raise PasswordHasherBusyException()
+
+        submitted = time.perf_counter()
+        state = {"started": None, "abandoned": False}
+
+        def work() -> T:
+            with self._lock:
+                if state["abandoned"]:
+                    raise asyncio.CancelledError()
+                state["started"] = time.perf_counter()
+                self._queued -= 1
+                self._running += 1
+                self._update_gauges()
+            try:
+                return func(*args)
+            finally:
+                password_hash_duration_seconds.labels(operation=operation).observe(
+                    time.perf_counter() - state["started"]
+                )
+                with self._lock:
+                    self._running -= 1
+                    self._update_gauges()
+
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), work)
+        finally:
+            with self._lock:
+                if state["started"] is None:
+                    # Cancelled before a worker picked it up
+                    state["abandoned"] = True
+                    self._queued -= 1
+                    self._update_gauges()
+            if state["started"] is not None:
+                password_hash_wait_seconds.labels(operation=operation).observe(
+                    state["started"] - submitted
+                )
+
+    async def hash(self, password: str) -> str:
+        """Hash a password with the current cost parameters"""
+        return await self._run("hash", self.context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """Verify a password against a hash"""
+        return await self._run("verify", self.context.verify, password, hashed_password)
+
+    async def verify_and_update(
+        self,
+        password: str,
+        hashed_password: str
+    ) -> Tuple[bool, Optional[str]]:
+        """
+        Verify a password and rehash it if its cost parameters are outdated.
+
+        Returns (valid, new_hash); new_hash is None unless the password is
+        valid and the stored hash should be replaced.
+        """
+        valid, new_hash = await self._run(
+            "verify", self.context.verify_and_update, password, hashed_password
+        )
+        if new_hash is not None:
+            password_rehash_total.inc()
+        return valid, new_hash
+
+    def shutdown(self) -> None:
+        """Stop the worker threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher()
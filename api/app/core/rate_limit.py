@@ -0,0 +1,292 @@
+"""
+Shared rate limiting engine.
+
+Limits are enforced with GCRA (generic cell rate algorithm): each key stores
+a single "theoretical arrival time", so a check is O(1) in time and memory.
+A policy of N requests per window admits a burst of N and then one request
+every window/N seconds.
+
+- RedisRateLimiterBackend: one atomic Lua script call per check, shared by
+  every worker, using the Redis server clock
+- MemoryRateLimiterBackend: per-process fallback with a bounded key map;
+  idle keys (whose state equals "full bucket") are evicted without loss,
+  and new keys are denied while the map is full of live ones
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.logging import StructuredLogger
+
+logger = StructuredLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """N requests per window for one bucket namespace."""
+
+    name: str
+    limit: int
+    window_seconds: int = 60
+
+    @property
+    def interval(self) -> float:
+        """Seconds between requests at the sustained rate."""
+        return self.window_seconds / self.limit
+
+    @property
+    def description(self) -> str:
+        unit = {60: "minute", 3600: "hour"}.get(self.window_seconds)
+        if unit:
+            return f"{self.limit} requests per {unit}"
+        return f"{self.limit} requests per {self.window_seconds} seconds"
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """Applies a policy to requests matching a path prefix, methods and roles."""
+
+    policy: RateLimitPolicy
+    path_prefix: Optional[str] = None
+    methods: Tuple[str, ...] = ()
+    roles: Tuple[str, ...] = ()
+
+    def matches(self, path: str, method: str, role: Optional[str]) -> bool:
+        if self.path_prefix and not path.startswith(self.path_prefix):
+            return False
+        if self.methods and method not in self.methods:
+            return False
+        if self.roles and role not in self.roles:
+            return False
+        return True
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    """Outcome of a rate limit check."""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float
+    reset_after: float
+
+
+def default_rate_limit_rules(requests_per_minute: int) -> Tuple[RateLimitRule, ...]:
+    """Per-route and per-role policies applied before the default policy."""
+    return (
+        RateLimitRule(
+            RateLimitPolicy("login", settings.RATE_LIMIT_LOGIN_PER_MINUTE),
+            path_prefix="/api/v1/auth/login",
+            methods=("POST",)
+        ),
+        RateLimitRule(
+            RateLimitPolicy("reports", settings.RATE_LIMIT_REPORTS_PER_MINUTE),
+            path_prefix="/api/v1/reports"
+        ),
+        RateLimitRule(
+            RateLimitPolicy("admin", requests_per_minute * 2),
+            roles=("Admin",)
+        ),
+    )
+
+
+def resolve_policy(
+    rules: Sequence[RateLimitRule],
+    default: RateLimitPolicy,
+    path: str,
+    method: str,
+    role: Optional[str]
+) -> RateLimitPolicy:
+    """First matching rule's policy, or the default policy."""
+    for rule in rules:
+        if rule.matches(path, method, role):
+            return rule.policy
+    return default
+
+
+def _gcra(tat: float, now: float, policy: RateLimitPolicy, cost: int) -> Tuple[RateLimitResult, Optional[float]]:
+    """
+    Evaluate GCRA for one request.
+
+    Returns the result and the new theoretical arrival time to store
+    (None when the request is denied and state is unchanged).
+    """
+    interval = policy.interval
+    tat = max(tat, now)
+    new_tat = tat + interval * cost
+    allow_at = new_tat - interval * policy.limit
+
+    if now < allow_at:
+        return RateLimitResult(False, policy.limit, 0, allow_at - now, tat - now), None
+
+    remaining = int((now - allow_at) / interval + 1e-9)
+    return RateLimitResult(True, policy.limit, remaining, 0.0, new_tat - now), new_tat
+
+
+class MemoryRateLimiterBackend:
+    """
+    Per-process GCRA state with idle-key eviction and a key bound.
+
+    Live keys are never evicted, as that would reset a throttled client to a
+    full bucket; once max_keys live keys are stored, new keys are denied
+    until one of them expires.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._tat: "OrderedDict[str, float]" = OrderedDict()
+        self._next_expiry = 0.0  # no stored TAT expires earlier
+
+    def __len__(self) -> int:
+        return len(self._tat)
+
+    def _evict(self, now: float) -> None:
+        # Least recently updated keys first; an expired TAT is a full bucket
+        for _ in range(2):
+            if not self._tat:
+                return
+            key, tat = next(iter(self._tat.items()))
+            if tat > now:
+                break
+            del self._tat[key]
+
+    def _sweep(self, now: float) -> None:
+        # Full scan, at most once per expiry while the map is full
+        for key in [key for key, tat in self._tat.items() if tat <= now]:
+            del self._tat[key]
+        self._next_expiry = min(self._tat.values(), default=now)
+
+    async def hit(self, key: str, policy: RateLimitPolicy, cost: int = 1) -> RateLimitResult:
+        now = time.monotonic()
+        if key not in self._tat and len(self._tat) >= self.max_keys:
+            if now >= self._next_expiry:
+                self._sweep(now)
+            if len(self._tat) >= self.max_keys:
+                retry_after = self._next_expiry - now
+                return RateLimitResult(False, policy.limit, 0, retry_after, retry_after)
+
+        result, new_tat = _gcra(self._tat.get(key, now), now, policy, cost)
+        if new_tat is not None:
+            self._tat[key] = new_tat
+            self._tat.move_to_end(key)
+            self._next_expiry = min(self._next_expiry, new_tat)
+        self._evict(now)
+        return result
+
+
+# KEYS[1] = bucket key; ARGV = interval, limit, cost
+# Returns {allowed, remaining, retry_after, reset_after}; floats as strings
+GCRA_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+
+local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+if tat < now then tat = now end
+local new_tat = tat + interval * cost
+local allow_at = new_tat - interval * limit
+
+if now < allow_at then
+    return {0, 0, tostring(allow_at - now), tostring(tat - now)}
+end
+
+redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+return {1, math.floor((now - allow_at) / interval + 1e-9), '0', tostring(new_tat - now)}
+"""
+
+
+class RedisRateLimiterBackend:
+    """GCRA state shared through Redis, evaluated atomically server-side."""
+
+    def __init__(self, redis_client: aioredis.Redis):
+        self.redis = redis_client
+        self._script = redis_client.register_script(GCRA_SCRIPT)
+
+    async def hit(self, key: str, policy: RateLimitPolicy, cost: int = 1) -> RateLimitResult:
+        allowed, remaining, retry_after, reset_after = await self._script(
+            keys=[key], args=[policy.interval, policy.limit, cost]
+        )
+        return RateLimitResult(
+            bool(allowed), policy.limit, int(remaining), float(retry_after), float(reset_after)
+        )
+
+
+class RateLimiter:
+    """
+    Rate limiter facade: Redis when available, in-memory otherwise.
+
+    Redis failures switch to the in-memory backend and reconnection is
+    retried after RATE_LIMIT_REDIS_RETRY_SECONDS, so an outage neither fails
+    requests nor costs a connection attempt per request.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[RedisRateLimiterBackend] = None,
+        fallback: Optional[MemoryRateLimiterBackend] = None
+    ):
+        self.backend = backend
+        self.fallback = (
+            fallback if fallback is not None
+            else MemoryRateLimiterBackend(settings.RATE_LIMIT_MEMORY_MAX_KEYS)
+        )
+        self.redis_client: Optional[aioredis.Redis] = backend.redis if backend else None
+        self._retry_at = 0.0
+
+    async def get_redis(self) -> Optional[aioredis.Redis]:
+        """Shared Redis client, connecting lazily; None while Redis is unavailable."""
+        if self.redis_client is not None:
+            return self.redis_client
+        if settings.RATE_LIMIT_BACKEND != "redis" or time.monotonic() < self._retry_at:
+            return None
+        try:
+            client = aioredis.from_url(
+                settings.redis_url,
+                encoding="utf-8",
+                decode_responses=True,
+                socket_connect_timeout=5,
+                socket_timeout=5
+            )
+            await client.ping()
+        except RedisError as e:
+            logger.warning(f"Redis unavailable for rate limiting, using in-memory limits: {e}")
+            self._retry_at = time.monotonic() + settings.RATE_LIMIT_REDIS_RETRY_SECONDS
+            return None
+
+        self.redis_client = client
+        self.backend = RedisRateLimiterBackend(client)
+        logger.info("Redis connection established for rate limiting")
+        return client
+
+    async def hit(self, identifier: str, policy: RateLimitPolicy, cost: int = 1) -> RateLimitResult:
+        """Count a request for identifier against policy."""
+        key = f"ratelimit:{policy.name}:{identifier}"
+        if await self.get_redis() is not None:
+            try:
+                return await self.backend.hit(key, policy, cost)
+            except RedisError as e:
+                logger.warning(f"Redis rate limit check failed, using in-memory limits: {e}")
+                self.redis_client = None
+                self.backend = None
+                self._retry_at = time.monotonic() + settings.RATE_LIMIT_REDIS_RETRY_SECONDS
+        return await self.fallback.hit(key, policy, cost)
+
+
+# Global rate limiter instance
+_rate_limiter: Optional[RateLimiter] = None
+
+
+def get_rate_limiter() -> RateLimiter:
+    """Get or create the shared rate limiter"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        _rate_limiter = RateLimiter()
+    return _rate_limiter
@@ -1,19 +1,18 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, HTTPBearer
 from fastapi import Request, Header
 from starlette.requests import Request as StarletteRequest
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.orm import make_transient_to_detached
 from app.core.config import settings
-from app.db.base import get_db
+from app.db.base import get_db, async_session_maker
+from app.core.password_hashing import password_hasher, pwd_context
 from app.models.user import User
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app.services.cache_service import cache_service
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
@@ -21,17 +20,47 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 # Optional OAuth2 scheme
 optional_oauth2_scheme = HTTPBearer(auto_error=False)
 
+# User columns cached for authenticated requests; the password hash is not cached
+PRINCIPAL_COLUMNS = tuple(
+    column.key for column in User.__table__.columns if column.key != "hashed_password"
+)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against a hash"""
+    """Verify a password against a hash (blocking; use verify_password_async in handlers)"""
     return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    """Hash a password"""
+    """Hash a password (blocking; use hash_password in handlers)"""
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hash on the password hashing pool"""
+    return await password_hasher.verify(plain_password, hashed_password)
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password on the password hashing pool"""
+    return await password_hasher.hash(password)
+
+
+async def authenticate_password(user: User, plain_password: str) -> bool:
+    """
+    Verify a user's password on the password hashing pool.
+
+    If the stored hash uses outdated cost parameters it is replaced with a
+    fresh hash on the user, to be saved with the session.
+    """
+    valid, new_hash = await password_hasher.verify_and_update(
+        plain_password, user.hashed_password
+    )
+    if new_hash is not None:
+        user.hashed_password = new_hash
+    return valid
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -45,6 +74,77 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def create_user_access_token(user: User, expires_delta: Optional[timedelta] = None) -> str:
+    """Create a JWT access token bound to the user's current token version"""
+    return create_access_token(
+        data={"sub": str(user.id), "ver": user.token_version},
+        expires_delta=expires_delta
+    )
+
+
+async def _attach_principal(db: AsyncSession, values: dict) -> User:
+    """Attach a cached user to the session without querying the users table"""
+    user = User(**values)
+    make_transient_to_detached(user)
+    return await db.merge(user, load=False)
+
+
+async def get_user_for_token(token: str, db: AsyncSession) -> Optional[User]:
+    """
+    Resolve the user an access token was issued to.
+
+    Users are cached per (user_id, token version) for
+    PRINCIPAL_CACHE_TTL_SECONDS, so authenticated requests skip the users
+    lookup. Cached users are attached to the session and can be updated as
+    usual; hashed_password is not cached and must be refreshed before use.
+
+    Returns None for invalid tokens, unknown users and revoked tokens (whose
+    version no longer matches the user's). Tokens issued without a version
+    claim count as version 1.
+    """
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
+    user_id = payload.get("sub")
+    if user_id is None:
+        return None
+    token_version = payload.get("ver", 1)
+
+    key = cache_service.principal_key(user_id, token_version)
+    values = await cache_service.get(key)
+    if values is not None:
+        return await _attach_principal(db, values)
+
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalar_one_or_none()
+    if user is None or user.token_version != token_version:
+        return None
+
+    await cache_service.set(
+        key,
+        {column: getattr(user, column) for column in PRINCIPAL_COLUMNS},
+        ttl=timedelta(seconds=settings.PRINCIPAL_CACHE_TTL_SECONDS),
+        tags=[f"principal:{user_id}"]
+    )
+    return user
+
+
+async def get_principal(token: str) -> Optional[User]:
+    """
+    Resolve the active user an access token was issued to, outside a request.
+
+    For middleware: looked up like get_user_for_token, so a cache miss fills
+    the principal cache the request's own lookup then hits. The returned user
+    is detached and only meant for reading identity and role.
+    """
+    async with async_session_maker() as db:
+        user = await get_user_for_token(token, db)
+    if user is None or not user.is_active:
+        return None
+    return user
+
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db)
@@ -56,18 +156,7 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    
-    # Get user from database (user_id is already a string)
-    result = await db.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    
+    user = await get_user_for_token(token, db)
     if user is None:
         raise credentials_exception
     
@@ -103,19 +192,9 @@ async def get_current_user_optional(
     token = authorization.replace("Bearer ", "")
     if not token:
         return None
-        
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            return None
-    except JWTError:
-        return None
     
-    # Get user from database (user_id is already a string)
     try:
-        result = await db.execute(select(User).where(User.id == user_id))
-        user = result.scalar_one_or_none()
+        user = await get_user_for_token(token, db)
         
         if user is None or not user.is_active:
             return None
@@ -243,207 +243,50 @@ class CRUDBug(CRUDBase[Bug, BugCreate, BugUpdate]):
         Returns:
             List of bugs matching the criteria including descendants
         """
-        from app.models.hierarchy import Program, Project, Usecase, UserStory, Task, Subtask
+        from app.services.hierarchy_closure_service import HierarchyClosureService, ENTITY_TYPES
         
         query = select(Bug).where(Bug.is_deleted == False)
         
-        # Build hierarchy conditions
+        # Bug hierarchy column for each entity type, root to leaf
+        bug_columns = {
+            'client': Bug.client_id,
+            'program': Bug.program_id,
+            'project': Bug.project_id,
+            'usecase': Bug.usecase_id,
+            'userstory': Bug.user_story_id,
+            'task': Bug.task_id,
+            'subtask': Bug.subtask_id
+        }
+        
+        # The most specific hierarchy filter defines the scope
+        scope = None
+        for scope_type, scope_id in [
+            ('subtask', subtask_id),
+            ('task', task_id),
+            ('userstory', user_story_id),
+            ('usecase', usecase_id),
+            ('project', project_id),
+            ('program', program_id),
+            ('client', client_id)
+        ]:
+            if scope_id:
+                scope = (scope_type, scope_id)
+                break
+        
+        # Build hierarchy conditions: bugs attached to the scope entity or to
+        # any of its live descendants, resolved through the closure table
         hierarchy_conditions = []
         
-        if subtask_id:
-            # Subtask is a leaf node, no descendants
-            hierarchy_conditions.append(Bug.subtask_id == subtask_id)
-        elif task_id:
-            # Include bugs at task level and all subtasks under it
-            hierarchy_conditions.append(Bug.task_id == task_id)
-            
-            # Get all subtasks under this task
-            subtask_subquery = select(Subtask.id).where(
-                and_(
-                    Subtask.task_id == task_id,
-                    Subtask.is_deleted == False
-                )
-            )
-            subtask_result = await db.execute(subtask_subquery)
-            subtask_ids = [row[0] for row in subtask_result.fetchall()]
-            
-            if subtask_ids:
-                hierarchy_conditions.append(Bug.subtask_id.in_(subtask_ids))
-        elif user_story_id:
-            # Include bugs at user story level and all descendants
-            hierarchy_conditions.append(Bug.user_story_id == user_story_id)
-            
-            # Get all tasks under this user story
-            task_subquery = select(Task.id).where(
-                and_(
-                    Task.user_story_id == user_story_id,
-                    Task.is_deleted == False
-                )
-            )
-            task_result = await db.execute(task_subquery)
-            task_ids = [row[0] for row in task_result.fetchall()]
-            
-            if task_ids:
-                hierarchy_conditions.append(Bug.task_id.in_(task_ids))
-                
-                # Get all subtasks under these tasks
-                subtask_subquery = select(Subtask.id).where(
-                    and_(
-                        Subtask.task_id.in_(task_ids),
-                        Subtask.is_deleted == False
+        if scope:
+            scope_type, scope_id = scope
+            closure = HierarchyClosureService(db)
+            hierarchy_conditions.append(bug_columns[scope_type] == scope_id)
+            for descendant_type in ENTITY_TYPES[ENTITY_TYPES.index(scope_type) + 1:]:
+                hierarchy_conditions.append(
+                    bug_columns[descendant_type].in_(
+                        closure.descendants_query(scope_type, scope_id, descendant_type)
                     )
                 )
-                subtask_result = await db.execute(subtask_subquery)
-                subtask_ids = [row[0] for row in subtask_result.fetchall()]
-                
-                if subtask_ids:
-                    hierarchy_conditions.append(Bug.subtask_id.in_(subtask_ids))
-        elif usecase_id:
-            # Include bugs at use case level and all descendants
-            hierarchy_conditions.append(Bug.usecase_id == usecase_id)
-            
-            # Get all user stories under this use case
-            user_story_subquery = select(UserStory.id).where(
-                and_(
-                    UserStory.usecase_id == usecase_id,
-                    UserStory.is_deleted == False
-                )
-            )
-            user_story_result = await db.execute(user_story_subquery)
-            user_story_ids = [row[0] for row in user_story_result.fetchall()]
-            
-            if user_story_ids:
-                hierarchy_conditions.append(Bug.user_story_id.in_(user_story_ids))
-                
-                # Get all tasks under these user stories
-                task_subquery = select(Task.id).where(
-                    and_(
-                        Task.user_story_id.in_(user_story_ids),
-                        Task.is_deleted == False
-                    )
-                )
-                task_result = await db.execute(task_subquery)
-                task_ids = [row[0] for row in task_result.fetchall()]
-                
-                if task_ids:
-                    hierarchy_conditions.append(Bug.task_id.in_(task_ids))
-                    
-                    # Get all subtasks under these tasks
-                    subtask_subquery = select(Subtask.id).where(
-                        and_(
-                            Subtask.task_id.in_(task_ids),
-                            Subtask.is_deleted == False
-                        )
-                    )
-                    subtask_result = await db.execute(subtask_subquery)
-                    subtask_ids = [row[0] for row in subtask_result.fetchall()]
-                    
-                    if subtask_ids:
-                        hierarchy_conditions.append(Bug.subtask_id.in_(subtask_ids))
-        elif project_id:
-            # Include bugs at project level and all descendants
-            hierarchy_conditions.append(Bug.project_id == project_id)
-            
-            # Get all use cases under this project
-            usecase_subquery = select(Usecase.id).where(
-                and_(
-                    Usecase.project_id == project_id,
-                    Usecase.is_deleted == False
-                )
-            )
-            usecase_result = await db.execute(usecase_subquery)
-            usecase_ids = [row[0] for row in usecase_result.fetchall()]
-            
-            if usecase_ids:
-                hierarchy_conditions.append(Bug.usecase_id.in_(usecase_ids))
-                
-                # Continue down the hierarchy (user stories, tasks, subtasks)
-                user_story_subquery = select(UserStory.id).where(
-                    and_(
-                        UserStory.usecase_id.in_(usecase_ids),
-                        UserStory.is_deleted == False
-                    )
-                )
-                user_story_result = await db.execute(user_story_subquery)
-                user_story_ids = [row[0] for row in user_story_result.fetchall()]
-                
-                if user_story_ids:
-                    hierarchy_conditions.append(Bug.user_story_id.in_(user_story_ids))
-                    
-                    task_subquery = select(Task.id).where(
-                        and_(
-                            Task.user_story_id.in_(user_story_ids),
-                            Task.is_deleted == False
-                        )
-                    )
-                    task_result = await db.execute(task_subquery)
-                    task_ids = [row[0] for row in task_result.fetchall()]
-                    
-                    if task_ids:
-                        hierarchy_conditions.append(Bug.task_id.in_(task_ids))
-                        
-                        subtask_subquery = select(Subtask.id).where(
-                            and_(
-                                Subtask.task_id.in_(task_ids),
-                                Subtask.is_deleted == False
-                            )
-                        )
-                        subtask_result = await db.execute(subtask_subquery)
-                        subtask_ids = [row[0] for row in subtask_result.fetchall()]
-                        
-                        if subtask_ids:
-                            hierarchy_conditions.append(Bug.subtask_id.in_(subtask_ids))
-        elif program_id:
-            # Include bugs at program level and all descendants
-            hierarchy_conditions.append(Bug.program_id == program_id)
-            
-            # Get all projects under this program
-            project_subquery = select(Project.id).where(
-                and_(
-                    Project.program_id == program_id,
-                    Project.is_deleted == False
-                )
-            )
-            project_result = await db.execute(project_subquery)
-            project_ids = [row[0] for row in project_result.fetchall()]
-            
-            if project_ids:
-                hierarchy_conditions.append(Bug.project_id.in_(project_ids))
-                
-                # Continue down the hierarchy
-                usecase_subquery = select(Usecase.id).where(
-                    and_(
-                        Usecase.project_id.in_(project_ids),
-                        Usecase.is_deleted == False
-                    )
-                )
-                usecase_result = await db.execute(usecase_subquery)
-                usecase_ids = [row[0] for row in usecase_result.fetchall()]
-                
-                if usecase_ids:
-                    hierarchy_conditions.append(Bug.usecase_id.in_(usecase_ids))
-                    
-                    # Continue with user stories, tasks, subtasks...
-                    # (Similar pattern as above)
-        elif client_id:
-            # Include bugs at client level and all descendants
-            hierarchy_conditions.append(Bug.client_id == client_id)
-            
-            # Get all programs under this client
-            program_subquery = select(Program.id).where(
-                and_(
-                    Program.client_id == client_id,
-                    Program.is_deleted == False
-                )
-            )
-            program_result = await db.execute(program_subquery)
-            program_ids = [row[0] for row in program_result.fetchall()]
-            
-            if program_ids:
-                hierarchy_conditions.append(Bug.program_id.in_(program_ids))
-                
-                # Continue down the hierarchy
-                # (Similar pattern as above)
         
         # Apply hierarchy conditions with OR
         if hierarchy_conditions:
@@ -4,7 +4,8 @@ Main FastAPI application with middleware and exception handlers.
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from app.core.config import settings
 from app.core.logging import setup_logging, StructuredLogger
 from app.core.exceptions import (
@@ -118,6 +119,10 @@ async def startup_event():
         environment=settings.ENVIRONMENT
     )
     
+    # Connect the shared cache backend (falls back to in-process only)
+    from app.services.cache_service import cache_service
+    await cache_service.connect()
+    
     # Initialize chat service
     try:
         from app.services.chat_service import get_chat_service
@@ -155,6 +160,8 @@ async def shutdown_event():
     try:
         from app.services.chat_service import get_chat_service
         chat_service = get_chat_service()
+        # Finish post-response bookkeeping and stop the audit writer
+        await chat_service.drain()
         # Close connections
         if hasattr(chat_service.session_service, 'close'):
             await chat_service.session_service.close()
@@ -164,6 +171,24 @@ async def shutdown_event():
     except Exception as e:
         logger.error(f"Error cleaning up chat service: {str(e)}")
     
+    # Close the shared cache backend
+    try:
+        from app.services.cache_service import cache_service
+        await cache_service.disconnect()
+    except Exception as e:
+        logger.error(f"Error closing cache backend: {str(e)}")
+    
+    # Stop the report job workers
+    try:
+        from app.services.report_jobs import get_report_job_service
+        await get_report_job_service().stop()
+    except Exception as e:
+        logger.error(f"Error stopping report job workers: {str(e)}")
+    
+    # Stop the password hashing workers
+    from app.core.password_hashing import password_hasher
+    password_hasher.shutdown()
+    
     # Sprint background job is disabled
     # Stop sprint background job
     # try:
@@ -200,6 +225,12 @@ async def health_check():
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics endpoint."""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 if __name__ == "__main__":
     import uvicorn
     import os
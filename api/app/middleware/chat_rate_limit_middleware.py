@@ -3,130 +3,261 @@ Chat Rate Limiting Middleware
 
 Implements token bucket algorithm using Redis for rate limiting chat requests.
 Enforces per-user limits: 60 req/min, 1000 req/hour with burst allowance.
+
+Both windows are checked and consumed by one atomic Lua script call. While a
+user sending requests in quick succession is well under both limits, the
+script also leases a few extra tokens that this worker spends locally,
+skipping Redis for the next requests. Leased tokens left unspent are
+refunded by the user's next check.
 """
 
 import time
 import logging
-from typing import Optional, Tuple
-from starlette.middleware.base import BaseHTTPMiddleware
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+from starlette.datastructures import MutableHeaders
 from starlette.requests import Request
-from starlette.responses import Response, JSONResponse
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from fastapi import status
 from redis import asyncio as aioredis
 from redis.exceptions import RedisError
 
 from app.core.config import settings
 from app.core.logging import StructuredLogger
+from app.core.rate_limit import get_rate_limiter
 from app.services.chat_metrics import get_chat_metrics
 
 logger = StructuredLogger(__name__)
 
 
-class TokenBucket:
-    """Token bucket implementation for rate limiting"""
-    
+# KEYS = one bucket key per window
+# ARGV = cost, lease, headroom, refund, then capacity and refill rate per window
+# Returns {allowed, denied window index, retry_after, leased, remaining per window}
+# Buckets are stored as "tokens:timestamp", using the Redis server clock
+TOKEN_BUCKETS_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local cost = tonumber(ARGV[1])
+local lease = tonumber(ARGV[2])
+local headroom = tonumber(ARGV[3])
+local refund = tonumber(ARGV[4])
+
+local levels, capacities, rates = {}, {}, {}
+local denied, retry_after = 0, 0
+for i = 1, #KEYS do
+    local capacity = tonumber(ARGV[3 + i * 2])
+    local rate = tonumber(ARGV[4 + i * 2])
+    local level = capacity
+    local state = redis.call('GET', KEYS[i])
+    if state then
+        local tokens, updated = string.match(state, '([^:]+):([^:]+)')
+        level = tonumber(tokens) + math.max(0, now - tonumber(updated)) * rate
+    end
+    -- Unspent tokens of a lapsed lease go back before this check
+    level = math.min(capacity, level + refund)
+    if level < cost and (cost - level) / rate > retry_after then
+        denied = i
+        retry_after = (cost - level) / rate
+    end
+    levels[i], capacities[i], rates[i] = level, capacity, rate
+end
+
+local function save(i, level)
+    local ttl = math.ceil((capacities[i] - level) / rates[i] * 1000) + 1
+    redis.call('SET', KEYS[i], tostring(level) .. ':' .. tostring(now), 'PX', ttl)
+end
+
+local result = {0, denied, tostring(retry_after), 0}
+if denied > 0 then
+    for i = 1, #KEYS do
+        if refund > 0 then save(i, levels[i]) end
+        result[4 + i] = math.floor(levels[i])
+    end
+    return result
+end
+
+-- Lease extra tokens only while every bucket stays above its headroom
+local extra = lease
+for i = 1, #KEYS do
+    if levels[i] - cost - extra < capacities[i] * headroom then extra = 0 end
+end
+
+result[1], result[4] = 1, extra
+for i = 1, #KEYS do
+    local level = levels[i] - cost - extra
+    save(i, level)
+    result[4 + i] = math.floor(level)
+end
+return result
+"""
+
+
+@dataclass(frozen=True)
+class BucketWindow:
+    """Token bucket for one rate limit window"""
+
+    name: str
+    limit: int
+    capacity: int
+    refill_rate: float
+
+
+@dataclass(frozen=True)
+class BucketsResult:
+    """Outcome of a check against every window"""
+
+    allowed: bool
+    denied_window: Optional[BucketWindow]
+    retry_after: float
+    leased: int
+    remaining: Tuple[int, ...]
+
+
+class TokenBuckets:
+    """
+    Token buckets for several windows, checked and consumed atomically.
+
+    One script call per check evaluates every window on the Redis server, so
+    concurrent requests cannot over-admit and a denied window never
+    consumes tokens from the others.
+    """
+
     def __init__(
         self,
         redis_client: aioredis.Redis,
-        capacity: int,
-        refill_rate: float,
-        window_seconds: int
+        windows: Sequence[BucketWindow],
+        lease: int = 0,
+        headroom: float = 0.5
     ):
         """
-        Initialize token bucket
-        
+        Initialize token buckets
+
         Args:
             redis_client: Redis client instance
-            capacity: Maximum tokens in bucket (burst allowance)
-            refill_rate: Tokens added per second
-            window_seconds: Time window for rate calculation
+            windows: Buckets to check, e.g. minute and hour
+            lease: Extra tokens to take per check for the local allowance
+            headroom: Fraction of capacity every bucket must keep for a lease
         """
         self.redis = redis_client
-        self.capacity = capacity
-        self.refill_rate = refill_rate
-        self.window_seconds = window_seconds
-    
+        self.windows = tuple(windows)
+        self.lease = lease
+        self.headroom = headroom
+        self._script = redis_client.register_script(TOKEN_BUCKETS_SCRIPT)
+
     def _get_bucket_key(self, identifier: str, window_type: str) -> str:
         """Generate Redis key for token bucket"""
         return f"chat:ratelimit:{window_type}:{identifier}"
-    
+
     async def consume(
         self,
         identifier: str,
-        window_type: str,
-        tokens: int = 1
-    ) -> Tuple[bool, int, float]:
+        tokens: int = 1,
+        lease: bool = True,
+        refund: int = 0
+    ) -> BucketsResult:
         """
-        Attempt to consume tokens from bucket
-        
+        Attempt to consume tokens from every window's bucket
+
         Args:
             identifier: User identifier (user_id)
-            window_type: "minute" or "hour"
             tokens: Number of tokens to consume
-            
+            lease: Whether to lease extra tokens for the local allowance
+            refund: Unspent leased tokens to give back first
+
         Returns:
-            Tuple of (allowed, remaining_tokens, retry_after_seconds)
+            BucketsResult; leased extra tokens were consumed on the caller's behalf
         """
-        bucket_key = self._get_bucket_key(identifier, window_type)
-        current_time = time.time()
-        
-        try:
-            # Get current bucket state
-            bucket_data = await self.redis.get(bucket_key)
-            
-            if bucket_data:
-                # Parse existing bucket state
-                parts = bucket_data.split(":")
-                last_tokens = float(parts[0])
-                last_update = float(parts[1])
-            else:
-                # Initialize new bucket
-                last_tokens = float(self.capacity)
-                last_update = current_time
-            
-            # Calculate tokens to add based on time elapsed
-            time_elapsed = current_time - last_update
-            tokens_to_add = time_elapsed * self.refill_rate
-            
-            # Update token count (capped at capacity)
-            current_tokens = min(self.capacity, last_tokens + tokens_to_add)
-            
-            # Check if we have enough tokens
-            if current_tokens >= tokens:
-                # Consume tokens
-                new_tokens = current_tokens - tokens
-                
-                # Store updated bucket state
-                bucket_value = f"{new_tokens}:{current_time}"
-                await self.redis.setex(
-                    bucket_key,
-                    self.window_seconds,
-                    bucket_value
-                )
-                
-                return True, int(new_tokens), 0.0
-            else:
-                # Not enough tokens - calculate retry after
-                tokens_needed = tokens - current_tokens
-                retry_after = tokens_needed / self.refill_rate
-                
-                # Update last check time without consuming
-                bucket_value = f"{current_tokens}:{current_time}"
-                await self.redis.setex(
-                    bucket_key,
-                    self.window_seconds,
-                    bucket_value
-                )
-                
-                return False, int(current_tokens), retry_after
-                
-        except RedisError as e:
-            logger.error(f"Redis error in token bucket: {e}")
-            # Fail open - allow request if Redis is down
-            return True, self.capacity, 0.0
+        args = [tokens, self.lease if lease else 0, self.headroom, refund]
+        for window in self.windows:
+            args.extend([window.capacity, window.refill_rate])
+
+        allowed, denied, retry_after, leased, *remaining = await self._script(
+            keys=[self._get_bucket_key(identifier, window.name) for window in self.windows],
+            args=args
+        )
+        return BucketsResult(
+            allowed=bool(allowed),
+            denied_window=self.windows[int(denied) - 1] if int(denied) else None,
+            retry_after=float(retry_after),
+            leased=int(leased),
+            remaining=tuple(int(value) for value in remaining)
+        )
 
 
-class ChatRateLimitMiddleware(BaseHTTPMiddleware):
+class LocalAllowance:
+    """
+    Per-process short-circuit for users clearly under their limits.
+
+    Holds tokens already consumed in Redis on a user's behalf, so spending
+    them locally never over-admits. Tokens are leased only to users whose
+    previous Redis check was within ttl_seconds; tokens still unspent when a
+    grant lapses are handed back by checkout() for the next check to refund.
+    Users dropped beyond max_keys lose their unspent tokens.
+    """
+
+    def __init__(self, ttl_seconds: float, max_keys: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_keys = max_keys
+        # identifier -> (tokens left, expires at, remaining per window in Redis, last Redis check)
+        self._grants: "OrderedDict[str, Tuple[int, float, Tuple[int, ...], float]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._grants)
+
+    def _store(self, identifier: str, grant: Tuple[int, float, Tuple[int, ...], float]) -> None:
+        self._grants[identifier] = grant
+        self._grants.move_to_end(identifier)
+        while len(self._grants) > self.max_keys:
+            self._grants.popitem(last=False)
+
+    def checkout(self, identifier: str) -> Tuple[int, bool]:
+        """
+        Record a Redis check for identifier
+
+        Returns:
+            Unspent tokens of a lapsed grant to refund, and whether to lease
+        """
+        now = time.monotonic()
+        grant = self._grants.get(identifier)
+        if grant is None:
+            self._store(identifier, (0, now, (), now))
+            return 0, False
+        tokens, expires_at, remaining, checked_at = grant
+        lease = now - checked_at < self.ttl_seconds
+        if now >= expires_at:
+            self._store(identifier, (0, now, (), now))
+            return tokens, lease
+        # A grant stored by a concurrent check is kept for take()
+        self._store(identifier, (tokens, expires_at, remaining, now))
+        return 0, lease
+
+    def grant(self, identifier: str, tokens: int, remaining: Tuple[int, ...]) -> None:
+        """Store leased tokens for identifier, adding to any unexpired grant"""
+        now = time.monotonic()
+        checked_at = now
+        grant = self._grants.get(identifier)
+        if grant is not None:
+            if now < grant[1]:
+                tokens += grant[0]
+            checked_at = grant[3]
+        self._store(identifier, (tokens, now + self.ttl_seconds, remaining, checked_at))
+
+    def take(self, identifier: str) -> Optional[Tuple[int, ...]]:
+        """Spend one leased token; remaining allowance per window, or None"""
+        grant = self._grants.get(identifier)
+        if grant is None:
+            return None
+        tokens, expires_at, remaining, checked_at = grant
+        if not tokens or time.monotonic() >= expires_at:
+            return None
+        tokens -= 1
+        self._grants[identifier] = (tokens, expires_at, remaining, checked_at)
+        return tuple(value + tokens for value in remaining)
+
+
+class ChatRateLimitMiddleware:
     """
     Rate limiting middleware specifically for chat endpoints
     
@@ -134,10 +265,12 @@ class ChatRateLimitMiddleware(BaseHTTPMiddleware):
     - 60 requests per minute per user
     - 1000 requests per hour per user
     - Burst allowance of 10 requests
+
+    Pure ASGI, so streamed chat responses pass through unbuffered.
     """
     
-    def __init__(self, app):
-        super().__init__(app)
+    def __init__(self, app: ASGIApp):
+        self.app = app
         self.redis_client: Optional[aioredis.Redis] = None
         self.metrics = get_chat_metrics()
         
@@ -157,155 +290,138 @@ class ChatRateLimitMiddleware(BaseHTTPMiddleware):
         # Refill rate = limit / 3600 tokens per second
         self.hour_capacity = self.hour_limit
         self.hour_refill_rate = self.hour_limit / 3600.0
-    
+
+        self.windows = (
+            BucketWindow("minute", self.minute_limit, self.minute_capacity, self.minute_refill_rate),
+            BucketWindow("hour", self.hour_limit, self.hour_capacity, self.hour_refill_rate),
+        )
+        self.buckets: Optional[TokenBuckets] = None
+
+        # Tokens leased from Redis for users well under both limits and
+        # sending requests faster than the lease lapses
+        self.allowance = LocalAllowance(
+            settings.CHAT_RATE_LIMIT_LEASE_SECONDS,
+            settings.RATE_LIMIT_MEMORY_MAX_KEYS
+        )
+
     async def _ensure_redis_connection(self) -> None:
-        """Ensure Redis connection is established"""
+        """Use the shared rate limiter's Redis connection"""
+        self.redis_client = await get_rate_limiter().get_redis()
         if self.redis_client is None:
-            try:
-                self.redis_client = await aioredis.from_url(
-                    settings.redis_url,
-                    encoding="utf-8",
-                    decode_responses=True,
-                    socket_connect_timeout=5,
-                    socket_timeout=5
-                )
-                await self.redis_client.ping()
-                logger.info("Redis connection established for chat rate limiting")
-            except RedisError as e:
-                logger.error(f"Failed to connect to Redis for rate limiting: {e}")
-                raise
-    
-    async def dispatch(self, request: Request, call_next) -> Response:
+            raise RedisError("Redis unavailable for chat rate limiting")
+        if self.buckets is None or self.buckets.redis is not self.redis_client:
+            self.buckets = TokenBuckets(
+                self.redis_client,
+                self.windows,
+                lease=settings.CHAT_RATE_LIMIT_LEASE_SIZE
+            )
+
+    async def _consume(self, user_id: str, lease: bool, refund: int) -> Optional[BucketsResult]:
+        """Check both windows in Redis; None if Redis is unavailable"""
+        try:
+            await self._ensure_redis_connection()
+            return await self.buckets.consume(user_id, lease=lease, refund=refund)
+        except RedisError as e:
+            logger.warning(f"Rate limiting disabled due to Redis unavailability: {e}")
+            return None
+
+    def _rate_limited(self, window: str, limit: int, retry_after: float) -> JSONResponse:
+        """Build the 429 response for an exhausted window"""
+        return JSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={
+                "status": "error",
+                "error": {
+                    "code": "RATE_LIMIT_EXCEEDED",
+                    "message": f"Rate limit exceeded. Maximum {limit} requests per {window} allowed.",
+                    "retry_after": int(retry_after) + 1,
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+                }
+            },
+            headers={
+                "Retry-After": str(int(retry_after) + 1),
+                "X-RateLimit-Limit": str(limit),
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset": str(int(time.time() + retry_after))
+            }
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
         Process request with rate limiting
-        
+
         Args:
-            request: Incoming HTTP request
-            call_next: Next middleware/handler in chain
-            
-        Returns:
-            HTTP response (429 if rate limited, otherwise normal response)
+            scope: ASGI connection scope
+            receive: ASGI receive channel
+            send: ASGI send channel (429 is sent here if rate limited)
         """
-        # Only apply rate limiting to chat endpoints
-        if not request.url.path.startswith("/api/v1/chat"):
-            return await call_next(request)
-        
-        # Skip rate limiting for health check
-        if request.url.path.endswith("/health"):
-            return await call_next(request)
-        
+        # Only apply rate limiting to chat endpoints, skipping health check
+        if (
+            scope["type"] != "http"
+            or not scope["path"].startswith("/api/v1/chat")
+            or scope["path"].endswith("/health")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+
         # Get user identifier from request state
         # (assumes auth middleware has already run)
+        request = Request(scope)
         user_id = None
         if hasattr(request.state, "user") and request.state.user:
             user_id = str(request.state.user.id)
-        
+
         if not user_id:
             # No authenticated user - let auth middleware handle it
-            return await call_next(request)
-        
-        # Ensure Redis connection
-        try:
-            await self._ensure_redis_connection()
-        except RedisError:
-            # Fail open if Redis is unavailable
-            logger.warning("Rate limiting disabled due to Redis unavailability")
-            return await call_next(request)
-        
-        # Create token buckets
-        minute_bucket = TokenBucket(
-            self.redis_client,
-            self.minute_capacity,
-            self.minute_refill_rate,
-            60
-        )
-        
-        hour_bucket = TokenBucket(
-            self.redis_client,
-            self.hour_capacity,
-            self.hour_refill_rate,
-            3600
-        )
-        
-        # Check minute limit
-        minute_allowed, minute_remaining, minute_retry = await minute_bucket.consume(
-            user_id,
-            "minute"
-        )
-        
-        if not minute_allowed:
-            logger.warning(
-                "Chat rate limit exceeded (minute)",
-                user_id=user_id,
-                path=request.url.path,
-                retry_after=minute_retry
-            )
-            
-            # Record rate limit metric
-            self.metrics.record_rate_limit_exceeded("minute")
-            
-            return JSONResponse(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                content={
-                    "status": "error",
-                    "error": {
-                        "code": "RATE_LIMIT_EXCEEDED",
-                        "message": f"Rate limit exceeded. Maximum {self.minute_limit} requests per minute allowed.",
-                        "retry_after": int(minute_retry) + 1,
-                        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-                    }
-                },
-                headers={
-                    "Retry-After": str(int(minute_retry) + 1),
-                    "X-RateLimit-Limit": str(self.minute_limit),
-                    "X-RateLimit-Remaining": "0",
-                    "X-RateLimit-Reset": str(int(time.time() + minute_retry))
-                }
-            )
-        
-        # Check hour limit
-        hour_allowed, hour_remaining, hour_retry = await hour_bucket.consume(
-            user_id,
-            "hour"
-        )
-        
-        if not hour_allowed:
-            logger.warning(
-                "Chat rate limit exceeded (hour)",
-                user_id=user_id,
-                path=request.url.path,
-                retry_after=hour_retry
-            )
-            
-            # Record rate limit metric
-            self.metrics.record_rate_limit_exceeded("hour")
-            
-            return JSONResponse(
-                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                content={
-                    "status": "error",
-                    "error": {
-                        "code": "RATE_LIMIT_EXCEEDED",
-                        "message": f"Rate limit exceeded. Maximum {self.hour_limit} requests per hour allowed.",
-                        "retry_after": int(hour_retry) + 1,
-                        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
-                    }
-                },
-                headers={
-                    "Retry-After": str(int(hour_retry) + 1),
-                    "X-RateLimit-Limit": str(self.hour_limit),
-                    "X-RateLimit-Remaining": "0",
-                    "X-RateLimit-Reset": str(int(time.time() + hour_retry))
-                }
-            )
-        
+            await self.app(scope, receive, send)
+            return
+
+        # Spend a leased token locally, or check both windows in Redis
+        remaining = self.allowance.take(user_id)
+        if remaining is None:
+            refund, lease = self.allowance.checkout(user_id)
+            result = await self._consume(user_id, lease, refund)
+            if result is None:
+                # Fail open if Redis is unavailable
+                await self.app(scope, receive, send)
+                return
+
+            if not result.allowed:
+                window = result.denied_window
+                logger.warning(
+                    f"Chat rate limit exceeded ({window.name})",
+                    user_id=user_id,
+                    path=path,
+                    retry_after=result.retry_after
+                )
+
+                # Record rate limit metric
+                self.metrics.record_rate_limit_exceeded(window.name)
+
+                response = self._rate_limited(window.name, window.limit, result.retry_after)
+                await response(scope, receive, send)
+                return
+
+            if result.leased:
+                self.allowance.grant(user_id, result.leased, result.remaining)
+            remaining = tuple(value + result.leased for value in result.remaining)
+            self.metrics.record_rate_limit_check("redis")
+        else:
+            self.metrics.record_rate_limit_check("local")
+
+        minute_remaining, hour_remaining = remaining
+
+        async def send_with_headers(message: Message) -> None:
+            # Add rate limit headers to response
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit-Minute"] = str(self.minute_limit)
+                headers["X-RateLimit-Remaining-Minute"] = str(minute_remaining)
+                headers["X-RateLimit-Limit-Hour"] = str(self.hour_limit)
+                headers["X-RateLimit-Remaining-Hour"] = str(hour_remaining)
+            await send(message)
+
         # Both limits passed - process request
-        response = await call_next(request)
-        
-        # Add rate limit headers to response
-        response.headers["X-RateLimit-Limit-Minute"] = str(self.minute_limit)
-        response.headers["X-RateLimit-Remaining-Minute"] = str(minute_remaining)
-        response.headers["X-RateLimit-Limit-Hour"] = str(self.hour_limit)
-        response.headers["X-RateLimit-Remaining-Hour"] = str(hour_remaining)
-        
-        return response
+        await self.app(scope, receive, send_with_headers)
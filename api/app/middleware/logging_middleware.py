@@ -3,80 +3,105 @@ Logging middleware for request/response tracking.
 """
 import time
 import uuid
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import MutableHeaders
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from app.core.logging import request_id_var, user_id_var, client_id_var, project_id_var, StructuredLogger
 
 logger = StructuredLogger(__name__)
 
 
-class LoggingMiddleware(BaseHTTPMiddleware):
-    """Middleware to log all HTTP requests and responses."""
-    
-    async def dispatch(self, request: Request, call_next) -> Response:
+class LoggingMiddleware:
+    """
+    Middleware to log all HTTP requests and responses.
+
+    Implemented as a pure ASGI middleware: the response is passed through
+    message by message, so streaming responses are not buffered or wrapped
+    in an extra task. Duration covers the full response, including the body.
+    """
+
+    slow_request_ms = 2000
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+
         # Generate unique request ID
         request_id = str(uuid.uuid4())
         request_id_var.set(request_id)
-        
+
         # Store request_id in request state for access in handlers
         request.state.request_id = request_id
-        
+
         # Extract user info from request if available
         if hasattr(request.state, "user"):
             user = request.state.user
             user_id_var.set(str(user.id))
             client_id_var.set(str(user.client_id))
-        
+
+        method = scope["method"]
+        path = scope["path"]
+
         # Record start time
         start_time = time.time()
-        
+
         # Log incoming request
         logger.debug(
-            f"Incoming request: {request.method} {request.url.path}",
-            method=request.method,
-            path=request.url.path,
+            f"Incoming request: {method} {path}",
+            method=method,
+            path=path,
             query_params=dict(request.query_params),
             client_host=request.client.host if request.client else None
         )
-        
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                # Add request ID to response headers
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
+
         # Process request
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send_wrapper)
         except Exception as exc:
             # Log exception
             duration_ms = (time.time() - start_time) * 1000
             logger.error(
-                f"Request failed: {request.method} {request.url.path}",
-                method=request.method,
-                path=request.url.path,
+                f"Request failed: {method} {path}",
+                method=method,
+                path=path,
                 duration_ms=duration_ms,
                 error=str(exc)
             )
             raise
-        
+
         # Calculate duration
         duration_ms = (time.time() - start_time) * 1000
-        
-        # Add request ID to response headers
-        response.headers["X-Request-ID"] = request_id
-        
+
         # Log response
         logger.log_api_request(
-            method=request.method,
-            path=request.url.path,
-            status_code=response.status_code,
+            method=method,
+            path=path,
+            status_code=status_code,
             duration_ms=duration_ms
         )
-        
+
         # Log slow requests
-        if duration_ms > 2000:
+        if duration_ms > self.slow_request_ms:
             logger.warning(
-                f"Slow request detected: {request.method} {request.url.path}",
-                method=request.method,
-                path=request.url.path,
+                f"Slow request detected: {method} {path}",
+                method=method,
+                path=path,
                 duration_ms=duration_ms,
-                status_code=response.status_code
+                status_code=status_code
             )
-        
-        return response
@@ -1,78 +1,127 @@
 """
 Rate limiting middleware to prevent abuse.
 """
+import math
 import time
-from collections import defaultdict
-from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Optional, Sequence
+from starlette.datastructures import MutableHeaders
 from starlette.requests import Request
-from starlette.responses import Response, JSONResponse
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 from fastapi import status
 from app.core.logging import StructuredLogger
+from app.core.security import get_principal
+from app.core.rate_limit import (
+    RateLimiter,
+    RateLimitPolicy,
+    RateLimitRule,
+    default_rate_limit_rules,
+    get_rate_limiter,
+    resolve_policy,
+)
+from app.models.user import User
 
 logger = StructuredLogger(__name__)
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Middleware to implement rate limiting per user."""
-    
-    def __init__(self, app, requests_per_minute: int = 100):
-        super().__init__(app)
+class RateLimitMiddleware:
+    """
+    Middleware to implement rate limiting per user (or client IP).
+
+    Pure ASGI: rejected requests are answered directly and admitted ones
+    only get rate limit headers added to the response start message.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        requests_per_minute: int = 100,
+        rules: Optional[Sequence[RateLimitRule]] = None,
+        limiter: Optional[RateLimiter] = None
+    ):
+        self.app = app
         self.requests_per_minute = requests_per_minute
-        self.window_size = 60  # seconds
-        self.request_counts = defaultdict(list)
-    
-    async def dispatch(self, request: Request, call_next) -> Response:
-        # Skip rate limiting for health check and metrics
-        if request.url.path in ["/health", "/metrics"]:
-            return await call_next(request)
-        
-        # Get user identifier (user_id or IP address)
-        if hasattr(request.state, "user"):
-            identifier = str(request.state.user.id)
+        self.default_policy = RateLimitPolicy("default", requests_per_minute)
+        self.rules = tuple(rules) if rules is not None else default_rate_limit_rules(requests_per_minute)
+        self.limiter = limiter or get_rate_limiter()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # Skip rate limiting for non-HTTP traffic, health check and metrics
+        if scope["type"] != "http" or scope["path"] in ["/health", "/metrics"]:
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        path = scope["path"]
+
+        # Get user identifier (user_id from the bearer token, or IP address)
+        user = await self._principal(request)
+        if user is not None:
+            identifier = str(user.id)
         else:
             identifier = request.client.host if request.client else "unknown"
-        
+
+        policy = resolve_policy(
+            self.rules,
+            self.default_policy,
+            path,
+            scope["method"],
+            getattr(user, "role", None)
+        )
+        result = await self.limiter.hit(identifier, policy)
         current_time = time.time()
-        
-        # Clean old requests outside the window
-        self.request_counts[identifier] = [
-            req_time for req_time in self.request_counts[identifier]
-            if current_time - req_time < self.window_size
-        ]
-        
+        reset = str(int(current_time + result.reset_after))
+
         # Check if rate limit exceeded
-        if len(self.request_counts[identifier]) >= self.requests_per_minute:
+        if not result.allowed:
+            retry_after = max(1, math.ceil(result.retry_after))
             logger.warning(
                 "Rate limit exceeded",
                 identifier=identifier,
-                path=request.url.path,
-                requests_in_window=len(self.request_counts[identifier])
+                path=path,
+                policy=policy.name,
+                retry_after=retry_after
             )
-            
-            return JSONResponse(
+
+            response = JSONResponse(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 content={
                     "error": {
                         "code": "RATE_LIMIT_EXCEEDED",
-                        "message": f"Rate limit exceeded. Maximum {self.requests_per_minute} requests per minute allowed.",
-                        "retry_after": self.window_size,
+                        "message": f"Rate limit exceeded. Maximum {policy.description} allowed.",
+                        "retry_after": retry_after,
                         "timestamp": ""
                     }
                 },
-                headers={"Retry-After": str(self.window_size)}
+                headers={
+                    "Retry-After": str(retry_after),
+                    "X-RateLimit-Limit": str(policy.limit),
+                    "X-RateLimit-Remaining": "0",
+                    "X-RateLimit-Reset": reset
+                }
             )
-        
-        # Add current request to the count
-        self.request_counts[identifier].append(current_time)
-        
-        # Add rate limit headers to response
-        response = await call_next(request)
-        response.headers["X-RateLimit-Limit"] = str(self.requests_per_minute)
-        response.headers["X-RateLimit-Remaining"] = str(
-            self.requests_per_minute - len(self.request_counts[identifier])
-        )
-        response.headers["X-RateLimit-Reset"] = str(
-            int(current_time + self.window_size)
-        )
-        
-        return response
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            # Add rate limit headers to response
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-RateLimit-Limit"] = str(policy.limit)
+                headers["X-RateLimit-Remaining"] = str(result.remaining)
+                headers["X-RateLimit-Reset"] = reset
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    async def _principal(self, request: Request) -> Optional[User]:
+        """Active user the request's bearer token belongs to, if any"""
+        authorization = request.headers.get("authorization", "")
+        if not authorization.startswith("Bearer "):
+            return None
+        try:
+            return await get_principal(authorization[len("Bearer "):])
+        except Exception as e:
+            # Unresolvable principals are limited by client IP
+            logger.warning(f"Could not resolve principal for rate limiting: {e}")
+            return None
@@ -1,7 +1,7 @@
 from app.models.user import User
 from app.models.client import Client
-from app.models.hierarchy import Program, Project, Usecase, UserStory, Task, Subtask
-from app.models.bug import Bug
+from app.models.hierarchy import Program, Project, Usecase, UserStory, Task, Subtask, HierarchyClosure, HierarchyRollup
+from app.models.bug import Bug, BugDailySnapshot
 from app.models.git import Commit, PullRequest
 from app.models.documentation import Documentation
 from app.models.audit import AuditLog
@@ -25,7 +25,10 @@ __all__ = [
     "UserStory",
     "Task",
     "Subtask",
+    "HierarchyClosure",
+    "HierarchyRollup",
     "Bug",
+    "BugDailySnapshot",
     "Commit",
     "PullRequest",
     "Documentation",
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Boolean, Integer, text
+from sqlalchemy import Column, String, Date, DateTime, Text, ForeignKey, Boolean, Integer, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
@@ -8,7 +8,7 @@ from app.db.base import Base
 
 class Bug(Base):
     __tablename__ = "bugs"
-
+    
     id = Column(String(20), primary_key=True, server_default=text("generate_string_id('BUG', 'bugs_id_seq')"))
     
     # Link to test run and test case (for bugs from test failures)
@@ -78,7 +78,7 @@ class Bug(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     closed_at = Column(DateTime(timezone=True))
-
+    
     # Relationships
     test_run = relationship("TestRun", foreign_keys=[test_run_id])
     test_case = relationship("TestCase", foreign_keys=[test_case_id])
@@ -140,3 +140,29 @@ class Bug(Base):
         if value not in allowed_statuses:
             raise ValueError(f"status must be one of {allowed_statuses}")
         return value
+
+
+class BugDailySnapshot(Base):
+    """
+    Pre-aggregated bug activity per UTC day and hierarchy scope.
+    
+    One row per (day, client, program, project, usecase, user story, task,
+    subtask) holding how many live bugs were created and resolved that day
+    (NULL scope columns stored as ''). Long bug trend ranges read these rows
+    instead of the bugs table. Rows are rebuilt per day by
+    QAMetricsService.refresh_bug_snapshots; every refreshed day also gets a
+    row with an empty scope, so the covered days are known even without
+    bug activity.
+    """
+    __tablename__ = "bug_daily_snapshots"
+    
+    day = Column(Date, primary_key=True)
+    client_id = Column(String(20), primary_key=True)
+    program_id = Column(String(20), primary_key=True)
+    project_id = Column(String(20), primary_key=True)
+    usecase_id = Column(String(20), primary_key=True)
+    user_story_id = Column(String(20), primary_key=True)
+    task_id = Column(String(20), primary_key=True)
+    subtask_id = Column(String(20), primary_key=True)
+    created_count = Column(Integer, nullable=False, default=0)
+    resolved_count = Column(Integer, nullable=False, default=0)
@@ -4,6 +4,7 @@ from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
 from app.db.base import Base
+from app.models.hierarchy import search_vector_column
 
 
 class Client(Base):
@@ -13,6 +14,7 @@ class Client(Base):
     name = Column(String(255), nullable=False)
     short_description = Column(String(500))
     long_description = Column(Text)
+    search_vector = search_vector_column()
     email = Column(String(255))
     phone = Column(String(50))
     is_active = Column(Boolean, default=True)
@@ -1,11 +1,25 @@
-from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, Date, Numeric, Boolean, text
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, String, DateTime, Text, ForeignKey, Integer, Date, Numeric, Boolean, Index, Computed, text
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from sqlalchemy.sql import func
 import uuid
 from app.db.base import Base
 
 
+# Weighted full-text document (name ranks above descriptions) used by hierarchy
+# search; must match the generated columns in db/migrations/008_search_vectors.sql
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(short_description, '') || ' ' || "
+    "coalesce(long_description, '')), 'B')"
+)
+
+
+def search_vector_column():
+    """Generated tsvector column, deferred so regular loads never select it."""
+    return deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_EXPRESSION, persisted=True)))
+
+
 class Program(Base):
     __tablename__ = "programs"
 
@@ -14,6 +28,7 @@ class Program(Base):
     name = Column(String(255), nullable=False)
     short_description = Column(String(500))
     long_description = Column(Text)
+    search_vector = search_vector_column()
     start_date = Column(Date)
     end_date = Column(Date)
     status = Column(String(50), default="Planning")
@@ -36,6 +51,7 @@ class Project(Base):
     name = Column(String(255), nullable=False)
     short_description = Column(String(500))
     long_description = Column(Text)
+    search_vector = search_vector_column()
     start_date = Column(Date)
     end_date = Column(Date)
     status = Column(String(50), default="Planning")
@@ -64,6 +80,7 @@ class Usecase(Base):
     name = Column(String(255), nullable=False)
     short_description = Column(String(500))
     long_description = Column(Text)
+    search_vector = search_vector_column()
     priority = Column(String(20), default="Medium")
     status = Column(String(50), default="Draft")
     is_deleted = Column(Boolean, default=False)
@@ -86,6 +103,7 @@ class UserStory(Base):
     name = Column(String(255), nullable=False)
     short_description = Column(String(500))
     long_description = Column(Text)
+    search_vector = search_vector_column()
     acceptance_criteria = Column(Text)
     story_points = Column(Integer)
     priority = Column(String(20), default="Medium")
@@ -112,6 +130,7 @@ class Task(Base):
     name = Column(String(255), nullable=False)
     short_description = Column(String(500))
     long_description = Column(Text)
+    search_vector = search_vector_column()
     status = Column(String(50), default="To Do")
     priority = Column(String(20), default="Medium")
     assigned_to = Column(String(20), ForeignKey("users.id"))
@@ -147,6 +166,7 @@ class Subtask(Base):
     name = Column(String(255), nullable=False)
     short_description = Column(String(500))
     long_description = Column(Text)
+    search_vector = search_vector_column()
     status = Column(String(50), default="To Do")
     assigned_to = Column(String(20), ForeignKey("users.id"))
     estimated_hours = Column(Numeric(10, 2))
@@ -186,3 +206,45 @@ class Phase(Base):
     user_stories = relationship("UserStory", back_populates="phase")
     tasks = relationship("Task", back_populates="phase")
     subtasks = relationship("Subtask", back_populates="phase")
+
+
+class HierarchyClosure(Base):
+    """
+    Ancestor/descendant pairs for the Client -> Subtask hierarchy (closure table).
+
+    Every live (non-deleted) entity has a depth-0 row pointing at itself plus one
+    row per live ancestor, so subtree and ancestry lookups are a single indexed
+    scan instead of a join chain across the hierarchy tables. Rows are kept in
+    sync by app.services.hierarchy_closure_service on every ORM flush.
+    """
+    __tablename__ = "hierarchy_closure"
+
+    ancestor_id = Column(String(20), primary_key=True)
+    descendant_id = Column(String(20), primary_key=True)
+    ancestor_type = Column(String(20), nullable=False)
+    descendant_type = Column(String(20), nullable=False)
+    depth = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index('idx_hierarchy_closure_ancestor_type', 'ancestor_id', 'descendant_type'),
+        Index('idx_hierarchy_closure_descendant', 'descendant_id', 'depth'),
+    )
+
+
+class HierarchyRollup(Base):
+    """
+    Pre-aggregated descendant counters per ancestor (rollup table).
+
+    One row per (ancestor, descendant type, dimension, value) holding how many
+    live descendants of that type have that status, priority or phase. Rows are
+    adjusted incrementally by app.services.hierarchy_rollup_service on every ORM
+    flush, so dashboard statistics never scan the subtree.
+    """
+    __tablename__ = "hierarchy_rollups"
+
+    ancestor_id = Column(String(20), primary_key=True)
+    descendant_type = Column(String(20), primary_key=True)
+    dimension = Column(String(20), primary_key=True)
+    value = Column(String(50), primary_key=True)
+    ancestor_type = Column(String(20), nullable=False)
+    count = Column(Integer, nullable=False, default=0)
@@ -26,6 +26,8 @@ class NotificationType(str, enum.Enum):
     assignment_conflict = "assignment_conflict"
     bulk_assignment_completed = "bulk_assignment_completed"
     bulk_assignment_failed = "bulk_assignment_failed"
+    report_ready = "report_ready"
+    report_failed = "report_failed"
 
 
 class NotificationStatus(str, enum.Enum):
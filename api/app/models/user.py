@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime, text, ARRAY
+from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime, Integer, text, ARRAY
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.db.base import Base
@@ -19,6 +19,7 @@ class User(Base):
     language = Column(String(10), default="en")
     theme = Column(String(50), default="snow")
     is_active = Column(Boolean, default=True)
+    token_version = Column(Integer, nullable=False, default=1, server_default=text("1"))  # Bumped to revoke issued tokens
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
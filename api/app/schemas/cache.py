@@ -0,0 +1,32 @@
+"""
+Cache administration schemas for the Worky API.
+"""
+from typing import Optional, Dict, Any, List
+from pydantic import BaseModel, Field
+
+
+class CacheInvalidateRequest(BaseModel):
+    """Schema for invalidating cache entries by tag, key or pattern."""
+    
+    tags: List[str] = Field(default_factory=list, description="Tags such as team:TEAM-000001")
+    keys: List[str] = Field(default_factory=list, description="Exact cache keys")
+    pattern: Optional[str] = Field(None, min_length=1, description="Substring of keys, e.g. a namespace")
+
+
+class CacheHotKey(BaseModel):
+    """Schema for a frequently hit cache key."""
+    
+    key: str
+    namespace: str
+    hits: int
+
+
+class CacheStatsResponse(BaseModel):
+    """Schema for cache statistics of the answering worker."""
+    
+    backend: str
+    worker_id: str
+    l1_entries: int
+    l1_max_entries: int
+    l1_evictions: int
+    namespaces: Dict[str, Dict[str, Any]]
@@ -0,0 +1,69 @@
+"""
+Report job schemas for the Worky API.
+"""
+from datetime import date, datetime
+from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field
+
+
+class ReportJobCreate(BaseModel):
+    """Schema for submitting a report to be built in the background."""
+    
+    report: str = Field(..., description="Report name, e.g. project-health or utilization")
+    format: str = Field("pdf", pattern="^(pdf|csv|xlsx|json)$")
+    params: Dict[str, Any] = Field(default_factory=dict, description="Report parameters, as on the report endpoint")
+
+
+class ReportJobParams(BaseModel):
+    """Base for report job parameters; mirrors the report endpoint's query parameters."""
+    
+    class Config:
+        extra = "forbid"
+
+
+class ReportPeriodParams(ReportJobParams):
+    """Parameters of the utilization and engagement reports."""
+    
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+
+
+class OccupancyForecastParams(ReportJobParams):
+    """Parameters of the occupancy forecast."""
+    
+    weeks_ahead: int = Field(4, ge=1, le=52)
+
+
+class ProjectReportParams(ReportJobParams):
+    """Parameters of reports optionally scoped to one project."""
+    
+    project_id: Optional[str] = None
+
+
+class SprintVelocityParams(ProjectReportParams):
+    """Parameters of the sprint velocity report."""
+    
+    sprint_count: int = Field(10, ge=1, le=50)
+
+
+class ProjectTreeParams(ReportJobParams):
+    """Parameters of the project tree report."""
+    
+    project_id: str
+
+
+class ReportJobResponse(BaseModel):
+    """Schema for the status of a report job."""
+    
+    job_id: str
+    report: str
+    format: str
+    params: Dict[str, Any]
+    status: str  # queued, running, completed, failed
+    cached: bool = False  # served from a file built for an identical earlier request
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    size_bytes: Optional[int] = None
+    expires_at: Optional[datetime] = None  # the file may be deleted after this
+    error: Optional[str] = None
+    download_url: Optional[str] = None
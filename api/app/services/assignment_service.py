@@ -7,6 +7,7 @@ from sqlalchemy import select, and_, or_, delete
 from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, status
 from datetime import datetime
+import time
 
 from app.models.team import Assignment, AssignmentHistory, Team, TeamMember
 from app.models.user import User
@@ -83,8 +84,7 @@ class AssignmentService:
         
         # Invalidate caches after all database operations are complete
         try:
-            cache_service.clear_pattern("eligible_users")
-            cache_service.clear_pattern("assignment_validation")
+            await cache_service.invalidate_tags(f"{entity_type}:{entity_id}", f"user:{user_id}")
         except Exception as e:
             # Log cache error but don't fail the assignment
             from app.core.logging import StructuredLogger
@@ -175,8 +175,9 @@ class AssignmentService:
         
         # Invalidate caches after all database operations are complete
         try:
-            cache_service.clear_pattern("eligible_users")
-            cache_service.clear_pattern("assignment_validation")
+            await cache_service.invalidate_tags(
+                f"{entity_type}:{entity_id}", f"user:{assignment.user_id}"
+            )
         except Exception as e:
             # Log cache error but don't fail the unassignment
             from app.core.logging import StructuredLogger
@@ -465,9 +466,10 @@ class AssignmentService:
         """
         # Check cache first
         cache_key = cache_service.eligible_users_key(entity_type, entity_id, assignment_type)
-        cached_users = cache_service.get(cache_key)
+        cached_users = await cache_service.get(cache_key)
         if cached_users is not None:
             return cached_users
+        load_started = time.perf_counter()
         
         # Get project ID if applicable
         project_id = None
@@ -503,9 +505,13 @@ class AssignmentService:
                 if role_validation["valid"]:
                     eligible_users.append(user)
         
-        # Cache the results
+        # Cache the results; team membership changes invalidate the project tag
         cache_key = cache_service.eligible_users_key(entity_type, entity_id, assignment_type)
-        cache_service.set(cache_key, eligible_users)
+        cache_tags = [f"{entity_type}:{entity_id}"]
+        if project_id:
+            cache_tags.append(f"project:{project_id}")
+        cache_service.metrics.record_load(cache_key, time.perf_counter() - load_started)
+        await cache_service.set(cache_key, eligible_users, tags=cache_tags)
         
         return eligible_users
     
@@ -6,14 +6,20 @@ batch logging for performance, and querying capabilities for admin dashboards.
 """
 
 import logging
+import os
 import re
+import socket
 import asyncio
-from typing import Optional, List, Dict, Any
+import time
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, or_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload
 
+from app.core.config import settings
+from app.db.base import async_session_maker
 from app.models.chat import ChatAuditLog
 from app.schemas.chat import (
     ChatAuditLogCreate,
@@ -22,9 +28,17 @@ from app.schemas.chat import (
     IntentType,
     ActionResult
 )
+from app.services.chat_metrics import get_chat_metrics
 
 logger = logging.getLogger(__name__)
 
+# Durable hand-off between request handlers and the audit writer. Entries
+# stay pending in the consumer group until their rows are committed, so a
+# writer that dies mid-batch has them redelivered to another writer.
+AUDIT_STREAM_KEY = "chat:audit:stream"
+AUDIT_CONSUMER_GROUP = "audit-writers"
+AUDIT_READ_BLOCK_MS = 1000
+
 
 class AuditService:
     """Service for audit logging with PII masking and batch operations"""
@@ -47,6 +61,14 @@ class AuditService:
         self._batch_timeout = 5.0  # seconds
         self._batch_lock = asyncio.Lock()
         self._batch_task: Optional[asyncio.Task] = None
+        
+        # Durable queue (attached by start_writer)
+        self.metrics = get_chat_metrics()
+        self._redis = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._consumer = f"{socket.gethostname()}:{os.getpid()}"
+        self._queue_depth = 0
+        self._last_claim = 0.0
     
     def mask_pii(self, text: str) -> str:
         """
@@ -116,27 +138,8 @@ class AuditService:
         Returns:
             Created audit log or None if batched
         """
-        # Mask PII in query
-        masked_query = self.mask_pii(audit_data.query)
-        
-        # Truncate response summary
-        truncated_summary = self._truncate_text(audit_data.response_summary)
-        
-        # Create audit log data
-        log_data = {
-            "request_id": audit_data.request_id,
-            "user_id": audit_data.user_id,
-            "client_id": audit_data.client_id,
-            "session_id": audit_data.session_id,
-            "query": masked_query,
-            "intent_type": audit_data.intent_type.value if audit_data.intent_type else None,
-            "entities_accessed": audit_data.entities_accessed or [],
-            "action_performed": audit_data.action_performed,
-            "action_result": audit_data.action_result.value if audit_data.action_result else None,
-            "response_summary": truncated_summary,
-            "ip_address": audit_data.ip_address,
-            "user_agent": self._truncate_text(audit_data.user_agent, 255)
-        }
+        # Mask PII and truncate
+        log_data = self._build_log_data(audit_data)
         
         if use_batch:
             # Add to batch queue
@@ -167,6 +170,211 @@ class AuditService:
                 await db.rollback()
                 raise
     
+    def _build_log_data(self, audit_data: ChatAuditLogCreate) -> Dict[str, Any]:
+        """
+        Build audit log column values with PII masked
+        
+        Args:
+            audit_data: Audit log data
+            
+        Returns:
+            Column values for ChatAuditLog
+        """
+        return {
+            "request_id": audit_data.request_id,
+            "user_id": audit_data.user_id,
+            "client_id": audit_data.client_id,
+            "session_id": audit_data.session_id,
+            "query": self.mask_pii(audit_data.query),
+            "intent_type": audit_data.intent_type.value if audit_data.intent_type else None,
+            "entities_accessed": audit_data.entities_accessed or [],
+            "action_performed": audit_data.action_performed,
+            "action_result": audit_data.action_result.value if audit_data.action_result else None,
+            "response_summary": self._truncate_text(audit_data.response_summary),
+            "ip_address": audit_data.ip_address,
+            "user_agent": self._truncate_text(audit_data.user_agent, 255)
+        }
+    
+    async def _insert_logs(self, db: AsyncSession, batch: List[ChatAuditLogCreate]) -> None:
+        """
+        Insert audit logs, skipping request IDs that are already stored
+        
+        Delivery is at-least-once, so a redelivered entry must not fail
+        the whole batch on the unique request_id.
+        
+        Args:
+            db: Database session
+            batch: Audit log data
+        """
+        stmt = pg_insert(ChatAuditLog.__table__).on_conflict_do_nothing(
+            index_elements=['request_id']
+        )
+        await db.execute(stmt, [self._build_log_data(audit_data) for audit_data in batch])
+        await db.commit()
+    
+    async def _write_direct(self, audit_data: ChatAuditLogCreate) -> None:
+        """
+        Write an audit log with its own database session
+        
+        Args:
+            audit_data: Audit log data
+        """
+        async with async_session_maker() as db:
+            await self._insert_logs(db, [audit_data])
+        self.metrics.record_audit_event("direct")
+    
+    async def enqueue(self, audit_data: ChatAuditLogCreate) -> None:
+        """
+        Hand an audit log to the durable queue
+        
+        This is one Redis round trip; the database insert happens in the
+        writer. Without Redis, or when the queue is over
+        CHAT_AUDIT_QUEUE_MAX_LENGTH, the log is written directly so that
+        a backlog slows requests down instead of dropping audits.
+        
+        Args:
+            audit_data: Audit log data
+        """
+        if self._redis is not None and self._queue_depth < settings.CHAT_AUDIT_QUEUE_MAX_LENGTH:
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                pipe.xadd(AUDIT_STREAM_KEY, {"data": audit_data.model_dump_json()})
+                pipe.xlen(AUDIT_STREAM_KEY)
+                _, self._queue_depth = await pipe.execute()
+                self.metrics.set_audit_queue_depth(self._queue_depth)
+                self.metrics.record_audit_event("queued")
+                return
+            except Exception as e:
+                logger.warning(f"Audit queue unavailable, writing directly: {e}")
+        
+        await self._write_direct(audit_data)
+    
+    async def start_writer(self, redis_client) -> None:
+        """
+        Attach the durable queue and start the background writer
+        
+        Args:
+            redis_client: Redis client holding the audit stream
+        """
+        if redis_client is None or self._writer_task is not None:
+            return
+        
+        try:
+            await redis_client.xgroup_create(
+                AUDIT_STREAM_KEY, AUDIT_CONSUMER_GROUP, id="0", mkstream=True
+            )
+        except Exception as e:
+            # BUSYGROUP: another worker created it first
+            if "BUSYGROUP" not in str(e):
+                logger.error(f"Failed to create audit consumer group: {e}")
+                return
+        
+        self._redis = redis_client
+        self._writer_task = asyncio.create_task(self._run_writer())
+        logger.info(f"Audit writer started: consumer={self._consumer}")
+    
+    async def stop_writer(self) -> None:
+        """Stop the background writer; unacknowledged entries stay queued"""
+        if self._writer_task is not None:
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+            self._writer_task = None
+        self._redis = None
+    
+    async def _run_writer(self) -> None:
+        """Move queued audit logs into the database until cancelled"""
+        while True:
+            try:
+                entries = await self._claim_stale_entries()
+                if not entries:
+                    response = await self._redis.xreadgroup(
+                        AUDIT_CONSUMER_GROUP,
+                        self._consumer,
+                        {AUDIT_STREAM_KEY: ">"},
+                        count=settings.CHAT_AUDIT_WRITER_BATCH_SIZE,
+                        block=AUDIT_READ_BLOCK_MS
+                    )
+                    entries = response[0][1] if response else []
+                
+                if entries:
+                    await self._write_entries(entries)
+                    
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Audit writer failed, retrying: {e}")
+                await asyncio.sleep(1.0)
+    
+    async def _claim_stale_entries(self) -> List[Tuple[bytes, Dict[bytes, bytes]]]:
+        """
+        Take over entries another writer read but never acknowledged
+        
+        Checked at most once per claim interval; pending entries are only
+        claimed after being idle that long.
+        
+        Returns:
+            Claimed stream entries
+        """
+        idle_seconds = settings.CHAT_AUDIT_CLAIM_IDLE_SECONDS
+        now = time.monotonic()
+        if now - self._last_claim < idle_seconds:
+            return []
+        self._last_claim = now
+        
+        result = await self._redis.xautoclaim(
+            AUDIT_STREAM_KEY,
+            AUDIT_CONSUMER_GROUP,
+            self._consumer,
+            min_idle_time=int(idle_seconds * 1000),
+            start_id="0-0",
+            count=settings.CHAT_AUDIT_WRITER_BATCH_SIZE
+        )
+        entries = result[1]
+        if entries:
+            self.metrics.record_audit_event("redelivered", len(entries))
+        return entries
+    
+    async def _write_entries(self, entries: List[Tuple[bytes, Dict[bytes, bytes]]]) -> None:
+        """
+        Insert a batch of stream entries and acknowledge them
+        
+        Entries are acknowledged only after the commit. If the insert
+        fails they stay pending and are claimed again later.
+        
+        Args:
+            entries: Stream entries as (id, fields)
+        """
+        ids = [entry_id for entry_id, _ in entries]
+        batch = []
+        for entry_id, fields in entries:
+            try:
+                batch.append(ChatAuditLogCreate.model_validate_json(fields[b"data"]))
+            except Exception as e:
+                # Unreadable entries would be redelivered forever
+                logger.error(f"Discarding malformed audit entry {entry_id}: {e}")
+                self.metrics.record_audit_event("discarded")
+        
+        if batch:
+            try:
+                async with async_session_maker() as db:
+                    await self._insert_logs(db, batch)
+            except Exception:
+                self.metrics.record_audit_event("failed", len(batch))
+                raise
+        
+        pipe = self._redis.pipeline(transaction=False)
+        pipe.xack(AUDIT_STREAM_KEY, AUDIT_CONSUMER_GROUP, *ids)
+        pipe.xdel(AUDIT_STREAM_KEY, *ids)
+        pipe.xlen(AUDIT_STREAM_KEY)
+        _, _, self._queue_depth = await pipe.execute()
+        
+        self.metrics.set_audit_queue_depth(self._queue_depth)
+        self.metrics.record_audit_event("written", len(batch))
+        logger.debug(f"Audit writer stored {len(batch)} logs")
+    
     async def _process_batch(self, db: AsyncSession) -> None:
         """
         Process batch of audit logs
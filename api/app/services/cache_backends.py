@@ -0,0 +1,251 @@
+"""
+Cache backends used by CacheService.
+
+- MemoryCacheBackend: bounded in-process LRU with per-entry TTL. Every worker
+  keeps one as its L1 tier (and it is the only tier when Redis is disabled)
+- RedisCacheBackend: shared L2 tier storing values already encoded with
+  encode_value(). Each tag is a Redis set of the keys stored under it, so tag
+  invalidation is exact
+"""
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from uuid import UUID
+
+from redis import asyncio as aioredis
+
+
+class CacheBackend(ABC):
+    """Interface shared by the cache tiers"""
+
+    name = "base"
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        """Get a value, or None on a miss"""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl_seconds: int, tags: Iterable[str] = ()) -> None:
+        """Store a value for ttl_seconds, indexed under the given tags"""
+
+    @abstractmethod
+    async def delete(self, keys: Iterable[str]) -> None:
+        """Delete keys"""
+
+    @abstractmethod
+    async def invalidate_tags(self, tags: Iterable[str]) -> List[str]:
+        """Delete every key stored under any of the tags; returns the keys"""
+
+    @abstractmethod
+    async def delete_matching(self, pattern: str) -> int:
+        """Delete keys containing pattern; returns the number deleted"""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Delete every key owned by this backend"""
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Bounded LRU cache with per-entry TTL"""
+
+    name = "memory"
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        on_evict: Optional[Callable[[str, str], None]] = None
+    ):
+        self.max_entries = max_entries
+        self.on_evict = on_evict
+        self._entries: "OrderedDict[str, Tuple[float, Any, Tuple[str, ...]]]" = OrderedDict()
+        self._tags: Dict[str, Set[str]] = {}
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self._remove(key)
+            if self.on_evict:
+                self.on_evict(key, "expired")
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value: Any, ttl_seconds: int, tags: Iterable[str] = ()) -> None:
+        self._remove(key)
+        tags = tuple(tags)
+        self._entries[key] = (time.monotonic() + ttl_seconds, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+
+        # Evict least recently used entries beyond the bound
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+            if self.on_evict:
+                self.on_evict(oldest, "lru")
+
+    async def delete(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._remove(key)
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> List[str]:
+        keys = set()
+        for tag in tags:
+            keys.update(self._tags.get(tag, ()))
+        for key in keys:
+            self._remove(key)
+        return list(keys)
+
+    async def delete_matching(self, pattern: str) -> int:
+        keys = [key for key in self._entries if pattern in key]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+        self._tags.clear()
+
+
+# ==================== SERIALIZATION ====================
+
+def _encode_default(value: Any) -> Dict[str, str]:
+    """Encode the non-JSON types commonly returned by services"""
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"__decimal__": str(value)}
+    if isinstance(value, UUID):
+        return {"__uuid__": str(value)}
+    raise TypeError(f"Object of type {type(value).__name__} is not cacheable")
+
+
+def _decode_hook(value: Dict[str, Any]) -> Any:
+    if len(value) == 1:
+        if "__datetime__" in value:
+            return datetime.fromisoformat(value["__datetime__"])
+        if "__date__" in value:
+            return date.fromisoformat(value["__date__"])
+        if "__decimal__" in value:
+            return Decimal(value["__decimal__"])
+        if "__uuid__" in value:
+            return UUID(value["__uuid__"])
+    return value
+
+
+def encode_value(value: Any) -> str:
+    """Serialize a value for Redis; raises TypeError for unsupported objects"""
+    return json.dumps(value, default=_encode_default, separators=(",", ":"))
+
+
+def decode_value(data: str) -> Any:
+    """Deserialize a value written by encode_value"""
+    return json.loads(data, object_hook=_decode_hook)
+
+
+# KEYS[1] = value key, KEYS[2..] = tag set keys; ARGV = value, ttl_seconds
+# Tag sets keep the longest TTL of their members. TTL is compared in the
+# script rather than with EXPIRE NX/GT, which need Redis 7.
+SET_TAGGED_SCRIPT = """
+local ttl = tonumber(ARGV[2])
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ttl)
+for i = 2, #KEYS do
+    redis.call('SADD', KEYS[i], KEYS[1])
+    if redis.call('TTL', KEYS[i]) < ttl then
+        redis.call('EXPIRE', KEYS[i], ttl)
+    end
+end
+return 1
+"""
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Shared Redis cache tier for encoded string values.
+
+    Keys are namespaced under key_prefix; tag sets live under
+    "<key_prefix>:tag:<tag>" and expire with the longest-lived member.
+    """
+
+    name = "redis"
+
+    def __init__(self, redis_client: aioredis.Redis, key_prefix: str = "worky:cache"):
+        self.redis = redis_client
+        self.key_prefix = key_prefix
+        self._set_tagged = redis_client.register_script(SET_TAGGED_SCRIPT)
+
+    def _key(self, key: str) -> str:
+        return f"{self.key_prefix}:{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.key_prefix}:tag:{tag}"
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.redis.get(self._key(key))
+
+    async def set(self, key: str, value: str, ttl_seconds: int, tags: Iterable[str] = ()) -> None:
+        redis_key = self._key(key)
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            await self.redis.set(redis_key, value, ex=ttl_seconds)
+            return
+        await self._set_tagged(keys=[redis_key, *tag_keys], args=[value, ttl_seconds])
+
+    async def delete(self, keys: Iterable[str]) -> None:
+        redis_keys = [self._key(key) for key in keys]
+        if redis_keys:
+            await self.redis.unlink(*redis_keys)
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> List[str]:
+        tag_keys = [self._tag_key(tag) for tag in tags]
+        if not tag_keys:
+            return []
+        redis_keys = await self.redis.sunion(tag_keys)
+        await self.redis.unlink(*tag_keys, *redis_keys)
+        offset = len(self.key_prefix) + 1
+        return [redis_key[offset:] for redis_key in redis_keys]
+
+    async def _unlink_scan(self, match: str, include_tags: bool = False) -> int:
+        tag_prefix = self._tag_key("")
+        deleted = 0
+        batch = []
+        async for redis_key in self.redis.scan_iter(match=match, count=500):
+            if not include_tags and redis_key.startswith(tag_prefix):
+                continue
+            batch.append(redis_key)
+            if len(batch) >= 500:
+                deleted += await self.redis.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += await self.redis.unlink(*batch)
+        return deleted
+
+    async def delete_matching(self, pattern: str) -> int:
+        return await self._unlink_scan(f"{self.key_prefix}:*{pattern}*")
+
+    async def clear(self) -> None:
+        await self._unlink_scan(f"{self.key_prefix}:*", include_tags=True)
@@ -0,0 +1,196 @@
+"""
+Cache Metrics Service
+
+Provides Prometheus metrics for the two-tier cache: hits and misses per
+namespace and tier, L1 evictions, invalidations, entry sizes and the time
+spent loading values on a miss. Also keeps small in-process summaries
+(hot keys, load latency percentiles) for the cache admin endpoints.
+"""
+
+import logging
+from collections import Counter as KeyCounter, defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional
+from prometheus_client import Counter, Histogram, Gauge
+
+logger = logging.getLogger(__name__)
+
+
+# Lookup metrics
+cache_requests_total = Counter(
+    'cache_requests_total',
+    'Total number of cache lookups',
+    ['namespace', 'tier', 'result']
+)
+
+# Eviction and invalidation metrics
+cache_evictions_total = Counter(
+    'cache_evictions_total',
+    'Total number of L1 cache evictions',
+    ['namespace', 'reason']
+)
+
+cache_invalidations_total = Counter(
+    'cache_invalidations_total',
+    'Total number of cache invalidations',
+    ['kind', 'origin']
+)
+
+# Size metrics
+cache_entry_size_bytes = Histogram(
+    'cache_entry_size_bytes',
+    'Estimated size of cached values in bytes',
+    ['namespace'],
+    buckets=[256, 1024, 4096, 16384, 65536, 262144, 1048576]
+)
+
+cache_l1_entries = Gauge(
+    'cache_l1_entries',
+    'Number of entries in the in-process L1 cache'
+)
+
+# Load metrics
+cache_load_duration_seconds = Histogram(
+    'cache_load_duration_seconds',
+    'Time spent computing a value after a cache miss',
+    ['namespace'],
+    buckets=[0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+)
+
+
+def key_namespace(key: str) -> str:
+    """Namespace of a cache key: the readable prefix before the digest"""
+    return key.split(":", 1)[0]
+
+
+class CacheMetrics:
+    """Service for tracking cache effectiveness"""
+
+    HOT_KEY_CAPACITY = 10000
+    LATENCY_SAMPLES = 1024
+
+    def __init__(self):
+        self._hot_keys: KeyCounter = KeyCounter()
+        self._totals: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "evictions": 0}
+        )
+        self._load_samples: Dict[str, Deque[float]] = defaultdict(
+            lambda: deque(maxlen=self.LATENCY_SAMPLES)
+        )
+        self._size_totals: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+
+    def record_lookup(self, key: str, tier: str, hit: bool, final: bool = True) -> None:
+        """
+        Record a cache lookup
+
+        Args:
+            key: Cache key
+            tier: Tier consulted (l1, l2)
+            hit: Whether the value was found
+            final: False when a miss falls through to another tier
+        """
+        namespace = key_namespace(key)
+        try:
+            cache_requests_total.labels(
+                namespace=namespace, tier=tier, result="hit" if hit else "miss"
+            ).inc()
+        except Exception as e:
+            logger.warning(f"Failed to record cache lookup metric: {e}")
+
+        if hit:
+            self._totals[namespace]["hits"] += 1
+            self._hot_keys[key] += 1
+            if len(self._hot_keys) > self.HOT_KEY_CAPACITY:
+                # Keep the hottest half so the tracker stays bounded
+                self._hot_keys = KeyCounter(
+                    dict(self._hot_keys.most_common(self.HOT_KEY_CAPACITY // 2))
+                )
+        elif final:
+            self._totals[namespace]["misses"] += 1
+
+    def record_eviction(self, key: str, reason: str) -> None:
+        """Record an L1 eviction (lru, expired)"""
+        namespace = key_namespace(key)
+        self._totals[namespace]["evictions"] += 1
+        try:
+            cache_evictions_total.labels(namespace=namespace, reason=reason).inc()
+        except Exception as e:
+            logger.warning(f"Failed to record cache eviction metric: {e}")
+
+    def record_invalidation(self, kind: str, origin: str = "local") -> None:
+        """Record an invalidation (key, tag, pattern, clear) from this or another worker"""
+        try:
+            cache_invalidations_total.labels(kind=kind, origin=origin).inc()
+        except Exception as e:
+            logger.warning(f"Failed to record cache invalidation metric: {e}")
+
+    def record_entry_size(self, key: str, size: int) -> None:
+        """Record the estimated size of a stored value"""
+        namespace = key_namespace(key)
+        totals = self._size_totals[namespace]
+        totals[0] += 1
+        totals[1] += size
+        try:
+            cache_entry_size_bytes.labels(namespace=namespace).observe(size)
+        except Exception as e:
+            logger.warning(f"Failed to record cache entry size metric: {e}")
+
+    def record_load(self, key: str, duration: float) -> None:
+        """Record how long a miss took to load from the source"""
+        namespace = key_namespace(key)
+        self._load_samples[namespace].append(duration)
+        try:
+            cache_load_duration_seconds.labels(namespace=namespace).observe(duration)
+        except Exception as e:
+            logger.warning(f"Failed to record cache load metric: {e}")
+
+    def set_l1_entries(self, count: int) -> None:
+        """Set the number of L1 entries"""
+        try:
+            cache_l1_entries.set(count)
+        except Exception as e:
+            logger.warning(f"Failed to set cache entries metric: {e}")
+
+    def hot_keys(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most frequently hit keys in this worker"""
+        return [
+            {"key": key, "namespace": key_namespace(key), "hits": hits}
+            for key, hits in self._hot_keys.most_common(limit)
+        ]
+
+    def namespace_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-namespace hit ratio, evictions, sizes and load latency in this worker"""
+        namespaces = set(self._totals) | set(self._load_samples) | set(self._size_totals)
+        stats = {}
+        for namespace in sorted(namespaces):
+            totals = self._totals[namespace]
+            lookups = totals["hits"] + totals["misses"]
+            entries, total_size = self._size_totals[namespace]
+            samples = sorted(self._load_samples[namespace])
+            stats[namespace] = {
+                **totals,
+                "hit_ratio": round(totals["hits"] / lookups, 4) if lookups else None,
+                "avg_entry_bytes": total_size // entries if entries else None,
+                "load_p50_ms": _percentile_ms(samples, 0.50),
+                "load_p99_ms": _percentile_ms(samples, 0.99),
+            }
+        return stats
+
+
+def _percentile_ms(samples: List[float], quantile: float) -> Optional[float]:
+    """Nearest-rank percentile of sorted samples, in milliseconds"""
+    if not samples:
+        return None
+    index = min(len(samples) - 1, int(quantile * len(samples)))
+    return round(samples[index] * 1000, 2)
+
+
+# Singleton instance
+_cache_metrics: Optional[CacheMetrics] = None
+
+
+def get_cache_metrics() -> CacheMetrics:
+    """Get or create the cache metrics singleton"""
+    global _cache_metrics
+    if _cache_metrics is None:
+        _cache_metrics = CacheMetrics()
+    return _cache_metrics
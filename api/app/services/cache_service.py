@@ -1,153 +1,379 @@
 """
 Cache service for team assignment system performance optimization.
+
+Two tiers:
+- L1: bounded in-process LRU/TTL (MemoryCacheBackend), short TTL
+- L2: shared Redis backend (RedisCacheBackend) holding JSON-encoded values,
+  when CACHE_BACKEND is "redis"
+
+Entries can be tagged (e.g. "team:TEAM-000001") and invalidated by tag.
+Invalidations are applied to the shared tier and published on a Redis
+channel so every worker drops the affected L1 entries.
 """
-from typing import Any, Optional, List, Dict
-from datetime import datetime, timedelta
+from typing import Any, Optional, List, Dict, Iterable
+from datetime import timedelta
+import asyncio
 import json
 import hashlib
+import inspect
+import sys
+import time
+import uuid
 from functools import wraps
 
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+
+from app.core.config import settings
 from app.core.logging import StructuredLogger
+from app.services.cache_backends import (
+    CacheBackend, MemoryCacheBackend, RedisCacheBackend, encode_value, decode_value
+)
+from app.services.cache_metrics import get_cache_metrics
 
 logger = StructuredLogger(__name__)
 
 
 class CacheService:
-    """In-memory cache service for team and assignment data"""
-    
-    def __init__(self):
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self._ttl: Dict[str, datetime] = {}
-        self.default_ttl = timedelta(minutes=15)
-    
+    """Two-tier cache service for team and assignment data"""
+
+    def __init__(
+        self,
+        l1: Optional[MemoryCacheBackend] = None,
+        l2: Optional[CacheBackend] = None
+    ):
+        self.metrics = get_cache_metrics()
+        self.l1 = l1 if l1 is not None else MemoryCacheBackend(max_entries=settings.CACHE_L1_MAX_ENTRIES)
+        self.l1.on_evict = self.metrics.record_eviction
+        self.l2 = l2
+        self.default_ttl = timedelta(seconds=settings.CACHE_DEFAULT_TTL_SECONDS)
+        self.l1_ttl = timedelta(seconds=settings.CACHE_L1_TTL_SECONDS)
+        self.channel = settings.CACHE_INVALIDATION_CHANNEL
+        self.worker_id = uuid.uuid4().hex
+        self.redis_client: Optional[aioredis.Redis] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    # ==================== LIFECYCLE ====================
+
+    async def connect(self) -> None:
+        """Attach the Redis tier and start the invalidation listener"""
+        if settings.CACHE_BACKEND != "redis" or self.l2 is not None:
+            return
+        try:
+            self.redis_client = aioredis.from_url(
+                settings.redis_url,
+                encoding="utf-8",
+                decode_responses=True,
+                socket_connect_timeout=5,
+                socket_timeout=5
+            )
+            await self.redis_client.ping()
+        except RedisError as e:
+            logger.warning(f"Redis unavailable, cache running in-process only: {e}")
+            self.redis_client = None
+            return
+
+        self.l2 = RedisCacheBackend(self.redis_client, settings.CACHE_KEY_PREFIX)
+        self._listener = asyncio.create_task(self._listen_for_invalidations())
+        logger.info("Redis cache backend connected")
+
+    async def disconnect(self) -> None:
+        """Stop the invalidation listener and close the Redis connection"""
+        if self._listener:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self.redis_client:
+            await self.redis_client.close()
+            self.redis_client = None
+        self.l2 = None
+
+    # ==================== CORE OPERATIONS ====================
+
     def _generate_key(self, prefix: str, **kwargs) -> str:
-        """Generate cache key from parameters"""
-        key_data = f"{prefix}:{json.dumps(kwargs, sort_keys=True)}"
-        return hashlib.md5(key_data.encode()).hexdigest()
-    
-    def _is_expired(self, key: str) -> bool:
-        """Check if cache entry is expired"""
-        if key not in self._ttl:
-            return True
-        return datetime.utcnow() > self._ttl[key]
-    
-    def get(self, key: str) -> Optional[Any]:
-        """Get value from cache"""
-        if key not in self._cache or self._is_expired(key):
-            if key in self._cache:
-                del self._cache[key]
-                del self._ttl[key]
+        """Generate cache key from parameters, keeping the prefix readable"""
+        key_data = json.dumps(kwargs, sort_keys=True, default=str)
+        return f"{prefix}:{hashlib.md5(key_data.encode()).hexdigest()}"
+
+    def _l1_ttl_seconds(self, ttl: timedelta) -> int:
+        return max(1, int(min(ttl, self.l1_ttl).total_seconds()))
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Get value from cache, filling L1 from the shared tier"""
+        value = await self.l1.get(key)
+        self.metrics.record_lookup(key, "l1", value is not None, final=self.l2 is None)
+        if value is not None or self.l2 is None:
+            return value
+
+        try:
+            data = await self.l2.get(key)
+        except RedisError as e:
+            logger.warning(f"Cache read failed for {key}: {e}")
+            data = None
+
+        self.metrics.record_lookup(key, "l2", data is not None)
+        if data is None:
             return None
-        return self._cache[key]
-    
-    def set(self, key: str, value: Any, ttl: Optional[timedelta] = None) -> None:
-        """Set value in cache"""
-        self._cache[key] = value
-        self._ttl[key] = datetime.utcnow() + (ttl or self.default_ttl)
-    
-    def delete(self, key: str) -> None:
+
+        value = decode_value(data)
+        await self.l1.set(key, value, self._l1_ttl_seconds(self.default_ttl))
+        return value
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[timedelta] = None,
+        tags: Iterable[str] = ()
+    ) -> None:
+        """Set value in cache, optionally indexed under tags"""
+        ttl = ttl or self.default_ttl
+        tags = tuple(tags)
+        await self.l1.set(key, value, self._l1_ttl_seconds(ttl), tags)
+        self.metrics.set_l1_entries(len(self.l1))
+
+        try:
+            data = encode_value(value)
+        except TypeError:
+            # Not serializable (e.g. ORM instances): keep it in this worker only
+            self.metrics.record_entry_size(key, sys.getsizeof(value))
+            logger.debug(f"Cache value for {key} kept in-process only")
+            return
+
+        self.metrics.record_entry_size(key, len(data))
+        if self.l2 is None:
+            return
+        try:
+            await self.l2.set(key, data, max(1, int(ttl.total_seconds())), tags)
+        except RedisError as e:
+            logger.warning(f"Cache write failed for {key}: {e}")
+
+    async def delete(self, key: str) -> None:
         """Delete value from cache"""
-        if key in self._cache:
-            del self._cache[key]
-        if key in self._ttl:
-            del self._ttl[key]
-    
-    def clear_pattern(self, pattern: str) -> None:
-        """Clear all keys matching pattern"""
-        keys_to_delete = [key for key in self._cache.keys() if pattern in key]
-        for key in keys_to_delete:
-            self.delete(key)
-    
+        await self.l1.delete([key])
+        self.metrics.record_invalidation("key")
+        if await self._l2_call("delete", [key]):
+            await self._publish(keys=[key])
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        """Invalidate every entry stored under any of the tags"""
+        await self.l1.invalidate_tags(tags)
+        self.metrics.record_invalidation("tag")
+        if await self._l2_call("invalidate_tags", tags):
+            await self._publish(tags=list(tags))
+
+    async def clear_pattern(self, pattern: str) -> None:
+        """Clear all keys containing pattern (e.g. a key prefix)"""
+        await self.l1.delete_matching(pattern)
+        self.metrics.record_invalidation("pattern")
+        if await self._l2_call("delete_matching", pattern):
+            await self._publish(pattern=pattern)
+
+    async def clear(self) -> None:
+        """Clear every cache entry"""
+        await self.l1.clear()
+        self.metrics.record_invalidation("clear")
+        if await self._l2_call("clear"):
+            await self._publish(clear=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Get cache tier and per-namespace statistics for this worker"""
+        return {
+            "backend": self.l2.name if self.l2 else self.l1.name,
+            "worker_id": self.worker_id,
+            "l1_entries": len(self.l1),
+            "l1_max_entries": self.l1.max_entries,
+            "l1_evictions": self.l1.evictions,
+            "namespaces": self.metrics.namespace_stats()
+        }
+
+    async def _l2_call(self, method: str, *args) -> bool:
+        """Run an invalidation on the shared tier; False if there is none"""
+        if self.l2 is None:
+            return False
+        try:
+            await getattr(self.l2, method)(*args)
+        except RedisError as e:
+            logger.warning(f"Cache invalidation failed ({method}): {e}")
+        return True
+
+    # ==================== CROSS-WORKER INVALIDATION ====================
+
+    async def _publish(self, **message) -> None:
+        """Fan an invalidation out to the other workers"""
+        if not self.redis_client:
+            return
+        try:
+            await self.redis_client.publish(
+                self.channel, json.dumps({"origin": self.worker_id, **message})
+            )
+        except RedisError as e:
+            logger.warning(f"Cache invalidation publish failed: {e}")
+
+    async def _apply_invalidation(self, message: Dict[str, Any]) -> None:
+        """Apply an invalidation published by another worker to L1"""
+        if message.get("origin") == self.worker_id:
+            return
+        if message.get("clear"):
+            await self.l1.clear()
+            self.metrics.record_invalidation("clear", origin="remote")
+        if message.get("keys"):
+            await self.l1.delete(message["keys"])
+            self.metrics.record_invalidation("key", origin="remote")
+        if message.get("tags"):
+            await self.l1.invalidate_tags(message["tags"])
+            self.metrics.record_invalidation("tag", origin="remote")
+        if message.get("pattern"):
+            await self.l1.delete_matching(message["pattern"])
+            self.metrics.record_invalidation("pattern", origin="remote")
+
+    async def _listen_for_invalidations(self) -> None:
+        """Subscribe to the invalidation channel, reconnecting on errors"""
+        while True:
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                # Messages may have been missed while disconnected
+                await self.l1.clear()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        await self._apply_invalidation(json.loads(message["data"]))
+            except (RedisError, ValueError) as e:
+                logger.warning(f"Cache invalidation listener error: {e}")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.reset()
+
+    # ==================== KEYS AND TAGS ====================
+
     def team_membership_key(self, user_id: str, project_id: str) -> str:
         """Generate cache key for team membership"""
         return self._generate_key("team_membership", user_id=user_id, project_id=project_id)
-    
+
     def eligible_users_key(self, entity_type: str, entity_id: str, assignment_type: str) -> str:
         """Generate cache key for eligible users"""
-        return self._generate_key("eligible_users", 
-                                entity_type=entity_type, 
-                                entity_id=entity_id, 
+        return self._generate_key("eligible_users",
+                                entity_type=entity_type,
+                                entity_id=entity_id,
                                 assignment_type=assignment_type)
-    
+
     def team_members_key(self, team_id: str) -> str:
         """Generate cache key for team members"""
         return self._generate_key("team_members", team_id=team_id)
-    
+
     def user_assignments_key(self, user_id: str) -> str:
         """Generate cache key for user assignments"""
         return self._generate_key("user_assignments", user_id=user_id)
-    
-    def invalidate_user_cache(self, user_id: str) -> None:
+
+    def principal_key(self, user_id: str, token_version: int) -> str:
+        """Generate cache key for an authenticated user at a token version"""
+        return self._generate_key("principal", user_id=user_id, token_version=token_version)
+
+    async def invalidate_principal(self, user_id: str) -> None:
+        """Invalidate the cached authenticated user for every token version"""
+        await self.invalidate_tags(f"principal:{user_id}")
+
+    async def invalidate_user_cache(self, user_id: str) -> None:
         """Invalidate all cache entries for a user"""
-        self.clear_pattern(f"user_id:{user_id}")
-        self.clear_pattern(f"user_assignments")
-    
-    def invalidate_team_cache(self, team_id: str) -> None:
+        await self.invalidate_tags(f"user:{user_id}")
+        await self.clear_pattern("user_assignments")
+
+    async def invalidate_team_cache(self, team_id: str) -> None:
         """Invalidate all cache entries for a team"""
-        self.clear_pattern(f"team_id:{team_id}")
-        self.clear_pattern(f"team_members")
-        self.clear_pattern(f"team_membership")
-    
-    def invalidate_project_cache(self, project_id: str) -> None:
+        await self.invalidate_tags(f"team:{team_id}")
+        await self.clear_pattern("team_membership")
+
+    async def invalidate_entity(self, entity_type: str, entity_id: str) -> None:
+        """Invalidate cache entries tagged with a hierarchy entity"""
+        await self.invalidate_tags(f"{entity_type}:{entity_id}")
+
+    async def invalidate_project_cache(self, project_id: str) -> None:
         """Invalidate all cache entries for a project"""
-        self.clear_pattern(f"project_id:{project_id}")
-        self.clear_pattern(f"eligible_users")
-    
+        await self.invalidate_tags(f"project:{project_id}")
+        await self.clear_pattern("eligible_users")
+
     # Team-specific cache methods
-    def get_team_members(self, team_id: str) -> Optional[List]:
+    async def get_team_members(self, team_id: str) -> Optional[List]:
         """Get team members from cache"""
         key = self.team_members_key(team_id)
-        return self.get(key)
-    
-    def set_team_members(self, team_id: str, members: List) -> None:
+        return await self.get(key)
+
+    async def set_team_members(self, team_id: str, members: List) -> None:
         """Set team members in cache"""
         key = self.team_members_key(team_id)
-        self.set(key, members)
-    
-    def invalidate_team_members(self, team_id: str) -> None:
+        await self.set(key, members, tags=[f"team:{team_id}"])
+
+    async def invalidate_team_members(self, team_id: str) -> None:
         """Invalidate team members cache"""
-        key = self.team_members_key(team_id)
-        self.delete(key)
-    
-    def invalidate_user_teams(self, user_id: str) -> None:
+        await self.invalidate_tags(f"team:{team_id}")
+
+    async def invalidate_user_teams(self, user_id: str) -> None:
         """Invalidate user teams cache"""
-        self.clear_pattern(f"user_teams:{user_id}")
-    
-    def invalidate_project_team(self, project_id: str) -> None:
+        await self.invalidate_tags(f"user:{user_id}")
+
+    async def invalidate_project_team(self, project_id: str) -> None:
         """Invalidate project team cache"""
-        self.clear_pattern(f"project_team:{project_id}")
+        await self.invalidate_tags(f"project:{project_id}")
 
 
 # Global cache instance
 cache_service = CacheService()
 
 
-def cached(ttl: Optional[timedelta] = None, key_func: Optional[callable] = None):
-    """Decorator for caching function results"""
+def cached(
+    ttl: Optional[timedelta] = None,
+    key_func: Optional[callable] = None,
+    tags: Iterable[str] = ()
+):
+    """
+    Decorator for caching function results.
+
+    Keys are built from the function's qualified name and its bound
+    arguments, skipping ``self``/``cls`` so calls from different service
+    instances share entries. ``tags`` are format strings filled from the
+    same arguments, e.g. ``tags=["team:{team_id}"]``.
+    """
+    tag_templates = tuple(tags)
+
     def decorator(func):
+        signature = inspect.signature(func)
+        prefix = f"{func.__module__}.{func.__qualname__}"
+
+        def bind_arguments(args, kwargs) -> Dict[str, Any]:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return {
+                name: value for name, value in bound.arguments.items()
+                if name not in ("self", "cls")
+            }
+
         @wraps(func)
         async def wrapper(*args, **kwargs):
+            arguments = bind_arguments(args, kwargs)
+
             # Generate cache key
             if key_func:
                 cache_key = key_func(*args, **kwargs)
             else:
-                cache_key = cache_service._generate_key(
-                    f"{func.__module__}.{func.__name__}", 
-                    args=str(args), 
-                    kwargs=kwargs
-                )
-            
+                cache_key = cache_service._generate_key(prefix, **arguments)
+
             # Try to get from cache
-            cached_result = cache_service.get(cache_key)
+            cached_result = await cache_service.get(cache_key)
             if cached_result is not None:
                 logger.debug(f"Cache hit for {func.__name__}")
                 return cached_result
-            
+
             # Execute function and cache result
+            started = time.perf_counter()
             result = await func(*args, **kwargs)
-            cache_service.set(cache_key, result, ttl)
+            cache_service.metrics.record_load(cache_key, time.perf_counter() - started)
+            entry_tags = [template.format(**arguments) for template in tag_templates]
+            await cache_service.set(cache_key, result, ttl, tags=entry_tags)
             logger.debug(f"Cache miss for {func.__name__}, result cached")
             return result
-        
+
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -0,0 +1,297 @@
+"""
+Response Cache for Chat Assistant
+
+Caches the expensive parts of a chat turn in the shared CacheService:
+- Full QUERY/REPORT responses, keyed by user, the classified query
+  (normalized text, intent, entities, dates) and the current data version
+- LLM fallback classifications, keyed by the classification prompt
+
+Writes to the entities the assistant reads bump a shared data version when
+they commit, so a response computed before a write is never looked up
+again, even one stored after the write by a request still in flight.
+"""
+
+import asyncio
+import logging
+import re
+from datetime import timedelta
+from typing import Optional, Tuple
+
+from redis.exceptions import RedisError
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.bug import Bug
+from app.models.client import Client
+from app.models.hierarchy import (
+    Program, Project, Usecase, UserStory, Task, Subtask, Phase
+)
+from app.models.user import User
+from app.schemas.chat import ChatResponse, IntentType
+from app.services.cache_service import CacheService, cache_service
+from app.services.chat_metrics import get_chat_metrics
+from app.services.retrieval_planner import INCOMPLETE_DATA_KEY
+
+logger = logging.getLogger(__name__)
+
+CHAT_DATA_VERSION_KEY = "chat:data_version"
+
+# Models the data retriever reads; writes to these invalidate responses
+CHAT_DATA_MODELS = (Program, Project, Usecase, UserStory, Task, Subtask, Phase, Bug, User, Client)
+
+# Intents whose answers depend only on the query and the data
+CACHEABLE_INTENTS = (IntentType.QUERY, IntentType.REPORT)
+
+_DATA_CHANGED = "chat_data_changed"
+_WHITESPACE = re.compile(r'\s+')
+
+
+class ChatResponseCache:
+    """Versioned response cache and classification cache for chat"""
+    
+    def __init__(self, cache: CacheService = cache_service):
+        """Initialize the cache on top of the shared cache service"""
+        self.cache = cache
+        self.metrics = get_chat_metrics()
+        self.enabled = settings.CHAT_RESPONSE_CACHE_ENABLED
+        self.response_ttl = timedelta(seconds=settings.CHAT_RESPONSE_CACHE_TTL_SECONDS)
+        self.classification_ttl = timedelta(seconds=settings.CHAT_CLASSIFICATION_CACHE_TTL_SECONDS)
+        self._local_version = 0
+        self._bumps_in_flight = 0
+        self._bump_tasks = set()
+    
+    # ==================== DATA VERSION ====================
+    
+    def mark_data_changed(self) -> None:
+        """
+        Record a committed write to chat data
+        
+        Called from a synchronous commit hook, so the shared version is
+        bumped in a task; until it lands this worker bypasses the cache.
+        """
+        self._local_version += 1
+        redis_client = self.cache.redis_client
+        if redis_client is None:
+            return
+        
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Commit outside the event loop (scripts); other workers expire by TTL
+            return
+        
+        self._bumps_in_flight += 1
+        task = loop.create_task(self._bump_shared_version(redis_client))
+        self._bump_tasks.add(task)
+        task.add_done_callback(self._bump_tasks.discard)
+    
+    async def _bump_shared_version(self, redis_client) -> None:
+        """Increment the shared data version"""
+        try:
+            await redis_client.incr(CHAT_DATA_VERSION_KEY)
+        except RedisError as e:
+            # Without the bump other workers would keep serving old answers
+            logger.warning(f"Failed to bump chat data version, clearing responses: {e}")
+            await self.cache.clear_pattern("chat_response")
+        finally:
+            self._bumps_in_flight -= 1
+    
+    async def data_version(self) -> Optional[str]:
+        """
+        Get the current data version
+        
+        Returns:
+            Version string, or None if responses must not be cached now
+        """
+        if self._bumps_in_flight:
+            return None
+        
+        redis_client = self.cache.redis_client
+        if redis_client is None:
+            return f"local:{self._local_version}"
+        
+        try:
+            return str(await redis_client.get(CHAT_DATA_VERSION_KEY) or 0)
+        except RedisError as e:
+            logger.warning(f"Failed to read chat data version: {e}")
+            return None
+    
+    # ==================== RESPONSES ====================
+    
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """Normalize a query so trivially different phrasings share a key"""
+        return _WHITESPACE.sub(' ', query).strip().rstrip('?.! ').lower()
+    
+    def response_key(self, user, intent, version: str) -> str:
+        """
+        Build the response cache key
+        
+        Entities and temporal context are part of the key, so context
+        resolved pronouns and relative dates ("this week") are not shared
+        across sessions or days.
+        """
+        return self.cache._generate_key(
+            "chat_response",
+            user_id=user.id,
+            client_id=user.client_id,
+            intent_type=intent.intent_type.value,
+            query=self.normalize_query(intent.normalized_query),
+            entities=sorted(
+                (e.entity_type.value, e.entity_id or e.entity_name or "")
+                for e in intent.entities
+            ),
+            temporal=intent.temporal_context or {},
+            version=version
+        )
+    
+    async def lookup(
+        self,
+        user,
+        intent,
+        request_id: str
+    ) -> Tuple[Optional[str], Optional[ChatResponse]]:
+        """
+        Look up a cached response for a classified query
+        
+        Args:
+            user: Current user
+            intent: Classified intent
+            request_id: Request ID to put in the cached response
+        
+        Returns:
+            Tuple of (key to store the response under or None, cached response)
+        """
+        if not self.enabled or intent.intent_type not in CACHEABLE_INTENTS:
+            return None, None
+        
+        version = await self.data_version()
+        if version is None:
+            self.metrics.record_cache_lookup("response", "bypass")
+            return None, None
+        
+        key = self.response_key(user, intent, version)
+        entry = await self.cache.get(key)
+        if entry is None:
+            self.metrics.record_cache_lookup("response", "miss")
+            return key, None
+        
+        self.metrics.record_cache_lookup("response", "hit")
+        self.metrics.record_tokens_saved("response", entry["tokens"])
+        
+        response = ChatResponse.model_validate(entry["response"])
+        if response.metadata:
+            response.metadata.request_id = request_id
+        return key, response
+    
+    async def store(self, key: Optional[str], response: ChatResponse, tokens_used: int) -> None:
+        """
+        Cache a response
+        
+        Only successful LLM answers over complete data are kept; fallback
+        text produced while the LLM was unavailable (no tokens used) and
+        answers from data cut short by the retrieval budget are not.
+        """
+        if key is None or response.status != "success" or not tokens_used:
+            return
+        if (response.data or {}).get(INCOMPLETE_DATA_KEY):
+            return
+        
+        await self.cache.set(
+            key,
+            {"response": response.model_dump(mode="json"), "tokens": tokens_used},
+            self.response_ttl
+        )
+    
+    # ==================== CLASSIFICATIONS ====================
+    
+    async def get_classification(self, prompt: str) -> Optional[str]:
+        """
+        Get a cached LLM classification
+        
+        Args:
+            prompt: Classification prompt (query and conversation context)
+        
+        Returns:
+            Cached classification text or None
+        """
+        if not self.enabled:
+            return None
+        
+        entry = await self.cache.get(self.cache._generate_key("chat_classification", prompt=prompt))
+        if entry is None:
+            self.metrics.record_cache_lookup("classification", "miss")
+            return None
+        
+        self.metrics.record_cache_lookup("classification", "hit")
+        self.metrics.record_tokens_saved("classification", entry["tokens"])
+        return entry["text"]
+    
+    async def set_classification(self, prompt: str, text: str, tokens_used: int) -> None:
+        """
+        Cache an LLM classification
+        
+        Args:
+            prompt: Classification prompt
+            text: LLM classification text
+            tokens_used: Tokens the LLM call used
+        """
+        if not self.enabled:
+            return
+        
+        await self.cache.set(
+            self.cache._generate_key("chat_classification", prompt=prompt),
+            {"text": text, "tokens": tokens_used},
+            self.classification_ttl
+        )
+
+
+# Singleton instance
+_chat_response_cache: Optional[ChatResponseCache] = None
+
+
+def get_chat_response_cache() -> ChatResponseCache:
+    """Get or create the chat response cache singleton"""
+    global _chat_response_cache
+    if _chat_response_cache is None:
+        _chat_response_cache = ChatResponseCache()
+    return _chat_response_cache
+
+
+# ==================== WRITE TRACKING ====================
+
+def _track_flushed_changes(session: Session, flush_context) -> None:
+    """Flag the transaction if the flush wrote chat data"""
+    if any(
+        isinstance(obj, CHAT_DATA_MODELS)
+        for objects in (session.new, session.dirty, session.deleted)
+        for obj in objects
+    ):
+        session.info[_DATA_CHANGED] = True
+
+
+def _track_bulk_changes(orm_execute_state) -> None:
+    """Flag the transaction for bulk UPDATE/DELETE statements on chat data"""
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    for mapper in orm_execute_state.all_mappers:
+        if issubclass(mapper.class_, CHAT_DATA_MODELS):
+            orm_execute_state.session.info[_DATA_CHANGED] = True
+            return
+
+
+def _publish_committed_changes(session: Session) -> None:
+    """Bump the data version once the flagged transaction commits"""
+    if session.info.pop(_DATA_CHANGED, False):
+        get_chat_response_cache().mark_data_changed()
+
+
+def _discard_rolled_back_changes(session: Session) -> None:
+    session.info.pop(_DATA_CHANGED, None)
+
+
+event.listen(Session, "after_flush", _track_flushed_changes)
+event.listen(Session, "do_orm_execute", _track_bulk_changes)
+event.listen(Session, "after_commit", _publish_committed_changes)
+event.listen(Session, "after_rollback", _discard_rolled_back_changes)
@@ -28,12 +28,38 @@ chat_request_duration_seconds = Histogram(
     buckets=[0.1, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 30.0]
 )
 
+chat_bookkeeping_duration_seconds = Histogram(
+    'chat_bookkeeping_duration_seconds',
+    'Session and history writes run after the response, in seconds',
+    buckets=[0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5]
+)
+
+chat_retrieval_duration_seconds = Histogram(
+    'chat_retrieval_duration_seconds',
+    'Data retrieval duration for QUERY and REPORT intents in seconds',
+    buckets=[0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0]
+)
+
 chat_llm_call_duration_seconds = Histogram(
     'chat_llm_call_duration_seconds',
     'LLM API call duration in seconds',
     buckets=[0.1, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 30.0]
 )
 
+# Prompt size metrics
+chat_prompt_tokens = Histogram(
+    'chat_prompt_tokens',
+    'LLM prompt size in tokens by section (system, history, data, total)',
+    ['section'],
+    buckets=[50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000]
+)
+
+chat_prompt_compressed_total = Counter(
+    'chat_prompt_compressed_total',
+    'Prompts whose history or data was cut to fit the token budget',
+    ['section']
+)
+
 # Error metrics
 chat_errors_total = Counter(
     'chat_errors_total',
@@ -48,12 +74,61 @@ chat_rate_limit_exceeded_total = Counter(
     ['window_type']
 )
 
+chat_rate_limit_checks_total = Counter(
+    'chat_rate_limit_checks_total',
+    'Total number of admitted chat rate limit checks',
+    ['source']
+)
+
 # Session metrics
 chat_active_sessions = Gauge(
     'chat_active_sessions',
     'Number of active chat sessions'
 )
 
+# Bookkeeping metrics
+chat_bookkeeping_pending = Gauge(
+    'chat_bookkeeping_pending',
+    'Number of post-response bookkeeping tasks not yet finished'
+)
+
+chat_bookkeeping_inline_total = Counter(
+    'chat_bookkeeping_inline_total',
+    'Bookkeeping runs done before responding because too many were pending'
+)
+
+# Audit queue metrics
+chat_audit_events_total = Counter(
+    'chat_audit_events_total',
+    'Audit log entries by delivery outcome',
+    ['outcome']
+)
+
+chat_audit_queue_depth = Gauge(
+    'chat_audit_queue_depth',
+    'Audit log entries waiting in the durable queue'
+)
+
+# Response cache metrics
+chat_cache_lookups_total = Counter(
+    'chat_cache_lookups_total',
+    'Chat cache lookups by cache and result (hit, miss, bypass)',
+    ['cache', 'result']
+)
+
+chat_cache_tokens_saved_total = Counter(
+    'chat_cache_tokens_saved_total',
+    'LLM tokens not spent thanks to cache hits',
+    ['cache']
+)
+
+# Data retrieval metrics
+chat_retrieval_steps_total = Counter(
+    'chat_retrieval_steps_total',
+    'Data retrieval lookups by retrieved data key and outcome (ok, timeout, error)',
+    ['step', 'outcome']
+)
+
 # Action metrics
 chat_actions_executed_total = Counter(
     'chat_actions_executed_total',
@@ -103,6 +178,137 @@ class ChatMetrics:
             except Exception as e:
                 logger.warning(f"Failed to record request duration: {e}")
     
+    @staticmethod
+    @contextmanager
+    def track_bookkeeping_duration():
+        """
+        Context manager to track post-response bookkeeping duration
+        
+        This is kept apart from the request duration, which only covers
+        what the user waits for.
+        """
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - start_time
+            try:
+                chat_bookkeeping_duration_seconds.observe(duration)
+            except Exception as e:
+                logger.warning(f"Failed to record bookkeeping duration: {e}")
+    
+    @staticmethod
+    def set_bookkeeping_pending(count: int) -> None:
+        """
+        Set the number of pending bookkeeping tasks
+        
+        Args:
+            count: Number of pending tasks
+        """
+        try:
+            chat_bookkeeping_pending.set(count)
+        except Exception as e:
+            logger.warning(f"Failed to set bookkeeping pending metric: {e}")
+    
+    @staticmethod
+    def record_bookkeeping_inline() -> None:
+        """Record a bookkeeping run done inline because of backpressure"""
+        try:
+            chat_bookkeeping_inline_total.inc()
+        except Exception as e:
+            logger.warning(f"Failed to record bookkeeping inline metric: {e}")
+    
+    @staticmethod
+    def record_audit_event(outcome: str, count: int = 1) -> None:
+        """
+        Record audit log deliveries
+        
+        Args:
+            outcome: Delivery outcome (queued, direct, written, redelivered,
+                     discarded, failed)
+            count: Number of entries
+        """
+        try:
+            chat_audit_events_total.labels(outcome=outcome).inc(count)
+        except Exception as e:
+            logger.warning(f"Failed to record audit metric: {e}")
+    
+    @staticmethod
+    def set_audit_queue_depth(depth: int) -> None:
+        """
+        Set the number of audit entries waiting in the queue
+        
+        Args:
+            depth: Queue length
+        """
+        try:
+            chat_audit_queue_depth.set(depth)
+        except Exception as e:
+            logger.warning(f"Failed to set audit queue metric: {e}")
+    
+    @staticmethod
+    def record_cache_lookup(cache: str, result: str) -> None:
+        """
+        Record a chat cache lookup
+        
+        Args:
+            cache: Which cache (response, classification)
+            result: Lookup result (hit, miss, bypass)
+        """
+        try:
+            chat_cache_lookups_total.labels(cache=cache, result=result).inc()
+        except Exception as e:
+            logger.warning(f"Failed to record cache lookup metric: {e}")
+    
+    @staticmethod
+    def record_tokens_saved(cache: str, tokens: int) -> None:
+        """
+        Record LLM tokens saved by a cache hit
+        
+        Args:
+            cache: Which cache (response, classification)
+            tokens: Tokens the cached LLM call used
+        """
+        try:
+            chat_cache_tokens_saved_total.labels(cache=cache).inc(tokens)
+        except Exception as e:
+            logger.warning(f"Failed to record tokens saved metric: {e}")
+    
+    @staticmethod
+    @contextmanager
+    def track_retrieval_duration():
+        """
+        Context manager to track data retrieval duration
+        
+        Usage:
+            with ChatMetrics.track_retrieval_duration():
+                # run the retrieval plan
+                pass
+        """
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            duration = time.time() - start_time
+            try:
+                chat_retrieval_duration_seconds.observe(duration)
+            except Exception as e:
+                logger.warning(f"Failed to record retrieval duration: {e}")
+    
+    @staticmethod
+    def record_retrieval_step(step: str, outcome: str) -> None:
+        """
+        Record a data retrieval lookup
+        
+        Args:
+            step: Retrieved data key (tasks, bug_statistics, ...)
+            outcome: Lookup outcome (ok, timeout, error)
+        """
+        try:
+            chat_retrieval_steps_total.labels(step=step, outcome=outcome).inc()
+        except Exception as e:
+            logger.warning(f"Failed to record retrieval step metric: {e}")
+    
     @staticmethod
     @contextmanager
     def track_llm_call_duration():
@@ -124,6 +330,33 @@ class ChatMetrics:
             except Exception as e:
                 logger.warning(f"Failed to record LLM duration: {e}")
     
+    @staticmethod
+    def record_prompt_tokens(section: str, tokens: int) -> None:
+        """
+        Record the size of an LLM prompt section
+        
+        Args:
+            section: Prompt section (system, history, data, total)
+            tokens: Tokens in the section
+        """
+        try:
+            chat_prompt_tokens.labels(section=section).observe(tokens)
+        except Exception as e:
+            logger.warning(f"Failed to record prompt size metric: {e}")
+    
+    @staticmethod
+    def record_prompt_compressed(section: str) -> None:
+        """
+        Record a prompt section cut to fit the token budget
+        
+        Args:
+            section: Prompt section (history, data)
+        """
+        try:
+            chat_prompt_compressed_total.labels(section=section).inc()
+        except Exception as e:
+            logger.warning(f"Failed to record prompt compression metric: {e}")
+    
     @staticmethod
     def record_error(error_type: str) -> None:
         """
@@ -153,6 +386,19 @@ class ChatMetrics:
         except Exception as e:
             logger.warning(f"Failed to record rate limit metric: {e}")
     
+    @staticmethod
+    def record_rate_limit_check(source: str) -> None:
+        """
+        Record an admitted rate limit check
+        
+        Args:
+            source: Where it was decided (redis, local)
+        """
+        try:
+            chat_rate_limit_checks_total.labels(source=source).inc()
+        except Exception as e:
+            logger.warning(f"Failed to record rate limit check metric: {e}")
+    
     @staticmethod
     def set_active_sessions(count: int) -> None:
         """
@@ -13,9 +13,11 @@ It implements the end-to-end query processing flow with error handling
 and response formatting.
 """
 
+import asyncio
 import logging
 import uuid
-from typing import Optional, Dict, Any, List
+from functools import partial
+from typing import Optional, Dict, Any, List, Set, Tuple, AsyncIterator
 from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -37,6 +39,8 @@ from app.services.llm_service import get_llm_service
 from app.services.action_handler import get_action_handler, ActionExecutionError
 from app.services.audit_service import get_audit_service
 from app.services.chat_metrics import get_chat_metrics
+from app.services.chat_cache import get_chat_response_cache
+from app.services.retrieval_planner import get_retrieval_planner
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -54,6 +58,12 @@ class ChatService:
         self.action_handler = get_action_handler()
         self.audit_service = get_audit_service()
         self.metrics = get_chat_metrics()
+        self.response_cache = get_chat_response_cache()
+        self.retrieval_planner = get_retrieval_planner()
+        
+        # Post-response bookkeeping: latest task per session, and all pending
+        self._bookkeeping: Dict[str, asyncio.Task] = {}
+        self._pending_bookkeeping: Set[asyncio.Task] = set()
         
         # Set LLM service for intent classifier fallback
         self.intent_classifier.set_llm_service(self.llm_service)
@@ -63,6 +73,7 @@ class ChatService:
         try:
             await self.session_service.connect()
             await self.llm_service.connect()
+            await self.audit_service.start_writer(self.session_service.redis_client)
             logger.info("Chat service initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize chat service: {e}")
@@ -101,159 +112,292 @@ class ChatService:
         # Track request duration
         with self.metrics.track_request_duration():
             try:
-                # Step 1: Get or create session
-                session = await self._get_or_create_session(
-                    user, request.session_id, request.context
-                )
-                
-                # Step 2: Classify intent and extract entities
-                intent = await self.intent_classifier.classify_with_llm_fallback(
-                    request.query,
-                    context={
-                        'last_intent': session.last_intent,
-                        'mentioned_entities': [
-                            {'type': e.entity_type.value, 'id': e.entity_id}
-                            for e in session.mentioned_entities
-                        ]
-                    }
-                )
-                
-                logger.debug(
-                    f"Intent classified: type={intent.intent_type.value}, "
-                    f"confidence={intent.confidence:.2f}, entities={len(intent.entities)}"
-                )
+                # Steps 1-2: Get or create session and classify intent
+                session, history, intent = await self._start_turn(user, request)
                 
                 # Step 3: Handle based on intent type
-                if intent.intent_type == IntentType.ACTION:
-                    response = await self._handle_action_intent(
-                        db, user, request, intent, request_id
-                    )
-                elif intent.intent_type == IntentType.NAVIGATION:
-                    response = await self._handle_navigation_intent(
-                        db, user, request, intent, request_id
-                    )
-                elif intent.intent_type == IntentType.CLARIFICATION:
-                    response = await self._handle_clarification_intent(
-                        db, user, request, intent, session, request_id
-                    )
-                else:
-                    # QUERY or REPORT intent
-                    response = await self._handle_query_intent(
-                        db, user, request, intent, session, request_id
-                    )
-                
-                # Step 4: Update session with new context
-                await self._update_session_context(
-                    session.session_id,
-                    intent,
-                    response
+                response = await self._handle_intent(
+                    db, user, request, intent, session, history, request_id
                 )
                 
-                # Step 5: Store message in conversation history
-                await self._store_message(session.session_id, user, request.query, response)
-                
-                # Step 6: Create audit log
-                await self._create_audit_log(
-                    user,
-                    session.session_id,
-                    request.query,
-                    intent,
-                    response,
-                    request_id,
-                    ip_address,
-                    user_agent
-                )
-                
-                # Calculate processing time
-                duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
-                
-                # Record successful request metric
-                self.metrics.record_request(
-                    intent_type=intent.intent_type.value,
-                    status="success"
-                )
-                
-                logger.info(
-                    f"Query processed successfully: request_id={request_id}, "
-                    f"duration_ms={duration_ms}, intent={intent.intent_type.value}"
+                # Steps 4-5: Audit, then store the turn after responding
+                await self._finish_turn(
+                    user, session, request, intent, response,
+                    request_id, ip_address, user_agent, start_time
                 )
                 
                 return response
             
-            except ActionExecutionError as e:
-                # Handle action execution errors
-                logger.warning(f"Action execution error: {e.message}")
-                
-                # Record error metric
-                self.metrics.record_error("action_failed")
-                self.metrics.record_request(
-                    intent_type="action",
-                    status="error"
+            except Exception as e:
+                return await self._failure_response(
+                    e, user, request, request_id, ip_address, user_agent
                 )
+    
+    async def stream_query(
+        self,
+        db: AsyncSession,
+        user: User,
+        request: ChatRequest,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Process a chat query, yielding each stage's output as soon as it is ready
+        
+        Events, in order:
+        - intent: the classified intent
+        - data: retrieved data with entity cards and table (QUERY/REPORT only)
+        - token: LLM text chunks as they arrive (QUERY/REPORT only)
+        - response: the final ChatResponse, as process_query would return it
+        
+        If the consumer stops iterating (the client disconnected), the
+        upstream LLM stream is closed and the turn is not stored.
+        
+        Args:
+            db: Database session
+            user: Current user
+            request: Chat request with query and session_id
+            ip_address: Client IP address
+            user_agent: Client user agent
+            
+        Yields:
+            Tuples of (event, payload)
+        """
+        request_id = f"req_{uuid.uuid4().hex[:16]}"
+        start_time = datetime.utcnow()
+        
+        logger.info(
+            f"Streaming chat query: request_id={request_id}, "
+            f"user_id={user.id}, session_id={request.session_id}"
+        )
+        
+        with self.metrics.track_request_duration():
+            try:
+                session, history, intent = await self._start_turn(user, request)
+                
+                yield "intent", {
+                    "request_id": request_id,
+                    "intent_type": intent.intent_type.value,
+                    "confidence": intent.confidence,
+                    "entities_found": len(intent.entities)
+                }
                 
-                error_response = ChatResponse(
-                    status="error",
-                    message=e.message,
-                    data={},
-                    actions=[],
-                    metadata={
-                        "request_id": request_id,
-                        "error_code": "ACTION_FAILED",
-                        "timestamp": datetime.utcnow().isoformat()
+                cache_key, response = await self.response_cache.lookup(user, intent, request_id)
+                
+                if response is not None:
+                    # Same events as a fresh answer, the text in one chunk
+                    yield "data", {
+                        "data": response.data,
+                        **self.llm_service.extract_data_views(response.data or {})
                     }
-                )
+                    yield "token", {"text": response.message}
+                elif intent.intent_type in (IntentType.QUERY, IntentType.REPORT):
+                    retrieved_data = await self._retrieve_data(db, user, intent)
+                    
+                    yield "data", {
+                        "data": retrieved_data,
+                        **self.llm_service.extract_data_views(retrieved_data)
+                    }
+                    
+                    parts = []
+                    async for text in self.llm_service.stream_response(
+                        query=request.query,
+                        retrieved_data=retrieved_data,
+                        intent_type=intent.intent_type,
+                        conversation_context=self._conversation_context(
+                            history, settings.CHAT_MAX_CONTEXT_MESSAGES
+                        )
+                    ):
+                        parts.append(text)
+                        yield "token", {"text": text}
+                    
+                    response_text = "".join(parts)
+                    tokens_used = self.llm_service.count_tokens(response_text)
+                    response = self._build_query_response(
+                        request_id, intent, retrieved_data, response_text, tokens_used
+                    )
+                    await self.response_cache.store(cache_key, response, tokens_used)
+                else:
+                    response = await self._handle_intent(
+                        db, user, request, intent, session, history, request_id
+                    )
                 
-                # Still audit the failed action
-                await self._create_audit_log(
-                    user,
-                    request.session_id,
-                    request.query,
-                    None,
-                    error_response,
-                    request_id,
-                    ip_address,
-                    user_agent,
-                    action_result=e.result
+                await self._finish_turn(
+                    user, session, request, intent, response,
+                    request_id, ip_address, user_agent, start_time
                 )
-                
-                return error_response
             
             except Exception as e:
-                logger.error(f"Error processing query: {e}", exc_info=True)
-                
-                # Record error metric
-                self.metrics.record_error("internal")
-                self.metrics.record_request(
-                    intent_type="unknown",
-                    status="error"
-                )
-                
-                error_response = ChatResponse(
-                    status="error",
-                    message="I encountered an error processing your request. Please try again.",
-                    data={},
-                    actions=[],
-                    metadata={
-                        "request_id": request_id,
-                        "error_code": "INTERNAL_ERROR",
-                        "timestamp": datetime.utcnow().isoformat()
-                    }
-                )
-                
-                # Audit the error
-                await self._create_audit_log(
-                    user,
-                    request.session_id,
-                    request.query,
-                    None,
-                    error_response,
-                    request_id,
-                    ip_address,
-                    user_agent,
-                    action_result=ActionResult.FAILED
+                response = await self._failure_response(
+                    e, user, request, request_id, ip_address, user_agent
                 )
-                
-                return error_response
+            
+            yield "response", response.model_dump(mode="json")
+    
+    async def _start_turn(self, user: User, request: ChatRequest):
+        """Load the session with recent history and classify the query"""
+        session, history = await self._get_or_create_session(
+            user, request.session_id, request.context
+        )
+        
+        intent = await self.intent_classifier.classify_with_llm_fallback(
+            request.query,
+            context={
+                'last_intent': session.last_intent,
+                'mentioned_entities': [
+                    {'type': e.entity_type.value, 'id': e.entity_id}
+                    for e in session.mentioned_entities
+                ]
+            }
+        )
+        
+        logger.debug(
+            f"Intent classified: type={intent.intent_type.value}, "
+            f"confidence={intent.confidence:.2f}, entities={len(intent.entities)}"
+        )
+        
+        return session, history, intent
+    
+    async def _handle_intent(
+        self,
+        db: AsyncSession,
+        user: User,
+        request: ChatRequest,
+        intent,
+        session,
+        history: List[ChatMessageResponse],
+        request_id: str
+    ) -> ChatResponse:
+        """Dispatch to the handler for the intent type"""
+        if intent.intent_type == IntentType.ACTION:
+            return await self._handle_action_intent(
+                db, user, request, intent, request_id
+            )
+        if intent.intent_type == IntentType.NAVIGATION:
+            return await self._handle_navigation_intent(
+                db, user, request, intent, request_id
+            )
+        if intent.intent_type == IntentType.CLARIFICATION:
+            return await self._handle_clarification_intent(
+                db, user, request, intent, session, history, request_id
+            )
+        # QUERY or REPORT intent
+        return await self._handle_query_intent(
+            db, user, request, intent, session, history, request_id
+        )
+    
+    async def _finish_turn(
+        self,
+        user: User,
+        session,
+        request: ChatRequest,
+        intent,
+        response: ChatResponse,
+        request_id: str,
+        ip_address: Optional[str],
+        user_agent: Optional[str],
+        start_time: datetime
+    ) -> None:
+        """Audit a successful turn and schedule storing it"""
+        # Hand the audit log to the durable queue
+        await self._create_audit_log(
+            user,
+            session.session_id,
+            request.query,
+            intent,
+            response,
+            request_id,
+            ip_address,
+            user_agent
+        )
+        
+        # Update session context and store messages after responding
+        await self._schedule_bookkeeping(
+            session,
+            user.id,
+            request.query,
+            intent,
+            response
+        )
+        
+        # Calculate processing time
+        duration_ms = int((datetime.utcnow() - start_time).total_seconds() * 1000)
+        
+        # Record successful request metric
+        self.metrics.record_request(
+            intent_type=intent.intent_type.value,
+            status="success"
+        )
+        
+        logger.info(
+            f"Query processed successfully: request_id={request_id}, "
+            f"duration_ms={duration_ms}, intent={intent.intent_type.value}"
+        )
+    
+    async def _failure_response(
+        self,
+        error: Exception,
+        user: User,
+        request: ChatRequest,
+        request_id: str,
+        ip_address: Optional[str],
+        user_agent: Optional[str]
+    ) -> ChatResponse:
+        """Build and audit the error response for a failed turn"""
+        if isinstance(error, ActionExecutionError):
+            # Handle action execution errors
+            logger.warning(f"Action execution error: {error.message}")
+            
+            # Record error metric
+            self.metrics.record_error("action_failed")
+            self.metrics.record_request(
+                intent_type="action",
+                status="error"
+            )
+            
+            message = error.message
+            error_code = "ACTION_FAILED"
+            action_result = error.result
+        else:
+            logger.error(f"Error processing query: {error}", exc_info=error)
+            
+            # Record error metric
+            self.metrics.record_error("internal")
+            self.metrics.record_request(
+                intent_type="unknown",
+                status="error"
+            )
+            
+            message = "I encountered an error processing your request. Please try again."
+            error_code = "INTERNAL_ERROR"
+            action_result = ActionResult.FAILED
+        
+        error_response = ChatResponse(
+            status="error",
+            message=message,
+            data={},
+            actions=[],
+            metadata={
+                "request_id": request_id,
+                "error_code": error_code,
+                "timestamp": datetime.utcnow().isoformat()
+            }
+        )
+        
+        # Still audit the failed request
+        await self._create_audit_log(
+            user,
+            request.session_id,
+            request.query,
+            None,
+            error_response,
+            request_id,
+            ip_address,
+            user_agent,
+            action_result=action_result
+        )
+        
+        return error_response
     
     async def _get_or_create_session(
         self,
@@ -261,8 +405,19 @@ class ChatService:
         session_id: str,
         context: Optional[Dict[str, Any]] = None
     ):
-        """Get existing session or create new one"""
-        session = await self.session_service.get_session(session_id)
+        """
+        Get existing session or create new one
+        
+        Returns the session and its recent conversation history, loaded
+        (and the session's TTL extended) in one Redis round trip.
+        """
+        # The previous turn's context and messages must be stored first
+        await self._wait_for_bookkeeping(session_id)
+        
+        session, history = await self.session_service.get_session_with_history(
+            session_id,
+            limit=settings.CHAT_MAX_CONTEXT_MESSAGES
+        )
         
         if not session:
             # Create new session
@@ -274,11 +429,8 @@ class ChatService:
                 current_project=current_project
             )
             logger.info(f"Created new session: {session_id}")
-        else:
-            # Extend TTL for existing session
-            await self.session_service.extend_session_ttl(session_id)
         
-        return session
+        return session, history
     
     async def _handle_query_intent(
         self,
@@ -287,39 +439,62 @@ class ChatService:
         request: ChatRequest,
         intent,
         session,
+        history: List[ChatMessageResponse],
         request_id: str
     ) -> ChatResponse:
         """Handle QUERY or REPORT intent"""
+        # Repeated questions about unchanged data are answered from cache
+        cache_key, cached = await self.response_cache.lookup(user, intent, request_id)
+        if cached is not None:
+            return cached
+        
         # Step 1: Retrieve data based on intent and entities
         retrieved_data = await self._retrieve_data(db, user, intent)
         
         logger.debug(f"Retrieved data keys: {list(retrieved_data.keys())}")
         
         # Step 2: Generate LLM response
-        conversation_history = await self.session_service.get_conversation_history(
-            session.session_id,
-            limit=3
-        )
-        
-        conversation_context = [
-            {"role": msg.role, "content": msg.content}
-            for msg in conversation_history
-        ]
-        
         response_text, tokens_used = await self.llm_service.generate_response(
             query=request.query,
             retrieved_data=retrieved_data,
             intent_type=intent.intent_type,
-            conversation_context=conversation_context
+            conversation_context=self._conversation_context(
+                history, settings.CHAT_MAX_CONTEXT_MESSAGES
+            )
         )
         
-        # Step 3: Parse structured output
+        # Step 3: Parse structured output and build response
+        response = self._build_query_response(
+            request_id, intent, retrieved_data, response_text, tokens_used
+        )
+        await self.response_cache.store(cache_key, response, tokens_used)
+        return response
+    
+    def _conversation_context(
+        self,
+        history: List[ChatMessageResponse],
+        limit: int
+    ) -> List[Dict[str, str]]:
+        """Format the last messages of the history for the LLM"""
+        return [
+            {"role": msg.role, "content": msg.content}
+            for msg in history[-limit:]
+        ]
+    
+    def _build_query_response(
+        self,
+        request_id: str,
+        intent,
+        retrieved_data: Dict[str, Any],
+        response_text: str,
+        tokens_used: int
+    ) -> ChatResponse:
+        """Build the QUERY/REPORT response from the data and LLM text"""
         structured_output = self.llm_service.parse_structured_output(
             response_text,
             retrieved_data
         )
         
-        # Step 4: Build response
         return ChatResponse(
             status="success",
             message=structured_output.get("text", response_text),
@@ -468,14 +643,12 @@ class ChatService:
         request: ChatRequest,
         intent,
         session,
+        history: List[ChatMessageResponse],
         request_id: str
     ) -> ChatResponse:
         """Handle CLARIFICATION intent"""
         # Get recent conversation history
-        conversation_history = await self.session_service.get_conversation_history(
-            session.session_id,
-            limit=5
-        )
+        conversation_history = history[-5:]
         
         if not conversation_history:
             return ChatResponse(
@@ -523,100 +696,18 @@ class ChatService:
         user: User,
         intent
     ) -> Dict[str, Any]:
-        """Retrieve data based on intent and entities"""
+        """
+        Retrieve data based on intent and entities
+        
+        The lookups run concurrently on their own pooled sessions within the
+        retrieval budget, not on the request session db.
+        """
         retrieved_data = {}
         
         try:
-            # Resolve entities to database objects
-            if intent.entities:
-                resolved = await self.data_retriever.resolve_entities(
-                    db, user, intent.entities
-                )
-                
-                # Convert resolved entities to serializable format
-                for key, entities in resolved.items():
-                    retrieved_data[key] = [
-                        self._serialize_entity(entity) for entity in entities
-                    ]
-            
-            # Handle REPORT intent - get aggregate data
-            if intent.intent_type == IntentType.REPORT:
-                # Determine what kind of report
-                query_lower = intent.normalized_query.lower()
-                
-                if any(word in query_lower for word in ['task', 'tasks']):
-                    stats = await self.data_retriever.get_task_statistics(
-                        db, user,
-                        start_date=intent.temporal_context.get('start_date'),
-                        end_date=intent.temporal_context.get('end_date')
-                    )
-                    retrieved_data['task_statistics'] = stats
-                
-                elif any(word in query_lower for word in ['bug', 'bugs']):
-                    stats = await self.data_retriever.get_bug_statistics(
-                        db, user,
-                        start_date=intent.temporal_context.get('start_date'),
-                        end_date=intent.temporal_context.get('end_date')
-                    )
-                    retrieved_data['bug_statistics'] = stats
-                
-                elif any(word in query_lower for word in ['project', 'projects']):
-                    stats = await self.data_retriever.get_project_statistics(db, user)
-                    retrieved_data['project_statistics'] = stats
-                
-                elif any(word in query_lower for word in ['workload', 'assigned', 'my']):
-                    stats = await self.data_retriever.get_user_workload(db, user)
-                    retrieved_data['user_workload'] = stats
-            
-            # Handle QUERY intent - get filtered data
-            elif intent.intent_type == IntentType.QUERY:
-                # Apply temporal filters if present
-                filters = {}
-                if intent.temporal_context:
-                    if 'status_filter' in intent.temporal_context:
-                        filters['status'] = intent.temporal_context['status_filter']
-                    if 'priority_filter' in intent.temporal_context:
-                        filters['priority'] = intent.temporal_context['priority_filter']
-                    if 'start_date' in intent.temporal_context:
-                        filters['start_date'] = intent.temporal_context['start_date']
-                    if 'end_date' in intent.temporal_context:
-                        filters['end_date'] = intent.temporal_context['end_date']
-                
-                # Determine what to query based on keywords
-                query_lower = intent.normalized_query.lower()
-                
-                if any(word in query_lower for word in ['task', 'tasks']):
-                    tasks = await self.data_retriever.get_tasks_by_filters(
-                        db, user, **filters
-                    )
-                    retrieved_data['tasks'] = [
-                        self._serialize_entity(task) for task in tasks
-                    ]
-                
-                elif any(word in query_lower for word in ['bug', 'bugs', 'issue', 'issues']):
-                    bugs = await self.data_retriever.get_bugs_by_filters(
-                        db, user, **filters
-                    )
-                    retrieved_data['bugs'] = [
-                        self._serialize_entity(bug) for bug in bugs
-                    ]
-                
-                elif any(word in query_lower for word in ['project', 'projects']):
-                    projects = await self.data_retriever.get_projects_by_filters(
-                        db, user, **filters
-                    )
-                    retrieved_data['projects'] = [
-                        self._serialize_entity(project) for project in projects
-                    ]
-                
-                elif any(word in query_lower for word in ['story', 'stories', 'user story']):
-                    stories = await self.data_retriever.get_user_stories_by_filters(
-                        db, user, **filters
-                    )
-                    retrieved_data['user_stories'] = [
-                        self._serialize_entity(story) for story in stories
-                    ]
-            
+            retrieved_data = await self.retrieval_planner.retrieve(
+                user, intent, self._serialize_entity
+            )
             logger.debug(f"Retrieved data: {len(retrieved_data)} categories")
             
         except Exception as e:
@@ -667,7 +758,7 @@ class ChatService:
     
     async def _update_session_context(
         self,
-        session_id: str,
+        session,
         intent,
         response: ChatResponse
     ) -> None:
@@ -687,9 +778,10 @@ class ChatService:
             
             # Update session
             await self.session_service.update_session(
-                session_id=session_id,
+                session_id=session.session_id,
                 last_intent=intent.intent_type,
-                new_entities=new_entities if new_entities else None
+                new_entities=new_entities if new_entities else None,
+                session_context=session
             )
             
         except Exception as e:
@@ -698,43 +790,122 @@ class ChatService:
     async def _store_message(
         self,
         session_id: str,
-        user: User,
+        user_id: str,
         query: str,
         response: ChatResponse
     ) -> None:
-        """Store message in conversation history"""
+        """Store the user and assistant messages in conversation history"""
         try:
-            # Store user message
+            # User message
             user_message = ChatMessageResponse(
                 id=f"msg_{uuid.uuid4().hex[:16]}",
                 session_id=session_id,
+                user_id=user_id,
                 role="user",
                 content=query,
                 intent_type=None,
-                entities=[],
+                entities={},
                 actions=[],
                 created_at=datetime.utcnow()
             )
             
-            await self.session_service.store_message(session_id, user_message)
-            
-            # Store assistant message
+            # Assistant message
             assistant_message = ChatMessageResponse(
                 id=f"msg_{uuid.uuid4().hex[:16]}",
                 session_id=session_id,
+                user_id=user_id,
                 role="assistant",
                 content=response.message,
-                intent_type=response.metadata.get('intent_type'),
-                entities=[],
-                actions=response.actions,
+                intent_type=response.metadata.intent_type if response.metadata else None,
+                entities={},
+                actions=[action.model_dump(mode='json') for action in response.actions or []],
                 created_at=datetime.utcnow()
             )
             
-            await self.session_service.store_message(session_id, assistant_message)
-            
+            # Both messages in one transaction
+            await self.session_service.store_messages(
+                session_id, [user_message, assistant_message]
+            )
+        
         except Exception as e:
             logger.warning(f"Failed to store message: {e}")
     
+    async def _schedule_bookkeeping(
+        self,
+        session,
+        user_id: str,
+        query: str,
+        intent,
+        response: ChatResponse
+    ) -> None:
+        """
+        Update session context and store messages without holding the response
+        
+        Runs in the background, chained after any earlier run for the same
+        session so turns are stored in order. Once
+        CHAT_BOOKKEEPING_MAX_PENDING runs are pending it runs inline
+        instead, so a slow Redis slows requests down rather than piling up
+        tasks.
+        """
+        session_id = session.session_id
+        run = self._run_bookkeeping(
+            self._bookkeeping.get(session_id), session, user_id, query, intent, response
+        )
+        
+        if len(self._pending_bookkeeping) >= settings.CHAT_BOOKKEEPING_MAX_PENDING:
+            self.metrics.record_bookkeeping_inline()
+            await run
+            return
+        
+        task = asyncio.create_task(run)
+        self._bookkeeping[session_id] = task
+        self._pending_bookkeeping.add(task)
+        self.metrics.set_bookkeeping_pending(len(self._pending_bookkeeping))
+        task.add_done_callback(partial(self._bookkeeping_done, session_id))
+    
+    async def _run_bookkeeping(
+        self,
+        previous: Optional[asyncio.Task],
+        session,
+        user_id: str,
+        query: str,
+        intent,
+        response: ChatResponse
+    ) -> None:
+        """Run the session update and message store concurrently"""
+        if previous is not None:
+            await asyncio.wait([previous])
+        
+        with self.metrics.track_bookkeeping_duration():
+            await asyncio.gather(
+                self._update_session_context(session, intent, response),
+                self._store_message(session.session_id, user_id, query, response)
+            )
+    
+    def _bookkeeping_done(self, session_id: str, task: asyncio.Task) -> None:
+        """Forget a finished bookkeeping task"""
+        self._pending_bookkeeping.discard(task)
+        if self._bookkeeping.get(session_id) is task:
+            del self._bookkeeping[session_id]
+        self.metrics.set_bookkeeping_pending(len(self._pending_bookkeeping))
+    
+    async def _wait_for_bookkeeping(self, session_id: str) -> None:
+        """Wait until pending bookkeeping for a session has finished"""
+        pending = self._bookkeeping.get(session_id)
+        if pending is not None:
+            await asyncio.wait([pending])
+    
+    async def drain(self, timeout: float = 10.0) -> None:
+        """
+        Finish pending bookkeeping and stop the audit writer
+        
+        Args:
+            timeout: Seconds to wait for pending bookkeeping
+        """
+        if self._pending_bookkeeping:
+            await asyncio.wait(set(self._pending_bookkeeping), timeout=timeout)
+        await self.audit_service.stop_writer()
+    
     async def _create_audit_log(
         self,
         user: User,
@@ -747,7 +918,7 @@ class ChatService:
         user_agent: Optional[str],
         action_result: Optional[ActionResult] = None
     ) -> None:
-        """Create audit log entry"""
+        """Build the audit log entry and hand it to the audit queue"""
         try:
             # Extract entities accessed
             entities_accessed = []
@@ -758,9 +929,8 @@ class ChatService:
                 ]
             
             # Determine action performed
-            action_performed = None
-            if response.metadata.get('action_type'):
-                action_performed = response.metadata['action_type']
+            # (ChatMetadata drops action_type; the action result carries it)
+            action_performed = (response.data or {}).get('action')
             
             # Determine action result
             if action_result is None:
@@ -785,16 +955,15 @@ class ChatService:
                 user_agent=user_agent
             )
             
-            # Use batch logging if enabled
-            use_batch = settings.CHAT_ENABLE_AUDIT_LOGGING
+            if not settings.CHAT_ENABLE_AUDIT_LOGGING:
+                return
             
-            # Note: We need a database session here, but for now we'll skip
-            # actual creation since we don't have db in this context
-            # This would be handled by the endpoint layer
-            logger.debug(f"Audit log prepared: {request_id}")
+            await self.audit_service.enqueue(audit_data)
+            logger.debug(f"Audit log queued: {request_id}")
             
         except Exception as e:
-            logger.error(f"Failed to create audit log: {e}")
+            self.metrics.record_audit_event("failed")
+            logger.error(f"Failed to create audit log: {request_id}: {e}")
     
     async def get_conversation_history(
         self,
@@ -812,6 +981,7 @@ class ChatService:
             List of chat messages
         """
         try:
+            await self._wait_for_bookkeeping(session_id)
             messages = await self.session_service.get_conversation_history(
                 session_id,
                 limit=limit
@@ -832,6 +1002,8 @@ class ChatService:
             True if deleted successfully
         """
         try:
+            # A pending store would recreate the history after the delete
+            await self._wait_for_bookkeeping(session_id)
             return await self.session_service.delete_session(session_id)
         except Exception as e:
             logger.error(f"Failed to delete session: {e}")
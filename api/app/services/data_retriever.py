@@ -13,7 +13,7 @@ import logging
 from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, date
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, and_, or_, case
+from sqlalchemy import select, func, and_, or_, case, tuple_
 from sqlalchemy.orm import selectinload, joinedload
 
 from app.models.hierarchy import (
@@ -23,6 +23,7 @@ from app.models.bug import Bug
 from app.models.user import User
 from app.models.client import Client
 from app.schemas.chat import EntityType, ExtractedEntity
+from app.services.hierarchy_rollup_service import HierarchyRollupService
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +31,14 @@ logger = logging.getLogger(__name__)
 class DataRetriever:
     """Service for retrieving data with RBAC enforcement"""
     
+    # Key each resolvable entity type is collected under
+    RESOLVED_KEYS = {
+        EntityType.PROJECT: 'projects',
+        EntityType.TASK: 'tasks',
+        EntityType.BUG: 'bugs',
+        EntityType.USER_STORY: 'user_stories',
+    }
+    
     def __init__(self):
         """Initialize the data retriever"""
         pass
@@ -596,39 +605,65 @@ class DataRetriever:
         resolved = {}
         
         for entity in entities:
-            if entity.entity_id:
-                # Resolve by ID
-                if entity.entity_type == EntityType.PROJECT:
-                    obj = await self.get_project_by_id(db, user, entity.entity_id)
-                    if obj:
-                        resolved.setdefault('projects', []).append(obj)
-                
-                elif entity.entity_type == EntityType.TASK:
-                    obj = await self.get_task_by_id(db, user, entity.entity_id)
-                    if obj:
-                        resolved.setdefault('tasks', []).append(obj)
-                
-                elif entity.entity_type == EntityType.BUG:
-                    obj = await self.get_bug_by_id(db, user, entity.entity_id)
-                    if obj:
-                        resolved.setdefault('bugs', []).append(obj)
-                
-                elif entity.entity_type == EntityType.USER_STORY:
-                    obj = await self.get_user_story_by_id(db, user, entity.entity_id)
-                    if obj:
-                        resolved.setdefault('user_stories', []).append(obj)
-            
-            elif entity.entity_name:
-                # Resolve by name (search)
-                if entity.entity_type == EntityType.PROJECT:
-                    objs = await self.get_projects_by_filters(
-                        db, user, name_search=entity.entity_name, limit=5
-                    )
-                    if objs:
-                        resolved.setdefault('projects', []).extend(objs)
+            objs = await self.resolve_entity(db, user, entity)
+            if objs:
+                resolved.setdefault(self.RESOLVED_KEYS[entity.entity_type], []).extend(objs)
         
         return resolved
     
+    def can_resolve(self, entity: ExtractedEntity) -> bool:
+        """
+        Check whether resolve_entity can look up an extracted entity
+        
+        Args:
+            entity: Extracted entity
+            
+        Returns:
+            True for entity IDs of RESOLVED_KEYS types and project names
+        """
+        if entity.entity_id:
+            return entity.entity_type in self.RESOLVED_KEYS
+        return bool(entity.entity_name) and entity.entity_type == EntityType.PROJECT
+    
+    async def resolve_entity(
+        self,
+        db: AsyncSession,
+        user: User,
+        entity: ExtractedEntity
+    ) -> List[Any]:
+        """
+        Resolve one extracted entity to database objects
+        
+        Args:
+            db: Database session
+            user: Current user
+            entity: Extracted entity from query
+            
+        Returns:
+            Accessible matching objects, collected under
+            RESOLVED_KEYS[entity.entity_type]
+        """
+        if not self.can_resolve(entity):
+            return []
+        
+        if not entity.entity_id:
+            # Resolve by name (search)
+            return await self.get_projects_by_filters(
+                db, user, name_search=entity.entity_name, limit=5
+            )
+        
+        # Resolve by ID
+        if entity.entity_type == EntityType.PROJECT:
+            obj = await self.get_project_by_id(db, user, entity.entity_id)
+        elif entity.entity_type == EntityType.TASK:
+            obj = await self.get_task_by_id(db, user, entity.entity_id)
+        elif entity.entity_type == EntityType.BUG:
+            obj = await self.get_bug_by_id(db, user, entity.entity_id)
+        else:
+            obj = await self.get_user_story_by_id(db, user, entity.entity_id)
+        
+        return [obj] if obj else []
+    
     # ========================================================================
     # Aggregate Queries for Reports
     # ========================================================================
@@ -654,9 +689,15 @@ class DataRetriever:
         Returns:
             Dictionary with task statistics
         """
-        # Build base query with client filtering
-        base_query = (
-            select(Task)
+        # One scan answers every breakdown: GROUPING(status, priority) is
+        # 1 for rows grouped by status, 2 by priority and 3 for the total
+        query = (
+            select(
+                Task.status,
+                Task.priority,
+                func.grouping(Task.status, Task.priority),
+                func.count(Task.id)
+            )
             .join(UserStory)
             .join(Usecase)
             .join(Project)
@@ -669,48 +710,33 @@ class DataRetriever:
                 Project.is_deleted == False,
                 Program.is_deleted == False
             )
+            .group_by(func.grouping_sets(
+                tuple_(Task.status), tuple_(Task.priority), tuple_()
+            ))
         )
         
         # Apply filters
         if project_id:
-            base_query = base_query.where(Project.id == project_id)
+            query = query.where(Project.id == project_id)
         
         if start_date:
-            base_query = base_query.where(Task.created_at >= start_date)
+            query = query.where(Task.created_at >= start_date)
         
         if end_date:
-            base_query = base_query.where(Task.created_at <= end_date)
-        
-        # Count by status
-        status_query = (
-            select(
-                Task.status,
-                func.count(Task.id).label('count')
-            )
-            .select_from(base_query.subquery())
-            .group_by(Task.status)
-        )
+            query = query.where(Task.created_at <= end_date)
         
-        result = await db.execute(status_query)
-        status_counts = {row[0]: row[1] for row in result.all()}
-        
-        # Count by priority
-        priority_query = (
-            select(
-                Task.priority,
-                func.count(Task.id).label('count')
-            )
-            .select_from(base_query.subquery())
-            .group_by(Task.priority)
-        )
-        
-        result = await db.execute(priority_query)
-        priority_counts = {row[0]: row[1] for row in result.all()}
+        result = await db.execute(query)
         
-        # Total count
-        total_query = select(func.count()).select_from(base_query.subquery())
-        result = await db.execute(total_query)
-        total_count = result.scalar()
+        status_counts = {}
+        priority_counts = {}
+        total_count = 0
+        for status, priority, grouping, count in result.all():
+            if grouping == 1:
+                status_counts[status] = count
+            elif grouping == 2:
+                priority_counts[priority] = count
+            else:
+                total_count = count
         
         return {
             'total_tasks': total_count,
@@ -739,13 +765,24 @@ class DataRetriever:
         Returns:
             Dictionary with bug statistics
         """
-        # Build base query with client filtering
+        # One scan answers every breakdown: GROUPING(status, severity,
+        # priority) is 3 for rows grouped by status, 5 by severity, 6 by
+        # priority and 7 for the total
         query = (
-            select(Bug)
+            select(
+                Bug.status,
+                Bug.severity,
+                Bug.priority,
+                func.grouping(Bug.status, Bug.severity, Bug.priority),
+                func.count(Bug.id)
+            )
             .where(
                 Bug.client_id == user.client_id,
                 Bug.is_deleted == False
             )
+            .group_by(func.grouping_sets(
+                tuple_(Bug.status), tuple_(Bug.severity), tuple_(Bug.priority), tuple_()
+            ))
         )
         
         # Apply filters
@@ -758,93 +795,21 @@ class DataRetriever:
         if end_date:
             query = query.where(Bug.created_at <= end_date)
         
-        # Count by status
-        status_query = (
-            select(
-                Bug.status,
-                func.count(Bug.id).label('count')
-            )
-            .where(
-                Bug.client_id == user.client_id,
-                Bug.is_deleted == False
-            )
-            .group_by(Bug.status)
-        )
-        
-        if project_id:
-            status_query = status_query.where(Bug.project_id == project_id)
-        if start_date:
-            status_query = status_query.where(Bug.created_at >= start_date)
-        if end_date:
-            status_query = status_query.where(Bug.created_at <= end_date)
-        
-        result = await db.execute(status_query)
-        status_counts = {row[0]: row[1] for row in result.all()}
-        
-        # Count by severity
-        severity_query = (
-            select(
-                Bug.severity,
-                func.count(Bug.id).label('count')
-            )
-            .where(
-                Bug.client_id == user.client_id,
-                Bug.is_deleted == False
-            )
-            .group_by(Bug.severity)
-        )
-        
-        if project_id:
-            severity_query = severity_query.where(Bug.project_id == project_id)
-        if start_date:
-            severity_query = severity_query.where(Bug.created_at >= start_date)
-        if end_date:
-            severity_query = severity_query.where(Bug.created_at <= end_date)
-        
-        result = await db.execute(severity_query)
-        severity_counts = {row[0]: row[1] for row in result.all()}
-        
-        # Count by priority
-        priority_query = (
-            select(
-                Bug.priority,
-                func.count(Bug.id).label('count')
-            )
-            .where(
-                Bug.client_id == user.client_id,
-                Bug.is_deleted == False
-            )
-            .group_by(Bug.priority)
-        )
-        
-        if project_id:
-            priority_query = priority_query.where(Bug.project_id == project_id)
-        if start_date:
-            priority_query = priority_query.where(Bug.created_at >= start_date)
-        if end_date:
-            priority_query = priority_query.where(Bug.created_at <= end_date)
-        
-        result = await db.execute(priority_query)
-        priority_counts = {row[0]: row[1] for row in result.all()}
-        
-        # Total count
-        total_query = (
-            select(func.count(Bug.id))
-            .where(
-                Bug.client_id == user.client_id,
-                Bug.is_deleted == False
-            )
-        )
-        
-        if project_id:
-            total_query = total_query.where(Bug.project_id == project_id)
-        if start_date:
-            total_query = total_query.where(Bug.created_at >= start_date)
-        if end_date:
-            total_query = total_query.where(Bug.created_at <= end_date)
+        result = await db.execute(query)
         
-        result = await db.execute(total_query)
-        total_count = result.scalar()
+        status_counts = {}
+        severity_counts = {}
+        priority_counts = {}
+        total_count = 0
+        for status, severity, priority, grouping, count in result.all():
+            if grouping == 3:
+                status_counts[status] = count
+            elif grouping == 5:
+                severity_counts[severity] = count
+            elif grouping == 6:
+                priority_counts[priority] = count
+            else:
+                total_count = count
         
         return {
             'total_bugs': total_count,
@@ -868,37 +833,11 @@ class DataRetriever:
         Returns:
             Dictionary with project statistics
         """
-        # Count by status
-        status_query = (
-            select(
-                Project.status,
-                func.count(Project.id).label('count')
-            )
-            .join(Program)
-            .where(
-                Program.client_id == user.client_id,
-                Project.is_deleted == False,
-                Program.is_deleted == False
-            )
-            .group_by(Project.status)
-        )
-        
-        result = await db.execute(status_query)
-        status_counts = {row[0]: row[1] for row in result.all()}
-        
-        # Total count
-        total_query = (
-            select(func.count(Project.id))
-            .join(Program)
-            .where(
-                Program.client_id == user.client_id,
-                Project.is_deleted == False,
-                Program.is_deleted == False
-            )
+        # Project counts by status come from the client's rollup counters
+        status_counts = await HierarchyRollupService(db).get_descendant_counts(
+            'client', user.client_id, 'project'
         )
-        
-        result = await db.execute(total_query)
-        total_count = result.scalar()
+        total_count = sum(status_counts.values())
         
         return {
             'total_projects': total_count,
@@ -0,0 +1,399 @@
+"""
+Hierarchy closure service for constant-depth ancestor/descendant lookups.
+
+The hierarchy_closure table stores one row per (ancestor, descendant) pair of
+live entities in the Client -> Program -> Project -> Usecase -> UserStory ->
+Task -> Subtask tree. Soft-deleted entities are skipped rather than cutting
+their live descendants off: those stay linked to the live ancestors above.
+This service:
+- Exposes descendants()/ancestors() lookups (and their subquery forms) that
+  replace the per-level join chains used for statistics, search and bug scoping
+- Keeps the table in sync on every ORM flush (create, soft delete, restore
+  with its subtree, re-parent), so both HierarchyService and the legacy per-entity routers
+  maintain it without extra calls
+- Rebuilds the table from the source tables to repair drift
+"""
+from typing import List, Optional, Dict, Tuple
+
+from sqlalchemy import select, insert, delete, literal, func, event, or_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased, attributes, outerjoin
+
+from app.models.client import Client
+from app.models.hierarchy import (
+    Program, Project, Usecase, UserStory, Task, Subtask, HierarchyClosure
+)
+from app.core.logging import StructuredLogger
+
+logger = StructuredLogger(__name__)
+
+closure_table = HierarchyClosure.__table__
+
+# Hierarchy levels from root to leaf: (entity_type, model, parent foreign key)
+HIERARCHY_LEVELS: List[Tuple[str, type, Optional[str]]] = [
+    ('client', Client, None),
+    ('program', Program, 'client_id'),
+    ('project', Project, 'program_id'),
+    ('usecase', Usecase, 'project_id'),
+    ('userstory', UserStory, 'usecase_id'),
+    ('task', Task, 'user_story_id'),
+    ('subtask', Subtask, 'task_id'),
+]
+
+ENTITY_TYPES = [level[0] for level in HIERARCHY_LEVELS]
+LEVEL_BY_MODEL = {model: (entity_type, parent_field) for entity_type, model, parent_field in HIERARCHY_LEVELS}
+LEVEL_INDEX = {entity_type: index for index, entity_type in enumerate(ENTITY_TYPES)}
+CLOSURE_COLUMNS = ['ancestor_type', 'ancestor_id', 'descendant_type', 'descendant_id', 'depth']
+
+
+# ==================== STATEMENT BUILDERS ====================
+
+def _add_node_stmt(entity_type: str, entity_id: str, parent_id: Optional[str]):
+    """Insert the self row plus one row per live ancestor of the parent."""
+    self_row = select(
+        literal(entity_type), literal(entity_id),
+        literal(entity_type), literal(entity_id), literal(0)
+    )
+    if parent_id:
+        ancestor_rows = select(
+            closure_table.c.ancestor_type,
+            closure_table.c.ancestor_id,
+            literal(entity_type),
+            literal(entity_id),
+            closure_table.c.depth + 1
+        ).where(closure_table.c.descendant_id == parent_id)
+        source = ancestor_rows.union_all(self_row)
+    else:
+        source = self_row
+
+    return insert(closure_table).from_select(CLOSURE_COLUMNS, source)
+
+
+def _subtree_ids(entity_id: str):
+    """Subquery of the entity itself and all of its live descendants."""
+    return select(closure_table.c.descendant_id).where(
+        closure_table.c.ancestor_id == entity_id
+    ).scalar_subquery()
+
+
+def _remove_node_stmt(entity_id: str):
+    """Drop the rows of the entity itself, keeping its descendants' other rows."""
+    return delete(closure_table).where(
+        or_(closure_table.c.ancestor_id == entity_id, closure_table.c.descendant_id == entity_id)
+    )
+
+
+def _remove_subtree_stmt(entity_id: str):
+    """Drop every closure row that touches the entity's subtree."""
+    return delete(closure_table).where(
+        closure_table.c.descendant_id.in_(_subtree_ids(entity_id))
+    )
+
+
+def _detach_subtree_stmt(entity_id: str):
+    """Drop the rows linking the entity's subtree to its current ancestors."""
+    return delete(closure_table).where(
+        closure_table.c.descendant_id.in_(_subtree_ids(entity_id)),
+        closure_table.c.ancestor_id.notin_(_subtree_ids(entity_id))
+    )
+
+
+def _attach_subtree_stmt(entity_id: str, new_parent_id: str):
+    """Link every node of the entity's subtree to the new parent's ancestors."""
+    parent_rows = closure_table.alias('parent_rows')
+    subtree_rows = closure_table.alias('subtree_rows')
+    return insert(closure_table).from_select(
+        CLOSURE_COLUMNS,
+        select(
+            parent_rows.c.ancestor_type,
+            parent_rows.c.ancestor_id,
+            subtree_rows.c.descendant_type,
+            subtree_rows.c.descendant_id,
+            parent_rows.c.depth + subtree_rows.c.depth + 1
+        ).select_from(
+            parent_rows.join(subtree_rows, subtree_rows.c.ancestor_id == entity_id)
+        ).where(parent_rows.c.descendant_id == new_parent_id)
+    )
+
+
+def _lineage(level: int, top: int = 0):
+    """
+    Join a level's model to the models of the levels up to `top` through the
+    parent keys, deleted entities included. Returns the aliases by level
+    index and the joined source.
+    """
+    lineage = {index: aliased(HIERARCHY_LEVELS[index][1]) for index in range(top, level + 1)}
+    source = lineage[level]
+    for index in range(level, top, -1):
+        parent_field = HIERARCHY_LEVELS[index][2]
+        source = outerjoin(
+            source, lineage[index - 1], lineage[index - 1].id == getattr(lineage[index], parent_field)
+        )
+    return lineage, source
+
+
+def _lineage_rows_stmt(level: int, under: Optional[Tuple[int, str]] = None):
+    """
+    Insert the rows of one level's live entities: a self row and one row per
+    live ancestor, found through the parent keys so deleted ancestors are
+    skipped. With under=(level, entity_id), only entities in that entity's
+    subtree are linked, including those below deleted descendants.
+    """
+    lineage, source = _lineage(level)
+    entity = lineage[level]
+    criteria = [lineage[under[0]].id == under[1]] if under else []
+    return insert(closure_table).from_select(
+        CLOSURE_COLUMNS,
+        union_all(*[
+            select(
+                literal(ENTITY_TYPES[index]), ancestor.id,
+                literal(ENTITY_TYPES[level]), entity.id, literal(level - index)
+            ).select_from(source).where(
+                entity.is_deleted == False, ancestor.is_deleted == False, *criteria
+            )
+            for index, ancestor in lineage.items()
+        ])
+    )
+
+
+def _rebuild_stmts() -> list:
+    """Statements that repopulate the closure table level by level."""
+    return [delete(closure_table)] + [
+        _lineage_rows_stmt(level) for level in range(len(HIERARCHY_LEVELS))
+    ]
+
+
+def _restore_subtree_stmts(entity_type: str, entity_id: str) -> list:
+    """
+    Statements that relink a restored entity and every live entity under it
+    to all of their live ancestors. Rows are rebuilt rather than added, which
+    also covers moves and children created while the entity was deleted.
+    """
+    restored_level = LEVEL_INDEX[entity_type]
+    stmts = []
+    for level in range(restored_level, len(HIERARCHY_LEVELS)):
+        lineage, source = _lineage(level, top=restored_level)
+        under_restored = lineage[restored_level].id == entity_id
+        stmts.extend([
+            delete(closure_table).where(closure_table.c.descendant_id.in_(
+                select(lineage[level].id).select_from(source).where(under_restored)
+            )),
+            _lineage_rows_stmt(level, under=(restored_level, entity_id)),
+        ])
+    return stmts
+
+
+# ==================== FLUSH-TIME MAINTENANCE ====================
+
+def _maintain_closure(session: Session, flush_context) -> None:
+    """
+    Apply hierarchy inserts, soft deletes, restores and re-parents to the
+    closure table in the same transaction as the flush that made them.
+    """
+    new_nodes = []
+    for obj in session.new:
+        level = LEVEL_BY_MODEL.get(type(obj))
+        if level and not obj.is_deleted:
+            new_nodes.append((LEVEL_INDEX[level[0]], obj, level))
+
+    changed_nodes = []
+    for obj in session.dirty:
+        level = LEVEL_BY_MODEL.get(type(obj))
+        if level:
+            changed_nodes.append((LEVEL_INDEX[level[0]], obj, level))
+
+    removed_nodes = [obj for obj in session.deleted if type(obj) in LEVEL_BY_MODEL]
+
+    if not (new_nodes or changed_nodes or removed_nodes):
+        return
+
+    connection = session.connection()
+
+    # Parents before children so a child always finds its parent's rows
+    for _, obj, (entity_type, parent_field) in sorted(new_nodes, key=lambda item: item[0]):
+        parent_id = getattr(obj, parent_field) if parent_field else None
+        connection.execute(_add_node_stmt(entity_type, obj.id, parent_id))
+
+    for _, obj, (entity_type, parent_field) in sorted(changed_nodes, key=lambda item: item[0]):
+        deleted_history = attributes.get_history(obj, 'is_deleted')
+        parent_history = (
+            attributes.get_history(obj, parent_field) if parent_field else None
+        )
+        parent_id = getattr(obj, parent_field) if parent_field else None
+
+        if deleted_history.has_changes():
+            if obj.is_deleted:
+                connection.execute(_remove_node_stmt(obj.id))
+            else:
+                for stmt in _restore_subtree_stmts(entity_type, obj.id):
+                    connection.execute(stmt)
+        elif parent_history is not None and parent_history.has_changes() and not obj.is_deleted:
+            connection.execute(_detach_subtree_stmt(obj.id))
+            if parent_id:
+                connection.execute(_attach_subtree_stmt(obj.id, parent_id))
+
+    for obj in removed_nodes:
+        connection.execute(_remove_subtree_stmt(obj.id))
+
+
+event.listen(Session, "after_flush", _maintain_closure)
+
+
+# ==================== QUERY API ====================
+
+class HierarchyClosureService:
+    """Service for ancestor/descendant lookups over the hierarchy closure table"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def descendants_query(
+        self,
+        entity_type: str,
+        entity_id: str,
+        descendant_type: Optional[str] = None,
+        include_self: bool = False
+    ):
+        """
+        Build a subquery selecting descendant IDs of an entity.
+
+        Intended for embedding in other queries, e.g.
+        ``Task.id.in_(closure.descendants_query('project', project_id, 'task'))``.
+        """
+        query = select(closure_table.c.descendant_id).where(
+            closure_table.c.ancestor_id == entity_id,
+            closure_table.c.ancestor_type == entity_type.lower()
+        )
+        if descendant_type:
+            query = query.where(closure_table.c.descendant_type == descendant_type.lower())
+        if not include_self:
+            query = query.where(closure_table.c.depth > 0)
+        return query
+
+    def ancestors_query(
+        self,
+        entity_type: str,
+        entity_id: str,
+        ancestor_type: Optional[str] = None,
+        include_self: bool = False
+    ):
+        """Build a subquery selecting ancestor IDs of an entity."""
+        query = select(closure_table.c.ancestor_id).where(
+            closure_table.c.descendant_id == entity_id,
+            closure_table.c.descendant_type == entity_type.lower()
+        )
+        if ancestor_type:
+            query = query.where(closure_table.c.ancestor_type == ancestor_type.lower())
+        if not include_self:
+            query = query.where(closure_table.c.depth > 0)
+        return query
+
+    async def descendants(
+        self,
+        entity_type: str,
+        entity_id: str,
+        descendant_type: Optional[str] = None,
+        include_self: bool = False
+    ) -> List[str]:
+        """Get IDs of all live descendants of an entity, nearest first."""
+        query = self.descendants_query(
+            entity_type, entity_id, descendant_type, include_self
+        ).order_by(closure_table.c.depth)
+        result = await self.db.execute(query)
+        return [row[0] for row in result.all()]
+
+    async def ancestors(
+        self,
+        entity_type: str,
+        entity_id: str,
+        include_self: bool = False
+    ) -> List[Tuple[str, str]]:
+        """
+        Get (entity_type, entity_id) pairs for all ancestors of an entity,
+        ordered from the root (Client) down.
+        """
+        query = select(
+            closure_table.c.ancestor_type,
+            closure_table.c.ancestor_id
+        ).where(
+            closure_table.c.descendant_id == entity_id,
+            closure_table.c.descendant_type == entity_type.lower()
+        ).order_by(closure_table.c.depth.desc())
+        if not include_self:
+            query = query.where(closure_table.c.depth > 0)
+
+        result = await self.db.execute(query)
+        return [(row.ancestor_type, row.ancestor_id) for row in result.all()]
+
+    async def ancestor_paths(
+        self,
+        entity_ids: List[str]
+    ) -> Dict[str, List[Dict[str, str]]]:
+        """
+        Get breadcrumb trails for many entities in one query.
+
+        Returns {entity_id: [{"type", "id", "name"}, ...]} ordered from the
+        root (Client) down to the entity itself. Entities that are not live
+        are missing from the result.
+        """
+        if not entity_ids:
+            return {}
+
+        # IDs are unique across levels, so exactly one outer join matches
+        source = closure_table
+        for _, model, _ in HIERARCHY_LEVELS:
+            source = source.outerjoin(model, model.id == closure_table.c.ancestor_id)
+        name = func.coalesce(*[model.name for _, model, _ in HIERARCHY_LEVELS])
+
+        query = select(
+            closure_table.c.descendant_id,
+            closure_table.c.ancestor_type,
+            closure_table.c.ancestor_id,
+            name.label('name')
+        ).select_from(source).where(
+            closure_table.c.descendant_id.in_(entity_ids)
+        ).order_by(closure_table.c.descendant_id, closure_table.c.depth.desc())
+
+        result = await self.db.execute(query)
+        paths: Dict[str, List[Dict[str, str]]] = {}
+        for row in result.all():
+            paths.setdefault(row.descendant_id, []).append({
+                "type": row.ancestor_type,
+                "id": str(row.ancestor_id),
+                "name": row.name
+            })
+        return paths
+
+    async def descendant_counts(
+        self,
+        entity_type: str,
+        entity_id: str
+    ) -> Dict[str, int]:
+        """Count live descendants of an entity grouped by entity type."""
+        query = select(
+            closure_table.c.descendant_type,
+            func.count().label('count')
+        ).where(
+            closure_table.c.ancestor_id == entity_id,
+            closure_table.c.ancestor_type == entity_type.lower(),
+            closure_table.c.depth > 0
+        ).group_by(closure_table.c.descendant_type)
+
+        result = await self.db.execute(query)
+        return {row.descendant_type: row.count for row in result.all()}
+
+    async def rebuild(self) -> int:
+        """
+        Rebuild the closure table from the hierarchy tables.
+
+        Used to repair drift (e.g. rows written by raw SQL or data loaders).
+        Returns the number of closure rows after the rebuild.
+        """
+        for stmt in _rebuild_stmts():
+            await self.db.execute(stmt)
+        await self.db.commit()
+
+        result = await self.db.execute(select(func.count()).select_from(closure_table))
+        total = result.scalar() or 0
+        logger.info("Hierarchy closure rebuilt", rows=total)
+        return total
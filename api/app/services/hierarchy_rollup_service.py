@@ -0,0 +1,495 @@
+"""
+Hierarchy rollup service for entity statistics.
+
+The hierarchy_rollups table stores, for every live ancestor, how many live
+descendants of each type carry a given status, priority or phase; like the
+closure table, it keeps counting the live descendants of a soft-deleted
+entity on the live ancestors above it. This service:
+- Reads direct-children status counts, per-level counts, phase distribution
+  and completion percentage for one or many entities of the same type in a
+  single indexed query, independent of subtree size
+- Adjusts the counters on every ORM flush (create, field update, soft
+  delete, restore, re-parent), so both HierarchyService
+  and the legacy per-entity routers maintain them without extra calls
+- Rebuilds the table from the closure table to repair drift
+"""
+from typing import Dict, Any, Iterable, Optional, Sequence
+
+from sqlalchemy import select, delete, union_all, literal, func, event, true, and_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, attributes
+
+from app.models.hierarchy import Subtask, Phase, HierarchyRollup
+from app.services.hierarchy_closure_service import (
+    closure_table, HIERARCHY_LEVELS, ENTITY_TYPES, LEVEL_BY_MODEL
+)
+from app.core.logging import StructuredLogger
+
+logger = StructuredLogger(__name__)
+
+rollup_table = HierarchyRollup.__table__
+
+# Keys used in rollup_counts for each descendant entity type
+ROLLUP_COUNT_KEYS = {
+    'program': 'programs',
+    'project': 'projects',
+    'usecase': 'usecases',
+    'userstory': 'user_stories',
+    'task': 'tasks',
+    'subtask': 'subtasks'
+}
+
+# Direct child level of each entity type: (child_type, child_model, parent foreign key)
+CHILD_LEVELS = {
+    parent[0]: (child[0], child[1], child[2])
+    for parent, child in zip(HIERARCHY_LEVELS, HIERARCHY_LEVELS[1:])
+}
+
+# Counted dimensions: (dimension, model attribute); models without the attribute skip it
+ROLLUP_DIMENSIONS = (
+    ('status', 'status'),
+    ('priority', 'priority'),
+    ('phase', 'phase_id'),
+)
+
+# Entity types that report a phase distribution of their descendant tasks/subtasks
+PHASE_ROLLUP_TYPES = ('client', 'program', 'project', 'usecase', 'userstory')
+PHASE_SOURCE_TYPES = ('task', 'subtask')
+
+COMPLETED_STATUSES = ('Completed', 'Done')
+
+# Stored in place of a NULL status/priority (primary key columns cannot be NULL)
+EMPTY_VALUE = ''
+
+ROLLUP_COLUMNS = ['ancestor_id', 'ancestor_type', 'descendant_type', 'dimension', 'value', 'count']
+
+
+# ==================== ENTITY VALUES ====================
+
+def _committed_value(obj, field: str):
+    """Value of an attribute as last loaded from the database."""
+    history = attributes.get_history(obj, field)
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return getattr(obj, field)
+
+
+def _rollup_values(obj, committed: bool = False) -> Dict[str, str]:
+    """Dimension values an entity contributes to its ancestors' counters."""
+    values = {}
+    for dimension, field in ROLLUP_DIMENSIONS:
+        if not hasattr(type(obj), field):
+            continue
+        value = _committed_value(obj, field) if committed else getattr(obj, field)
+        if value is None:
+            if dimension == 'phase':
+                continue
+            value = EMPTY_VALUE
+        values[dimension] = str(value)
+    return values
+
+
+# ==================== STATEMENT BUILDERS ====================
+
+def _apply_delta_stmt(
+    anchor_id: str,
+    entity_type: str,
+    values: Dict[str, str],
+    sign: int,
+    subtree_of: Optional[str] = None,
+    include_anchor: bool = True
+):
+    """
+    Add (sign=1) or subtract (sign=-1) an entity's contribution on the
+    anchor (unless include_anchor is False) and every live ancestor of it.
+    The anchor is the entity's parent, or the entity itself when its current
+    closure rows are to be followed.
+
+    With subtree_of set, the counters held by that entity (its whole subtree)
+    are carried along, as needed for re-parents.
+    """
+    ancestors = select(
+        closure_table.c.ancestor_id, closure_table.c.ancestor_type
+    ).where(closure_table.c.descendant_id == anchor_id)
+    if not include_anchor:
+        ancestors = ancestors.where(closure_table.c.depth > 0)
+    ancestors = ancestors.subquery('ancestors')
+
+    sources = [
+        select(
+            ancestors.c.ancestor_id,
+            ancestors.c.ancestor_type,
+            literal(entity_type).label('descendant_type'),
+            literal(dimension).label('dimension'),
+            literal(value).label('value'),
+            literal(sign).label('count')
+        )
+        for dimension, value in values.items()
+    ]
+    if subtree_of:
+        subtree = rollup_table.alias('subtree')
+        sources.append(
+            select(
+                ancestors.c.ancestor_id,
+                ancestors.c.ancestor_type,
+                subtree.c.descendant_type,
+                subtree.c.dimension,
+                subtree.c.value,
+                subtree.c.count * sign
+            ).select_from(
+                ancestors.join(subtree, true())
+            ).where(subtree.c.ancestor_id == subtree_of)
+        )
+
+    deltas = union_all(*sources).subquery('deltas')
+    key_columns = [
+        deltas.c.ancestor_id, deltas.c.ancestor_type, deltas.c.descendant_type,
+        deltas.c.dimension, deltas.c.value
+    ]
+    stmt = pg_insert(rollup_table).from_select(
+        ROLLUP_COLUMNS,
+        select(*key_columns, func.sum(deltas.c.count)).group_by(*key_columns)
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=['ancestor_id', 'descendant_type', 'dimension', 'value'],
+        set_={'count': rollup_table.c.count + stmt.excluded.count}
+    )
+
+
+def _clear_counters_stmt(entity_id: str):
+    """Drop the counters held by an entity that left the live tree."""
+    return delete(rollup_table).where(rollup_table.c.ancestor_id == entity_id)
+
+
+def _count_stmt(*criteria):
+    """Insert counters computed from the closure and hierarchy tables."""
+    facts = []
+    for _, model, _ in HIERARCHY_LEVELS[1:]:
+        for dimension, field in ROLLUP_DIMENSIONS:
+            if not hasattr(model, field):
+                continue
+            column = getattr(model, field)
+            fact = select(
+                model.id.label('id'),
+                literal(dimension).label('dimension'),
+                func.coalesce(column, EMPTY_VALUE).label('value')
+            )
+            if dimension == 'phase':
+                fact = fact.where(column.isnot(None))
+            facts.append(fact)
+
+    fact_rows = union_all(*facts).subquery('facts')
+    key_columns = [
+        closure_table.c.ancestor_id, closure_table.c.ancestor_type,
+        closure_table.c.descendant_type, fact_rows.c.dimension, fact_rows.c.value
+    ]
+    return pg_insert(rollup_table).from_select(
+        ROLLUP_COLUMNS,
+        select(*key_columns, func.count()).select_from(
+            closure_table.join(fact_rows, fact_rows.c.id == closure_table.c.descendant_id)
+        ).where(closure_table.c.depth > 0, *criteria).group_by(*key_columns)
+    )
+
+
+def _rebuild_stmts() -> list:
+    """Statements that repopulate the rollup table from the closure table."""
+    return [delete(rollup_table), _count_stmt()]
+
+
+def _recount_stmts(entity_id: str) -> list:
+    """
+    Statements that recount the counters held by a restored entity, which
+    were cleared when it left the tree.
+    """
+    return [
+        _clear_counters_stmt(entity_id),
+        _count_stmt(closure_table.c.ancestor_id == entity_id),
+    ]
+
+
+# ==================== FLUSH-TIME MAINTENANCE ====================
+
+def _maintain_rollups(session: Session, flush_context) -> None:
+    """
+    Apply hierarchy inserts, field changes, soft deletes, restores and
+    re-parents to the rollup counters in the same transaction as the flush.
+
+    Registered after the closure listener, so an entity's closure rows
+    already link it to its current live ancestors; contributions are added
+    and changed through those rows, which also reach past a deleted parent.
+    Contributions leaving old ancestors (moves, deletes) are removed through
+    the old parent, as the entity's rows no longer lead there.
+    """
+    # (entity, entity_type, old_parent, old_values, new_parent, new_values)
+    changes = []
+    # IDs of restored entities, whose own counters are recounted
+    restored = set()
+    # IDs of removed rows, whose subtree leaves the closure with them
+    removed = set()
+
+    for obj in session.new:
+        level = LEVEL_BY_MODEL.get(type(obj))
+        if level and level[1] and not obj.is_deleted:
+            entity_type, parent_field = level
+            changes.append((obj, entity_type, None, None, getattr(obj, parent_field), _rollup_values(obj)))
+
+    for obj in session.dirty:
+        level = LEVEL_BY_MODEL.get(type(obj))
+        if not level:
+            continue
+        entity_type, parent_field = level
+        was_live = not _committed_value(obj, 'is_deleted')
+        is_live = not obj.is_deleted
+        if is_live and not was_live:
+            restored.add(obj.id)
+        if not parent_field:
+            continue
+        old_parent = _committed_value(obj, parent_field) if was_live else None
+        new_parent = getattr(obj, parent_field) if is_live else None
+        old_values = _rollup_values(obj, committed=True) if was_live else None
+        new_values = _rollup_values(obj) if is_live else None
+        if old_parent == new_parent and old_values == new_values:
+            continue
+        changes.append((obj, entity_type, old_parent, old_values, new_parent, new_values))
+
+    for obj in session.deleted:
+        level = LEVEL_BY_MODEL.get(type(obj))
+        if level and level[1] and not _committed_value(obj, 'is_deleted'):
+            entity_type, parent_field = level
+            removed.add(obj.id)
+            changes.append((
+                obj, entity_type, _committed_value(obj, parent_field),
+                _rollup_values(obj, committed=True), None, None
+            ))
+
+    if not (changes or restored):
+        return
+
+    connection = session.connection()
+
+    # Closure rows of restored subtrees are already back (closure listener runs first)
+    for entity_id in restored:
+        for stmt in _recount_stmts(entity_id):
+            connection.execute(stmt)
+
+    for obj, entity_type, old_parent, old_values, new_parent, new_values in changes:
+        moved = old_values is not None and new_values is not None and old_parent != new_parent
+        left_tree = old_values is not None and new_values is None
+
+        # Moves and row removals carry the subtree's counters; the live
+        # descendants of a soft-deleted or restored entity stay counted
+        if old_values is not None and old_parent:
+            if moved or left_tree:
+                connection.execute(_apply_delta_stmt(
+                    old_parent, entity_type, old_values, -1,
+                    subtree_of=obj.id if (moved or obj.id in removed) else None
+                ))
+            else:
+                connection.execute(_apply_delta_stmt(
+                    obj.id, entity_type, old_values, -1, include_anchor=False
+                ))
+        if new_values is not None and new_parent:
+            connection.execute(_apply_delta_stmt(
+                obj.id, entity_type, new_values, 1,
+                subtree_of=obj.id if moved else None, include_anchor=False
+            ))
+        if left_tree:
+            connection.execute(_clear_counters_stmt(obj.id))
+
+
+event.listen(Session, "after_flush", _maintain_rollups)
+
+
+# ==================== RESULT SHAPING ====================
+
+def completion_percentage(status_counts: Dict[str, int]) -> float:
+    """Share of completed items among the given status counts."""
+    total = sum(status_counts.values())
+    completed = sum(status_counts.get(s, 0) for s in COMPLETED_STATUSES)
+    return round((completed / total * 100), 1) if total > 0 else 0.0
+
+
+def empty_statistics(entity_type: str) -> Dict[str, Any]:
+    """Statistics for an entity with no children or descendants."""
+    entity_type = entity_type.lower()
+    rollup_counts = {}
+    if entity_type in CHILD_LEVELS:
+        for descendant_type in ENTITY_TYPES[ENTITY_TYPES.index(entity_type) + 1:]:
+            rollup_counts[ROLLUP_COUNT_KEYS[descendant_type]] = 0
+
+    return {
+        "status_counts": {},
+        "phase_distribution": [] if entity_type in PHASE_ROLLUP_TYPES else None,
+        "rollup_counts": rollup_counts,
+        "completion_percentage": 0.0,
+        "total_items": 0
+    }
+
+
+def rollup_query(entity_type: str, entity_ids: Sequence[str]):
+    """
+    Build the counters query for entities of one type.
+
+    Status rows give both direct-children status counts and per-level totals;
+    phase rows are joined to phases for their display name and color.
+    """
+    return select(
+        rollup_table.c.ancestor_id,
+        rollup_table.c.descendant_type,
+        rollup_table.c.dimension,
+        rollup_table.c.value,
+        rollup_table.c.count,
+        Phase.name.label('phase_name'),
+        Phase.color.label('phase_color')
+    ).select_from(
+        rollup_table.outerjoin(
+            Phase, and_(rollup_table.c.dimension == 'phase', Phase.id == rollup_table.c.value)
+        )
+    ).where(
+        rollup_table.c.ancestor_id.in_(entity_ids),
+        rollup_table.c.ancestor_type == entity_type.lower(),
+        rollup_table.c.dimension.in_(('status', 'phase')),
+        rollup_table.c.count > 0
+    )
+
+
+def shape_statistics(
+    entity_type: str,
+    entity_ids: Sequence[str],
+    rows: Iterable[Any]
+) -> Dict[str, Dict[str, Any]]:
+    """Fold counter rows into per-entity statistics dictionaries."""
+    entity_type = entity_type.lower()
+    child_type = CHILD_LEVELS[entity_type][0] if entity_type in CHILD_LEVELS else None
+    statistics = {entity_id: empty_statistics(entity_type) for entity_id in entity_ids}
+    phases: Dict[str, Dict[str, Dict[str, Any]]] = {entity_id: {} for entity_id in entity_ids}
+
+    for row in rows:
+        stats = statistics.get(row.ancestor_id)
+        if stats is None:
+            continue
+
+        if row.dimension == 'status':
+            rollup_key = ROLLUP_COUNT_KEYS.get(row.descendant_type)
+            if rollup_key in stats["rollup_counts"]:
+                stats["rollup_counts"][rollup_key] += row.count
+            if row.descendant_type == child_type:
+                status = row.value if row.value != EMPTY_VALUE else None
+                stats["status_counts"][status] = row.count
+        elif (
+            row.dimension == 'phase'
+            and row.descendant_type in PHASE_SOURCE_TYPES
+            and row.phase_name is not None
+            and stats["phase_distribution"] is not None
+        ):
+            phase = phases[row.ancestor_id].setdefault(
+                row.value, {'phase': row.phase_name, 'color': row.phase_color, 'count': 0}
+            )
+            phase['count'] += row.count
+
+    for entity_id, stats in statistics.items():
+        if stats["phase_distribution"] is not None:
+            distribution = list(phases[entity_id].values())
+            distribution.sort(key=lambda x: x['count'], reverse=True)
+            stats["phase_distribution"] = distribution
+
+        stats["total_items"] = sum(stats["status_counts"].values())
+        stats["completion_percentage"] = completion_percentage(stats["status_counts"])
+
+    return statistics
+
+
+# ==================== SERVICE ====================
+
+class HierarchyRollupService:
+    """Service for reading and rebuilding hierarchy rollup counters"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_statistics_batch(
+        self,
+        entity_type: str,
+        entity_ids: Sequence[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get statistics for many entities of the same type in one round-trip.
+
+        Returns a dictionary keyed by entity ID; entities without children
+        get zeroed statistics.
+        """
+        entity_type = entity_type.lower()
+        entity_ids = list(dict.fromkeys(entity_ids))
+        if not entity_ids:
+            return {}
+
+        if entity_type == 'subtask':
+            # Subtasks have no children; report their own status
+            result = await self.db.execute(
+                select(Subtask.id, Subtask.status).where(
+                    Subtask.id.in_(entity_ids),
+                    Subtask.is_deleted == False
+                )
+            )
+            statistics = {entity_id: empty_statistics(entity_type) for entity_id in entity_ids}
+            for row in result.all():
+                status_counts = {row.status: 1}
+                statistics[row.id].update(
+                    status_counts=status_counts,
+                    total_items=1,
+                    completion_percentage=completion_percentage(status_counts)
+                )
+            return statistics
+
+        result = await self.db.execute(rollup_query(entity_type, entity_ids))
+        return shape_statistics(entity_type, entity_ids, result.all())
+
+    async def get_statistics(
+        self,
+        entity_type: str,
+        entity_id: str
+    ) -> Dict[str, Any]:
+        """Get statistics for a single entity."""
+        statistics = await self.get_statistics_batch(entity_type, [entity_id])
+        return statistics[entity_id]
+
+    async def get_descendant_counts(
+        self,
+        entity_type: str,
+        entity_id: str,
+        descendant_type: str,
+        dimension: str = 'status'
+    ) -> Dict[str, int]:
+        """Count live descendants of one type by status, priority or phase."""
+        result = await self.db.execute(
+            select(rollup_table.c.value, rollup_table.c.count).where(
+                rollup_table.c.ancestor_id == entity_id,
+                rollup_table.c.ancestor_type == entity_type.lower(),
+                rollup_table.c.descendant_type == descendant_type.lower(),
+                rollup_table.c.dimension == dimension,
+                rollup_table.c.count > 0
+            )
+        )
+        return {
+            (row.value if row.value != EMPTY_VALUE else None): row.count
+            for row in result.all()
+        }
+
+    async def rebuild(self) -> int:
+        """
+        Rebuild the rollup counters from the closure and hierarchy tables.
+
+        Used to repair drift (e.g. rows written by raw SQL or data loaders).
+        Returns the number of counter rows after the rebuild.
+        """
+        for stmt in _rebuild_stmts():
+            await self.db.execute(stmt)
+        await self.db.commit()
+
+        result = await self.db.execute(select(func.count()).select_from(rollup_table))
+        total = result.scalar() or 0
+        logger.info("Hierarchy rollups rebuilt", rows=total)
+        return total
@@ -1,9 +1,11 @@
 """
 Hierarchy Service for managing entity creation, updates, and hierarchy operations.
 """
+import re
 from typing import Optional, Dict, Any, TYPE_CHECKING
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, union_all, literal, cast, null, or_, func, String
+from sqlalchemy.dialects.postgresql import REGCONFIG
 from fastapi import HTTPException, status
 from datetime import datetime
 
@@ -17,6 +19,13 @@ from app.schemas.hierarchy import (
 )
 from app.schemas.project import ProjectCreate as ProjectCreateSchema, ProjectUpdate
 from app.schemas.task import TaskCreate, TaskUpdate
+from app.services.cache_service import cache_service
+from app.services.hierarchy_closure_service import (
+    HierarchyClosureService, HIERARCHY_LEVELS, ENTITY_TYPES
+)
+from app.services.hierarchy_rollup_service import (
+    HierarchyRollupService, CHILD_LEVELS, completion_percentage
+)
 
 if TYPE_CHECKING:
     from app.schemas.client import ClientUpdate
@@ -25,11 +34,27 @@ if TYPE_CHECKING:
     from app.schemas.task import TaskUpdate
 
 
+def _build_prefix_tsquery(query: str) -> Optional[str]:
+    """
+    Turn free text into a to_tsquery() expression that ANDs prefix terms
+    ("acme corp" -> "acme:* & corp:*"). Only word characters are kept, so the
+    result is always valid tsquery syntax; returns None if nothing remains.
+    """
+    terms = re.findall(r"\w+", query.lower())
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" for term in terms)
+
+
 class HierarchyService:
     """Service for managing hierarchical entities"""
     
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.closure = HierarchyClosureService(db)
+        self.rollups = HierarchyRollupService(db)
+        self._rollup_memo: Dict[tuple, Dict[str, Any]] = {}
+        self._breadcrumb_memo: Dict[str, list[Dict[str, str]]] = {}
     
     # ==================== CLIENT OPERATIONS ====================
     
@@ -542,8 +567,7 @@ class HierarchyService:
         await self.db.commit()
         await self.db.refresh(client)
         
-        # TODO: Invalidate cache when CacheService is implemented (Task 5.2)
-        # await self.cache.invalidate_entity('client', client_id)
+        await cache_service.invalidate_entity('client', client_id)
         
         return client
     
@@ -579,8 +603,7 @@ class HierarchyService:
         await self.db.commit()
         await self.db.refresh(program)
         
-        # TODO: Invalidate cache when CacheService is implemented (Task 5.2)
-        # await self.cache.invalidate_entity('program', program_id)
+        await cache_service.invalidate_entity('program', program_id)
         
         return program
     
@@ -616,8 +639,7 @@ class HierarchyService:
         await self.db.commit()
         await self.db.refresh(project)
         
-        # TODO: Invalidate cache when CacheService is implemented (Task 5.2)
-        # await self.cache.invalidate_entity('project', project_id)
+        await cache_service.invalidate_entity('project', project_id)
         
         return project
     
@@ -653,8 +675,7 @@ class HierarchyService:
         await self.db.commit()
         await self.db.refresh(usecase)
         
-        # TODO: Invalidate cache when CacheService is implemented (Task 5.2)
-        # await self.cache.invalidate_entity('usecase', usecase_id)
+        await cache_service.invalidate_entity('usecase', usecase_id)
         
         return usecase
     
@@ -690,8 +711,7 @@ class HierarchyService:
         await self.db.commit()
         await self.db.refresh(user_story)
         
-        # TODO: Invalidate cache when CacheService is implemented (Task 5.2)
-        # await self.cache.invalidate_entity('user_story', user_story_id)
+        await cache_service.invalidate_entity('userstory', user_story_id)
         
         return user_story
     
@@ -728,8 +748,7 @@ class HierarchyService:
         await self.db.commit()
         await self.db.refresh(task)
         
-        # TODO: Invalidate cache when CacheService is implemented (Task 5.2)
-        # await self.cache.invalidate_entity('task', task_id)
+        await cache_service.invalidate_entity('task', task_id)
         
         return task
     
@@ -781,8 +800,7 @@ class HierarchyService:
         await self.db.commit()
         await self.db.refresh(subtask)
         
-        # TODO: Invalidate cache when CacheService is implemented (Task 5.2)
-        # await self.cache.invalidate_entity('subtask', subtask_id)
+        await cache_service.invalidate_entity('subtask', subtask_id)
         
         return subtask
     
@@ -818,8 +836,7 @@ class HierarchyService:
         
         await self.db.commit()
         
-        # TODO: Invalidate cache when CacheService is implemented (Task 5.2)
-        # await self.cache.invalidate_entity('client', client_id)
+        await cache_service.invalidate_entity('client', client_id)
         
         return {"message": f"Client {client.name} has been deleted"}
     
@@ -853,8 +870,7 @@ class HierarchyService:
         
         await self.db.commit()
         
-        # TODO: Invalidate cache when CacheService is implemented (Task 5.2)
-        # await self.cache.invalidate_entity('program', program_id)
+        await cache_service.invalidate_entity('program', program_id)
         
         return {"message": f"Program {program.name} has been deleted"}
     
@@ -888,8 +904,7 @@ class HierarchyService:
         
         await self.db.commit()
         
-        # TODO: Invalidate cache when CacheService is implemented (Task 5.2)
-        # await self.cache.invalidate_entity('project', project_id)
+        await cache_service.invalidate_entity('project', project_id)
         
         return {"message": f"Project {project.name} has been deleted"}
     
@@ -923,8 +938,7 @@ class HierarchyService:
         
         await self.db.commit()
         
-        # TODO: Invalidate cache when CacheService is implemented (Task 5.2)
-        # await self.cache.invalidate_entity('usecase', usecase_id)
+        await cache_service.invalidate_entity('usecase', usecase_id)
         
         return {"message": f"Use case {usecase.name} has been deleted"}
     
@@ -958,8 +972,7 @@ class HierarchyService:
         
         await self.db.commit()
         
-        # TODO: Invalidate cache when CacheService is implemented (Task 5.2)
-        # await self.cache.invalidate_entity('user_story', user_story_id)
+        await cache_service.invalidate_entity('userstory', user_story_id)
         
         return {"message": f"User story {user_story.title} has been deleted"}
     
@@ -994,8 +1007,7 @@ class HierarchyService:
         
         await self.db.commit()
         
-        # TODO: Invalidate cache when CacheService is implemented (Task 5.2)
-        # await self.cache.invalidate_entity('task', task_id)
+        await cache_service.invalidate_entity('task', task_id)
         
         return {"message": f"Task {task.title} has been deleted"}
     
@@ -1042,11 +1054,78 @@ class HierarchyService:
         
         await self.db.commit()
         
-        # TODO: Invalidate cache when CacheService is implemented (Task 5.2)
-        # await self.cache.invalidate_entity('subtask', subtask_id)
+        await cache_service.invalidate_entity('subtask', subtask_id)
         
         return {"message": f"Subtask {subtask.title} has been deleted"}
     
+    # ==================== MOVE OPERATIONS ====================
+    
+    async def move_entity(
+        self,
+        entity_type: str,
+        entity_id: str,
+        new_parent_id: str,
+        current_user: User
+    ) -> Any:
+        """
+        Re-parent an entity (and its whole subtree) under a new parent of the
+        level directly above it, e.g. move a user story to another use case.
+        
+        The hierarchy closure rows for the subtree are re-linked by the flush
+        listener in hierarchy_closure_service as part of the same commit.
+        """
+        entity_type_lower = entity_type.lower()
+        if entity_type_lower not in ENTITY_TYPES or entity_type_lower == 'client':
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Entity type {entity_type} cannot be moved"
+            )
+        
+        # Role check - same roles that may update the entity's parent level
+        allowed_roles = ["Admin", "Architect"]
+        if entity_type_lower not in ['program', 'project']:
+            allowed_roles.append("Designer")
+        if current_user.role not in allowed_roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Only {', '.join(allowed_roles)} users can move {entity_type_lower} entities"
+            )
+        
+        level_index = ENTITY_TYPES.index(entity_type_lower)
+        _, _, parent_field = HIERARCHY_LEVELS[level_index]
+        parent_type = ENTITY_TYPES[level_index - 1]
+        
+        # Verify access to both the entity and its new parent
+        await self._verify_entity_access(entity_type_lower, entity_id, current_user)
+        await self._verify_entity_access(parent_type, new_parent_id, current_user)
+        
+        entity = await self._get_entity_by_type(entity_type_lower, entity_id)
+        if getattr(entity, parent_field) == new_parent_id:
+            return entity
+        
+        # Entries tagged with the old or new ancestors (e.g. project-scoped
+        # eligible assignees) no longer apply to the moved subtree
+        stale_tags = {f"{entity_type_lower}:{entity_id}"}
+        stale_tags.update(
+            f"{ancestor_type}:{ancestor_id}"
+            for ancestor_type, ancestor_id in await self.closure.ancestors(entity_type_lower, entity_id)
+        )
+        stale_tags.update(
+            f"{ancestor_type}:{ancestor_id}"
+            for ancestor_type, ancestor_id in await self.closure.ancestors(parent_type, new_parent_id, include_self=True)
+        )
+        
+        setattr(entity, parent_field, new_parent_id)
+        entity.updated_by = str(current_user.id)
+        entity.updated_at = datetime.utcnow()
+        
+        await self.db.commit()
+        self._breadcrumb_memo.clear()
+        await cache_service.invalidate_tags(*stale_tags)
+        await self.db.refresh(entity)
+        
+        return entity
+    
     async def _check_active_children(
         self,
         entity: Any,
@@ -1087,6 +1166,9 @@ class HierarchyService:
         # Verify entity exists and user has access
         await self._verify_entity_access(entity_type, entity_id, current_user)
         
+        # The helpers below share one grouped rollup query per call
+        self._rollup_memo.clear()
+        
         # Get direct children status counts
         status_counts = await self._get_status_counts(entity_type, entity_id)
         
@@ -1098,78 +1180,60 @@ class HierarchyService:
         # Get rollup counts (all descendants)
         rollup_counts = await self._get_rollup_counts(entity_type, entity_id)
         
-        # Calculate completion percentage
-        total = sum(status_counts.values())
-        completed = status_counts.get('Completed', 0) + status_counts.get('Done', 0)
-        completion_percentage = round((completed / total * 100), 1) if total > 0 else 0.0
-        
         return {
             "status_counts": status_counts,
             "phase_distribution": phase_distribution,
             "rollup_counts": rollup_counts,
-            "completion_percentage": completion_percentage,
-            "total_items": total
+            "completion_percentage": completion_percentage(status_counts),
+            "total_items": sum(status_counts.values())
         }
     
-    async def _get_status_counts(
+    async def get_children_statistics(
         self,
         entity_type: str,
-        entity_id: str
-    ) -> Dict[str, int]:
-        """
-        Get status counts for direct children of an entity.
-        
-        Requirements: 8.1, 25.1
+        entity_id: str,
+        current_user: User
+    ) -> Dict[str, Dict[str, Any]]:
         """
-        from sqlalchemy import func
+        Get statistics for every direct child of an entity in one rollup query.
         
-        # Map entity type to child model and parent field
-        child_mapping = {
-            'client': (Program, 'client_id'),
-            'program': (Project, 'program_id'),
-            'project': (Usecase, 'project_id'),
-            'usecase': (UserStory, 'usecase_id'),
-            'userstory': (Task, 'user_story_id'),
-            'task': (Subtask, 'task_id')
-        }
+        Used by tree views to render all sibling nodes at once. Returns a
+        dictionary keyed by child entity ID.
         
+        Requirements: 8.1, 8.2, 25.1, 25.2
+        """
         entity_type_lower = entity_type.lower()
         
-        # Subtasks have no children, return their own status
-        if entity_type_lower == 'subtask':
-            # Get the subtask itself to return its status
-            result = await self.db.execute(
-                select(Subtask).where(
-                    Subtask.id == entity_id,
-                    Subtask.is_deleted == False
-                )
-            )
-            subtask = result.scalar_one_or_none()
-            if subtask:
-                return {subtask.status: 1}
-            return {}
+        # Children inherit access from their parent
+        await self._verify_entity_access(entity_type_lower, entity_id, current_user)
         
-        if entity_type_lower not in child_mapping:
+        if entity_type_lower not in CHILD_LEVELS:
             return {}
         
-        child_model, parent_field = child_mapping[entity_type_lower]
-        
-        # Query for status counts
-        query = select(
-            child_model.status,
-            func.count(child_model.id).label('count')
-        ).where(
-            getattr(child_model, parent_field) == entity_id,
-            child_model.is_deleted == False
-        ).group_by(child_model.status)
-        
-        result = await self.db.execute(query)
-        rows = result.all()
+        child_type, child_model, parent_field = CHILD_LEVELS[entity_type_lower]
+        result = await self.db.execute(
+            select(child_model.id).where(
+                getattr(child_model, parent_field) == entity_id,
+                child_model.is_deleted == False
+            )
+        )
+        child_ids = [row[0] for row in result.all()]
         
-        # Convert to dictionary
-        status_counts = {row.status: row.count for row in rows}
+        return await self.rollups.get_statistics_batch(child_type, child_ids)
+    
+    async def _get_status_counts(
+        self,
+        entity_type: str,
+        entity_id: str
+    ) -> Dict[str, int]:
+        """
+        Get status counts for direct children of an entity.
         
-        return status_counts
+        Requirements: 8.1, 25.1
+        """
+        # Subtasks have no children; the rollup reports their own status
+        statistics = await self._get_rollup_statistics(entity_type, entity_id)
+        return statistics["status_counts"]
     
     async def _get_phase_distribution(
         self,
@@ -1181,73 +1245,8 @@ class HierarchyService:
         
         Requirements: 13.1, 13.2, 25.2
         """
-        from sqlalchemy import func, or_
-        
-        # Get all descendant task and subtask IDs
-        task_ids = await self._get_descendant_task_ids(entity_type, entity_id)
-        
-        if not task_ids:
-            return []
-        
-        # Query phase distribution for tasks
-        task_query = select(
-            Phase.id,
-            Phase.name,
-            Phase.color,
-            func.count(Task.id).label('count')
-        ).join(
-            Task, Task.phase_id == Phase.id
-        ).where(
-            Task.id.in_(task_ids),
-            Task.is_deleted == False
-        ).group_by(Phase.id, Phase.name, Phase.color)
-        
-        task_result = await self.db.execute(task_query)
-        task_rows = task_result.all()
-        
-        # Query phase distribution for subtasks
-        subtask_query = select(
-            Phase.id,
-            Phase.name,
-            Phase.color,
-            func.count(Subtask.id).label('count')
-        ).join(
-            Subtask, Subtask.phase_id == Phase.id
-        ).where(
-            Subtask.task_id.in_(task_ids),
-            Subtask.is_deleted == False
-        ).group_by(Phase.id, Phase.name, Phase.color)
-        
-        subtask_result = await self.db.execute(subtask_query)
-        subtask_rows = subtask_result.all()
-        
-        # Combine task and subtask counts by phase
-        phase_counts = {}
-        for row in task_rows:
-            phase_id = str(row.id)
-            if phase_id not in phase_counts:
-                phase_counts[phase_id] = {
-                    'phase': row.name,
-                    'color': row.color,
-                    'count': 0
-                }
-            phase_counts[phase_id]['count'] += row.count
-        
-        for row in subtask_rows:
-            phase_id = str(row.id)
-            if phase_id not in phase_counts:
-                phase_counts[phase_id] = {
-                    'phase': row.name,
-                    'color': row.color,
-                    'count': 0
-                }
-            phase_counts[phase_id]['count'] += row.count
-        
-        # Convert to list and sort by count descending
-        distribution = list(phase_counts.values())
-        distribution.sort(key=lambda x: x['count'], reverse=True)
-        
-        return distribution
+        statistics = await self._get_rollup_statistics(entity_type, entity_id)
+        return statistics["phase_distribution"] or []
     
     async def _get_descendant_task_ids(
         self,
@@ -1267,82 +1266,11 @@ class HierarchyService:
             # Subtasks have no tasks under them
             return []
         
-        elif entity_type_lower == 'userstory':
-            # Get tasks directly under this user story
-            query = select(Task.id).where(
-                Task.user_story_id == entity_id,
-                Task.is_deleted == False
-            )
-            result = await self.db.execute(query)
-            return [row[0] for row in result.all()]
-        
-        elif entity_type_lower == 'usecase':
-            # Get tasks through user stories
-            query = select(Task.id).join(
-                UserStory, Task.user_story_id == UserStory.id
-            ).where(
-                UserStory.usecase_id == entity_id,
-                UserStory.is_deleted == False,
-                Task.is_deleted == False
-            )
-            result = await self.db.execute(query)
-            return [row[0] for row in result.all()]
-        
-        elif entity_type_lower == 'project':
-            # Get tasks through usecases and user stories
-            query = select(Task.id).join(
-                UserStory, Task.user_story_id == UserStory.id
-            ).join(
-                Usecase, UserStory.usecase_id == Usecase.id
-            ).where(
-                Usecase.project_id == entity_id,
-                Usecase.is_deleted == False,
-                UserStory.is_deleted == False,
-                Task.is_deleted == False
-            )
-            result = await self.db.execute(query)
-            return [row[0] for row in result.all()]
-        
-        elif entity_type_lower == 'program':
-            # Get tasks through projects, usecases, and user stories
-            query = select(Task.id).join(
-                UserStory, Task.user_story_id == UserStory.id
-            ).join(
-                Usecase, UserStory.usecase_id == Usecase.id
-            ).join(
-                Project, Usecase.project_id == Project.id
-            ).where(
-                Project.program_id == entity_id,
-                Project.is_deleted == False,
-                Usecase.is_deleted == False,
-                UserStory.is_deleted == False,
-                Task.is_deleted == False
-            )
-            result = await self.db.execute(query)
-            return [row[0] for row in result.all()]
-        
-        elif entity_type_lower == 'client':
-            # Get tasks through programs, projects, usecases, and user stories
-            query = select(Task.id).join(
-                UserStory, Task.user_story_id == UserStory.id
-            ).join(
-                Usecase, UserStory.usecase_id == Usecase.id
-            ).join(
-                Project, Usecase.project_id == Project.id
-            ).join(
-                Program, Project.program_id == Program.id
-            ).where(
-                Program.client_id == entity_id,
-                Program.is_deleted == False,
-                Project.is_deleted == False,
-                Usecase.is_deleted == False,
-                UserStory.is_deleted == False,
-                Task.is_deleted == False
-            )
-            result = await self.db.execute(query)
-            return [row[0] for row in result.all()]
+        elif entity_type_lower not in ENTITY_TYPES:
+            return []
         
-        return []
+        # Tasks anywhere below the entity, from the closure table
+        return await self.closure.descendants(entity_type_lower, entity_id, descendant_type='task')
     
     async def _get_rollup_counts(
         self,
@@ -1354,293 +1282,28 @@ class HierarchyService:
         
         Requirements: 8.2, 25.1, 25.2
         """
-        from sqlalchemy import func
-        
         entity_type_lower = entity_type.lower()
-        counts = {}
-        
-        if entity_type_lower == 'client':
-            # Count programs
-            program_query = select(func.count(Program.id)).where(
-                Program.client_id == entity_id,
-                Program.is_deleted == False
-            )
-            program_result = await self.db.execute(program_query)
-            counts['programs'] = program_result.scalar() or 0
-            
-            # Count projects
-            project_query = select(func.count(Project.id)).join(
-                Program, Project.program_id == Program.id
-            ).where(
-                Program.client_id == entity_id,
-                Program.is_deleted == False,
-                Project.is_deleted == False
-            )
-            project_result = await self.db.execute(project_query)
-            counts['projects'] = project_result.scalar() or 0
-            
-            # Count usecases
-            usecase_query = select(func.count(Usecase.id)).join(
-                Project, Usecase.project_id == Project.id
-            ).join(
-                Program, Project.program_id == Program.id
-            ).where(
-                Program.client_id == entity_id,
-                Program.is_deleted == False,
-                Project.is_deleted == False,
-                Usecase.is_deleted == False
-            )
-            usecase_result = await self.db.execute(usecase_query)
-            counts['usecases'] = usecase_result.scalar() or 0
-            
-            # Count user stories
-            story_query = select(func.count(UserStory.id)).join(
-                Usecase, UserStory.usecase_id == Usecase.id
-            ).join(
-                Project, Usecase.project_id == Project.id
-            ).join(
-                Program, Project.program_id == Program.id
-            ).where(
-                Program.client_id == entity_id,
-                Program.is_deleted == False,
-                Project.is_deleted == False,
-                Usecase.is_deleted == False,
-                UserStory.is_deleted == False
-            )
-            story_result = await self.db.execute(story_query)
-            counts['user_stories'] = story_result.scalar() or 0
-            
-            # Count tasks
-            task_query = select(func.count(Task.id)).join(
-                UserStory, Task.user_story_id == UserStory.id
-            ).join(
-                Usecase, UserStory.usecase_id == Usecase.id
-            ).join(
-                Project, Usecase.project_id == Project.id
-            ).join(
-                Program, Project.program_id == Program.id
-            ).where(
-                Program.client_id == entity_id,
-                Program.is_deleted == False,
-                Project.is_deleted == False,
-                Usecase.is_deleted == False,
-                UserStory.is_deleted == False,
-                Task.is_deleted == False
-            )
-            task_result = await self.db.execute(task_query)
-            counts['tasks'] = task_result.scalar() or 0
-            
-            # Count subtasks
-            subtask_query = select(func.count(Subtask.id)).join(
-                Task, Subtask.task_id == Task.id
-            ).join(
-                UserStory, Task.user_story_id == UserStory.id
-            ).join(
-                Usecase, UserStory.usecase_id == Usecase.id
-            ).join(
-                Project, Usecase.project_id == Project.id
-            ).join(
-                Program, Project.program_id == Program.id
-            ).where(
-                Program.client_id == entity_id,
-                Program.is_deleted == False,
-                Project.is_deleted == False,
-                Usecase.is_deleted == False,
-                UserStory.is_deleted == False,
-                Task.is_deleted == False,
-                Subtask.is_deleted == False
-            )
-            subtask_result = await self.db.execute(subtask_query)
-            counts['subtasks'] = subtask_result.scalar() or 0
-        
-        elif entity_type_lower == 'program':
-            # Count projects
-            project_query = select(func.count(Project.id)).where(
-                Project.program_id == entity_id,
-                Project.is_deleted == False
-            )
-            project_result = await self.db.execute(project_query)
-            counts['projects'] = project_result.scalar() or 0
-            
-            # Count usecases
-            usecase_query = select(func.count(Usecase.id)).join(
-                Project, Usecase.project_id == Project.id
-            ).where(
-                Project.program_id == entity_id,
-                Project.is_deleted == False,
-                Usecase.is_deleted == False
-            )
-            usecase_result = await self.db.execute(usecase_query)
-            counts['usecases'] = usecase_result.scalar() or 0
-            
-            # Count user stories
-            story_query = select(func.count(UserStory.id)).join(
-                Usecase, UserStory.usecase_id == Usecase.id
-            ).join(
-                Project, Usecase.project_id == Project.id
-            ).where(
-                Project.program_id == entity_id,
-                Project.is_deleted == False,
-                Usecase.is_deleted == False,
-                UserStory.is_deleted == False
-            )
-            story_result = await self.db.execute(story_query)
-            counts['user_stories'] = story_result.scalar() or 0
-            
-            # Count tasks
-            task_query = select(func.count(Task.id)).join(
-                UserStory, Task.user_story_id == UserStory.id
-            ).join(
-                Usecase, UserStory.usecase_id == Usecase.id
-            ).join(
-                Project, Usecase.project_id == Project.id
-            ).where(
-                Project.program_id == entity_id,
-                Project.is_deleted == False,
-                Usecase.is_deleted == False,
-                UserStory.is_deleted == False,
-                Task.is_deleted == False
-            )
-            task_result = await self.db.execute(task_query)
-            counts['tasks'] = task_result.scalar() or 0
-            
-            # Count subtasks
-            subtask_query = select(func.count(Subtask.id)).join(
-                Task, Subtask.task_id == Task.id
-            ).join(
-                UserStory, Task.user_story_id == UserStory.id
-            ).join(
-                Usecase, UserStory.usecase_id == Usecase.id
-            ).join(
-                Project, Usecase.project_id == Project.id
-            ).where(
-                Project.program_id == entity_id,
-                Project.is_deleted == False,
-                Usecase.is_deleted == False,
-                UserStory.is_deleted == False,
-                Task.is_deleted == False,
-                Subtask.is_deleted == False
-            )
-            subtask_result = await self.db.execute(subtask_query)
-            counts['subtasks'] = subtask_result.scalar() or 0
-        
-        elif entity_type_lower == 'project':
-            # Count usecases
-            usecase_query = select(func.count(Usecase.id)).where(
-                Usecase.project_id == entity_id,
-                Usecase.is_deleted == False
-            )
-            usecase_result = await self.db.execute(usecase_query)
-            counts['usecases'] = usecase_result.scalar() or 0
-            
-            # Count user stories
-            story_query = select(func.count(UserStory.id)).join(
-                Usecase, UserStory.usecase_id == Usecase.id
-            ).where(
-                Usecase.project_id == entity_id,
-                Usecase.is_deleted == False,
-                UserStory.is_deleted == False
-            )
-            story_result = await self.db.execute(story_query)
-            counts['user_stories'] = story_result.scalar() or 0
-            
-            # Count tasks
-            task_query = select(func.count(Task.id)).join(
-                UserStory, Task.user_story_id == UserStory.id
-            ).join(
-                Usecase, UserStory.usecase_id == Usecase.id
-            ).where(
-                Usecase.project_id == entity_id,
-                Usecase.is_deleted == False,
-                UserStory.is_deleted == False,
-                Task.is_deleted == False
-            )
-            task_result = await self.db.execute(task_query)
-            counts['tasks'] = task_result.scalar() or 0
-            
-            # Count subtasks
-            subtask_query = select(func.count(Subtask.id)).join(
-                Task, Subtask.task_id == Task.id
-            ).join(
-                UserStory, Task.user_story_id == UserStory.id
-            ).join(
-                Usecase, UserStory.usecase_id == Usecase.id
-            ).where(
-                Usecase.project_id == entity_id,
-                Usecase.is_deleted == False,
-                UserStory.is_deleted == False,
-                Task.is_deleted == False,
-                Subtask.is_deleted == False
-            )
-            subtask_result = await self.db.execute(subtask_query)
-            counts['subtasks'] = subtask_result.scalar() or 0
-        
-        elif entity_type_lower == 'usecase':
-            # Count user stories
-            story_query = select(func.count(UserStory.id)).where(
-                UserStory.usecase_id == entity_id,
-                UserStory.is_deleted == False
-            )
-            story_result = await self.db.execute(story_query)
-            counts['user_stories'] = story_result.scalar() or 0
-            
-            # Count tasks
-            task_query = select(func.count(Task.id)).join(
-                UserStory, Task.user_story_id == UserStory.id
-            ).where(
-                UserStory.usecase_id == entity_id,
-                UserStory.is_deleted == False,
-                Task.is_deleted == False
-            )
-            task_result = await self.db.execute(task_query)
-            counts['tasks'] = task_result.scalar() or 0
-            
-            # Count subtasks
-            subtask_query = select(func.count(Subtask.id)).join(
-                Task, Subtask.task_id == Task.id
-            ).join(
-                UserStory, Task.user_story_id == UserStory.id
-            ).where(
-                UserStory.usecase_id == entity_id,
-                UserStory.is_deleted == False,
-                Task.is_deleted == False,
-                Subtask.is_deleted == False
-            )
-            subtask_result = await self.db.execute(subtask_query)
-            counts['subtasks'] = subtask_result.scalar() or 0
-        
-        elif entity_type_lower == 'userstory':
-            # Count tasks
-            task_query = select(func.count(Task.id)).where(
-                Task.user_story_id == entity_id,
-                Task.is_deleted == False
-            )
-            task_result = await self.db.execute(task_query)
-            counts['tasks'] = task_result.scalar() or 0
-            
-            # Count subtasks
-            subtask_query = select(func.count(Subtask.id)).join(
-                Task, Subtask.task_id == Task.id
-            ).where(
-                Task.user_story_id == entity_id,
-                Task.is_deleted == False,
-                Subtask.is_deleted == False
-            )
-            subtask_result = await self.db.execute(subtask_query)
-            counts['subtasks'] = subtask_result.scalar() or 0
-        
-        elif entity_type_lower == 'task':
-            # Count subtasks
-            subtask_query = select(func.count(Subtask.id)).where(
-                Subtask.task_id == entity_id,
-                Subtask.is_deleted == False
-            )
-            subtask_result = await self.db.execute(subtask_query)
-            counts['subtasks'] = subtask_result.scalar() or 0
         
         # Subtask has no children
+        if entity_type_lower not in ENTITY_TYPES or entity_type_lower == 'subtask':
+            return {}
         
-        return counts
+        statistics = await self._get_rollup_statistics(entity_type_lower, entity_id)
+        return statistics["rollup_counts"]
+    
+    async def _get_rollup_statistics(
+        self,
+        entity_type: str,
+        entity_id: str
+    ) -> Dict[str, Any]:
+        """
+        Get status counts, per-level counts and phase distribution for an
+        entity from a single grouped query, memoized for this service instance.
+        """
+        key = (entity_type.lower(), entity_id)
+        if key not in self._rollup_memo:
+            self._rollup_memo[key] = await self.rollups.get_statistics(*key)
+        return self._rollup_memo[key]
     
     async def _verify_entity_access(
         self,
@@ -1711,8 +1374,6 @@ class HierarchyService:
         Returns:
             Dictionary containing search results with pagination info
         """
-        from sqlalchemy import or_, func
-        
         # Define entity types to search (default to all)
         types_to_search = entity_types or [
             'client', 'program', 'project', 'usecase', 'userstory', 'task', 'subtask'
@@ -1721,29 +1382,56 @@ class HierarchyService:
         # Normalize entity types to lowercase
         types_to_search = [t.lower() for t in types_to_search]
         
-        all_results = []
-        
-        # Search each entity type
+        # One ranked branch per entity type, combined into a single UNION ALL
+        branches = []
         for entity_type in types_to_search:
-            entity_results = await self._search_entity_type(
-                entity_type, 
-                query, 
-                current_user
-            )
-            all_results.extend(entity_results)
-        
-        # Calculate pagination
-        total_results = len(all_results)
-        start_idx = (page - 1) * page_size
-        end_idx = start_idx + page_size
-        paginated_results = all_results[start_idx:end_idx]
+            branch = await self._search_entity_type(entity_type, query, current_user)
+            if branch is not None:
+                branches.append(branch)
+        
+        total_results = 0
+        paginated_results = []
+        
+        if branches:
+            matches = union_all(*branches).subquery('matches')
+            search_query = select(
+                matches,
+                func.count().over().label('total_count')
+            ).order_by(
+                matches.c.rank.desc(),
+                matches.c.entity_type,
+                matches.c.id
+            ).limit(page_size).offset((page - 1) * page_size)
+            
+            result = await self.db.execute(search_query)
+            rows = result.all()
+            
+            if rows:
+                total_results = rows[0].total_count
+            elif page > 1:
+                # Past the last page: the window count is unavailable
+                count_result = await self.db.execute(
+                    select(func.count()).select_from(matches)
+                )
+                total_results = count_result.scalar() or 0
+            
+            paginated_results = [
+                {
+                    "entity_type": row.entity_type,
+                    "id": str(row.id),
+                    "name": row.name,
+                    "status": row.status,
+                    "description": row.description
+                }
+                for row in rows
+            ]
         
-        # Generate hierarchy paths for paginated results
+        # Generate hierarchy paths for the page in one query
+        hierarchy_paths = await self._generate_hierarchy_paths(
+            [(result['entity_type'], result['id']) for result in paginated_results]
+        )
         for result in paginated_results:
-            result['hierarchy_path'] = await self._generate_hierarchy_path(
-                result['entity_type'],
-                result['id']
-            )
+            result['hierarchy_path'] = hierarchy_paths.get(result['id'], "")
         
         return {
             "results": paginated_results,
@@ -1758,14 +1446,16 @@ class HierarchyService:
         entity_type: str,
         query: str,
         current_user: User
-    ) -> list[Dict[str, Any]]:
+    ):
         """
-        Search a specific entity type.
+        Build the ranked search query for a specific entity type.
+        
+        Matches the generated search_vector (GIN indexed, prefix terms) plus
+        trigram similarity and substring matches on the name (pg_trgm indexed).
+        Returns None for unknown entity types.
         
         Requirements: 2.1, 2.2, 6.1, 6.2
         """
-        from sqlalchemy import or_
-        
         # Map entity type to model
         model_mapping = {
             'client': Client,
@@ -1778,28 +1468,35 @@ class HierarchyService:
         }
         
         if entity_type not in model_mapping:
-            return []
+            return None
         
         model = model_mapping[entity_type]
         
-        # Build search conditions based on model fields
-        search_conditions = []
-        
-        # Search in name/title field
-        if hasattr(model, 'name'):
-            search_conditions.append(model.name.ilike(f"%{query}%"))
-        elif hasattr(model, 'title'):
-            search_conditions.append(model.title.ilike(f"%{query}%"))
+        # Name substring and typo-tolerant trigram matches
+        search_conditions = [
+            model.name.ilike(f"%{query}%"),
+            model.name.op('%')(query)
+        ]
+        rank = func.similarity(model.name, query)
         
-        # Search in description field if it exists
-        if hasattr(model, 'description'):
-            search_conditions.append(model.description.ilike(f"%{query}%"))
+        # Full-text match on name and descriptions, with prefix terms
+        ts_query_text = _build_prefix_tsquery(query)
+        if ts_query_text:
+            ts_query = func.to_tsquery(cast('english', REGCONFIG), ts_query_text)
+            search_conditions.append(model.search_vector.op('@@')(ts_query))
+            rank = rank + func.ts_rank_cd(model.search_vector, ts_query)
         
-        if not search_conditions:
-            return []
+        status_column = model.status if hasattr(model, 'status') else cast(null(), String)
         
         # Build base query
-        search_query = select(model).where(
+        search_query = select(
+            literal(entity_type).label('entity_type'),
+            model.id.label('id'),
+            model.name.label('name'),
+            status_column.label('status'),
+            model.short_description.label('description'),
+            rank.label('rank')
+        ).where(
             or_(*search_conditions),
             model.is_deleted == False
         )
@@ -1813,23 +1510,7 @@ class HierarchyService:
                 current_user.client_id
             )
         
-        # Execute query
-        result = await self.db.execute(search_query)
-        entities = result.scalars().all()
-        
-        # Convert to result dictionaries
-        results = []
-        for entity in entities:
-            result_dict = {
-                "entity_type": entity_type,
-                "id": str(entity.id),
-                "name": getattr(entity, 'name', None) or getattr(entity, 'title', None),
-                "status": getattr(entity, 'status', None),
-                "description": getattr(entity, 'description', None)
-            }
-            results.append(result_dict)
-        
-        return results
+        return search_query
     
     async def _apply_client_filter(
         self,
@@ -1848,82 +1529,12 @@ class HierarchyService:
         if entity_type_lower == 'client':
             # Filter to user's client only
             query = query.where(model.id == client_id)
-        
-        elif entity_type_lower == 'program':
-            # Filter by client_id
-            query = query.where(model.client_id == client_id)
-        
-        elif entity_type_lower == 'project':
-            # Join with Program to filter by client
-            query = query.join(Program, model.program_id == Program.id).where(
-                Program.client_id == client_id,
-                Program.is_deleted == False
-            )
-        
-        elif entity_type_lower == 'usecase':
-            # Join with Project and Program to filter by client
-            query = query.join(
-                Project, model.project_id == Project.id
-            ).join(
-                Program, Project.program_id == Program.id
-            ).where(
-                Program.client_id == client_id,
-                Project.is_deleted == False,
-                Program.is_deleted == False
-            )
-        
-        elif entity_type_lower == 'userstory':
-            # Join through Usecase, Project, and Program
-            query = query.join(
-                Usecase, model.usecase_id == Usecase.id
-            ).join(
-                Project, Usecase.project_id == Project.id
-            ).join(
-                Program, Project.program_id == Program.id
-            ).where(
-                Program.client_id == client_id,
-                Usecase.is_deleted == False,
-                Project.is_deleted == False,
-                Program.is_deleted == False
-            )
-        
-        elif entity_type_lower == 'task':
-            # Join through UserStory, Usecase, Project, and Program
-            query = query.join(
-                UserStory, model.user_story_id == UserStory.id
-            ).join(
-                Usecase, UserStory.usecase_id == Usecase.id
-            ).join(
-                Project, Usecase.project_id == Project.id
-            ).join(
-                Program, Project.program_id == Program.id
-            ).where(
-                Program.client_id == client_id,
-                UserStory.is_deleted == False,
-                Usecase.is_deleted == False,
-                Project.is_deleted == False,
-                Program.is_deleted == False
-            )
-        
-        elif entity_type_lower == 'subtask':
-            # Join through Task, UserStory, Usecase, Project, and Program
-            query = query.join(
-                Task, model.task_id == Task.id
-            ).join(
-                UserStory, Task.user_story_id == UserStory.id
-            ).join(
-                Usecase, UserStory.usecase_id == Usecase.id
-            ).join(
-                Project, Usecase.project_id == Project.id
-            ).join(
-                Program, Project.program_id == Program.id
-            ).where(
-                Program.client_id == client_id,
-                Task.is_deleted == False,
-                UserStory.is_deleted == False,
-                Usecase.is_deleted == False,
-                Project.is_deleted == False,
-                Program.is_deleted == False
+        else:
+            # Restrict to entities under the user's client
+            query = query.where(
+                model.id.in_(
+                    self.closure.descendants_query('client', client_id, entity_type_lower)
+                )
             )
         
         return query
@@ -1947,6 +1558,23 @@ class HierarchyService:
         path = " > ".join([item['name'] for item in breadcrumb])
         return path
     
+    async def _generate_hierarchy_paths(
+        self,
+        entities: list[tuple[str, str]]
+    ) -> Dict[str, str]:
+        """
+        Generate hierarchy path strings for many (entity_type, entity_id)
+        pairs, keyed by entity ID.
+        
+        Requirements: 2.3
+        """
+        breadcrumbs = await self._get_breadcrumbs(entities)
+        return {
+            entity_id: " > ".join([item['name'] for item in breadcrumb])
+            for entity_id, breadcrumb in breadcrumbs.items()
+            if breadcrumb
+        }
+    
     async def _get_breadcrumb_for_entity(
         self,
         entity_type: str,
@@ -1957,34 +1585,34 @@ class HierarchyService:
         
         Requirements: 6.1
         """
-        breadcrumb = []
-        current_type = entity_type.lower()
-        current_id = entity_id
+        breadcrumbs = await self._get_breadcrumbs([(entity_type, entity_id)])
+        return breadcrumbs[str(entity_id)]
+    
+    async def _get_breadcrumbs(
+        self,
+        entities: list[tuple[str, str]]
+    ) -> Dict[str, list[Dict[str, str]]]:
+        """
+        Get breadcrumb trails from Client down to each (entity_type, entity_id)
+        pair, keyed by entity ID.
         
-        # Traverse up the hierarchy
-        while current_type and current_id:
-            # Get entity
-            entity = await self._get_entity_by_type(current_type, current_id)
-            
-            if not entity:
-                break
-            
-            # Add to breadcrumb (insert at beginning to maintain order)
-            name = getattr(entity, 'name', None) or getattr(entity, 'title', None)
-            breadcrumb.insert(0, {
-                "type": current_type,
-                "id": str(entity.id),
-                "name": name
-            })
-            
-            # Move to parent
-            parent_info = self._get_parent_info(current_type, entity)
-            if not parent_info:
-                break
-            
-            current_type, current_id = parent_info
+        All trails not already resolved by this service instance are loaded
+        with one closure query; results (including misses, which map to an
+        empty trail) are memoized for the rest of the request.
+        
+        Requirements: 6.1
+        """
+        entity_ids = [str(entity_id) for _, entity_id in entities]
+        missing = list(dict.fromkeys(
+            entity_id for entity_id in entity_ids if entity_id not in self._breadcrumb_memo
+        ))
+        
+        if missing:
+            paths = await self.closure.ancestor_paths(missing)
+            for entity_id in missing:
+                self._breadcrumb_memo[entity_id] = paths.get(entity_id, [])
         
-        return breadcrumb
+        return {entity_id: self._breadcrumb_memo[entity_id] for entity_id in entity_ids}
     
     async def _get_entity_by_type(
         self,
@@ -8,9 +8,10 @@ falls back to LLM for ambiguous queries.
 
 import re
 import logging
-from typing import Optional, List, Dict, Any, Tuple
+from collections import defaultdict
+from typing import Optional, List, Dict, Any, Set, Tuple
 from datetime import datetime, timedelta
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 from app.schemas.chat import IntentType, EntityType
 from app.core.config import settings
@@ -39,19 +40,205 @@ class Intent:
     requires_llm: bool = False
 
 
+@dataclass
+class QueryFeatures:
+    """Vocabulary found in a query by a single scan"""
+    entity_ids: List[Tuple[str, str]] = field(default_factory=list)  # (PATTERNS name, raw text) in query order
+    specific_date: Optional[str] = None  # first explicit date in the query
+    keyword_patterns: Set[Tuple[IntentType, int]] = field(default_factory=set)  # matched INTENT_KEYWORDS entries
+    dates: Set[str] = field(default_factory=set)  # matched relative DATE_PATTERNS names
+    signals: Set[str] = field(default_factory=set)  # SIGNAL_WORDS groups present
+    connectors: Set[str] = field(default_factory=set)  # CLAUSE_CONNECTORS present
+    statuses: Set[str] = field(default_factory=set)
+    priorities: Set[str] = field(default_factory=set)
+
+
+_WORDS = r'[a-z]+(?: [a-z]+)*'
+_WORD_PATTERN = re.compile(rf'\\b(?:\(({_WORDS}(?:\|{_WORDS})*)\)|({_WORDS}))\\b')
+_CAPTURE_PATTERN = re.compile(r'\\b\((.+)\)\\b')
+_ID_NUMBER = re.compile(r'\d+\b')
+
+
+def _is_word_char(char: str) -> bool:
+    """Same test as the \\w class in str patterns"""
+    return char.isalnum() or char == '_'
+
+
+def _trie_regex(node: Dict[str, dict]) -> str:
+    """Regex matching the longest word of a character trie"""
+    branches = [
+        re.escape(char) + _trie_regex(child)
+        for char, child in sorted(node.items()) if char
+    ]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    # Greedy, so longer words are tried before the word ending here
+    return f'(?:{body})?' if '' in node else body
+
+
+class QueryScanner:
+    """
+    Single-pass matcher for the classifier's vocabulary
+    
+    Intent keywords, relative dates, entity ID prefixes, signal words,
+    statuses and priorities are compiled into one trie-shaped alternation,
+    with explicit dates beside it. A lookahead at every position finds the
+    longest term starting there, and each shorter term that is a prefix of
+    it is present too, so overlapping terms ("show me" and "how", "more
+    details" and "details") are all reported as the separate searches did.
+    Word boundaries and entity ID numbers are checked around the match.
+    
+    Expects a normalized query (whitespace collapsed to single spaces).
+    """
+    
+    def __init__(self, classifier: 'IntentClassifier'):
+        """
+        Compile the vocabulary of a classifier
+        
+        Args:
+            classifier: Classifier whose pattern tables are scanned
+        """
+        uses = defaultdict(list)  # term -> [(QueryFeatures field, value, needs word boundaries)]
+        self._unscanned = []  # (QueryFeatures field, value, compiled pattern) searched separately
+        
+        for intent_type, patterns in classifier.INTENT_KEYWORDS.items():
+            for index, pattern in enumerate(patterns):
+                words = self._word_alternatives(pattern)
+                if words is None:
+                    # e.g. anchored patterns; searched on their own
+                    self._unscanned.append(('keyword_patterns', (intent_type, index), re.compile(pattern)))
+                    continue
+                for word in words:
+                    uses[word].append(('keyword_patterns', (intent_type, index), True))
+        
+        for name, pattern in classifier.DATE_PATTERNS.items():
+            if name == 'specific_date':
+                continue
+            words = self._word_alternatives(pattern.pattern)
+            if words is None:
+                self._unscanned.append(('dates', name, pattern))
+                continue
+            for word in words:
+                uses[word].append(('dates', name, True))
+        
+        # Prefix only; the number after it is matched separately
+        for name, prefix in classifier.ENTITY_ID_PREFIXES.items():
+            uses[f'{prefix.lower()}-'].append(('entity_ids', name, True))
+        
+        for group, words in classifier.SIGNAL_WORDS.items():
+            for word in words:
+                uses[word].append(('signals', group, False))
+        for word in classifier.CLAUSE_CONNECTORS:
+            uses[f' {word} '].append(('connectors', word, False))
+        for status in classifier.STATUS_VALUES:
+            uses[status].append(('statuses', status, False))
+        for priority in classifier.PRIORITY_VALUES:
+            uses[priority].append(('priorities', priority, False))
+        
+        # Every term present at a position is a prefix of the longest one
+        self._terms = {
+            term: [
+                (len(prefix), kind, value, bounded)
+                for prefix in uses if term.startswith(prefix)
+                for kind, value, bounded in uses[prefix]
+            ]
+            for term in uses
+        }
+        
+        trie = {}
+        for term in uses:
+            node = trie
+            for char in term:
+                node = node.setdefault(char, {})
+            node[''] = {}
+        
+        date_pattern = classifier.DATE_PATTERNS['specific_date']
+        match = _CAPTURE_PATTERN.fullmatch(date_pattern.pattern)
+        if match is None:
+            raise ValueError("DATE_PATTERNS['specific_date'] must have the form \\b(...)\\b")
+        
+        # Dates start with a digit and terms never do, so at most one matches
+        self._pattern = re.compile(
+            r'(?=\b(?P<date>' + match.group(1) + r')\b|(?P<term>' + _trie_regex(trie) + '))'
+        )
+    
+    @staticmethod
+    def _word_alternatives(pattern: str) -> Optional[List[str]]:
+        """Words of a \\b(word|word)\\b pattern, or None for any other pattern"""
+        match = _WORD_PATTERN.fullmatch(pattern.replace(r'\s+', ' '))
+        if match is None:
+            return None
+        return (match.group(1) or match.group(2)).split('|')
+    
+    def scan(self, query: str) -> QueryFeatures:
+        """
+        Find the vocabulary in a query
+        
+        Args:
+            query: Normalized query string
+            
+        Returns:
+            QueryFeatures for the query
+        """
+        features = QueryFeatures()
+        text = query.lower()
+        positions = None
+        if len(text) != len(query):
+            # lower() expanded some characters; map spans back to the query
+            positions = [index for index, char in enumerate(query) for _ in char.lower()]
+            positions.append(len(query))
+        
+        for match in self._pattern.finditer(text):
+            start = match.start()
+            term = match.group('term')
+            if term is None:
+                if features.specific_date is None:
+                    features.specific_date = match.group('date')
+                continue
+            
+            starts_word = start == 0 or not _is_word_char(text[start - 1])
+            for length, kind, value, bounded in self._terms[term]:
+                if bounded and not starts_word:
+                    continue
+                end = start + length
+                if kind == 'entity_ids':
+                    number = _ID_NUMBER.match(text, end)
+                    if number:
+                        id_start, id_end = start, number.end()
+                        if positions:
+                            id_start, id_end = positions[id_start], positions[id_end]
+                        features.entity_ids.append((value, query[id_start:id_end]))
+                    continue
+                if bounded and end < len(text) and _is_word_char(text[end]):
+                    continue
+                getattr(features, kind).add(value)
+        
+        for kind, value, pattern in self._unscanned:
+            if pattern.search(query if kind == 'dates' else text):
+                getattr(features, kind).add(value)
+        
+        return features
+
 class IntentClassifier:
     """Service for classifying user intents and extracting entities"""
     
+    # Entity ID prefixes
+    ENTITY_ID_PREFIXES = {
+        'project_id': 'PRJ',
+        'task_id': 'TSK',
+        'subtask_id': 'SUB',
+        'bug_id': 'BUG',
+        'story_id': 'STY',
+        'usecase_id': 'USC',
+        'test_case_id': 'TST',
+        'program_id': 'PRG',
+    }
+    
     # Entity ID patterns
     PATTERNS = {
-        'project_id': re.compile(r'\b(PRJ-\d+)\b', re.IGNORECASE),
-        'task_id': re.compile(r'\b(TSK-\d+)\b', re.IGNORECASE),
-        'subtask_id': re.compile(r'\b(SUB-\d+)\b', re.IGNORECASE),
-        'bug_id': re.compile(r'\b(BUG-\d+)\b', re.IGNORECASE),
-        'story_id': re.compile(r'\b(STY-\d+)\b', re.IGNORECASE),
-        'usecase_id': re.compile(r'\b(USC-\d+)\b', re.IGNORECASE),
-        'test_case_id': re.compile(r'\b(TST-\d+)\b', re.IGNORECASE),
-        'program_id': re.compile(r'\b(PRG-\d+)\b', re.IGNORECASE),
+        name: re.compile(rf'\b({prefix}-\d+)\b', re.IGNORECASE)
+        for name, prefix in ENTITY_ID_PREFIXES.items()
     }
     
     # Date patterns
@@ -105,9 +292,33 @@ class IntentClassifier:
     # Priority values
     PRIORITY_VALUES = ['low', 'medium', 'high', 'critical', 'urgent']
     
+    # Substring cues for intent scoring and complexity checks
+    SIGNAL_WORDS = {
+        'navigation': ['open', 'view', 'show me', 'go to', 'navigate'],
+        'action': ['set', 'create', 'add', 'update', 'change', 'assign', 'link', 'remind'],
+        'question': ['what', 'which', 'who', 'when', 'where', 'how'],
+        'listing': ['show', 'list', 'find', 'get', 'display'],
+        'report': ['report', 'summary', 'statistics', 'distribution', 'breakdown', 'trend'],
+        'aggregate': ['count', 'total', 'average', 'sum', 'how many'],
+        'clarification': ['yes', 'no', 'what', 'huh', 'ok', 'yeah'],
+        'pronoun': ['it', 'this', 'that', 'them'],
+        'conditional': ['if', 'when', 'unless', 'provided that'],
+        'comparison': ['compare', 'difference', 'versus', 'vs', 'better'],
+    }
+    
+    # Words joining clauses of a complex query
+    CLAUSE_CONNECTORS = ['and', 'or', 'but', 'however', 'also', 'additionally']
+    
+    # Entity name patterns (quoted strings)
+    NAME_PATTERNS = [
+        re.compile(r'"([^"]+)"'),
+        re.compile(r"'([^']+)'"),
+    ]
+    
     def __init__(self):
         """Initialize the intent classifier"""
         self.llm_service = None  # Will be injected when LLM service is available
+        self.scanner = QueryScanner(self)
     
     def set_llm_service(self, llm_service):
         """Set LLM service for fallback classification"""
@@ -131,21 +342,25 @@ class IntentClassifier:
         # Normalize query
         normalized_query = self._normalize_query(query)
         
+        # Find keywords, entity IDs, dates, statuses and priorities in one pass
+        features = self.scanner.scan(normalized_query)
+        
         # Extract entities
-        entities = self._extract_entities(normalized_query)
+        entities = self._extract_entities(normalized_query, features)
         
         # Extract temporal context
-        temporal_context = self._extract_temporal_context(normalized_query)
+        temporal_context = self._extract_temporal_context(normalized_query, features)
         
         # Classify intent type
         intent_type, confidence = self._classify_intent_type(
             normalized_query,
             entities,
-            context
+            context,
+            features
         )
         
         # Determine if LLM fallback is needed
-        requires_llm = confidence < 0.7 or self._is_complex_query(normalized_query)
+        requires_llm = confidence < 0.7 or self._is_complex_query(normalized_query, features)
         
         intent = Intent(
             intent_type=intent_type,
@@ -187,16 +402,24 @@ class IntentClassifier:
         
         return normalized
     
-    def _extract_entities(self, query: str) -> List[ExtractedEntity]:
+    def _extract_entities(
+        self,
+        query: str,
+        features: Optional[QueryFeatures] = None
+    ) -> List[ExtractedEntity]:
         """
         Extract entities from query using regex patterns
         
         Args:
             query: Normalized query string
+            features: Scan of the query, if already done
             
         Returns:
             List of extracted entities
         """
+        if features is None:
+            features = self.scanner.scan(query)
+        
         entities = []
         
         # Extract entity IDs
@@ -211,26 +434,20 @@ class IntentClassifier:
             'program_id': EntityType.PROGRAM,
         }
         
-        for pattern_name, pattern in self.PATTERNS.items():
-            matches = pattern.findall(query)
-            if matches:
-                entity_type = entity_type_map.get(pattern_name)
-                if entity_type:
-                    for match in matches:
-                        entities.append(ExtractedEntity(
-                            entity_type=entity_type,
-                            entity_id=match.upper(),
-                            raw_text=match
-                        ))
+        # Grouped by type in PATTERNS order, then by position
+        pattern_order = list(self.PATTERNS)
+        for pattern_name, match in sorted(features.entity_ids, key=lambda item: pattern_order.index(item[0])):
+            entity_type = entity_type_map.get(pattern_name)
+            if entity_type:
+                entities.append(ExtractedEntity(
+                    entity_type=entity_type,
+                    entity_id=match.upper(),
+                    raw_text=match
+                ))
         
         # Extract entity names (quoted strings or capitalized phrases)
         # e.g., "Project Alpha" or Project Alpha
-        name_patterns = [
-            re.compile(r'"([^"]+)"'),  # Quoted strings
-            re.compile(r"'([^']+)'"),  # Single quoted strings
-        ]
-        
-        for pattern in name_patterns:
+        for pattern in self.NAME_PATTERNS:
             matches = pattern.findall(query)
             for match in matches:
                 # Try to infer entity type from context
@@ -242,19 +459,8 @@ class IntentClassifier:
                         raw_text=match
                     ))
         
-        # Extract status values
-        query_lower = query.lower()
-        for status in self.STATUS_VALUES:
-            if status in query_lower:
-                # Status is metadata, not a primary entity
-                # We'll include it in temporal_context instead
-                pass
-        
-        # Extract priority values
-        for priority in self.PRIORITY_VALUES:
-            if priority in query_lower:
-                # Priority is metadata, not a primary entity
-                pass
+        # Status and priority values are metadata, not primary entities;
+        # they go into temporal_context instead
         
         return entities
     
@@ -305,39 +511,48 @@ class IntentClassifier:
         
         return None
     
-    def _extract_temporal_context(self, query: str) -> Dict[str, Any]:
+    def _extract_temporal_context(
+        self,
+        query: str,
+        features: Optional[QueryFeatures] = None
+    ) -> Dict[str, Any]:
         """
         Extract temporal information from query
         
         Args:
             query: Normalized query string
+            features: Scan of the query, if already done
             
         Returns:
             Dictionary with temporal context
         """
+        if features is None:
+            features = self.scanner.scan(query)
+        
+        dates = features.dates
         temporal_context = {}
         
         # Check for relative dates
         today = datetime.now().date()
         
-        if self.DATE_PATTERNS['today'].search(query):
+        if 'today' in dates:
             temporal_context['date_filter'] = 'today'
             temporal_context['start_date'] = today
             temporal_context['end_date'] = today
         
-        elif self.DATE_PATTERNS['tomorrow'].search(query):
+        elif 'tomorrow' in dates:
             tomorrow = today + timedelta(days=1)
             temporal_context['date_filter'] = 'tomorrow'
             temporal_context['start_date'] = tomorrow
             temporal_context['end_date'] = tomorrow
         
-        elif self.DATE_PATTERNS['yesterday'].search(query):
+        elif 'yesterday' in dates:
             yesterday = today - timedelta(days=1)
             temporal_context['date_filter'] = 'yesterday'
             temporal_context['start_date'] = yesterday
             temporal_context['end_date'] = yesterday
         
-        elif self.DATE_PATTERNS['this_week'].search(query):
+        elif 'this_week' in dates:
             # Start of week (Monday)
             start_of_week = today - timedelta(days=today.weekday())
             end_of_week = start_of_week + timedelta(days=6)
@@ -345,21 +560,21 @@ class IntentClassifier:
             temporal_context['start_date'] = start_of_week
             temporal_context['end_date'] = end_of_week
         
-        elif self.DATE_PATTERNS['last_week'].search(query):
+        elif 'last_week' in dates:
             start_of_last_week = today - timedelta(days=today.weekday() + 7)
             end_of_last_week = start_of_last_week + timedelta(days=6)
             temporal_context['date_filter'] = 'last_week'
             temporal_context['start_date'] = start_of_last_week
             temporal_context['end_date'] = end_of_last_week
         
-        elif self.DATE_PATTERNS['next_week'].search(query):
+        elif 'next_week' in dates:
             start_of_next_week = today + timedelta(days=(7 - today.weekday()))
             end_of_next_week = start_of_next_week + timedelta(days=6)
             temporal_context['date_filter'] = 'next_week'
             temporal_context['start_date'] = start_of_next_week
             temporal_context['end_date'] = end_of_next_week
         
-        elif self.DATE_PATTERNS['this_month'].search(query):
+        elif 'this_month' in dates:
             start_of_month = today.replace(day=1)
             # Last day of month
             if today.month == 12:
@@ -370,7 +585,7 @@ class IntentClassifier:
             temporal_context['start_date'] = start_of_month
             temporal_context['end_date'] = end_of_month
         
-        elif self.DATE_PATTERNS['last_month'].search(query):
+        elif 'last_month' in dates:
             if today.month == 1:
                 start_of_last_month = today.replace(year=today.year - 1, month=12, day=1)
             else:
@@ -381,9 +596,8 @@ class IntentClassifier:
             temporal_context['end_date'] = end_of_last_month
         
         # Check for specific dates
-        specific_date_match = self.DATE_PATTERNS['specific_date'].search(query)
-        if specific_date_match:
-            date_str = specific_date_match.group(1)
+        date_str = features.specific_date
+        if date_str:
             try:
                 # Try different date formats
                 for fmt in ['%Y-%m-%d', '%m-%d-%Y', '%d-%m-%Y', '%Y/%m/%d', '%m/%d/%Y', '%d/%m/%Y']:
@@ -398,16 +612,15 @@ class IntentClassifier:
             except Exception as e:
                 logger.warning(f"Failed to parse date '{date_str}': {e}")
         
-        # Extract status filter
-        query_lower = query.lower()
+        # Extract status filter (first in STATUS_VALUES order)
         for status in self.STATUS_VALUES:
-            if status in query_lower:
+            if status in features.statuses:
                 temporal_context['status_filter'] = status
                 break
         
         # Extract priority filter
         for priority in self.PRIORITY_VALUES:
-            if priority in query_lower:
+            if priority in features.priorities:
                 temporal_context['priority_filter'] = priority
                 break
         
@@ -417,7 +630,8 @@ class IntentClassifier:
         self,
         query: str,
         entities: List[ExtractedEntity],
-        context: Optional[Dict[str, Any]] = None
+        context: Optional[Dict[str, Any]] = None,
+        features: Optional[QueryFeatures] = None
     ) -> Tuple[IntentType, float]:
         """
         Classify the intent type of the query
@@ -426,55 +640,52 @@ class IntentClassifier:
             query: Normalized query string
             entities: Extracted entities
             context: Optional conversation context
+            features: Scan of the query, if already done
             
         Returns:
             Tuple of (IntentType, confidence_score)
         """
-        query_lower = query.lower()
+        if features is None:
+            features = self.scanner.scan(query)
+        
+        signals = features.signals
         scores = {intent_type: 0.0 for intent_type in IntentType}
         
         # Score based on keyword patterns
         for intent_type, patterns in self.INTENT_KEYWORDS.items():
-            for pattern in patterns:
-                if re.search(pattern, query_lower):
+            for index in range(len(patterns)):
+                if (intent_type, index) in features.keyword_patterns:
                     scores[intent_type] += 0.3
         
         # Adjust scores based on entities and structure
         
         # NAVIGATION: Single entity with "open", "view", "show me"
-        if len(entities) == 1 and any(
-            word in query_lower for word in ['open', 'view', 'show me', 'go to', 'navigate']
-        ):
+        if len(entities) == 1 and 'navigation' in signals:
             scores[IntentType.NAVIGATION] += 0.5
         
         # ACTION: Contains action verbs and specific entities
-        action_verbs = ['set', 'create', 'add', 'update', 'change', 'assign', 'link', 'remind']
-        if any(verb in query_lower for verb in action_verbs):
+        if 'action' in signals:
             scores[IntentType.ACTION] += 0.4
             if entities:
                 scores[IntentType.ACTION] += 0.2
         
         # QUERY: Question words or list/show commands
-        question_words = ['what', 'which', 'who', 'when', 'where', 'how']
-        if any(word in query_lower for word in question_words):
+        if 'question' in signals:
             scores[IntentType.QUERY] += 0.4
         
-        if any(word in query_lower for word in ['show', 'list', 'find', 'get', 'display']):
+        if 'listing' in signals:
             scores[IntentType.QUERY] += 0.3
         
         # REPORT: Aggregate or analytical queries
-        report_keywords = ['report', 'summary', 'statistics', 'distribution', 'breakdown', 'trend']
-        if any(keyword in query_lower for keyword in report_keywords):
+        if 'report' in signals:
             scores[IntentType.REPORT] += 0.5
         
         # Check for aggregate functions
-        if any(word in query_lower for word in ['count', 'total', 'average', 'sum', 'how many']):
+        if 'aggregate' in signals:
             scores[IntentType.REPORT] += 0.3
         
         # CLARIFICATION: Very short queries or yes/no responses
-        if len(query.split()) <= 3 and any(
-            word in query_lower for word in ['yes', 'no', 'what', 'huh', 'ok', 'yeah']
-        ):
+        if len(query.split()) <= 3 and 'clarification' in signals:
             scores[IntentType.CLARIFICATION] += 0.5
         
         # Context-based adjustments
@@ -486,9 +697,7 @@ class IntentClassifier:
                 scores[IntentType.CLARIFICATION] -= 0.3
             
             # If we have mentioned entities in context and query uses pronouns
-            if context.get('mentioned_entities') and any(
-                pronoun in query_lower for pronoun in ['it', 'this', 'that', 'them']
-            ):
+            if context.get('mentioned_entities') and 'pronoun' in signals:
                 # Likely continuing previous conversation
                 if last_intent:
                     scores[last_intent] += 0.2
@@ -509,12 +718,17 @@ class IntentClassifier:
         
         return best_intent, confidence
     
-    def _is_complex_query(self, query: str) -> bool:
+    def _is_complex_query(
+        self,
+        query: str,
+        features: Optional[QueryFeatures] = None
+    ) -> bool:
         """
         Determine if query is complex and requires LLM processing
         
         Args:
             query: Normalized query string
+            features: Scan of the query, if already done
             
         Returns:
             True if query is complex, False otherwise
@@ -523,10 +737,11 @@ class IntentClassifier:
         if len(query.split()) > 20:
             return True
         
+        if features is None:
+            features = self.scanner.scan(query)
+        
         # Multiple clauses (and, or, but)
-        clause_connectors = ['and', 'or', 'but', 'however', 'also', 'additionally']
-        connector_count = sum(1 for word in clause_connectors if f' {word} ' in query.lower())
-        if connector_count >= 2:
+        if len(features.connectors) >= 2:
             return True
         
         # Nested questions
@@ -534,11 +749,11 @@ class IntentClassifier:
             return True
         
         # Conditional statements
-        if any(word in query.lower() for word in ['if', 'when', 'unless', 'provided that']):
+        if 'conditional' in features.signals:
             return True
         
         # Comparison queries
-        if any(word in query.lower() for word in ['compare', 'difference', 'versus', 'vs', 'better']):
+        if 'comparison' in features.signals:
             return True
         
         return False
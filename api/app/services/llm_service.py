@@ -7,10 +7,8 @@ for generating natural language responses based on retrieved data.
 
 import logging
 import asyncio
-import json
-from typing import Optional, Dict, Any, List, Tuple
+from typing import Optional, Dict, Any, List, Tuple, AsyncIterator
 from datetime import datetime
-import tiktoken
 from openai import AsyncOpenAI, APIError, APITimeoutError, RateLimitError
 
 from app.core.config import settings
@@ -23,6 +21,8 @@ from app.schemas.chat import (
     DataTable
 )
 from app.services.chat_metrics import get_chat_metrics
+from app.services.chat_cache import get_chat_response_cache
+from app.services.prompt_builder import PromptBuilder, get_encoding
 
 logger = logging.getLogger(__name__)
 
@@ -39,14 +39,11 @@ class LLMService:
         self.timeout = settings.LLM_TIMEOUT
         self.provider = settings.LLM_PROVIDER
         self.metrics = get_chat_metrics()
+        self.response_cache = get_chat_response_cache()
         
-        # Initialize token counter
-        try:
-            self.encoding = tiktoken.encoding_for_model(self.model)
-        except KeyError:
-            # Fallback to cl100k_base for unknown models
-            self.encoding = tiktoken.get_encoding("cl100k_base")
-            logger.warning(f"Unknown model {self.model}, using cl100k_base encoding")
+        # Token counting and budgeted prompts
+        self.encoding = get_encoding(self.model)
+        self.prompt_builder = PromptBuilder(self.encoding)
     
     async def connect(self) -> None:
         """Initialize OpenAI client connection"""
@@ -74,12 +71,7 @@ class LLMService:
         Returns:
             Number of tokens
         """
-        try:
-            return len(self.encoding.encode(text))
-        except Exception as e:
-            logger.warning(f"Failed to count tokens: {e}")
-            # Rough estimate: 1 token ≈ 4 characters
-            return len(text) // 4
+        return self.prompt_builder.count_tokens(text)
     
     def _build_system_prompt(self) -> str:
         """
@@ -109,62 +101,26 @@ Important:
 - ALWAYS base your response on the retrieved data provided
 - If you're unsure, ask clarifying questions"""
     
-    def _build_user_prompt(
+    def _build_messages(
         self,
         query: str,
         retrieved_data: Dict[str, Any],
         intent_type: Optional[IntentType] = None,
         conversation_context: Optional[List[Dict[str, str]]] = None
-    ) -> str:
+    ) -> Tuple[List[Dict[str, str]], int]:
         """
-        Build the user prompt with query and retrieved data
+        Build the chat completion messages within the prompt token budget
         
-        Args:
-            query: User's natural language query
-            retrieved_data: Data retrieved from database
-            intent_type: Detected intent type
-            conversation_context: Previous messages for context
-            
         Returns:
-            Formatted user prompt
+            Tuple of (messages, input_tokens)
         """
-        prompt_parts = []
-        
-        # Add conversation context if available
-        if conversation_context:
-            prompt_parts.append("Previous conversation:")
-            for msg in conversation_context[-3:]:  # Last 3 messages for context
-                role = msg.get("role", "user")
-                content = msg.get("content", "")
-                prompt_parts.append(f"{role.capitalize()}: {content}")
-            prompt_parts.append("")
-        
-        # Add current query
-        prompt_parts.append(f"User Query: {query}")
-        prompt_parts.append("")
-        
-        # Add intent type if detected
-        if intent_type:
-            prompt_parts.append(f"Detected Intent: {intent_type.value}")
-            prompt_parts.append("")
-        
-        # Add retrieved data
-        prompt_parts.append("Retrieved Data from Database:")
-        
-        if not retrieved_data or all(not v for v in retrieved_data.values()):
-            prompt_parts.append("No relevant data found in the database.")
-        else:
-            # Format retrieved data as JSON for clarity
-            prompt_parts.append(json.dumps(retrieved_data, indent=2, default=str))
-        
-        prompt_parts.append("")
-        prompt_parts.append("Instructions:")
-        prompt_parts.append("- Provide a clear, helpful response based on the retrieved data")
-        prompt_parts.append("- If suggesting actions, be specific about what the user can do")
-        prompt_parts.append("- If data is missing or unclear, ask for clarification")
-        prompt_parts.append("- Format your response in a user-friendly way")
-        
-        return "\n".join(prompt_parts)
+        return self.prompt_builder.build(
+            self._build_system_prompt(),
+            query,
+            retrieved_data,
+            intent_type,
+            conversation_context
+        )
     
     async def generate_response(
         self,
@@ -197,14 +153,10 @@ Important:
             return self._generate_fallback_response(query, retrieved_data, intent_type), 0
         
         try:
-            # Build prompts
-            system_prompt = self._build_system_prompt()
-            user_prompt = self._build_user_prompt(
+            # Build prompts and count input tokens
+            messages, input_tokens = self._build_messages(
                 query, retrieved_data, intent_type, conversation_context
             )
-            
-            # Count input tokens
-            input_tokens = self.count_tokens(system_prompt) + self.count_tokens(user_prompt)
             logger.debug(f"LLM request with {input_tokens} input tokens")
             
             # Make API call with timeout and track duration
@@ -214,10 +166,7 @@ Important:
                 response = await asyncio.wait_for(
                     self.client.chat.completions.create(
                         model=self.model,
-                        messages=[
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": user_prompt}
-                        ],
+                        messages=messages,
                         temperature=self.temperature,
                         max_tokens=self.max_tokens
                     ),
@@ -267,6 +216,137 @@ Important:
                 error_msg="I encountered an issue processing your request. Here's the raw data:"
             ), 0
     
+    async def stream_response(
+        self,
+        query: str,
+        retrieved_data: Dict[str, Any],
+        intent_type: Optional[IntentType] = None,
+        conversation_context: Optional[List[Dict[str, str]]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Generate a response, yielding text as the LLM produces it
+        
+        Same prompts and fallbacks as generate_response. The timeout applies
+        to the wait for each chunk rather than the whole completion. Closing
+        the iterator (e.g. when the client disconnects) closes the upstream
+        HTTP stream, so the LLM stops generating.
+        
+        Args:
+            query: User's natural language query
+            retrieved_data: Data retrieved from database
+            intent_type: Detected intent type
+            conversation_context: Previous messages for context
+            
+        Yields:
+            Response text chunks
+        """
+        if not self.client:
+            await self.connect()
+        
+        if not self.client:
+            yield self._generate_fallback_response(query, retrieved_data, intent_type)
+            return
+        
+        messages, input_tokens = self._build_messages(
+            query, retrieved_data, intent_type, conversation_context
+        )
+        logger.debug(f"LLM stream request with {input_tokens} input tokens")
+        
+        stream = None
+        started = False
+        try:
+            with self.metrics.track_llm_call_duration():
+                stream = await asyncio.wait_for(
+                    self.client.chat.completions.create(
+                        model=self.model,
+                        messages=messages,
+                        temperature=self.temperature,
+                        max_tokens=self.max_tokens,
+                        stream=True
+                    ),
+                    timeout=self.timeout
+                )
+                chunks = stream.__aiter__()
+                
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.timeout)
+                    except StopAsyncIteration:
+                        break
+                    
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        started = True
+                        yield chunk.choices[0].delta.content
+        
+        except asyncio.TimeoutError:
+            logger.error(f"LLM stream stalled for {self.timeout} seconds")
+            self.metrics.record_error("llm_timeout")
+            raise APITimeoutError("LLM request timed out")
+        
+        except (RateLimitError, APIError) as e:
+            # Once text was sent, a fallback would be appended to it
+            if started:
+                raise
+            logger.error(f"LLM API error: {e}")
+            self.metrics.record_error(
+                "llm_rate_limit" if isinstance(e, RateLimitError) else "llm_unavailable"
+            )
+            yield self._generate_fallback_response(
+                query, retrieved_data, intent_type,
+                error_msg="The AI service encountered an error. Here's what I found in the database:"
+            )
+        
+        finally:
+            # Shielded so a cancelled request still releases the connection
+            if stream is not None:
+                await asyncio.shield(stream.close())
+    
+    async def classify_intent(self, prompt: str) -> str:
+        """
+        Classify a query with the LLM for IntentClassifier's fallback path
+        
+        Results are cached by prompt, which holds the query and the
+        conversation context it is classified in.
+        
+        Args:
+            prompt: Classification prompt asking for a JSON answer
+            
+        Returns:
+            LLM classification text
+            
+        Raises:
+            RuntimeError: If no LLM is configured
+            APITimeoutError: If LLM request times out
+        """
+        cached = await self.response_cache.get_classification(prompt)
+        if cached is not None:
+            return cached
+        
+        if not self.client:
+            await self.connect()
+        if not self.client:
+            raise RuntimeError("LLM is not configured")
+        
+        try:
+            with self.metrics.track_llm_call_duration():
+                response = await asyncio.wait_for(
+                    self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=0,
+                        max_tokens=300
+                    ),
+                    timeout=self.timeout
+                )
+        except asyncio.TimeoutError:
+            self.metrics.record_error("llm_timeout")
+            raise APITimeoutError("LLM classification timed out")
+        
+        text = response.choices[0].message.content
+        tokens_used = response.usage.total_tokens if response.usage else self.count_tokens(prompt)
+        await self.response_cache.set_classification(prompt, text, tokens_used)
+        return text
+    
     def _generate_fallback_response(
         self,
         query: str,
@@ -353,23 +433,31 @@ Important:
             "table": None
         }
         
-        # Extract entity cards from retrieved data
-        cards = self._extract_entity_cards(retrieved_data)
-        if cards:
-            structured_output["cards"] = cards
+        # Extract entity cards and table data from retrieved data
+        structured_output.update(self.extract_data_views(retrieved_data))
         
         # Extract suggested actions
         actions = self._extract_suggested_actions(response_text, retrieved_data)
         if actions:
             structured_output["actions"] = actions
         
-        # Extract table data if present
-        table = self._extract_table_data(retrieved_data)
-        if table:
-            structured_output["table"] = table
-        
         return structured_output
     
+    def extract_data_views(self, retrieved_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Extract entity cards and table data, which do not depend on the LLM text
+        
+        Args:
+            retrieved_data: Data retrieved from database
+            
+        Returns:
+            Dictionary with "cards" and "table"
+        """
+        return {
+            "cards": self._extract_entity_cards(retrieved_data),
+            "table": self._extract_table_data(retrieved_data)
+        }
+    
     def _extract_entity_cards(self, retrieved_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Extract entity cards from retrieved data"""
         cards = []
@@ -8,6 +8,7 @@ This service manages notifications for:
 - Test execution results
 - Team assignment notifications
 - Team membership changes
+- Background report jobs
 """
 from typing import List, Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -1017,6 +1018,82 @@ class NotificationService:
         
         return notification
 
+    @staticmethod
+    async def notify_report_job_finished(
+        db: AsyncSession,
+        user_id: str,
+        job_id: str,
+        report_title: str,
+        succeeded: bool,
+        download_url: Optional[str] = None,
+        error: Optional[str] = None
+    ) -> Optional[Notification]:
+        """
+        Send notification when a background report job finishes.
+        
+        Args:
+            db: Database session
+            user_id: ID of the user who submitted the job
+            job_id: Report job ID
+            report_title: Human readable report name
+            succeeded: Whether the report was built
+            download_url: Where the finished report can be downloaded
+            error: Why the report could not be built
+            
+        Returns:
+            Created notification or None if user has disabled this notification type
+        """
+        notification_type = NotificationType.report_ready if succeeded else NotificationType.report_failed
+        
+        # Check if user has enabled this notification type
+        preference_enabled = await crud_notification_preference.check_user_preference(
+            db, 
+            user_id=user_id, 
+            notification_type=notification_type,
+            channel=NotificationChannel.in_app
+        )
+        
+        if not preference_enabled:
+            logger.info(f"Report job notification disabled for user {user_id}")
+            return None
+        
+        if succeeded:
+            title = "Report Ready"
+            message = f"Your {report_title} is ready to download"
+        else:
+            title = "Report Failed"
+            message = f"Your {report_title} could not be generated"
+        
+        notification_data = NotificationCreate(
+            user_id=user_id,
+            type=notification_type,
+            title=title,
+            message=message,
+            entity_type="report_job",
+            entity_id=job_id,
+            channel=NotificationChannel.in_app,
+            context_data={
+                "job_id": job_id,
+                "download_url": download_url,
+                "error": error
+            }
+        )
+        
+        notification = await crud_notification.create_notification(
+            db, notification_data=notification_data
+        )
+        
+        logger.log_activity(
+            action="report_job_notification_created",
+            user_id=user_id,
+            job_id=job_id,
+            succeeded=succeeded,
+            notification_id=notification.id,
+            message=f"Report job notification sent for {report_title}"
+        )
+        
+        return notification
+
     @staticmethod
     async def _send_email_notification_if_enabled(
         db: AsyncSession,
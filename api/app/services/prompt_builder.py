@@ -0,0 +1,383 @@
+"""
+Prompt Builder for Chat Assistant
+
+Builds the LLM prompt within a token budget (CHAT_PROMPT_MAX_TOKENS) shared
+by the system prompt, conversation history and retrieved data:
+- The system prompt, query and instructions are always sent
+- History gets up to CHAT_PROMPT_HISTORY_SHARE of what is left, newest
+  messages first; the part it does not use goes to the data
+- Lists of retrieved rows are sent as compact tables of their top rows,
+  cut further to fit, with a footer counting all rows by status and priority
+"""
+
+import json
+import logging
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import tiktoken
+
+from app.core.config import settings
+from app.schemas.chat import IntentType
+from app.services.chat_metrics import get_chat_metrics
+from app.services.retrieval_planner import INCOMPLETE_DATA_KEY
+
+logger = logging.getLogger(__name__)
+
+# Chat format tokens added around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Table columns sent first, in this order, when the rows have them
+PRIORITY_COLUMNS = ["id", "title", "name", "status", "assignee_name", "due_date", "priority", "severity"]
+MAX_TABLE_COLUMNS = 8
+MAX_CELL_CHARS = 80
+
+# Columns counted over all rows in the footer of a cut table
+FOOTER_COLUMNS = ["status", "priority", "severity"]
+
+# A history message is cut rather than dropped if this much of it fits
+MIN_TRUNCATED_MESSAGE_TOKENS = 16
+
+DATA_HEADING = "Retrieved Data from Database:"
+NO_DATA = "No relevant data found in the database."
+
+INSTRUCTIONS = "\n".join([
+    "Instructions:",
+    "- Provide a clear, helpful response based on the retrieved data",
+    "- If suggesting actions, be specific about what the user can do",
+    "- If data is missing or unclear, ask for clarification",
+    "- Format your response in a user-friendly way",
+])
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str):
+    """
+    Get the tiktoken encoder for a model, loaded once per process
+    
+    Args:
+        model: LLM model name
+    
+    Returns:
+        Encoder for the model, cl100k_base for unknown models
+    """
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        logger.warning(f"Unknown model {model}, using cl100k_base encoding")
+        return tiktoken.get_encoding("cl100k_base")
+
+
+class _Table:
+    """A list of retrieved rows rendered as a table of its first rows"""
+    
+    def __init__(self, key: str, rows: List[Dict[str, Any]]):
+        self.title = key.replace("_", " ").title()
+        self.rows = rows
+        
+        all_keys = set()
+        for row in rows:
+            all_keys.update(row.keys())
+        columns = [col for col in PRIORITY_COLUMNS if col in all_keys]
+        remaining = [col for col in sorted(all_keys) if col not in columns]
+        self.columns = (columns + remaining)[:MAX_TABLE_COLUMNS]
+        
+        self.footer = self._footer()
+    
+    def _footer(self) -> Optional[str]:
+        """Count all rows by the categorical columns they have"""
+        parts = []
+        for column in FOOTER_COLUMNS:
+            counts = Counter(row[column] for row in self.rows if row.get(column) is not None)
+            if counts:
+                values = ", ".join(f"{value} {count}" for value, count in counts.most_common())
+                parts.append(f"by {column}: {values}")
+        if not parts:
+            return None
+        return f"All {len(self.rows)} rows " + "; ".join(parts)
+    
+    @staticmethod
+    def _cell(value: Any) -> str:
+        if value is None:
+            return ""
+        text = " ".join(str(value).split()).replace("|", "/")
+        if len(text) > MAX_CELL_CHARS:
+            text = text[:MAX_CELL_CHARS - 1] + "…"
+        return text
+    
+    def render(self, shown: int) -> str:
+        """Render the table with its first shown rows"""
+        total = len(self.rows)
+        if shown < total:
+            lines = [f"{self.title} ({total} rows, first {shown} shown):"]
+        else:
+            lines = [f"{self.title} ({total} rows):"]
+        
+        if shown:
+            lines.append(" | ".join(self.columns))
+            for row in self.rows[:shown]:
+                lines.append(" | ".join(self._cell(row.get(col)) for col in self.columns))
+        
+        if shown < total and self.footer:
+            lines.append(self.footer)
+        return "\n".join(lines)
+
+
+class PromptBuilder:
+    """Builds chat completion messages within a token budget"""
+    
+    def __init__(
+        self,
+        encoding,
+        max_tokens: Optional[int] = None,
+        history_share: Optional[float] = None,
+        table_rows: Optional[int] = None,
+        max_context_messages: Optional[int] = None
+    ):
+        """
+        Initialize the builder
+        
+        Args:
+            encoding: tiktoken encoder of the model
+            max_tokens: Input token budget (default: CHAT_PROMPT_MAX_TOKENS)
+            history_share: Share of the budget history may use
+            table_rows: Rows per table before the budget cuts them
+            max_context_messages: History messages considered at most
+        """
+        self.encoding = encoding
+        self.max_tokens = max_tokens or settings.CHAT_PROMPT_MAX_TOKENS
+        self.history_share = (
+            settings.CHAT_PROMPT_HISTORY_SHARE if history_share is None else history_share
+        )
+        self.table_rows = table_rows or settings.CHAT_PROMPT_TABLE_ROWS
+        self.max_context_messages = max_context_messages or settings.CHAT_MAX_CONTEXT_MESSAGES
+        self.metrics = get_chat_metrics()
+        self._fixed_counts: Dict[str, int] = {}
+    
+    # ==================== TOKENS ====================
+    
+    def count_tokens(self, text: str) -> int:
+        """
+        Count tokens in a text string
+        
+        Args:
+            text: Text to count tokens for
+        
+        Returns:
+            Number of tokens
+        """
+        try:
+            return len(self.encoding.encode(text))
+        except Exception as e:
+            logger.warning(f"Failed to count tokens: {e}")
+            # Rough estimate: 1 token ≈ 4 characters
+            return len(text) // 4
+    
+    def count_fixed(self, text: str) -> int:
+        """Count tokens of text sent with every prompt, encoded only once"""
+        count = self._fixed_counts.get(text)
+        if count is None:
+            count = self._fixed_counts[text] = self.count_tokens(text)
+        return count
+    
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Cut text to at most max_tokens tokens"""
+        try:
+            tokens = self.encoding.encode(text)
+            if len(tokens) <= max_tokens:
+                return text
+            return self.encoding.decode(tokens[:max(0, max_tokens - 1)]) + "…"
+        except Exception as e:
+            logger.warning(f"Failed to truncate by tokens: {e}")
+            max_chars = max_tokens * 4
+            return text if len(text) <= max_chars else text[:max_chars - 1] + "…"
+    
+    # ==================== BUILDING ====================
+    
+    def build(
+        self,
+        system_prompt: str,
+        query: str,
+        retrieved_data: Dict[str, Any],
+        intent_type: Optional[IntentType] = None,
+        conversation_context: Optional[List[Dict[str, str]]] = None
+    ) -> Tuple[List[Dict[str, str]], int]:
+        """
+        Build the chat completion messages
+        
+        Args:
+            system_prompt: System prompt
+            query: User's natural language query
+            retrieved_data: Data retrieved from database
+            intent_type: Detected intent type
+            conversation_context: Previous messages, oldest first
+        
+        Returns:
+            Tuple of (messages, input_tokens)
+        """
+        query_lines = [f"User Query: {query}", ""]
+        if intent_type:
+            query_lines.extend([f"Detected Intent: {intent_type.value}", ""])
+        query_block = "\n".join(query_lines)
+        
+        data = dict(retrieved_data or {})
+        incomplete = data.pop(INCOMPLETE_DATA_KEY, None)
+        notes = ""
+        if incomplete:
+            notes = (
+                f"Note: {', '.join(incomplete)} could not be retrieved in time, "
+                "so the data below is partial. Say so in your answer."
+            )
+        
+        system_tokens = self.count_fixed(system_prompt)
+        fixed_tokens = (
+            system_tokens
+            + self.count_tokens(query_block)
+            + self.count_tokens(notes)
+            + self.count_fixed(DATA_HEADING)
+            + self.count_fixed(INSTRUCTIONS)
+            + 2 * MESSAGE_OVERHEAD_TOKENS
+        )
+        available = max(0, self.max_tokens - fixed_tokens)
+        
+        history_block, history_tokens = self._fit_history(
+            conversation_context or [], int(available * self.history_share)
+        )
+        data_block, data_tokens = self._fit_data(data, available - history_tokens)
+        
+        prompt_parts = []
+        if history_block:
+            prompt_parts.extend([history_block, ""])
+        prompt_parts.append(query_block)
+        prompt_parts.append(DATA_HEADING)
+        if notes:
+            prompt_parts.append(notes)
+        prompt_parts.extend([data_block, "", INSTRUCTIONS])
+        user_prompt = "\n".join(prompt_parts)
+        
+        input_tokens = system_tokens + self.count_tokens(user_prompt) + 2 * MESSAGE_OVERHEAD_TOKENS
+        
+        self.metrics.record_prompt_tokens("system", system_tokens)
+        self.metrics.record_prompt_tokens("history", history_tokens)
+        self.metrics.record_prompt_tokens("data", data_tokens)
+        self.metrics.record_prompt_tokens("total", input_tokens)
+        
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
+        return messages, input_tokens
+    
+    def _fit_history(self, conversation_context: List[Dict[str, str]], budget: int) -> Tuple[str, int]:
+        """
+        Keep the newest messages that fit the history budget
+        
+        Returns:
+            Tuple of (history block, its tokens)
+        """
+        heading = "Previous conversation:"
+        messages = conversation_context[-self.max_context_messages:]
+        if not messages:
+            return "", 0
+        
+        used = self.count_fixed(heading) + 1
+        kept = []
+        for msg in reversed(messages):
+            line = f"{msg.get('role', 'user').capitalize()}: {msg.get('content', '')}"
+            tokens = self.count_tokens(line) + 1
+            if used + tokens <= budget:
+                kept.append(line)
+                used += tokens
+                continue
+            
+            # Older messages are dropped; this one is cut if enough of it fits
+            self.metrics.record_prompt_compressed("history")
+            remaining = budget - used - 1
+            if remaining >= MIN_TRUNCATED_MESSAGE_TOKENS:
+                line = self.truncate(line, remaining)
+                kept.append(line)
+                used += self.count_tokens(line) + 1
+            break
+        
+        if not kept:
+            return "", 0
+        return "\n".join([heading] + kept[::-1]), used
+    
+    def _fit_data(self, data: Dict[str, Any], budget: int) -> Tuple[str, int]:
+        """
+        Render the retrieved data within the data budget
+        
+        Statistics and single values are sent as compact JSON. Tables share
+        what they leave, smallest first, so a table that needs less than an
+        even share passes the rest on to the larger ones.
+        
+        Returns:
+            Tuple of (data block, its tokens)
+        """
+        if not data or all(not v for v in data.values()):
+            return NO_DATA, self.count_fixed(NO_DATA)
+        
+        rendered: Dict[str, str] = {}
+        tables: Dict[str, _Table] = {}
+        used = 0
+        for key, value in data.items():
+            if not value:
+                continue
+            if isinstance(value, list) and all(isinstance(item, dict) for item in value):
+                tables[key] = _Table(key, value)
+                continue
+            
+            text = f"{key.replace('_', ' ').title()}: {json.dumps(value, default=str, separators=(',', ':'))}"
+            tokens = self.count_tokens(text)
+            if used + tokens > budget:
+                text = self.truncate(text, max(0, budget - used))
+                tokens = self.count_tokens(text)
+                self.metrics.record_prompt_compressed("data")
+            rendered[key] = text
+            used += tokens + 1
+        
+        pending = sorted(tables, key=lambda key: len(tables[key].rows))
+        for position, key in enumerate(pending):
+            share = max(0, budget - used) // (len(pending) - position)
+            text, tokens = self._fit_table(tables[key], share)
+            rendered[key] = text
+            used += tokens + 1
+        
+        # Keep the retrieved order
+        return "\n".join(rendered[key] for key in data if key in rendered), used
+    
+    def _fit_table(self, table: _Table, budget: int) -> Tuple[str, int]:
+        """
+        Render a table with as many of its first rows as fit the budget
+        
+        At most CHAT_PROMPT_TABLE_ROWS rows are sent even if more would fit.
+        
+        Returns:
+            Tuple of (table text, its tokens)
+        """
+        def measure(shown: int) -> Tuple[str, int]:
+            text = table.render(shown)
+            return text, self.count_tokens(text)
+        
+        rows = min(len(table.rows), self.table_rows)
+        text, tokens = measure(rows)
+        if tokens <= budget:
+            if rows < len(table.rows):
+                self.metrics.record_prompt_compressed("data")
+            return text, tokens
+        
+        self.metrics.record_prompt_compressed("data")
+        
+        # Largest row count that fits; the row-less summary is always sent
+        low, high = 0, rows - 1
+        best = measure(0)
+        while low <= high:
+            mid = (low + high) // 2
+            text, tokens = measure(mid)
+            if tokens <= budget:
+                best = (text, tokens)
+                low = mid + 1
+            else:
+                high = mid - 1
+        return best
@@ -0,0 +1,533 @@
+"""
+QA metrics service for bug and test execution analytics.
+
+Every metric is computed in PostgreSQL and only the aggregates come back,
+so response time and memory do not grow with the number of bugs or
+executions:
+- Counts per condition are COUNT(*) FILTER (WHERE ...) in the same scan
+- Breakdowns by several columns share one GROUPING SETS query
+- Durations are AVG over timestamp differences, in days
+- Bug ages are bucketed with width_bucket
+- Bug trends are a generate_series of date_trunc buckets joined to the
+  grouped counts; long ranges can read pre-aggregated daily snapshots
+"""
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import (
+    Date, DateTime, Integer, cast, delete, distinct, func, literal_column, or_, select, tuple_, union_all
+)
+from sqlalchemy.dialects.postgresql import array, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.bug import Bug, BugDailySnapshot
+from app.models.test_case import TestCase
+from app.models.test_execution import TestExecution, TestRun
+from app.core.logging import StructuredLogger
+
+logger = StructuredLogger(__name__)
+
+OPEN_BUG_STATUSES = ['New', 'Open', 'In Progress', 'Reopened']
+CLOSED_BUG_STATUSES = ['Closed', 'Verified', 'Rejected']
+
+EXECUTION_STATUSES = ['Passed', 'Failed', 'Blocked', 'Skipped']
+
+# Bug age ranges: (label, first day); a bug is in the last range it has reached
+AGE_RANGES = (
+    ('0-7 days', 0),
+    ('8-30 days', 8),
+    ('31-90 days', 31),
+    ('90+ days', 91),
+)
+
+# Reported for NULL severity, priority or status
+UNKNOWN = 'Unknown'
+
+SECONDS_PER_DAY = 86400
+
+# Hierarchy filters of the bug metrics, columns of both Bug and BugDailySnapshot
+BUG_SCOPE_FIELDS = (
+    'client_id', 'program_id', 'project_id', 'usecase_id', 'user_story_id', 'task_id', 'subtask_id'
+)
+
+# Stored in bug_daily_snapshots in place of a NULL scope column
+EMPTY_SCOPE = ''
+
+# Trend bucket sizes: granularity -> generate_series step
+TREND_STEPS = {
+    'day': "INTERVAL '1 day'",
+    'week': "INTERVAL '1 week'",
+    'month': "INTERVAL '1 month'",
+}
+
+# Hierarchy filters of the test metrics; test cases belong to a test run,
+# which is attached to the hierarchy
+TEST_RUN_SCOPE_COLUMNS = (
+    ('project_id', TestRun.project_id),
+    ('usecase_id', TestRun.usecase_id),
+    ('user_story_id', TestRun.user_story_id),
+    ('task_id', TestRun.task_id),
+)
+
+
+# ==================== AGGREGATES ====================
+
+def count_where(condition):
+    """COUNT(*) FILTER (WHERE condition)."""
+    return func.count().filter(condition)
+
+
+def days_between(start, end):
+    """Days from start to end, fractional; NULL if either is NULL."""
+    return func.extract('epoch', end - start) / SECONDS_PER_DAY
+
+
+def age_bucket(age_days):
+    """Index into AGE_RANGES of an age in days."""
+    bounds = array([literal_column(str(first_day)) for _, first_day in AGE_RANGES[1:]])
+    return func.width_bucket(cast(func.floor(age_days), Integer), bounds)
+
+
+def percentage(part: int, whole: int, digits: int = 2) -> float:
+    """Share of part in whole in percent, 0 for an empty whole."""
+    return round(part / whole * 100, digits) if whole > 0 else 0
+
+
+def _days(value) -> float:
+    return float(value) if value is not None else 0
+
+
+def bug_scope(filters: Dict[str, Optional[str]]) -> List[Any]:
+    """Conditions selecting the live bugs within the hierarchy filters."""
+    return [Bug.is_deleted == False] + [
+        getattr(Bug, name) == filters[name]
+        for name in BUG_SCOPE_FIELDS
+        if filters.get(name)
+    ]
+
+
+def snapshot_scope(filters: Dict[str, Optional[str]]) -> List[Any]:
+    """Conditions selecting the snapshot rows within the hierarchy filters."""
+    return [
+        getattr(BugDailySnapshot, name) == filters[name]
+        for name in BUG_SCOPE_FIELDS
+        if filters.get(name)
+    ]
+
+
+def truncate_day(day: date, granularity: str) -> date:
+    """First day of the trend bucket a day is in; weeks start on Monday, as in date_trunc."""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def next_bucket(day: date, granularity: str) -> date:
+    """First day of the trend bucket after the one starting on day."""
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def utc_midnight(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+
+def utc_day(column):
+    """UTC calendar day of a timestamptz column, as a timestamp."""
+    return func.date_trunc('day', func.timezone('UTC', column))
+
+
+def test_case_scope(filters: Dict[str, Optional[str]]) -> List[Any]:
+    """Conditions selecting test cases whose test run is within the hierarchy filters."""
+    run_conditions = [
+        column == filters[name]
+        for name, column in TEST_RUN_SCOPE_COLUMNS
+        if filters.get(name)
+    ]
+    if not run_conditions:
+        return []
+    return [TestCase.test_run_id.in_(select(TestRun.id).where(*run_conditions))]
+
+
+class QAMetricsService:
+    """Service computing QA metrics as SQL aggregates"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def get_bug_summary(self, **filters: Optional[str]) -> Dict[str, Any]:
+        """
+        Get bug totals, resolution rate and time, and distributions.
+        
+        One GROUPING SETS query: GROUPING(severity, priority, status) is 3
+        for rows grouped by severity, 5 by priority, 6 by status and 7 for
+        the total row, which also carries the filtered counts and average.
+        """
+        query = (
+            select(
+                Bug.severity,
+                Bug.priority,
+                Bug.status,
+                func.grouping(Bug.severity, Bug.priority, Bug.status).label('grouping'),
+                func.count().label('count'),
+                count_where(Bug.status.in_(OPEN_BUG_STATUSES)).label('open_bugs'),
+                count_where(Bug.status.in_(CLOSED_BUG_STATUSES)).label('closed_bugs'),
+                func.avg(days_between(Bug.created_at, Bug.closed_at)).label('resolution_days'),
+            )
+            .where(*bug_scope(filters))
+            .group_by(func.grouping_sets(
+                tuple_(Bug.severity), tuple_(Bug.priority), tuple_(Bug.status), tuple_()
+            ))
+        )
+        result = await self.db.execute(query)
+        
+        distributions = {3: {}, 5: {}, 6: {}}
+        total = None
+        for row in result.all():
+            if row.grouping == 7:
+                total = row
+                continue
+            value = {3: row.severity, 5: row.priority, 6: row.status}[row.grouping] or UNKNOWN
+            counts = distributions[row.grouping]
+            counts[value] = counts.get(value, 0) + row.count
+        
+        total_bugs = total.count if total else 0
+        closed_bugs = total.closed_bugs if total else 0
+        return {
+            "total_bugs": total_bugs,
+            "open_bugs": total.open_bugs if total else 0,
+            "closed_bugs": closed_bugs,
+            "resolution_rate": percentage(closed_bugs, total_bugs),
+            "average_resolution_time": round(_days(total.resolution_days if total else None), 2),
+            "by_severity": distributions[3],
+            "by_priority": distributions[5],
+            "by_status": distributions[6]
+        }
+    
+    async def get_bug_aging(self, **filters: Optional[str]) -> Dict[str, Any]:
+        """
+        Get open bugs by age range and their average age by severity.
+        
+        Ages are taken in whole days, so every open bug falls in exactly
+        one range. One GROUPING SETS query: GROUPING(age_bucket, severity)
+        is 1 for rows grouped by age bucket, 2 by severity and 3 for the
+        total.
+        """
+        age_days = days_between(Bug.created_at, func.now())
+        open_bugs = (
+            select(
+                age_bucket(age_days).label('age_bucket'),
+                Bug.severity.label('severity'),
+                age_days.label('age_days')
+            )
+            .where(
+                *bug_scope(filters),
+                Bug.status.in_(OPEN_BUG_STATUSES),
+                Bug.created_at.isnot(None)
+            )
+            .subquery()
+        )
+        query = (
+            select(
+                open_bugs.c.age_bucket,
+                open_bugs.c.severity,
+                func.grouping(open_bugs.c.age_bucket, open_bugs.c.severity).label('grouping'),
+                func.count().label('count'),
+                func.avg(open_bugs.c.age_days).label('average_age')
+            )
+            .group_by(func.grouping_sets(
+                tuple_(open_bugs.c.age_bucket), tuple_(open_bugs.c.severity), tuple_()
+            ))
+        )
+        result = await self.db.execute(query)
+        
+        bucket_counts = [0] * len(AGE_RANGES)
+        severity_ages = {}
+        total = 0
+        for row in result.all():
+            if row.grouping == 1:
+                bucket_counts[row.age_bucket] += row.count
+            elif row.grouping == 2:
+                severity = row.severity or UNKNOWN
+                age_sum, count = severity_ages.get(severity, (0, 0))
+                severity_ages[severity] = (age_sum + _days(row.average_age) * row.count, count + row.count)
+            else:
+                total = row.count
+        
+        return {
+            "age_ranges": [
+                {
+                    'range': label,
+                    'count': count,
+                    'percentage': percentage(count, total, 1)
+                }
+                for (label, _), count in zip(AGE_RANGES, bucket_counts)
+            ],
+            "average_age_by_severity": {
+                severity: round(age_sum / count, 1)
+                for severity, (age_sum, count) in severity_ages.items()
+            }
+        }
+    
+    async def get_bug_trends(
+        self,
+        start_day: date,
+        end_day: date,
+        granularity: str = 'day',
+        **filters: Optional[str]
+    ) -> Dict[str, List[Any]]:
+        """
+        Get bugs created and resolved per day, week or month, and the open count.
+        
+        The buckets come from generate_series, so empty ones are returned as
+        zeros, and are joined to the counts grouped by date_trunc of the UTC
+        day. The open count at the end of each bucket is the open count
+        before the range plus a running sum of created minus resolved.
+        
+        Args:
+            start_day: First day of the range (its bucket is included)
+            end_day: Last day of the range (its bucket is included)
+            granularity: Bucket size: day, week or month
+            **filters: Hierarchy filters
+        
+        Returns:
+            Dictionary of parallel lists: dates (bucket start), created,
+            resolved and open
+        """
+        first = truncate_day(start_day, granularity)
+        last = truncate_day(end_day, granularity)
+        if last < first:
+            return {"dates": [], "created": [], "resolved": [], "open": []}
+        stop = next_bucket(last, granularity)
+        
+        covered = None
+        if settings.QA_TRENDS_SNAPSHOTS_ENABLED and (stop - first).days >= settings.QA_TRENDS_SNAPSHOT_MIN_DAYS:
+            covered = await self._snapshot_coverage(first, stop)
+        
+        events = self._trend_events(first, stop, covered, filters).subquery()
+        bucketed = select(
+            func.date_trunc(granularity, events.c.day).label('bucket'),
+            events.c.created,
+            events.c.resolved
+        ).subquery()
+        counts = (
+            select(
+                bucketed.c.bucket,
+                func.sum(bucketed.c.created).label('created'),
+                func.sum(bucketed.c.resolved).label('resolved')
+            )
+            .group_by(bucketed.c.bucket)
+            .subquery()
+        )
+        series = select(
+            func.generate_series(
+                datetime.combine(first, datetime.min.time()),
+                datetime.combine(last, datetime.min.time()),
+                literal_column(TREND_STEPS[granularity])
+            ).label('bucket')
+        ).subquery()
+        
+        first_at = utc_midnight(first)
+        open_before = (
+            select(count_where(Bug.created_at < first_at) - count_where(Bug.closed_at < first_at))
+            .where(*bug_scope(filters))
+            .scalar_subquery()
+        )
+        created = func.coalesce(counts.c.created, 0)
+        resolved = func.coalesce(counts.c.resolved, 0)
+        query = (
+            select(
+                series.c.bucket,
+                created.label('created'),
+                resolved.label('resolved'),
+                (open_before + func.sum(created - resolved).over(order_by=series.c.bucket)).label('open')
+            )
+            .select_from(series.outerjoin(counts, counts.c.bucket == series.c.bucket))
+            .order_by(series.c.bucket)
+        )
+        result = await self.db.execute(query)
+        
+        trends = {"dates": [], "created": [], "resolved": [], "open": []}
+        for row in result.all():
+            trends["dates"].append(row.bucket.strftime("%Y-%m-%d"))
+            trends["created"].append(int(row.created))
+            trends["resolved"].append(int(row.resolved))
+            trends["open"].append(int(row.open))
+        return trends
+    
+    def _trend_events(
+        self,
+        first: date,
+        stop: date,
+        covered: Optional[Tuple[date, date]],
+        filters: Dict[str, Optional[str]]
+    ):
+        """
+        Daily created/resolved counts from first up to stop, as a UNION ALL.
+        
+        Days in covered come from the snapshots; the others from the bugs,
+        one row per creation or resolution.
+        """
+        live_ranges = []
+        for column in (Bug.created_at, Bug.closed_at):
+            condition = [column >= utc_midnight(first), column < utc_midnight(stop)]
+            if covered:
+                condition.append(or_(column < utc_midnight(covered[0]), column >= utc_midnight(covered[1])))
+            live_ranges.append(condition)
+        
+        parts = [
+            select(
+                utc_day(Bug.created_at).label('day'),
+                literal_column('1').label('created'),
+                literal_column('0').label('resolved')
+            ).where(*bug_scope(filters), *live_ranges[0]),
+            select(
+                utc_day(Bug.closed_at).label('day'),
+                literal_column('0').label('created'),
+                literal_column('1').label('resolved')
+            ).where(*bug_scope(filters), *live_ranges[1]),
+        ]
+        if covered:
+            parts.append(
+                select(
+                    cast(BugDailySnapshot.day, DateTime).label('day'),
+                    BugDailySnapshot.created_count.label('created'),
+                    BugDailySnapshot.resolved_count.label('resolved')
+                ).where(
+                    BugDailySnapshot.day >= covered[0],
+                    BugDailySnapshot.day < covered[1],
+                    *snapshot_scope(filters)
+                )
+            )
+        return union_all(*parts)
+    
+    async def _snapshot_coverage(self, first: date, stop: date) -> Optional[Tuple[date, date]]:
+        """
+        Days from first up to stop that the snapshots cover.
+        
+        Returns:
+            Tuple of (first covered day, day after the last), or None
+        """
+        result = await self.db.execute(
+            select(func.min(BugDailySnapshot.day), func.max(BugDailySnapshot.day)).where(
+                *[getattr(BugDailySnapshot, name) == EMPTY_SCOPE for name in BUG_SCOPE_FIELDS]
+            )
+        )
+        min_day, max_day = result.one()
+        if min_day is None:
+            return None
+        
+        covered = (max(first, min_day), min(stop, max_day + timedelta(days=1)))
+        return covered if covered[0] < covered[1] else None
+    
+    async def refresh_bug_snapshots(self, start_day: date, end_day: date) -> int:
+        """
+        Rebuild the daily bug snapshots of the days from start_day to end_day.
+        
+        Returns:
+            Number of snapshot rows with bug activity written
+        """
+        start_at, stop_at = utc_midnight(start_day), utc_midnight(end_day + timedelta(days=1))
+        scope_columns = [func.coalesce(getattr(Bug, name), EMPTY_SCOPE).label(name) for name in BUG_SCOPE_FIELDS]
+        events = union_all(
+            select(
+                cast(func.timezone('UTC', Bug.created_at), Date).label('day'),
+                *scope_columns,
+                literal_column('1').label('created'),
+                literal_column('0').label('resolved')
+            ).where(Bug.is_deleted == False, Bug.created_at >= start_at, Bug.created_at < stop_at),
+            select(
+                cast(func.timezone('UTC', Bug.closed_at), Date).label('day'),
+                *scope_columns,
+                literal_column('0').label('created'),
+                literal_column('1').label('resolved')
+            ).where(Bug.is_deleted == False, Bug.closed_at >= start_at, Bug.closed_at < stop_at),
+        ).subquery()
+        keys = [events.c.day] + [events.c[name] for name in BUG_SCOPE_FIELDS]
+        columns = ['day', *BUG_SCOPE_FIELDS, 'created_count', 'resolved_count']
+        
+        await self.db.execute(
+            delete(BugDailySnapshot).where(BugDailySnapshot.day.between(start_day, end_day))
+        )
+        result = await self.db.execute(
+            pg_insert(BugDailySnapshot).from_select(
+                columns,
+                select(*keys, func.sum(events.c.created), func.sum(events.c.resolved)).group_by(*keys)
+            )
+        )
+        days = select(
+            func.generate_series(
+                datetime.combine(start_day, datetime.min.time()),
+                datetime.combine(end_day, datetime.min.time()),
+                literal_column("INTERVAL '1 day'")
+            ).label('day')
+        ).subquery()
+        await self.db.execute(
+            pg_insert(BugDailySnapshot).from_select(
+                columns,
+                select(
+                    cast(days.c.day, Date),
+                    *[literal_column("''") for _ in BUG_SCOPE_FIELDS],
+                    literal_column('0'),
+                    literal_column('0')
+                )
+            ).on_conflict_do_nothing()
+        )
+        await self.db.commit()
+        return result.rowcount
+    
+    async def get_test_execution_summary(
+        self,
+        test_run_id: Optional[str] = None,
+        **filters: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        Get execution counts, pass and fail rates, and coverage.
+        
+        Executions are counted per status with FILTER in one scan; the
+        number of test cases in scope comes from a scalar subquery, so the
+        whole summary is one round trip.
+        """
+        case_scope = test_case_scope(filters)
+        total_test_cases = (
+            select(func.count())
+            .select_from(TestCase)
+            .where(TestCase.is_deleted == False, *case_scope)
+            .scalar_subquery()
+        )
+        
+        query = select(
+            func.count(TestExecution.id).label('total_executions'),
+            *[
+                count_where(TestExecution.execution_status == status).label(status.lower())
+                for status in EXECUTION_STATUSES
+            ],
+            func.count(distinct(TestExecution.test_case_id)).label('executed_test_cases'),
+            total_test_cases.label('total_test_cases')
+        ).select_from(TestExecution)
+        
+        if test_run_id:
+            query = query.where(TestExecution.test_run_id == test_run_id)
+        if case_scope:
+            query = query.join(TestCase, TestExecution.test_case_id == TestCase.id).where(*case_scope)
+        
+        row = (await self.db.execute(query)).one()
+        
+        return {
+            "total_executions": row.total_executions,
+            "passed": row.passed,
+            "failed": row.failed,
+            "blocked": row.blocked,
+            "skipped": row.skipped,
+            "pass_rate": percentage(row.passed, row.total_executions),
+            "fail_rate": percentage(row.failed, row.total_executions),
+            "execution_coverage": percentage(row.executed_test_cases, row.total_test_cases),
+            "total_test_cases": row.total_test_cases,
+            "executed_test_cases": row.executed_test_cases
+        }
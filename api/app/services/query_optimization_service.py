@@ -19,7 +19,7 @@ class QueryOptimizationService:
     def __init__(self, db: AsyncSession):
         self.db = db
     
-    @cached(ttl=timedelta(minutes=10))
+    @cached(ttl=timedelta(minutes=10), tags=["team:{team_id}"])
     async def get_team_members_optimized(self, team_id: str) -> List[Dict[str, Any]]:
         """Optimized query for team members with user details"""
         query = (
@@ -50,7 +50,7 @@ class QueryOptimizationService:
         
         return members
     
-    @cached(ttl=timedelta(minutes=5))
+    @cached(ttl=timedelta(minutes=5), tags=["user:{user_id}"])
     async def get_user_team_memberships(self, user_id: str) -> List[Dict[str, Any]]:
         """Optimized query for user's team memberships"""
         query = (
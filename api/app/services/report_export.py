@@ -0,0 +1,262 @@
+"""
+Report Export
+Streams report rows to CSV, XLSX and PDF as they are read
+
+- CSV is written row by row into chunks of REPORT_CSV_CHUNK_BYTES
+- XLSX rows go to a write-only workbook, which keeps them on disk
+- PDF pages are drawn one page of rows at a time on a canvas in a worker
+  thread; only the compressed page content is kept until the file is done
+- Any export can be gzip-compressed on the fly
+
+XLSX and PDF files can only be sent once they are complete; they are
+built in a spooled temporary file and then streamed from it.
+"""
+import asyncio
+import csv
+import io
+import tempfile
+import zlib
+from typing import AsyncIterator, BinaryIO, List
+
+from app.core.config import settings
+from app.services.report_service import ReportStream
+
+# PDF generation
+try:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.pdfgen.canvas import Canvas
+    from reportlab.platypus import Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.enums import TA_CENTER
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+    print("Warning: reportlab not installed. PDF generation will not work.")
+
+# XLSX generation
+try:
+    from openpyxl import Workbook
+    XLSX_AVAILABLE = True
+except ImportError:
+    XLSX_AVAILABLE = False
+    print("Warning: openpyxl not installed. XLSX generation will not work.")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "pdf": "application/pdf",
+}
+
+# Finished XLSX/PDF files stay in memory up to this size, then spill to disk
+SPOOL_MAX_BYTES = 8 * 1024 * 1024
+FILE_CHUNK_BYTES = 64 * 1024
+
+
+def export_stream(report: ReportStream, format: str) -> AsyncIterator[bytes]:
+    """
+    Export a report as a stream of file chunks
+    
+    Args:
+        report: Report to export; its rows are consumed
+        format: One of MEDIA_TYPES
+    
+    Returns:
+        Async iterator of file bytes
+    
+    Raises:
+        ImportError: If the library for the format is not installed
+    """
+    if format == "pdf":
+        if not PDF_AVAILABLE:
+            raise ImportError("reportlab is required for PDF generation. Install with: pip install reportlab")
+        return _pdf_chunks(report)
+    if format == "xlsx":
+        if not XLSX_AVAILABLE:
+            raise ImportError("openpyxl is required for XLSX generation. Install with: pip install openpyxl")
+        return _xlsx_chunks(report)
+    return _csv_chunks(report)
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Gzip-compress a stream of chunks"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    async for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _title_rows(report: ReportStream) -> List[List[str]]:
+    """Title and metadata rows above the table"""
+    return [
+        [report.title],
+        [f"Period: {report.period}"],
+        [f"Generated: {report.generated_at}"],
+        [],  # Empty row
+    ]
+
+
+async def _file_chunks(output: BinaryIO) -> AsyncIterator[bytes]:
+    """Read a finished file from the start in chunks"""
+    output.seek(0)
+    while True:
+        chunk = await asyncio.to_thread(output.read, FILE_CHUNK_BYTES)
+        if not chunk:
+            return
+        yield chunk
+
+
+# ==================== CSV ====================
+
+def _drain(buffer: io.StringIO) -> bytes:
+    data = buffer.getvalue().encode()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+async def _csv_chunks(report: ReportStream) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    
+    writer.writerows(_title_rows(report))
+    writer.writerow(report.headers)
+    
+    async for row in report.rows:
+        writer.writerow(row)
+        if buffer.tell() >= settings.REPORT_CSV_CHUNK_BYTES:
+            yield _drain(buffer)
+    
+    yield _drain(buffer)
+
+
+# ==================== XLSX ====================
+
+async def _xlsx_chunks(report: ReportStream) -> AsyncIterator[bytes]:
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Report")
+    for row in _title_rows(report) + [report.headers]:
+        sheet.append(row)
+    
+    batch = []
+    async for row in report.rows:
+        batch.append(row)
+        if len(batch) >= settings.REPORT_STREAM_BATCH_ROWS:
+            await asyncio.to_thread(_append_rows, sheet, batch)
+            batch = []
+    await asyncio.to_thread(_append_rows, sheet, batch)
+    
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as output:
+        await asyncio.to_thread(workbook.save, output)
+        async for chunk in _file_chunks(output):
+            yield chunk
+
+
+def _append_rows(sheet, rows: List[List[str]]) -> None:
+    for row in rows:
+        sheet.append(row)
+
+
+# ==================== PDF ====================
+
+class _PdfPages:
+    """Draws a report onto a canvas one page of rows at a time"""
+    
+    MARGIN = 0.75 * inch
+    HEADER_HEIGHT = 28
+    ROW_HEIGHT = 16
+    
+    def __init__(self, output: BinaryIO, report: ReportStream):
+        self.canvas = Canvas(output, pagesize=letter, pageCompression=1)
+        self.page_width, self.page_height = letter
+        self.frame_width = self.page_width - 2 * self.MARGIN
+        self.headers = report.headers
+        self.pages = 0
+        
+        # Styles
+        styles = getSampleStyleSheet()
+        title_style = ParagraphStyle(
+            'CustomTitle',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#2563eb'),
+            alignment=TA_CENTER
+        )
+        meta_style = styles['Normal']
+        
+        # Title and metadata, on the first page only
+        self.title_block = [
+            Paragraph(report.title, title_style),
+            Spacer(1, 0.2*inch),
+            Paragraph(f"<b>Period:</b> {report.period}", meta_style),
+            Paragraph(f"<b>Generated:</b> {report.generated_at}", meta_style),
+            Spacer(1, 0.3*inch),
+        ]
+        self.title_height = sum(
+            flowable.wrap(self.frame_width, self.page_height)[1] for flowable in self.title_block
+        )
+        
+        self.table_style = TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2563eb')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 12),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
+        ])
+    
+    def capacity(self) -> int:
+        """Rows that fit on the next page under the column headers"""
+        height = self.page_height - 2 * self.MARGIN - self.HEADER_HEIGHT
+        if not self.pages:
+            height -= self.title_height
+        return max(1, int(height // self.ROW_HEIGHT))
+    
+    def draw_page(self, rows: List[List[str]]) -> None:
+        """Draw one page of rows and start the next page"""
+        y = self.page_height - self.MARGIN
+        if not self.pages:
+            for flowable in self.title_block:
+                _, height = flowable.wrap(self.frame_width, y - self.MARGIN)
+                flowable.drawOn(self.canvas, self.MARGIN, y - height)
+                y -= height
+        
+        table = Table(
+            [self.headers] + rows,
+            rowHeights=[self.HEADER_HEIGHT] + [self.ROW_HEIGHT] * len(rows)
+        )
+        table.setStyle(self.table_style)
+        _, height = table.wrapOn(self.canvas, self.frame_width, y - self.MARGIN)
+        table.drawOn(self.canvas, self.MARGIN, y - height)
+        
+        self.canvas.showPage()
+        self.pages += 1
+    
+    def save(self) -> None:
+        self.canvas.save()
+
+
+async def _pdf_chunks(report: ReportStream) -> AsyncIterator[bytes]:
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_BYTES) as output:
+        pages = _PdfPages(output, report)
+        
+        page = []
+        async for row in report.rows:
+            page.append(row)
+            if len(page) >= pages.capacity():
+                await asyncio.to_thread(pages.draw_page, page)
+                page = []
+        if page or not pages.pages:
+            await asyncio.to_thread(pages.draw_page, page)
+        
+        await asyncio.to_thread(pages.save)
+        async for chunk in _file_chunks(output):
+            yield chunk
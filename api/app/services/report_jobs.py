@@ -0,0 +1,463 @@
+"""
+Background report jobs.
+
+Heavy reports can be submitted as jobs instead of being built inside the
+request:
+- Submitting returns a job id at once; a bounded pool of asyncio workers
+  builds the report on its own database session and stores the file in an
+  ArtifactStore (a local directory standing in for an object store)
+- Requests with the same report, format and parameters as one built less
+  than REPORT_JOB_FRESHNESS_SECONDS ago get the stored file, and requests
+  identical to one still being built wait for that build
+- Files are kept REPORT_JOB_TTL_SECONDS after they were last built or
+  reused; completed jobs report when their file expires
+- Job status lives in Redis (in-process without it), so any API worker can
+  answer a poll; the submitter is also notified through NotificationService
+
+The queue is per API worker; at most REPORT_JOB_MAX_QUEUE builds wait for a
+worker and further submissions get ReportJobQueueFullException (503).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import secrets
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple, Type
+
+from fastapi import status
+from pydantic import ValidationError
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.exceptions import WorkyException, ValidationException
+from app.core.logging import StructuredLogger
+from app.db.base import async_session_maker
+from app.schemas.report import (
+    ReportJobParams, ReportPeriodParams, OccupancyForecastParams, ProjectReportParams,
+    SprintVelocityParams, ProjectTreeParams
+)
+from app.services.cache_service import CacheService, cache_service
+from app.services.notification_service import NotificationService
+from app.services.report_export import MEDIA_TYPES, export_stream
+from app.services.report_service import ReportService, ReportStream
+
+logger = StructuredLogger(__name__)
+
+JOB_KEY = "report_job:{}"
+ARTIFACT_KEY = "report_artifact:{}"
+
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+JOB_MEDIA_TYPES = {**MEDIA_TYPES, "json": "application/json"}
+
+# Seconds between sweeps of expired artifacts
+PURGE_INTERVAL_SECONDS = 3600
+
+
+@dataclass(frozen=True)
+class ReportSpec:
+    """A report that can be built as a job"""
+    method: str  # ReportService method producing the ReportStream
+    title: str
+    params: Type[ReportJobParams]  # validates the parameters the method accepts
+
+
+# Report name (as in the endpoint path) -> spec
+REPORT_JOBS = {
+    "utilization": ReportSpec("generate_utilization_report", "Utilization Report", ReportPeriodParams),
+    "engagement": ReportSpec("generate_engagement_report", "Engagement Report", ReportPeriodParams),
+    "occupancy-forecast": ReportSpec("generate_occupancy_forecast", "Occupancy Forecast", OccupancyForecastParams),
+    "bug-density": ReportSpec("generate_bug_density_report", "Bug Density Report", ProjectReportParams),
+    "sprint-velocity": ReportSpec("generate_sprint_velocity_report", "Sprint Velocity Report", SprintVelocityParams),
+    "project-health": ReportSpec("generate_project_health_report", "Project Health Report", ProjectReportParams),
+    "project-tree": ReportSpec("generate_project_tree_report", "Project Tree Report", ProjectTreeParams),
+}
+
+# Stored on failed jobs and sent to the submitter; the cause is only logged
+FAILURE_MESSAGE = "Report generation failed"
+TIMEOUT_MESSAGE = "Report generation timed out"
+
+
+class ReportJobQueueFullException(WorkyException):
+    """Exception raised when too many report jobs are waiting."""
+    
+    def __init__(self):
+        super().__init__(
+            code="REPORT_JOB_QUEUE_FULL",
+            message="Too many reports are being generated. Please retry shortly.",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def download_url(job_id: str) -> str:
+    """API path a finished job is downloaded from"""
+    return f"/api/v1/reports/jobs/{job_id}/download"
+
+
+class ArtifactStore:
+    """Report files in a local directory, standing in for an object store"""
+    
+    def __init__(self, root: str = settings.REPORT_ARTIFACT_DIR):
+        self.root = Path(root)
+    
+    def path(self, name: str) -> Path:
+        """Local path of a stored file"""
+        return self.root / name
+    
+    def exists(self, name: str) -> bool:
+        return self.path(name).is_file()
+    
+    def refresh(self, name: str) -> bool:
+        """Restart a stored file's age, as for a new file; False if it is gone"""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+    
+    def expires_at(self, name: str, max_age_seconds: int) -> str:
+        """When purge(max_age_seconds) may delete a stored file"""
+        mtime = self.path(name).stat().st_mtime
+        return datetime.fromtimestamp(mtime + max_age_seconds, timezone.utc).isoformat()
+    
+    async def save(self, name: str, chunks: AsyncIterator[bytes]) -> int:
+        """
+        Store a file from a stream of chunks
+        
+        The file is written under a temporary name and renamed when
+        complete, so readers never see a partial file.
+        
+        Returns:
+            File size in bytes
+        """
+        await asyncio.to_thread(self.root.mkdir, parents=True, exist_ok=True)
+        partial = self.path(f".{name}.part")
+        size = 0
+        output = await asyncio.to_thread(open, partial, "wb")
+        try:
+            async for chunk in chunks:
+                await asyncio.to_thread(output.write, chunk)
+                size += len(chunk)
+        except BaseException:
+            await asyncio.to_thread(output.close)
+            partial.unlink(missing_ok=True)
+            raise
+        await asyncio.to_thread(output.close)
+        await asyncio.to_thread(os.replace, partial, self.path(name))
+        return size
+    
+    def purge(self, max_age_seconds: int) -> int:
+        """Delete files older than max_age_seconds; returns how many"""
+        if not self.root.is_dir():
+            return 0
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for path in self.root.iterdir():
+            try:
+                if path.is_file() and path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+class ReportJobService:
+    """Queues report jobs, builds them on a worker pool and tracks their status"""
+    
+    def __init__(
+        self,
+        store: Optional[ArtifactStore] = None,
+        cache: CacheService = cache_service,
+        session_factory: Callable[[], AsyncSession] = async_session_maker
+    ):
+        """
+        Initialize the job service
+        
+        Args:
+            store: Where finished report files are kept
+            cache: Shared cache whose Redis client holds job status
+            session_factory: Factory for the database sessions of a build
+        """
+        self.store = store or ArtifactStore()
+        self.cache = cache
+        self.session_factory = session_factory
+        self.workers = settings.REPORT_JOB_WORKERS
+        self.timeout = settings.REPORT_JOB_TIMEOUT_SECONDS
+        self.freshness = settings.REPORT_JOB_FRESHNESS_SECONDS
+        self.ttl = settings.REPORT_JOB_TTL_SECONDS
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=settings.REPORT_JOB_MAX_QUEUE)
+        self._worker_tasks: List[asyncio.Task] = []
+        self._stopping = False
+        # Build fingerprint -> jobs waiting for that build
+        self._builds: Dict[str, List[Dict[str, Any]]] = {}
+        # Job status without Redis: key -> (expires at, record)
+        self._local: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._last_purge = 0.0
+    
+    # ==================== STATUS STORAGE ====================
+    
+    async def _put(self, key: str, record: Dict[str, Any], ttl: int) -> None:
+        redis_client = self.cache.redis_client
+        if redis_client is not None:
+            try:
+                await redis_client.set(key, json.dumps(record), ex=ttl)
+                return
+            except RedisError as e:
+                logger.warning(f"Failed to store {key} in Redis, keeping it in-process: {e}")
+        self._local[key] = (time.monotonic() + ttl, record)
+    
+    async def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        redis_client = self.cache.redis_client
+        if redis_client is not None:
+            try:
+                data = await redis_client.get(key)
+                if data is not None:
+                    return json.loads(data)
+            except RedisError as e:
+                logger.warning(f"Failed to read {key} from Redis: {e}")
+        
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._local[key]
+            return None
+        return entry[1]
+    
+    async def _save_job(self, job: Dict[str, Any]) -> None:
+        await self._put(JOB_KEY.format(job["job_id"]), job, self.ttl)
+    
+    # ==================== SUBMISSION ====================
+    
+    @staticmethod
+    def fingerprint(report: str, format: str, params: Dict[str, Any]) -> str:
+        """Identify a build by report, format and parameters"""
+        key_data = json.dumps({"report": report, "format": format, "params": params}, sort_keys=True, default=str)
+        return hashlib.sha256(key_data.encode()).hexdigest()
+    
+    async def submit(self, user_id: str, report: str, format: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Submit a report job
+        
+        Args:
+            user_id: Submitting user, who is notified when the job finishes
+            report: Report name, one of REPORT_JOBS
+            format: Output format (pdf, csv, xlsx or json)
+            params: Report parameters
+        
+        Returns:
+            Job record; already completed when a fresh identical file exists
+        
+        Raises:
+            ValidationException: If the report is unknown or a parameter invalid
+            ReportJobQueueFullException: If too many builds are waiting
+        """
+        spec = REPORT_JOBS.get(report)
+        if spec is None:
+            raise ValidationException(f"Unknown report: {report}", {"reports": sorted(REPORT_JOBS)})
+        try:
+            parsed = spec.params.model_validate(params)
+        except ValidationError as e:
+            raise ValidationException(
+                f"Invalid parameters for {report}",
+                {"errors": [
+                    {"field": ".".join(str(loc) for loc in error["loc"]), "message": error["msg"], "type": error["type"]}
+                    for error in e.errors()
+                ]}
+            )
+        # Defaults included, so requests differing only in spelling them out share a build
+        params = parsed.model_dump(mode="json", exclude_none=True)
+        
+        job = {
+            "job_id": secrets.token_hex(8),
+            "report": report,
+            "format": format,
+            "params": params,
+            "user_id": user_id,
+            "status": QUEUED,
+            "cached": False,
+            "created_at": _now(),
+            "finished_at": None,
+            "artifact": None,
+            "size_bytes": None,
+            "expires_at": None,
+            "error": None,
+        }
+        build = self.fingerprint(report, format, params)
+        
+        # A fresh file for the same parameters is reused as is, and kept as
+        # long as a file built for this job would be
+        artifact = await self._get(ARTIFACT_KEY.format(build))
+        if artifact is not None and self.store.refresh(artifact["artifact"]):
+            job.update(
+                status=COMPLETED, cached=True, finished_at=job["created_at"],
+                artifact=artifact["artifact"], size_bytes=artifact["size_bytes"],
+                expires_at=self.store.expires_at(artifact["artifact"], self.ttl)
+            )
+            await self._save_job(job)
+            logger.info("Report job served from stored file", job_id=job["job_id"], report=report)
+            return job
+        
+        # An identical build in progress on this worker finishes both jobs
+        waiting = self._builds.get(build)
+        if waiting is not None:
+            job["cached"] = True
+            waiting.append(job)
+            await self._save_job(job)
+            return job
+        
+        self._start_workers()
+        try:
+            self._queue.put_nowait((build, spec, job))
+        except asyncio.QueueFull:
+            logger.warning("Report job queue full", report=report, queue_depth=self._queue.qsize())
+            raise ReportJobQueueFullException()
+        self._builds[build] = [job]
+        await self._save_job(job)
+        logger.info("Report job queued", job_id=job["job_id"], report=report, format=format)
+        return job
+    
+    async def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get a job record by ID"""
+        return await self._get(JOB_KEY.format(job_id))
+    
+    # ==================== WORKERS ====================
+    
+    def _start_workers(self) -> None:
+        if self._worker_tasks:
+            return
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(), name=f"report-job-{i}")
+            for i in range(self.workers)
+        ]
+    
+    async def _worker(self) -> None:
+        """Build queued reports one at a time"""
+        # wait_for can swallow a cancel that lands as the build finishes,
+        # so stop() also sets a flag the loop checks between builds
+        while not self._stopping:
+            build, spec, job = await self._queue.get()
+            try:
+                await self._run_build(build, spec, job)
+            except Exception as e:
+                logger.error(f"Report job worker error: {e}", exc_info=True)
+            finally:
+                self._queue.task_done()
+            await self._purge_expired()
+    
+    async def _run_build(self, build: str, spec: ReportSpec, job: Dict[str, Any]) -> None:
+        """Build a report for every job waiting on it, then notify their users"""
+        for waiting in self._builds[build]:
+            waiting["status"] = RUNNING
+            await self._save_job(waiting)
+        
+        artifact = f"{job['job_id']}.{job['format']}"
+        try:
+            size = await asyncio.wait_for(self._build(spec, job, artifact), self.timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Report job {job['job_id']} timed out", report=job["report"])
+            outcome = {"status": FAILED, "error": TIMEOUT_MESSAGE}
+        except Exception as e:
+            logger.error(f"Report job {job['job_id']} failed: {e}", report=job["report"], exc_info=True)
+            outcome = {"status": FAILED, "error": FAILURE_MESSAGE}
+        else:
+            # Later identical requests reuse the file while it is fresh
+            await self._put(
+                ARTIFACT_KEY.format(build),
+                {"artifact": artifact, "size_bytes": size},
+                self.freshness
+            )
+            outcome = {
+                "status": COMPLETED, "artifact": artifact, "size_bytes": size,
+                "expires_at": self.store.expires_at(artifact, self.ttl)
+            }
+        
+        for waiting in self._builds.pop(build):
+            waiting.update(outcome, finished_at=_now())
+            await self._save_job(waiting)
+            await self._notify(spec, waiting)
+    
+    async def _build(self, spec: ReportSpec, job: Dict[str, Any], artifact: str) -> int:
+        """Generate the report on its own session and store the file"""
+        async with self.session_factory() as db:
+            params = spec.params.model_validate(job["params"])
+            report = await getattr(ReportService(db), spec.method)(**params.model_dump())
+            if job["format"] == "json":
+                chunks = self._json_chunks(report)
+            else:
+                chunks = export_stream(report, job["format"])
+            return await self.store.save(artifact, chunks)
+    
+    @staticmethod
+    async def _json_chunks(report: ReportStream) -> AsyncIterator[bytes]:
+        yield json.dumps(await report.collect()).encode()
+    
+    async def _notify(self, spec: ReportSpec, job: Dict[str, Any]) -> None:
+        """Tell the submitter the job finished; failures only get logged"""
+        succeeded = job["status"] == COMPLETED
+        try:
+            async with self.session_factory() as db:
+                await NotificationService.notify_report_job_finished(
+                    db,
+                    user_id=job["user_id"],
+                    job_id=job["job_id"],
+                    report_title=spec.title,
+                    succeeded=succeeded,
+                    download_url=download_url(job["job_id"]) if succeeded else None,
+                    error=job["error"]
+                )
+        except Exception as e:
+            logger.warning(f"Failed to notify user {job['user_id']} about report job {job['job_id']}: {e}")
+    
+    async def _purge_expired(self) -> None:
+        """Delete expired status records and files, at most once an interval"""
+        now = time.monotonic()
+        if now - self._last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        self._last_purge = now
+        
+        for key in [key for key, (expires_at, _) in self._local.items() if expires_at < now]:
+            del self._local[key]
+        
+        removed = await asyncio.to_thread(self.store.purge, self.ttl)
+        if removed:
+            logger.info(f"Purged {removed} expired report files")
+    
+    async def stop(self) -> None:
+        """Stop the workers; jobs not yet built are marked failed"""
+        self._stopping = True
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        
+        for waiting in self._builds.values():
+            for job in waiting:
+                job.update(status=FAILED, error="Server shut down before the report was built", finished_at=_now())
+                await self._save_job(job)
+        self._builds.clear()
+
+
+# Singleton instance
+_report_job_service: Optional[ReportJobService] = None
+
+
+def get_report_job_service() -> ReportJobService:
+    """Get or create the report job service singleton"""
+    global _report_job_service
+    if _report_job_service is None:
+        _report_job_service = ReportJobService()
+    return _report_job_service
@@ -1,518 +1,517 @@
 """
 Report Service
-Handles report generation, data aggregation, and export to PDF/CSV
-"""
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_
-from typing import Dict, List, Any, Optional
-from datetime import datetime, timedelta
-from io import BytesIO
-import csv
-import io
+Handles report generation and data aggregation
 
-# PDF generation
-try:
-    from reportlab.lib.pagesizes import letter, A4
-    from reportlab.lib import colors
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.units import inch
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-    from reportlab.lib.enums import TA_CENTER, TA_LEFT
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
-    print("Warning: reportlab not installed. PDF generation will not work.")
+Each report is produced as a ReportStream: its metadata plus rows read
+from a server-side cursor while they are consumed, so exports (see
+app.services.report_export) never hold the whole report in memory.
+"""
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncResult
+from sqlalchemy import select, func, case, and_, or_, tuple_, Row
+from typing import AsyncIterator, Callable, Dict, List, Any, Optional
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
 
-from app.models.hierarchy import Task, Subtask, UserStory, Usecase, Project
+from app.core.config import settings
+from app.models.hierarchy import Task, Subtask, UserStory, Usecase, Project, HierarchyRollup
 from app.models.bug import Bug
 from app.models.sprint import Sprint, SprintTask
 from app.models.user import User
 
+CLOSED_BUG_STATUSES = ['Closed', 'Verified', 'Rejected']
+
+# Project tree levels by GROUPING(Usecase.id, UserStory.id): (level, type, name indent)
+TREE_LEVELS = {
+    3: ("0", "Project", ""),
+    1: ("1", "Use Case", "  "),
+    0: ("2", "User Story", "    "),
+}
+
+
+@dataclass
+class ReportStream:
+    """Report metadata and its formatted rows, which can be iterated once"""
+    title: str
+    period: str
+    headers: List[str]
+    rows: AsyncIterator[List[str]]
+    generated_at: str = field(default_factory=lambda: datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    
+    def metadata(self) -> Dict[str, Any]:
+        """Report data without the rows"""
+        return {
+            "title": self.title,
+            "period": self.period,
+            "generated_at": self.generated_at,
+            "headers": self.headers
+        }
+    
+    async def collect(self) -> Dict[str, Any]:
+        """Read every row into the report data dictionary"""
+        return {**self.metadata(), "rows": [row async for row in self.rows]}
+
+
+async def _format_rows(
+    result: AsyncResult,
+    format_row: Callable[[Row], List[str]],
+    first: Optional[Row] = None
+) -> AsyncIterator[List[str]]:
+    """Format cursor rows as they are fetched, closing the cursor at the end"""
+    try:
+        if first is not None:
+            yield format_row(first)
+        async for row in result:
+            yield format_row(row)
+    finally:
+        await result.close()
+
 
 class ReportService:
     """Service for generating various reports"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
+    @staticmethod
+    def _date_range(start_date: Optional[date], end_date: Optional[date], days: int = 30):
+        """
+        Resolve a report period
+        
+        Args:
+            start_date: First day (defaults to `days` days before the end)
+            end_date: Last day, inclusive (defaults to today)
+            days: Default period length
+        
+        Returns:
+            Tuple of (start date, end date)
+        """
+        end = end_date or date.today()
+        start = start_date or end - timedelta(days=days)
+        return start, end
+    
+    async def _stream(self, query) -> AsyncResult:
+        """Execute a report query on a server-side cursor"""
+        return await self.db.stream(
+            query.execution_options(yield_per=settings.REPORT_STREAM_BATCH_ROWS)
+        )
+    
+    # ==================== UTILIZATION ====================
+    
     async def generate_utilization_report(
         self,
-        start_date: Optional[str] = None,
-        end_date: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
         user_id: Optional[str] = None
-    ) -> Dict[str, Any]:
+    ) -> ReportStream:
         """Generate utilization report data"""
         
         # Default to last 30 days if no dates provided
-        if not end_date:
-            end_date = datetime.now().strftime("%Y-%m-%d")
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+        start, end = self._date_range(start_date, end_date)
         
         # Query tasks with estimated vs actual hours
-        query = self.db.query(
+        query = select(
             Task.assigned_to,
             User.full_name,
             func.sum(Task.estimated_hours).label('total_estimated'),
             func.sum(Task.actual_hours).label('total_actual'),
             func.count(Task.id).label('task_count')
-        ).join(User, Task.assigned_to == User.id, isouter=True)
-        
-        if start_date and end_date:
-            query = query.filter(
-                and_(
-                    Task.created_at >= start_date,
-                    Task.created_at <= end_date
-                )
+        ).outerjoin(User, Task.assigned_to == User.id).where(
+            and_(
+                Task.created_at >= start,
+                Task.created_at < end + timedelta(days=1)
             )
+        ).group_by(Task.assigned_to, User.full_name)
         
-        query = query.group_by(Task.assigned_to, User.full_name)
-        results = query.all()
+        results = await self._stream(query)
         
-        # Format data
-        data = {
-            "title": "Utilization Report",
-            "period": f"{start_date} to {end_date}",
-            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "headers": ["User", "Tasks", "Estimated Hours", "Actual Hours", "Utilization %"],
-            "rows": []
-        }
-        
-        for row in results:
-            user_name = row.full_name or "Unassigned"
-            estimated = float(row.total_estimated or 0)
-            actual = float(row.total_actual or 0)
-            utilization = (actual / estimated * 100) if estimated > 0 else 0
-            
-            data["rows"].append([
-                user_name,
-                str(row.task_count),
-                f"{estimated:.1f}",
-                f"{actual:.1f}",
-                f"{utilization:.1f}%"
-            ])
-        
-        return data
+        return ReportStream(
+            title="Utilization Report",
+            period=f"{start} to {end}",
+            headers=["User", "Tasks", "Estimated Hours", "Actual Hours", "Utilization %"],
+            rows=_format_rows(results, self._utilization_row)
+        )
+    
+    @staticmethod
+    def _utilization_row(row: Row) -> List[str]:
+        user_name = row.full_name or "Unassigned"
+        estimated = float(row.total_estimated or 0)
+        actual = float(row.total_actual or 0)
+        utilization = (actual / estimated * 100) if estimated > 0 else 0
+        
+        return [
+            user_name,
+            str(row.task_count),
+            f"{estimated:.1f}",
+            f"{actual:.1f}",
+            f"{utilization:.1f}%"
+        ]
+    
+    # ==================== ENGAGEMENT ====================
     
     async def generate_engagement_report(
         self,
-        start_date: Optional[str] = None,
-        end_date: Optional[str] = None,
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
         user_id: Optional[str] = None
-    ) -> Dict[str, Any]:
+    ) -> ReportStream:
         """Generate engagement report data"""
         
-        if not end_date:
-            end_date = datetime.now().strftime("%Y-%m-%d")
-        if not start_date:
-            start_date = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+        start, end = self._date_range(start_date, end_date)
         
         # Query user activity
-        query = self.db.query(
+        query = select(
             User.full_name,
             func.count(Task.id).label('tasks_created'),
             func.count(Task.completed_at).label('tasks_completed')
-        ).join(Task, User.id == Task.created_by, isouter=True)
-        
-        if start_date and end_date:
-            query = query.filter(
-                and_(
-                    Task.created_at >= start_date,
-                    Task.created_at <= end_date
-                )
+        ).join(Task, User.id == Task.created_by).where(
+            and_(
+                Task.created_at >= start,
+                Task.created_at < end + timedelta(days=1)
             )
+        ).group_by(User.full_name)
         
-        query = query.group_by(User.full_name)
-        results = query.all()
-        
-        data = {
-            "title": "Engagement Report",
-            "period": f"{start_date} to {end_date}",
-            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "headers": ["User", "Tasks Created", "Tasks Completed", "Completion Rate"],
-            "rows": []
-        }
-        
-        for row in results:
-            created = row.tasks_created or 0
-            completed = row.tasks_completed or 0
-            rate = (completed / created * 100) if created > 0 else 0
-            
-            data["rows"].append([
-                row.full_name,
-                str(created),
-                str(completed),
-                f"{rate:.1f}%"
-            ])
+        results = await self._stream(query)
         
-        return data
+        return ReportStream(
+            title="Engagement Report",
+            period=f"{start} to {end}",
+            headers=["User", "Tasks Created", "Tasks Completed", "Completion Rate"],
+            rows=_format_rows(results, self._engagement_row)
+        )
+    
+    @staticmethod
+    def _engagement_row(row: Row) -> List[str]:
+        created = row.tasks_created or 0
+        completed = row.tasks_completed or 0
+        rate = (completed / created * 100) if created > 0 else 0
+        
+        return [
+            row.full_name,
+            str(created),
+            str(completed),
+            f"{rate:.1f}%"
+        ]
+    
+    # ==================== OCCUPANCY FORECAST ====================
     
     async def generate_occupancy_forecast(
         self,
         weeks_ahead: int = 4,
         user_id: Optional[str] = None
-    ) -> Dict[str, Any]:
+    ) -> ReportStream:
         """Generate occupancy forecast data"""
         
         # Query upcoming tasks
-        start_date = datetime.now()
+        start_date = date.today()
         end_date = start_date + timedelta(weeks=weeks_ahead)
         
-        query = self.db.query(
+        query = select(
             User.full_name,
             func.count(Task.id).label('upcoming_tasks'),
             func.sum(Task.estimated_hours).label('estimated_hours')
-        ).join(Task, User.id == Task.assigned_to, isouter=True).filter(
+        ).join(Task, User.id == Task.assigned_to).where(
             and_(
-                Task.due_date >= start_date.strftime("%Y-%m-%d"),
-                Task.due_date <= end_date.strftime("%Y-%m-%d"),
+                Task.due_date >= start_date,
+                Task.due_date <= end_date,
                 Task.status != 'Done'
             )
         ).group_by(User.full_name)
         
-        results = query.all()
-        
-        data = {
-            "title": "Occupancy Forecast",
-            "period": f"Next {weeks_ahead} weeks",
-            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "headers": ["User", "Upcoming Tasks", "Estimated Hours", "Weekly Average"],
-            "rows": []
-        }
+        results = await self._stream(query)
         
-        for row in results:
+        def occupancy_row(row: Row) -> List[str]:
             tasks = row.upcoming_tasks or 0
             hours = float(row.estimated_hours or 0)
             weekly_avg = hours / weeks_ahead if weeks_ahead > 0 else 0
             
-            data["rows"].append([
+            return [
                 row.full_name,
                 str(tasks),
                 f"{hours:.1f}",
                 f"{weekly_avg:.1f}"
-            ])
+            ]
         
-        return data
+        return ReportStream(
+            title="Occupancy Forecast",
+            period=f"Next {weeks_ahead} weeks",
+            headers=["User", "Upcoming Tasks", "Estimated Hours", "Weekly Average"],
+            rows=_format_rows(results, occupancy_row)
+        )
+    
+    # ==================== BUG DENSITY ====================
     
     async def generate_bug_density_report(
         self,
         project_id: Optional[str] = None,
         user_id: Optional[str] = None
-    ) -> Dict[str, Any]:
+    ) -> ReportStream:
         """Generate bug density report data"""
         
-        query = self.db.query(
+        query = select(
             Project.name,
             func.count(Bug.id).label('total_bugs'),
-            func.sum(func.case((Bug.severity == 'Critical', 1), else_=0)).label('critical'),
-            func.sum(func.case((Bug.severity == 'High', 1), else_=0)).label('high'),
-            func.sum(func.case((Bug.status == 'Closed', 1), else_=0)).label('closed')
-        ).join(Project, Bug.entity_id == Project.id, isouter=True).filter(
-            Bug.entity_type == 'project'
+            func.count(Bug.id).filter(Bug.severity == 'Critical').label('critical'),
+            func.count(Bug.id).filter(Bug.severity == 'High').label('high'),
+            func.count(Bug.id).filter(Bug.status == 'Closed').label('closed')
+        ).join(Project, Bug.project_id == Project.id).where(
+            Bug.is_deleted == False
         )
         
         if project_id:
-            query = query.filter(Bug.entity_id == project_id)
+            query = query.where(Bug.project_id == project_id)
         
-        query = query.group_by(Project.name)
-        results = query.all()
-        
-        data = {
-            "title": "Bug Density Report",
-            "period": "All time",
-            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "headers": ["Project", "Total Bugs", "Critical", "High", "Closed", "Resolution Rate"],
-            "rows": []
-        }
+        query = query.group_by(Project.id, Project.name)
+        results = await self._stream(query)
         
-        for row in results:
-            total = row.total_bugs or 0
-            closed = row.closed or 0
-            resolution_rate = (closed / total * 100) if total > 0 else 0
-            
-            data["rows"].append([
-                row.name or "Unknown",
-                str(total),
-                str(row.critical or 0),
-                str(row.high or 0),
-                str(closed),
-                f"{resolution_rate:.1f}%"
-            ])
-        
-        return data
+        return ReportStream(
+            title="Bug Density Report",
+            period="All time",
+            headers=["Project", "Total Bugs", "Critical", "High", "Closed", "Resolution Rate"],
+            rows=_format_rows(results, self._bug_density_row)
+        )
+    
+    @staticmethod
+    def _bug_density_row(row: Row) -> List[str]:
+        total = row.total_bugs or 0
+        closed = row.closed or 0
+        resolution_rate = (closed / total * 100) if total > 0 else 0
+        
+        return [
+            row.name or "Unknown",
+            str(total),
+            str(row.critical or 0),
+            str(row.high or 0),
+            str(closed),
+            f"{resolution_rate:.1f}%"
+        ]
+    
+    # ==================== SPRINT VELOCITY ====================
     
     async def generate_sprint_velocity_report(
         self,
         project_id: Optional[str] = None,
         sprint_count: int = 10,
         user_id: Optional[str] = None
-    ) -> Dict[str, Any]:
+    ) -> ReportStream:
         """Generate sprint velocity report data"""
         
-        query = self.db.query(
+        query = select(
             Sprint.name,
             Sprint.start_date,
             Sprint.end_date,
             func.count(SprintTask.task_id).label('total_tasks'),
-            func.sum(func.case((Task.status == 'Done', 1), else_=0)).label('completed_tasks')
-        ).join(SprintTask, Sprint.id == SprintTask.sprint_id, isouter=True).join(
-            Task, SprintTask.task_id == Task.id, isouter=True
+            func.count(Task.id).filter(Task.status == 'Done').label('completed_tasks')
+        ).outerjoin(SprintTask, Sprint.id == SprintTask.sprint_id).outerjoin(
+            Task, SprintTask.task_id == Task.id
         )
         
         if project_id:
-            query = query.filter(Sprint.project_id == project_id)
+            query = query.where(Sprint.project_id == project_id)
         
         query = query.group_by(Sprint.id, Sprint.name, Sprint.start_date, Sprint.end_date).order_by(
             Sprint.start_date.desc()
         ).limit(sprint_count)
         
-        results = query.all()
-        
-        data = {
-            "title": "Sprint Velocity Report",
-            "period": f"Last {sprint_count} sprints",
-            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "headers": ["Sprint", "Start Date", "End Date", "Total Tasks", "Completed", "Velocity %"],
-            "rows": []
-        }
+        results = await self._stream(query)
         
-        for row in results:
-            total = row.total_tasks or 0
-            completed = row.completed_tasks or 0
-            velocity = (completed / total * 100) if total > 0 else 0
-            
-            data["rows"].append([
-                row.name,
-                row.start_date.strftime("%Y-%m-%d") if row.start_date else "N/A",
-                row.end_date.strftime("%Y-%m-%d") if row.end_date else "N/A",
-                str(total),
-                str(completed),
-                f"{velocity:.1f}%"
-            ])
-        
-        return data
+        return ReportStream(
+            title="Sprint Velocity Report",
+            period=f"Last {sprint_count} sprints",
+            headers=["Sprint", "Start Date", "End Date", "Total Tasks", "Completed", "Velocity %"],
+            rows=_format_rows(results, self._sprint_velocity_row)
+        )
+    
+    @staticmethod
+    def _sprint_velocity_row(row: Row) -> List[str]:
+        total = row.total_tasks or 0
+        completed = row.completed_tasks or 0
+        velocity = (completed / total * 100) if total > 0 else 0
+        
+        return [
+            row.name,
+            row.start_date.strftime("%Y-%m-%d") if row.start_date else "N/A",
+            row.end_date.strftime("%Y-%m-%d") if row.end_date else "N/A",
+            str(total),
+            str(completed),
+            f"{velocity:.1f}%"
+        ]
+    
+    # ==================== PROJECT HEALTH ====================
     
     async def generate_project_health_report(
         self,
         project_id: Optional[str] = None,
         user_id: Optional[str] = None
-    ) -> Dict[str, Any]:
+    ) -> ReportStream:
         """Generate project health report data"""
         
-        query = self.db.query(
-            Project.name,
-            func.count(Task.id).label('total_tasks'),
-            func.sum(func.case((Task.status == 'Done', 1), else_=0)).label('completed_tasks'),
-            func.sum(func.case((Task.status == 'Blocked', 1), else_=0)).label('blocked_tasks'),
+        # Task counts per project come from the rollup counters
+        task_counts = select(
+            HierarchyRollup.ancestor_id.label('project_id'),
+            func.sum(HierarchyRollup.count).label('total_tasks'),
+            func.sum(case((HierarchyRollup.value == 'Done', HierarchyRollup.count), else_=0)).label('completed_tasks'),
+            func.sum(case((HierarchyRollup.value == 'Blocked', HierarchyRollup.count), else_=0)).label('blocked_tasks')
+        ).where(
+            HierarchyRollup.ancestor_type == 'project',
+            HierarchyRollup.descendant_type == 'task',
+            HierarchyRollup.dimension == 'status'
+        ).group_by(HierarchyRollup.ancestor_id).subquery()
+        
+        open_bugs = select(
+            Bug.project_id,
             func.count(Bug.id).label('open_bugs')
-        ).join(Usecase, Project.id == Usecase.project_id, isouter=True).join(
-            UserStory, Usecase.id == UserStory.usecase_id, isouter=True
-        ).join(Task, UserStory.id == Task.user_story_id, isouter=True).join(
-            Bug, and_(Bug.entity_type == 'project', Bug.entity_id == Project.id), isouter=True
-        )
+        ).where(
+            Bug.is_deleted == False,
+            Bug.status.notin_(CLOSED_BUG_STATUSES)
+        ).group_by(Bug.project_id).subquery()
+        
+        query = select(
+            Project.name,
+            task_counts.c.total_tasks,
+            task_counts.c.completed_tasks,
+            task_counts.c.blocked_tasks,
+            open_bugs.c.open_bugs
+        ).outerjoin(
+            task_counts, task_counts.c.project_id == Project.id
+        ).outerjoin(
+            open_bugs, open_bugs.c.project_id == Project.id
+        ).where(Project.is_deleted == False)
         
         if project_id:
-            query = query.filter(Project.id == project_id)
+            query = query.where(Project.id == project_id)
         
-        query = query.group_by(Project.id, Project.name)
-        results = query.all()
-        
-        data = {
-            "title": "Project Health Report",
-            "period": "Current status",
-            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "headers": ["Project", "Total Tasks", "Completed", "Blocked", "Open Bugs", "Health Score"],
-            "rows": []
-        }
+        results = await self._stream(query)
         
-        for row in results:
-            total = row.total_tasks or 0
-            completed = row.completed_tasks or 0
-            blocked = row.blocked_tasks or 0
-            bugs = row.open_bugs or 0
-            
-            # Simple health score calculation
-            completion_rate = (completed / total * 100) if total > 0 else 0
-            health_score = completion_rate - (blocked * 5) - (bugs * 2)
-            health_score = max(0, min(100, health_score))  # Clamp between 0-100
-            
-            data["rows"].append([
-                row.name,
-                str(total),
-                str(completed),
-                str(blocked),
-                str(bugs),
-                f"{health_score:.1f}"
-            ])
-        
-        return data
+        return ReportStream(
+            title="Project Health Report",
+            period="Current status",
+            headers=["Project", "Total Tasks", "Completed", "Blocked", "Open Bugs", "Health Score"],
+            rows=_format_rows(results, self._project_health_row)
+        )
+    
+    @staticmethod
+    def _project_health_row(row: Row) -> List[str]:
+        total = row.total_tasks or 0
+        completed = row.completed_tasks or 0
+        blocked = row.blocked_tasks or 0
+        bugs = row.open_bugs or 0
+        
+        # Simple health score calculation
+        completion_rate = (completed / total * 100) if total > 0 else 0
+        health_score = completion_rate - (blocked * 5) - (bugs * 2)
+        health_score = max(0, min(100, health_score))  # Clamp between 0-100
+        
+        return [
+            row.name,
+            str(total),
+            str(completed),
+            str(blocked),
+            str(bugs),
+            f"{health_score:.1f}"
+        ]
+    
+    # ==================== PROJECT TREE ====================
     
     async def generate_project_tree_report(
         self,
         project_id: str,
         user_id: Optional[str] = None
-    ) -> Dict[str, Any]:
-        """Generate project tree report data"""
-        
-        # Get project with all nested entities
-        project = self.db.query(Project).filter(Project.id == project_id).first()
-        if not project:
-            raise ValueError(f"Project {project_id} not found")
-        
-        usecases = self.db.query(Usecase).filter(Usecase.project_id == project_id).all()
-        
-        data = {
-            "title": f"Project Tree Report - {project.name}",
-            "period": "Current structure",
-            "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            "headers": ["Level", "Type", "Name", "Status", "Tasks", "Completion"],
-            "rows": []
-        }
-        
-        # Add project row
-        total_tasks = self.db.query(func.count(Task.id)).join(
-            UserStory
-        ).join(Usecase).filter(Usecase.project_id == project_id).scalar() or 0
-        
-        completed_tasks = self.db.query(func.count(Task.id)).join(
-            UserStory
-        ).join(Usecase).filter(
-            and_(Usecase.project_id == project_id, Task.status == 'Done')
-        ).scalar() or 0
-        
-        completion = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
-        
-        data["rows"].append([
-            "0",
-            "Project",
-            project.name,
-            project.status or "N/A",
-            str(total_tasks),
-            f"{completion:.1f}%"
-        ])
-        
-        # Add use cases and their user stories
-        for usecase in usecases:
-            uc_tasks = self.db.query(func.count(Task.id)).join(
-                UserStory
-            ).filter(UserStory.usecase_id == usecase.id).scalar() or 0
-            
-            uc_completed = self.db.query(func.count(Task.id)).join(
-                UserStory
-            ).filter(
-                and_(UserStory.usecase_id == usecase.id, Task.status == 'Done')
-            ).scalar() or 0
-            
-            uc_completion = (uc_completed / uc_tasks * 100) if uc_tasks > 0 else 0
-            
-            data["rows"].append([
-                "1",
-                "Use Case",
-                f"  {usecase.name}",
-                usecase.status or "N/A",
-                str(uc_tasks),
-                f"{uc_completion:.1f}%"
-            ])
-            
-            # Add user stories
-            user_stories = self.db.query(UserStory).filter(
-                UserStory.usecase_id == usecase.id
-            ).all()
-            
-            for story in user_stories:
-                story_tasks = self.db.query(func.count(Task.id)).filter(
-                    Task.user_story_id == story.id
-                ).scalar() or 0
-                
-                story_completed = self.db.query(func.count(Task.id)).filter(
-                    and_(Task.user_story_id == story.id, Task.status == 'Done')
-                ).scalar() or 0
-                
-                story_completion = (story_completed / story_tasks * 100) if story_tasks > 0 else 0
-                
-                data["rows"].append([
-                    "2",
-                    "User Story",
-                    f"    {story.title}",
-                    story.status or "N/A",
-                    str(story_tasks),
-                    f"{story_completion:.1f}%"
-                ])
-        
-        return data
-    
-    def export_to_csv(self, report_data: Dict[str, Any]) -> str:
-        """Export report data to CSV format"""
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write title and metadata
-        writer.writerow([report_data["title"]])
-        writer.writerow([f"Period: {report_data['period']}"])
-        writer.writerow([f"Generated: {report_data['generated_at']}"])
-        writer.writerow([])  # Empty row
+    ) -> ReportStream:
+        """
+        Generate project tree report data
+        
+        Task totals and completions of the project, each use case and each
+        user story come from one grouped query over the live hierarchy, with
+        a grouping set per level.
+        
+        Args:
+            project_id: Project ID
+            user_id: Requesting user ID
+        
+        Returns:
+            Report with the project row followed by each use case and its
+            user stories
+        
+        Raises:
+            ValueError: If the project does not exist
+        """
+        
+        # GROUPING bitmask of (Usecase.id, UserStory.id): 3 = project, 1 = use case, 0 = user story
+        level = func.grouping(Usecase.id, UserStory.id).label('level')
+        
+        query = select(
+            level,
+            Project.name.label('project_name'),
+            Project.status.label('project_status'),
+            Usecase.name.label('usecase_name'),
+            Usecase.status.label('usecase_status'),
+            UserStory.name.label('story_name'),
+            UserStory.status.label('story_status'),
+            func.count(Task.id).label('total_tasks'),
+            func.count(Task.id).filter(Task.status == 'Done').label('completed_tasks')
+        ).select_from(Project).outerjoin(
+            Usecase, and_(Usecase.project_id == Project.id, Usecase.is_deleted == False)
+        ).outerjoin(
+            UserStory, and_(UserStory.usecase_id == Usecase.id, UserStory.is_deleted == False)
+        ).outerjoin(
+            Task, and_(Task.user_story_id == UserStory.id, Task.is_deleted == False)
+        ).where(
+            Project.id == project_id,
+            Project.is_deleted == False
+        ).group_by(
+            Project.name,
+            Project.status,
+            func.grouping_sets(
+                tuple_(),
+                tuple_(Usecase.id, Usecase.name, Usecase.status),
+                tuple_(
+                    Usecase.id, Usecase.name, Usecase.status,
+                    UserStory.id, UserStory.name, UserStory.status
+                )
+            )
+        ).having(
+            # Outer joins put a childless node in its children's grouping set too
+            or_(func.grouping(Usecase.id) == 1, Usecase.id.isnot(None)),
+            or_(func.grouping(UserStory.id) == 1, UserStory.id.isnot(None))
+        ).order_by(
+            Usecase.id.asc().nulls_first(),
+            UserStory.id.asc().nulls_first()
+        )
         
-        # Write headers
-        writer.writerow(report_data["headers"])
+        results = await self._stream(query)
         
-        # Write data rows
-        for row in report_data["rows"]:
-            writer.writerow(row)
+        # The project row comes first and names the report
+        first = await anext(results, None)
+        if first is None:
+            await results.close()
+            raise ValueError(f"Project {project_id} not found")
         
-        return output.getvalue()
-    
-    def export_to_pdf(self, report_data: Dict[str, Any], title: str) -> bytes:
-        """Export report data to PDF format"""
-        if not PDF_AVAILABLE:
-            raise ImportError("reportlab is required for PDF generation. Install with: pip install reportlab")
-        
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter)
-        elements = []
-        
-        # Styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#2563eb'),
-            spaceAfter=30,
-            alignment=TA_CENTER
+        return ReportStream(
+            title=f"Project Tree Report - {first.project_name}",
+            period="Current structure",
+            headers=["Level", "Type", "Name", "Status", "Tasks", "Completion"],
+            rows=_format_rows(results, self._project_tree_row, first=first)
         )
-        
-        # Title
-        elements.append(Paragraph(report_data["title"], title_style))
-        elements.append(Spacer(1, 0.2*inch))
-        
-        # Metadata
-        meta_style = styles['Normal']
-        elements.append(Paragraph(f"<b>Period:</b> {report_data['period']}", meta_style))
-        elements.append(Paragraph(f"<b>Generated:</b> {report_data['generated_at']}", meta_style))
-        elements.append(Spacer(1, 0.3*inch))
-        
-        # Table data
-        table_data = [report_data["headers"]] + report_data["rows"]
-        
-        # Create table
-        table = Table(table_data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#2563eb')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey])
-        ]))
-        
-        elements.append(table)
-        
-        # Build PDF
-        doc.build(elements)
-        
-        return buffer.getvalue()
+    
+    @staticmethod
+    def _project_tree_row(row: Row) -> List[str]:
+        depth, node_type, indent = TREE_LEVELS[row.level]
+        if row.level == 3:
+            name, status = row.project_name, row.project_status
+        elif row.level == 1:
+            name, status = row.usecase_name, row.usecase_status
+        else:
+            name, status = row.story_name, row.story_status
+        
+        total = row.total_tasks or 0
+        completed = row.completed_tasks or 0
+        completion = (completed / total * 100) if total > 0 else 0
+        
+        return [
+            depth,
+            node_type,
+            f"{indent}{name}",
+            status or "N/A",
+            str(total),
+            f"{completion:.1f}%"
+        ]
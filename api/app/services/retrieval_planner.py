@@ -0,0 +1,302 @@
+"""
+Retrieval Planner for Chat Assistant
+
+Plans the database lookups a QUERY or REPORT intent needs and runs them
+concurrently, each on its own pooled connection, within a per-request budget:
+- Time: lookups still running when the budget is spent are cancelled, and
+  Postgres stops their statements through a matching statement_timeout
+- Rows: the list queries of a request share one row limit
+
+Lookups that did not finish are named under INCOMPLETE_DATA_KEY, so the
+answer can say the data is partial and is not cached.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.base import async_session_maker
+from app.models.user import User
+from app.schemas.chat import IntentType
+from app.services.chat_metrics import get_chat_metrics
+from app.services.data_retriever import DataRetriever, get_data_retriever
+
+logger = logging.getLogger(__name__)
+
+INCOMPLETE_DATA_KEY = "incomplete_data"
+
+# Row limit of a list query when the row budget allows it
+DEFAULT_LIST_LIMIT = 20
+
+# Retrieved data key -> words in the query asking for it
+REPORT_TOPICS = {
+    'task_statistics': ['task', 'tasks'],
+    'bug_statistics': ['bug', 'bugs'],
+    'project_statistics': ['project', 'projects'],
+    'user_workload': ['workload', 'assigned', 'my'],
+}
+
+QUERY_TOPICS = {
+    'tasks': ['task', 'tasks'],
+    'bugs': ['bug', 'bugs', 'issue', 'issues'],
+    'projects': ['project', 'projects'],
+    'user_stories': ['story', 'stories', 'user story'],
+}
+
+# Filters each list query supports
+QUERY_FILTERS = {
+    'tasks': {'status', 'priority', 'start_date', 'end_date'},
+    'bugs': {'status', 'priority'},
+    'projects': {'status'},
+    'user_stories': {'status', 'priority'},
+}
+
+Serializer = Callable[[Any], Dict[str, Any]]
+
+
+@dataclass
+class RetrievalStep:
+    """One independent lookup of a retrieval plan"""
+    key: str  # retrieved data key the result is stored under
+    fetch: Callable[[AsyncSession], Awaitable[Any]]
+    merge: bool = False  # extend the list under key instead of replacing it
+
+
+class RetrievalPlanner:
+    """Plans and runs the data lookups for QUERY and REPORT intents"""
+    
+    def __init__(
+        self,
+        data_retriever: Optional[DataRetriever] = None,
+        session_factory: Callable[[], AsyncSession] = async_session_maker
+    ):
+        """
+        Initialize the planner
+        
+        Args:
+            data_retriever: Retriever running the RBAC-checked queries
+            session_factory: Factory for the per-lookup database sessions
+        """
+        self.data_retriever = data_retriever or get_data_retriever()
+        self.session_factory = session_factory
+        self.metrics = get_chat_metrics()
+        self.timeout = settings.CHAT_RETRIEVAL_TIMEOUT_SECONDS
+        self.max_rows = settings.CHAT_RETRIEVAL_MAX_ROWS
+        self.max_concurrency = settings.CHAT_RETRIEVAL_MAX_CONCURRENCY
+        self._abandoned: Set[asyncio.Task] = set()
+    
+    # ==================== PLANNING ====================
+    
+    def plan(self, user: User, intent, serialize: Serializer) -> List[RetrievalStep]:
+        """
+        Plan the lookups for an intent
+        
+        Entities are resolved one lookup each. REPORT intents get every
+        statistic the query mentions and QUERY intents every filtered list,
+        each list with the filters it supports.
+        
+        Args:
+            user: Current user
+            intent: Classified intent
+            serialize: Converts a database object to a dictionary
+        
+        Returns:
+            Independent steps; entity lookups first, so lists replace them
+        """
+        retriever = self.data_retriever
+        steps = [
+            RetrievalStep(
+                retriever.RESOLVED_KEYS[entity.entity_type],
+                partial(self._resolve_entity, user, entity, serialize),
+                merge=True
+            )
+            for entity in intent.entities
+            if retriever.can_resolve(entity)
+        ]
+        
+        temporal_context = intent.temporal_context or {}
+        query_lower = intent.normalized_query.lower()
+        
+        if intent.intent_type == IntentType.REPORT:
+            dates = {
+                'start_date': temporal_context.get('start_date'),
+                'end_date': temporal_context.get('end_date')
+            }
+            fetchers = {
+                'task_statistics': partial(retriever.get_task_statistics, user=user, **dates),
+                'bug_statistics': partial(retriever.get_bug_statistics, user=user, **dates),
+                'project_statistics': partial(retriever.get_project_statistics, user=user),
+                'user_workload': partial(retriever.get_user_workload, user=user),
+            }
+            for key, words in REPORT_TOPICS.items():
+                if any(word in query_lower for word in words):
+                    steps.append(RetrievalStep(key, fetchers[key]))
+        
+        elif intent.intent_type == IntentType.QUERY:
+            filters = {}
+            if 'status_filter' in temporal_context:
+                filters['status'] = temporal_context['status_filter']
+            if 'priority_filter' in temporal_context:
+                filters['priority'] = temporal_context['priority_filter']
+            if 'start_date' in temporal_context:
+                filters['start_date'] = temporal_context['start_date']
+            if 'end_date' in temporal_context:
+                filters['end_date'] = temporal_context['end_date']
+            
+            fetchers = {
+                'tasks': retriever.get_tasks_by_filters,
+                'bugs': retriever.get_bugs_by_filters,
+                'projects': retriever.get_projects_by_filters,
+                'user_stories': retriever.get_user_stories_by_filters,
+            }
+            topics = [
+                key for key, words in QUERY_TOPICS.items()
+                if any(word in query_lower for word in words)
+            ]
+            if topics:
+                # The lists share the row budget
+                limit = max(1, min(DEFAULT_LIST_LIMIT, self.max_rows // len(topics)))
+                for key in topics:
+                    supported = {
+                        name: value for name, value in filters.items()
+                        if name in QUERY_FILTERS[key]
+                    }
+                    steps.append(RetrievalStep(key, partial(
+                        self._fetch_list, fetchers[key], user, supported, limit, serialize
+                    )))
+        
+        return steps
+    
+    async def _resolve_entity(
+        self,
+        user: User,
+        entity,
+        serialize: Serializer,
+        db: AsyncSession
+    ) -> List[Dict[str, Any]]:
+        """Resolve one entity, serialized while its session is open"""
+        objs = await self.data_retriever.resolve_entity(db, user, entity)
+        return [serialize(obj) for obj in objs]
+    
+    async def _fetch_list(
+        self,
+        fetch: Callable[..., Awaitable[List[Any]]],
+        user: User,
+        filters: Dict[str, Any],
+        limit: int,
+        serialize: Serializer,
+        db: AsyncSession
+    ) -> List[Dict[str, Any]]:
+        """Run a filtered list query, serialized while its session is open"""
+        objs = await fetch(db, user, limit=limit, **filters)
+        return [serialize(obj) for obj in objs]
+    
+    # ==================== EXECUTION ====================
+    
+    async def retrieve(self, user: User, intent, serialize: Serializer) -> Dict[str, Any]:
+        """
+        Retrieve the data for an intent within the request budget
+        
+        Args:
+            user: Current user
+            intent: Classified intent
+            serialize: Converts a database object to a dictionary
+        
+        Returns:
+            Retrieved data by key; keys that could not be retrieved are
+            listed under INCOMPLETE_DATA_KEY
+        """
+        steps = self.plan(user, intent, serialize)
+        if not steps:
+            return {}
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [
+            asyncio.create_task(self._run_step(step, semaphore, deadline))
+            for step in steps
+        ]
+        
+        with self.metrics.track_retrieval_duration():
+            _, pending = await asyncio.wait(tasks, timeout=self.timeout)
+        
+        for task in pending:
+            # Not awaited: the request moves on while sessions close
+            task.cancel()
+            self._abandoned.add(task)
+            task.add_done_callback(self._abandoned_done)
+        
+        retrieved_data = {}
+        incomplete = []
+        for step, task in zip(steps, tasks):
+            if task in pending:
+                outcome = "timeout"
+            elif task.exception() is not None:
+                outcome = "error"
+                logger.error(
+                    f"Error retrieving {step.key}: {task.exception()}",
+                    exc_info=task.exception()
+                )
+            else:
+                outcome = "ok"
+                if step.merge:
+                    retrieved_data.setdefault(step.key, []).extend(task.result())
+                else:
+                    retrieved_data[step.key] = task.result()
+            
+            self.metrics.record_retrieval_step(step.key, outcome)
+            if outcome != "ok" and step.key not in incomplete:
+                incomplete.append(step.key)
+        
+        if incomplete:
+            logger.warning(f"Retrieval incomplete after {self.timeout}s budget: {incomplete}")
+            retrieved_data[INCOMPLETE_DATA_KEY] = incomplete
+        
+        return retrieved_data
+    
+    async def _run_step(
+        self,
+        step: RetrievalStep,
+        semaphore: asyncio.Semaphore,
+        deadline: float
+    ) -> Any:
+        """Run a step on its own session, limited to the remaining budget"""
+        async with semaphore:
+            async with self.session_factory() as db:
+                await self._limit_statement_time(db, deadline)
+                return await step.fetch(db)
+    
+    @staticmethod
+    async def _limit_statement_time(db: AsyncSession, deadline: float) -> None:
+        """Make Postgres cancel statements still running at the deadline"""
+        bind = db.bind
+        if bind is None or bind.dialect.name != "postgresql":
+            return
+        remaining_ms = max(1, int((deadline - asyncio.get_running_loop().time()) * 1000))
+        # Transaction-local, so it is gone when the connection returns to the pool
+        await db.execute(select(func.set_config('statement_timeout', f'{remaining_ms}ms', True)))
+    
+    def _abandoned_done(self, task: asyncio.Task) -> None:
+        """Forget a cancelled step once its session has closed"""
+        self._abandoned.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.debug(f"Abandoned retrieval step failed: {task.exception()}")
+
+
+# Singleton instance
+_retrieval_planner: Optional[RetrievalPlanner] = None
+
+
+def get_retrieval_planner() -> RetrievalPlanner:
+    """Get or create the retrieval planner singleton"""
+    global _retrieval_planner
+    if _retrieval_planner is None:
+        _retrieval_planner = RetrievalPlanner()
+    return _retrieval_planner
@@ -3,12 +3,18 @@ Session Management Service for Chat Assistant
 
 This service manages conversation sessions using Redis for storage.
 It handles session creation, retrieval, context storage, and entity resolution.
+
+Sessions and messages are stored as msgpack and every write is a single
+pipelined round trip. Active sessions are tracked in a sorted set scored by
+expiry time, so counting them never scans the keyspace.
 """
 
-import json
 import logging
+import time
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Sequence, Tuple, Type, TypeVar
+import msgpack
+from pydantic import BaseModel, ValidationError
 from redis import asyncio as aioredis
 from redis.exceptions import RedisError
 
@@ -24,6 +30,23 @@ from app.services.chat_metrics import get_chat_metrics
 
 logger = logging.getLogger(__name__)
 
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Sorted set of active session ids, scored by expiry time
+ACTIVE_SESSIONS_KEY = "chat:sessions:active"
+
+
+def _encode(model: BaseModel) -> bytes:
+    """Serialize a session model to compact msgpack"""
+    return msgpack.packb(model.model_dump(mode="json", exclude_defaults=True))
+
+
+def _decode(model_cls: Type[ModelT], data: bytes) -> ModelT:
+    """Deserialize a session model; JSON values from before msgpack are accepted"""
+    if data[:1] == b"{":
+        return model_cls.model_validate_json(data)
+    return model_cls.model_validate(msgpack.unpackb(data))
+
 
 class SessionService:
     """Service for managing chat sessions with Redis"""
@@ -38,10 +61,10 @@ class SessionService:
     async def connect(self) -> None:
         """Establish Redis connection"""
         try:
+            # Values are msgpack, so responses are not decoded
             self.redis_client = await aioredis.from_url(
                 settings.redis_url,
-                encoding="utf-8",
-                decode_responses=True,
+                decode_responses=False,
                 socket_connect_timeout=5,
                 socket_timeout=5
             )
@@ -66,6 +89,37 @@ class SessionService:
         """Generate Redis key for session messages"""
         return f"chat:messages:{session_id}"
     
+    @property
+    def _ttl_seconds(self) -> int:
+        return int(self.session_ttl.total_seconds())
+    
+    def _expires_at(self) -> float:
+        """Active-session score for a session touched now"""
+        return time.time() + self._ttl_seconds
+    
+    def _queue_session_write(self, pipe, session_context: SessionContext) -> None:
+        """Queue storing a session and marking it active"""
+        pipe.set(
+            self._get_session_key(session_context.session_id),
+            _encode(session_context),
+            ex=self._ttl_seconds
+        )
+        pipe.zadd(ACTIVE_SESSIONS_KEY, {session_context.session_id: self._expires_at()})
+    
+    def _decode_messages(
+        self,
+        session_id: str,
+        messages_data: Sequence[bytes]
+    ) -> List[ChatMessageResponse]:
+        """Parse stored messages, skipping unreadable entries"""
+        messages = []
+        for data in messages_data:
+            try:
+                messages.append(_decode(ChatMessageResponse, data))
+            except (ValidationError, ValueError, msgpack.UnpackException) as e:
+                logger.warning(f"Failed to parse message in session {session_id}: {e}")
+        return messages
+    
     async def create_session(
         self,
         session_id: str,
@@ -81,10 +135,10 @@ class SessionService:
             user_id: User ID
             client_id: Client ID for RBAC
             current_project: Optional current project context
-            
+        
         Returns:
             SessionContext object
-            
+        
         Raises:
             RedisError: If Redis operation fails
         """
@@ -104,23 +158,14 @@ class SessionService:
         )
         
         try:
-            session_key = self._get_session_key(session_id)
-            session_data = session_context.model_dump(mode='json')
-            
-            # Convert datetime objects to ISO format strings
-            session_data['created_at'] = session_data['created_at'].isoformat()
-            session_data['last_activity'] = session_data['last_activity'].isoformat()
-            
-            # Store session with TTL
-            await self.redis_client.setex(
-                session_key,
-                int(self.session_ttl.total_seconds()),
-                json.dumps(session_data)
-            )
+            # Store session with TTL and mark it active in one round trip
+            pipe = self.redis_client.pipeline(transaction=True)
+            self._queue_session_write(pipe, session_context)
+            await pipe.execute()
             
             logger.info(f"Created session {session_id} for user {user_id}")
             return session_context
-            
+        
         except RedisError as e:
             logger.error(f"Failed to create session {session_id}: {e}")
             raise
@@ -131,7 +176,7 @@ class SessionService:
         
         Args:
             session_id: Session identifier
-            
+        
         Returns:
             SessionContext if found, None otherwise
         """
@@ -139,40 +184,79 @@ class SessionService:
             await self.connect()
         
         try:
-            session_key = self._get_session_key(session_id)
-            session_data = await self.redis_client.get(session_key)
+            session_data = await self.redis_client.get(self._get_session_key(session_id))
             
             if not session_data:
                 logger.debug(f"Session {session_id} not found or expired")
                 return None
             
-            # Parse JSON and reconstruct SessionContext
-            data = json.loads(session_data)
-            
-            # Convert ISO format strings back to datetime
-            data['created_at'] = datetime.fromisoformat(data['created_at'])
-            data['last_activity'] = datetime.fromisoformat(data['last_activity'])
-            
-            # Convert mentioned_entities list to SessionEntity objects
-            if 'mentioned_entities' in data:
-                data['mentioned_entities'] = [
-                    SessionEntity(**entity) for entity in data['mentioned_entities']
-                ]
-            
-            session_context = SessionContext(**data)
+            session_context = _decode(SessionContext, session_data)
             logger.debug(f"Retrieved session {session_id}")
             return session_context
-            
-        except (RedisError, json.JSONDecodeError, ValueError) as e:
+        
+        except (RedisError, ValidationError, ValueError, msgpack.UnpackException) as e:
             logger.error(f"Failed to retrieve session {session_id}: {e}")
             return None
     
+    async def get_session_with_history(
+        self,
+        session_id: str,
+        limit: Optional[int] = None,
+        extend_ttl: bool = True
+    ) -> Tuple[Optional[SessionContext], List[ChatMessageResponse]]:
+        """
+        Retrieve session context and recent history in one round trip
+        
+        Args:
+            session_id: Session identifier
+            limit: Maximum number of messages (default: max_context_messages)
+            extend_ttl: Also extend the TTL of an existing session
+        
+        Returns:
+            Tuple of (SessionContext or None, messages oldest first)
+        """
+        if not self.redis_client:
+            await self.connect()
+        
+        if limit is None:
+            limit = self.max_context_messages
+        
+        session_key = self._get_session_key(session_id)
+        messages_key = self._get_messages_key(session_id)
+        
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.get(session_key)
+            pipe.lrange(messages_key, -limit, -1)
+            if extend_ttl:
+                # No-ops for a missing session; XX never adds it to the active set
+                pipe.expire(session_key, self._ttl_seconds)
+                pipe.expire(messages_key, self._ttl_seconds)
+                pipe.zadd(ACTIVE_SESSIONS_KEY, {session_id: self._expires_at()}, xx=True)
+            session_data, messages_data, *_ = await pipe.execute()
+        except RedisError as e:
+            logger.error(f"Failed to retrieve session {session_id}: {e}")
+            return None, []
+        
+        if not session_data:
+            logger.debug(f"Session {session_id} not found or expired")
+            return None, []
+        
+        try:
+            session_context = _decode(SessionContext, session_data)
+        except (ValidationError, ValueError, msgpack.UnpackException) as e:
+            logger.error(f"Failed to retrieve session {session_id}: {e}")
+            return None, []
+        
+        return session_context, self._decode_messages(session_id, messages_data)
+    
     async def update_session(
         self,
         session_id: str,
         last_intent: Optional[IntentType] = None,
         current_project: Optional[str] = None,
-        new_entities: Optional[List[SessionEntity]] = None
+        new_entities: Optional[List[SessionEntity]] = None,
+        session_context: Optional[SessionContext] = None
     ) -> bool:
         """
         Update session context with new information
@@ -182,7 +266,8 @@ class SessionService:
             last_intent: Latest intent type
             current_project: Updated current project
             new_entities: New entities to add to context
-            
+            session_context: Session already loaded by the caller (skips a read)
+        
         Returns:
             True if update successful, False otherwise
         """
@@ -190,7 +275,8 @@ class SessionService:
             await self.connect()
         
         try:
-            session_context = await self.get_session(session_id)
+            if session_context is None:
+                session_context = await self.get_session(session_id)
             if not session_context:
                 logger.warning(f"Cannot update non-existent session {session_id}")
                 return False
@@ -205,7 +291,7 @@ class SessionService:
             if new_entities:
                 # Add new entities, avoiding duplicates
                 existing_ids = {
-                    (e.entity_type, e.entity_id) 
+                    (e.entity_type, e.entity_id)
                     for e in session_context.mentioned_entities
                 }
                 for entity in new_entities:
@@ -216,22 +302,13 @@ class SessionService:
             session_context.last_activity = datetime.utcnow()
             
             # Save updated session
-            session_key = self._get_session_key(session_id)
-            session_data = session_context.model_dump(mode='json')
-            
-            # Convert datetime objects to ISO format strings
-            session_data['created_at'] = session_data['created_at'].isoformat()
-            session_data['last_activity'] = session_data['last_activity'].isoformat()
-            
-            await self.redis_client.setex(
-                session_key,
-                int(self.session_ttl.total_seconds()),
-                json.dumps(session_data)
-            )
+            pipe = self.redis_client.pipeline(transaction=True)
+            self._queue_session_write(pipe, session_context)
+            await pipe.execute()
             
             logger.debug(f"Updated session {session_id}")
             return True
-            
+        
         except RedisError as e:
             logger.error(f"Failed to update session {session_id}: {e}")
             return False
@@ -247,7 +324,24 @@ class SessionService:
         Args:
             session_id: Session identifier
             message: Chat message to store
-            
+        
+        Returns:
+            True if storage successful, False otherwise
+        """
+        return await self.store_messages(session_id, [message])
+    
+    async def store_messages(
+        self,
+        session_id: str,
+        messages: Sequence[ChatMessageResponse]
+    ) -> bool:
+        """
+        Append messages to the conversation history in one transaction
+        
+        Args:
+            session_id: Session identifier
+            messages: Chat messages to store, oldest first
+        
         Returns:
             True if storage successful, False otherwise
         """
@@ -257,29 +351,16 @@ class SessionService:
         try:
             messages_key = self._get_messages_key(session_id)
             
-            # Convert message to JSON
-            message_data = message.model_dump(mode='json')
-            message_data['created_at'] = message_data['created_at'].isoformat()
-            
-            # Add message to list (right push)
-            await self.redis_client.rpush(messages_key, json.dumps(message_data))
-            
-            # Trim list to keep only last N messages
-            await self.redis_client.ltrim(
-                messages_key,
-                -self.max_context_messages,
-                -1
-            )
-            
-            # Set TTL on messages list
-            await self.redis_client.expire(
-                messages_key,
-                int(self.session_ttl.total_seconds())
-            )
+            # Push, trim to the last N messages and refresh the TTL atomically
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.rpush(messages_key, *(_encode(message) for message in messages))
+            pipe.ltrim(messages_key, -self.max_context_messages, -1)
+            pipe.expire(messages_key, self._ttl_seconds)
+            await pipe.execute()
             
-            logger.debug(f"Stored message in session {session_id}")
+            logger.debug(f"Stored {len(messages)} messages in session {session_id}")
             return True
-            
+        
         except RedisError as e:
             logger.error(f"Failed to store message in session {session_id}: {e}")
             return False
@@ -295,7 +376,7 @@ class SessionService:
         Args:
             session_id: Session identifier
             limit: Maximum number of messages to retrieve (default: max_context_messages)
-            
+        
         Returns:
             List of ChatMessageResponse objects
         """
@@ -306,11 +387,9 @@ class SessionService:
             limit = self.max_context_messages
         
         try:
-            messages_key = self._get_messages_key(session_id)
-            
             # Get last N messages
             messages_data = await self.redis_client.lrange(
-                messages_key,
+                self._get_messages_key(session_id),
                 -limit,
                 -1
             )
@@ -319,20 +398,10 @@ class SessionService:
                 logger.debug(f"No conversation history for session {session_id}")
                 return []
             
-            # Parse messages
-            messages = []
-            for msg_json in messages_data:
-                try:
-                    msg_data = json.loads(msg_json)
-                    msg_data['created_at'] = datetime.fromisoformat(msg_data['created_at'])
-                    messages.append(ChatMessageResponse(**msg_data))
-                except (json.JSONDecodeError, ValueError) as e:
-                    logger.warning(f"Failed to parse message in session {session_id}: {e}")
-                    continue
-            
+            messages = self._decode_messages(session_id, messages_data)
             logger.debug(f"Retrieved {len(messages)} messages for session {session_id}")
             return messages
-            
+        
         except RedisError as e:
             logger.error(f"Failed to retrieve conversation history for session {session_id}: {e}")
             return []
@@ -351,7 +420,7 @@ class SessionService:
         Args:
             session_id: Session identifier
             entity_reference: Reference to resolve (e.g., "it", "that task")
-            
+        
         Returns:
             SessionEntity if resolved, None otherwise
         """
@@ -391,7 +460,7 @@ class SessionService:
         
         Args:
             session_id: Session identifier
-            
+        
         Returns:
             True if deletion successful, False otherwise
         """
@@ -399,11 +468,11 @@ class SessionService:
             await self.connect()
         
         try:
-            session_key = self._get_session_key(session_id)
-            messages_key = self._get_messages_key(session_id)
-            
-            # Delete both keys
-            deleted = await self.redis_client.delete(session_key, messages_key)
+            # Delete both keys and drop the session from the active set
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.delete(self._get_session_key(session_id), self._get_messages_key(session_id))
+            pipe.zrem(ACTIVE_SESSIONS_KEY, session_id)
+            deleted, _ = await pipe.execute()
             
             if deleted > 0:
                 logger.info(f"Deleted session {session_id}")
@@ -411,17 +480,17 @@ class SessionService:
             else:
                 logger.debug(f"Session {session_id} not found for deletion")
                 return False
-                
+        
         except RedisError as e:
             logger.error(f"Failed to delete session {session_id}: {e}")
             return False
     
     async def cleanup_expired_sessions(self) -> int:
         """
-        Clean up expired sessions (Redis handles TTL automatically)
+        Drop expired sessions from the active set and count the rest
         
-        This method is primarily for monitoring and logging purposes,
-        as Redis automatically removes expired keys.
+        Redis expires the session keys themselves; this prunes their
+        entries from the active-session set and updates the metric.
         
         Returns:
             Number of active sessions
@@ -430,21 +499,10 @@ class SessionService:
             await self.connect()
         
         try:
-            # Count active sessions
-            pattern = "chat:session:*"
-            cursor = 0
-            active_count = 0
-            
-            while True:
-                cursor, keys = await self.redis_client.scan(
-                    cursor=cursor,
-                    match=pattern,
-                    count=100
-                )
-                active_count += len(keys)
-                
-                if cursor == 0:
-                    break
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.zremrangebyscore(ACTIVE_SESSIONS_KEY, "-inf", time.time())
+            pipe.zcard(ACTIVE_SESSIONS_KEY)
+            _, active_count = await pipe.execute()
             
             logger.info(f"Active sessions: {active_count}")
             
@@ -452,7 +510,7 @@ class SessionService:
             self.metrics.set_active_sessions(active_count)
             
             return active_count
-            
+        
         except RedisError as e:
             logger.error(f"Failed to cleanup expired sessions: {e}")
             return 0
@@ -463,7 +521,7 @@ class SessionService:
         
         Args:
             session_id: Session identifier
-            
+        
         Returns:
             True if TTL extended, False otherwise
         """
@@ -471,17 +529,16 @@ class SessionService:
             await self.connect()
         
         try:
-            session_key = self._get_session_key(session_id)
-            messages_key = self._get_messages_key(session_id)
-            
-            # Extend TTL for both keys
-            ttl_seconds = int(self.session_ttl.total_seconds())
-            await self.redis_client.expire(session_key, ttl_seconds)
-            await self.redis_client.expire(messages_key, ttl_seconds)
+            # Extend TTL for both keys and the active-set entry
+            pipe = self.redis_client.pipeline(transaction=True)
+            pipe.expire(self._get_session_key(session_id), self._ttl_seconds)
+            pipe.expire(self._get_messages_key(session_id), self._ttl_seconds)
+            pipe.zadd(ACTIVE_SESSIONS_KEY, {session_id: self._expires_at()}, xx=True)
+            await pipe.execute()
             
             logger.debug(f"Extended TTL for session {session_id}")
             return True
-            
+        
         except RedisError as e:
             logger.error(f"Failed to extend TTL for session {session_id}: {e}")
             return False
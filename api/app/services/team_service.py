@@ -185,9 +185,9 @@ class TeamService:
         await self.db.refresh(team_member, ["user"])
         
         # Invalidate caches
-        cache_service.invalidate_team_members(team_id)
-        cache_service.invalidate_user_teams(user_id)
-        cache_service.invalidate_project_team(team.project_id)
+        await cache_service.invalidate_team_members(team_id)
+        await cache_service.invalidate_user_teams(user_id)
+        await cache_service.invalidate_project_team(team.project_id)
         
         # Send team member added notification (temporarily disabled to avoid async issues)
         # TODO: Re-enable notifications after fixing async context issues
@@ -282,9 +282,9 @@ class TeamService:
         await self.db.commit()
         
         # Invalidate caches
-        cache_service.invalidate_team_members(team_id)
-        cache_service.invalidate_user_teams(user_id)
-        cache_service.invalidate_project_team(team.project_id)
+        await cache_service.invalidate_team_members(team_id)
+        await cache_service.invalidate_user_teams(user_id)
+        await cache_service.invalidate_project_team(team.project_id)
         
         return True
     
@@ -300,7 +300,7 @@ class TeamService:
         """
         # Temporarily disable caching to fix member count issue
         # Check cache first
-        # cached_members = cache_service.get_team_members(team_id)
+        # cached_members = await cache_service.get_team_members(team_id)
         # if cached_members is not None:
         #     # Still need to verify access, but return cached data
         #     if await self.validate_team_access(team_id, current_user):
@@ -459,6 +459,8 @@ class TeamService:
             # Empty string means clear the project_id (unassign from project)
             update_values["project_id"] = project_id if project_id != "" else None
         
+        previous_project_id = team.project_id
+        
         # Use direct SQL update for reliability
         stmt = sql_update(Team).where(Team.id == team_id).values(**update_values)
         await self.db.execute(stmt)
@@ -467,6 +469,20 @@ class TeamService:
         # Refresh the team object
         await self.db.refresh(team)
         
+        # Invalidate caches: team details appear in members' membership lists
+        member_result = await self.db.execute(
+            select(TeamMember.user_id).where(
+                TeamMember.team_id == team_id,
+                TeamMember.is_active == True
+            )
+        )
+        stale_tags = {f"team:{team_id}"}
+        stale_tags.update(f"user:{member_id}" for member_id in member_result.scalars().all())
+        stale_tags.update(
+            f"project:{project}" for project in (previous_project_id, team.project_id) if project
+        )
+        await cache_service.invalidate_tags(*stale_tags)
+        
         return team
     
     async def get_user_teams(
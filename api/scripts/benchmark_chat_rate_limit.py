@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark of admitted versus configured chat rate under concurrency.
+
+Many concurrent requests from one user hit the chat rate limiter in Redis
+(settings.redis_url) for a fixed duration. A correct limiter admits at most
+the minute bucket's capacity plus its refill over the run; the report shows
+admitted requests against that ceiling and Redis round trips per request.
+
+Modes:
+    get-setex - the previous limiter: GET, compute in Python, SETEX, once
+                per window (four round trips, racing between them)
+    script    - both windows in one atomic script call
+    leased    - script plus the per-worker local allowance
+
+Usage:
+    python benchmark_chat_rate_limit.py [--concurrency 50] [--seconds 5]
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from redis import asyncio as aioredis
+from app.core.config import settings
+from app.middleware.chat_rate_limit_middleware import (
+    BucketWindow,
+    LocalAllowance,
+    TokenBuckets,
+)
+
+MINUTE = BucketWindow(
+    "minute",
+    settings.CHAT_RATE_LIMIT_PER_MINUTE,
+    settings.CHAT_RATE_LIMIT_PER_MINUTE + 10,
+    settings.CHAT_RATE_LIMIT_PER_MINUTE / 60.0
+)
+HOUR = BucketWindow(
+    "hour",
+    settings.CHAT_RATE_LIMIT_PER_HOUR,
+    settings.CHAT_RATE_LIMIT_PER_HOUR,
+    settings.CHAT_RATE_LIMIT_PER_HOUR / 3600.0
+)
+
+
+class GetSetexLimiter:
+    """The token bucket as implemented before the atomic script"""
+
+    def __init__(self, redis_client: aioredis.Redis):
+        self.redis = redis_client
+        self.round_trips = 0
+
+    async def _consume(self, key: str, window: BucketWindow, ttl: int) -> bool:
+        now = time.time()
+        data = await self.redis.get(key)
+        self.round_trips += 1
+        tokens, updated = (float(part) for part in data.split(":")) if data else (window.capacity, now)
+        tokens = min(window.capacity, tokens + (now - updated) * window.refill_rate)
+        allowed = tokens >= 1
+        await self.redis.setex(key, ttl, f"{tokens - 1 if allowed else tokens}:{now}")
+        self.round_trips += 1
+        return allowed
+
+    async def check(self, user_id: str) -> bool:
+        if not await self._consume(f"chat:ratelimit:minute:{user_id}", MINUTE, 60):
+            return False
+        return await self._consume(f"chat:ratelimit:hour:{user_id}", HOUR, 3600)
+
+
+class ScriptLimiter:
+    """Atomic script, optionally with the local allowance"""
+
+    def __init__(self, redis_client: aioredis.Redis, lease: int):
+        self.buckets = TokenBuckets(redis_client, (MINUTE, HOUR), lease=lease)
+        self.allowance = LocalAllowance(settings.CHAT_RATE_LIMIT_LEASE_SECONDS)
+        self.round_trips = 0
+
+    async def check(self, user_id: str) -> bool:
+        if self.allowance.take(user_id) is not None:
+            return True
+        result = await self.buckets.consume(user_id)
+        self.round_trips += 1
+        if result.allowed and result.leased:
+            self.allowance.grant(user_id, result.leased, result.remaining)
+        return result.allowed
+
+
+async def run(limiter, concurrency: int, seconds: float) -> dict:
+    """Admitted and total requests from one user over the run"""
+    user_id = f"bench-{uuid.uuid4().hex[:8]}"
+    admitted = 0
+    requests = 0
+    deadline = time.monotonic() + seconds
+
+    async def client():
+        nonlocal admitted, requests
+        while time.monotonic() < deadline:
+            allowed = await limiter.check(user_id)
+            admitted += allowed
+            requests += 1
+            await asyncio.sleep(0.001)
+
+    start = time.monotonic()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.monotonic() - start
+    return {
+        "admitted": admitted,
+        "requests": requests,
+        "ceiling": int(MINUTE.capacity + MINUTE.refill_rate * elapsed),
+        "round_trips": limiter.round_trips / requests
+    }
+
+
+async def main():
+    """Main entry point for the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    args = parser.parse_args()
+
+    redis_client = aioredis.from_url(settings.redis_url, decode_responses=True)
+    limiters = {
+        "get-setex": GetSetexLimiter(redis_client),
+        "script": ScriptLimiter(redis_client, lease=0),
+        "leased": ScriptLimiter(redis_client, lease=settings.CHAT_RATE_LIMIT_LEASE_SIZE),
+    }
+
+    print(
+        f"{args.concurrency} concurrent clients for {args.seconds:.0f}s, "
+        f"{MINUTE.limit}/minute (capacity {MINUTE.capacity}), {HOUR.limit}/hour"
+    )
+    try:
+        for mode, limiter in limiters.items():
+            result = await run(limiter, args.concurrency, args.seconds)
+            print(
+                f"  {mode:9s} admitted {result['admitted']:5d} / ceiling {result['ceiling']:4d}"
+                f"  of {result['requests']:6d} requests"
+                f"  {result['round_trips']:.2f} round trips/request"
+            )
+    finally:
+        await redis_client.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
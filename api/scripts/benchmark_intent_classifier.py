@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Benchmark of rule-based intent classification throughput.
+
+Classifies a corpus of recorded chat queries with the single-pass scanner
+and with the previous implementation (a regex search per keyword pattern,
+entity ID and date, plus substring checks per cue word), asserts that both
+produce identical Intents and reports queries per second for each.
+
+The built-in corpus mirrors queries seen in chat sessions; pass --corpus to
+replay a file of recorded queries instead (one query per line).
+
+Usage:
+    python benchmark_intent_classifier.py [--corpus queries.txt] [--rounds 200]
+"""
+import argparse
+import asyncio
+import logging
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.schemas.chat import EntityType, IntentType
+from app.services.intent_classifier import ExtractedEntity, Intent, IntentClassifier
+
+logger = logging.getLogger("app.services.intent_classifier")
+
+RECORDED_QUERIES = [
+    "Show me all tasks for project PRJ-100",
+    "Show me tasks for Project X",
+    "Show my tasks",
+    "show my tasks",
+    "Show  my tasks?",
+    "Show me all tasks assigned to John",
+    "Show me the tasks for it",
+    "Show task distribution by status",
+    "Show me task distribution by status this week",
+    "What's the status of things we discussed?",
+    "What is the status of PRJ-12?",
+    "Which bugs are blocked in PRJ-7 and TSK-88?",
+    "Who is working on TSK-123",
+    "When is STY-45 due?",
+    "Where are we with the release?",
+    "How many bugs were created last week",
+    "how many tasks are in progress for PRJ-3",
+    "List critical bugs",
+    "list high priority bugs that are not started",
+    "Find tasks due tomorrow",
+    "Get overdue subtasks for SUB-12",
+    "Display test cases TST-1 TST-2 and TST-3",
+    "Open task TSK-123",
+    "Open bug BUG-456",
+    "view PRG-2",
+    "go to USC-19 details",
+    "Navigate to the detail page of STY-5",
+    "take me to project PRJ-77",
+    "Set reminder for task TSK-123",
+    "Set a reminder for task TSK-123 tomorrow at 2pm",
+    "Set a reminder for bug BUG-456 tomorrow",
+    "remind me about BUG-9 next week",
+    "Create a task under PRJ-4",
+    "assign TSK-5 to Maria",
+    "Update status of TSK-8 to completed",
+    "change TSK-10 to on hold",
+    "link commit abc123 to TSK-11",
+    "add a comment: looks good to me",
+    "Give me a summary of PRJ-1",
+    "Generate a report for PRJ-2 this month",
+    "bug trend last month",
+    "statistics for \"Project Alpha\"",
+    "breakdown of tasks by assignee for 'Mobile App' project",
+    "analytics for program PRG-3",
+    "How is PRJ-5 doing?",
+    "how are the sprints going",
+    "status of the payments epic",
+    "average bug resolution time",
+    "total open bugs by priority",
+    "count urgent bugs reported yesterday",
+    "sum of story points this week",
+    "overview of use case USC-2",
+    "metrics for 01/15/2024",
+    "tasks completed on 2024-03-01",
+    "what happened on 15-03-2024",
+    "bugs created 3/4/24",
+    "yes",
+    "no",
+    "ok",
+    "huh?",
+    "what?",
+    "sorry, can you explain",
+    "what do you mean",
+    "more details please",
+    "clarify that",
+    "and that one?",
+    "show them",
+    "what about it",
+    "compare PRJ-1 versus PRJ-2",
+    "which is better, TSK-1 or TSK-2?",
+    "difference between sprint 3 and sprint 4",
+    "if TSK-4 is blocked, who should I ask?",
+    "show bugs unless they are archived",
+    "tasks that are pending approval and also rejected or cancelled, however only medium",
+    "Show me low priority tasks that are approved but not yet archived and also the critical ones",
+    "show me every task assigned to the platform team in PRJ-9 that is in progress and has a due date this week or next week",
+    "I need to follow up on the highlighted items",
+    "What's up",
+    "settings page is slow",
+    "",
+    "   ",
+    "PRJ-1",
+    "tsk-42?",
+    "BUG-1, BUG-2, STY-3, SUB-4, USC-5, TST-6, PRG-7, PRJ-8",
+    "Is the deployment TSK-1001 ready for today's demo?",
+    "status of TSK-1 vs TSK-2 today",
+    "Any blockers yesterday?",
+]
+
+
+class LegacyIntentClassifier(IntentClassifier):
+    """The rule-based classification as implemented before the scanner"""
+
+    async def classify(self, query: str, context: Optional[Dict[str, Any]] = None) -> Intent:
+        normalized_query = self._normalize_query(query)
+        entities = self._extract_entities(normalized_query)
+        temporal_context = self._extract_temporal_context(normalized_query)
+        intent_type, confidence = self._classify_intent_type(normalized_query, entities, context)
+        requires_llm = confidence < 0.7 or self._is_complex_query(normalized_query)
+        logger.debug(
+            f"Classified intent: type={intent_type.value}, "
+            f"confidence={confidence:.2f}, entities={len(entities)}, "
+            f"requires_llm={requires_llm}"
+        )
+        return Intent(
+            intent_type=intent_type,
+            entities=entities,
+            confidence=confidence,
+            raw_query=query,
+            normalized_query=normalized_query,
+            temporal_context=temporal_context,
+            requires_llm=requires_llm
+        )
+
+    def _extract_entities(self, query: str, features=None) -> List[ExtractedEntity]:
+        entities = []
+        entity_type_map = {
+            'project_id': EntityType.PROJECT,
+            'task_id': EntityType.TASK,
+            'subtask_id': EntityType.SUBTASK,
+            'bug_id': EntityType.BUG,
+            'story_id': EntityType.USER_STORY,
+            'usecase_id': EntityType.USECASE,
+            'test_case_id': EntityType.TEST_CASE,
+            'program_id': EntityType.PROGRAM,
+        }
+        for pattern_name, pattern in self.PATTERNS.items():
+            matches = pattern.findall(query)
+            if matches:
+                entity_type = entity_type_map.get(pattern_name)
+                if entity_type:
+                    for match in matches:
+                        entities.append(ExtractedEntity(
+                            entity_type=entity_type,
+                            entity_id=match.upper(),
+                            raw_text=match
+                        ))
+        name_patterns = [
+            re.compile(r'"([^"]+)"'),
+            re.compile(r"'([^']+)'"),
+        ]
+        for pattern in name_patterns:
+            for match in pattern.findall(query):
+                entity_type = self._infer_entity_type_from_context(match, query)
+                if entity_type:
+                    entities.append(ExtractedEntity(
+                        entity_type=entity_type,
+                        entity_name=match,
+                        raw_text=match
+                    ))
+        query_lower = query.lower()
+        for status in self.STATUS_VALUES:
+            if status in query_lower:
+                pass
+        for priority in self.PRIORITY_VALUES:
+            if priority in query_lower:
+                pass
+        return entities
+
+    def _extract_temporal_context(self, query: str, features=None) -> Dict[str, Any]:
+        temporal_context = {}
+        today = datetime.now().date()
+        if self.DATE_PATTERNS['today'].search(query):
+            temporal_context.update(date_filter='today', start_date=today, end_date=today)
+        elif self.DATE_PATTERNS['tomorrow'].search(query):
+            tomorrow = today + timedelta(days=1)
+            temporal_context.update(date_filter='tomorrow', start_date=tomorrow, end_date=tomorrow)
+        elif self.DATE_PATTERNS['yesterday'].search(query):
+            yesterday = today - timedelta(days=1)
+            temporal_context.update(date_filter='yesterday', start_date=yesterday, end_date=yesterday)
+        elif self.DATE_PATTERNS['this_week'].search(query):
+            start = today - timedelta(days=today.weekday())
+            temporal_context.update(date_filter='this_week', start_date=start, end_date=start + timedelta(days=6))
+        elif self.DATE_PATTERNS['last_week'].search(query):
+            start = today - timedelta(days=today.weekday() + 7)
+            temporal_context.update(date_filter='last_week', start_date=start, end_date=start + timedelta(days=6))
+        elif self.DATE_PATTERNS['next_week'].search(query):
+            start = today + timedelta(days=(7 - today.weekday()))
+            temporal_context.update(date_filter='next_week', start_date=start, end_date=start + timedelta(days=6))
+        elif self.DATE_PATTERNS['this_month'].search(query):
+            start = today.replace(day=1)
+            if today.month == 12:
+                end = today.replace(day=31)
+            else:
+                end = today.replace(month=today.month + 1, day=1) - timedelta(days=1)
+            temporal_context.update(date_filter='this_month', start_date=start, end_date=end)
+        elif self.DATE_PATTERNS['last_month'].search(query):
+            if today.month == 1:
+                start = today.replace(year=today.year - 1, month=12, day=1)
+            else:
+                start = today.replace(month=today.month - 1, day=1)
+            end = today.replace(day=1) - timedelta(days=1)
+            temporal_context.update(date_filter='last_month', start_date=start, end_date=end)
+
+        specific_date_match = self.DATE_PATTERNS['specific_date'].search(query)
+        if specific_date_match:
+            date_str = specific_date_match.group(1)
+            for fmt in ['%Y-%m-%d', '%m-%d-%Y', '%d-%m-%Y', '%Y/%m/%d', '%m/%d/%Y', '%d/%m/%Y']:
+                try:
+                    parsed_date = datetime.strptime(date_str, fmt).date()
+                    temporal_context.update(date_filter='specific', start_date=parsed_date, end_date=parsed_date)
+                    break
+                except ValueError:
+                    continue
+
+        query_lower = query.lower()
+        for status in self.STATUS_VALUES:
+            if status in query_lower:
+                temporal_context['status_filter'] = status
+                break
+        for priority in self.PRIORITY_VALUES:
+            if priority in query_lower:
+                temporal_context['priority_filter'] = priority
+                break
+        return temporal_context
+
+    def _classify_intent_type(
+        self,
+        query: str,
+        entities: List[ExtractedEntity],
+        context: Optional[Dict[str, Any]] = None,
+        features=None
+    ) -> Tuple[IntentType, float]:
+        query_lower = query.lower()
+        scores = {intent_type: 0.0 for intent_type in IntentType}
+        for intent_type, patterns in self.INTENT_KEYWORDS.items():
+            for pattern in patterns:
+                if re.search(pattern, query_lower):
+                    scores[intent_type] += 0.3
+        if len(entities) == 1 and any(
+            word in query_lower for word in ['open', 'view', 'show me', 'go to', 'navigate']
+        ):
+            scores[IntentType.NAVIGATION] += 0.5
+        action_verbs = ['set', 'create', 'add', 'update', 'change', 'assign', 'link', 'remind']
+        if any(verb in query_lower for verb in action_verbs):
+            scores[IntentType.ACTION] += 0.4
+            if entities:
+                scores[IntentType.ACTION] += 0.2
+        question_words = ['what', 'which', 'who', 'when', 'where', 'how']
+        if any(word in query_lower for word in question_words):
+            scores[IntentType.QUERY] += 0.4
+        if any(word in query_lower for word in ['show', 'list', 'find', 'get', 'display']):
+            scores[IntentType.QUERY] += 0.3
+        report_keywords = ['report', 'summary', 'statistics', 'distribution', 'breakdown', 'trend']
+        if any(keyword in query_lower for keyword in report_keywords):
+            scores[IntentType.REPORT] += 0.5
+        if any(word in query_lower for word in ['count', 'total', 'average', 'sum', 'how many']):
+            scores[IntentType.REPORT] += 0.3
+        if len(query.split()) <= 3 and any(
+            word in query_lower for word in ['yes', 'no', 'what', 'huh', 'ok', 'yeah']
+        ):
+            scores[IntentType.CLARIFICATION] += 0.5
+        if context:
+            last_intent = context.get('last_intent')
+            if last_intent == IntentType.CLARIFICATION:
+                scores[IntentType.CLARIFICATION] -= 0.3
+            if context.get('mentioned_entities') and any(
+                pronoun in query_lower for pronoun in ['it', 'this', 'that', 'them']
+            ):
+                if last_intent:
+                    scores[last_intent] += 0.2
+        max_score = max(scores.values())
+        if max_score < 0.3:
+            return IntentType.QUERY, 0.5
+        best_intent = max(scores.items(), key=lambda x: x[1])[0]
+        return best_intent, min(max_score / 1.5, 1.0)
+
+    def _is_complex_query(self, query: str, features=None) -> bool:
+        if len(query.split()) > 20:
+            return True
+        clause_connectors = ['and', 'or', 'but', 'however', 'also', 'additionally']
+        connector_count = sum(1 for word in clause_connectors if f' {word} ' in query.lower())
+        if connector_count >= 2:
+            return True
+        if query.count('?') > 1:
+            return True
+        if any(word in query.lower() for word in ['if', 'when', 'unless', 'provided that']):
+            return True
+        if any(word in query.lower() for word in ['compare', 'difference', 'versus', 'vs', 'better']):
+            return True
+        return False
+
+
+CONTEXTS = [
+    None,
+    {"last_intent": IntentType.CLARIFICATION, "mentioned_entities": []},
+    {"last_intent": IntentType.ACTION, "mentioned_entities": [{"entity_type": "task", "entity_id": "TSK-1"}]},
+]
+
+
+async def compare(queries: List[str]) -> int:
+    """Assert both implementations classify every query identically"""
+    scanner, legacy = IntentClassifier(), LegacyIntentClassifier()
+    checked = 0
+    for query in queries:
+        for context in CONTEXTS:
+            expected = await legacy.classify(query, context)
+            actual = await scanner.classify(query, context)
+            assert actual == expected, f"{query!r} with {context}: {actual} != {expected}"
+            checked += 1
+    return checked
+
+
+async def throughput(classifier: IntentClassifier, queries: List[str], rounds: int) -> float:
+    """Queries classified per second"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for query in queries:
+            await classifier.classify(query)
+    return rounds * len(queries) / (time.perf_counter() - start)
+
+
+async def main():
+    """Main entry point for the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--corpus", help="file of recorded queries, one per line")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    queries = RECORDED_QUERIES
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as corpus:
+            queries = [line.rstrip("\n") for line in corpus]
+
+    checked = await compare(queries)
+    print(f"{checked} classifications identical across {len(queries)} queries")
+
+    results = {
+        "legacy": await throughput(LegacyIntentClassifier(), queries, args.rounds),
+        "scanner": await throughput(IntentClassifier(), queries, args.rounds),
+    }
+    for mode, rate in results.items():
+        print(f"  {mode:8s} {rate:10,.0f} queries/s  {1e6 / rate:6.1f} us/query")
+    print(f"  speedup  {results['scanner'] / results['legacy']:.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Load benchmark for password hashing during a login storm.
+
+Drives a small ASGI app in-process through httpx (no network, no database):
+a stream of concurrent logins, each verifying a bcrypt hash at the
+production cost, while a probe client calls an unrelated endpoint on a
+fixed schedule. Reports p50/p99 latency of the probe and login throughput.
+
+Modes:
+    inline - verify on the event loop, as the login handler used to
+    pool   - verify on the bounded password hashing pool
+
+Usage:
+    python benchmark_password_hashing.py [--logins 64] [--concurrency 16] [--probe-interval 0.01]
+"""
+import argparse
+import asyncio
+import logging
+import time
+import httpx
+from fastapi import FastAPI
+from app.core.config import settings
+from app.core.password_hashing import PasswordHasher, PasswordHasherBusyException, pwd_context
+
+
+def build_app(mode: str, hasher: PasswordHasher, hashed_password: str) -> FastAPI:
+    """Benchmark app with a login and an unrelated endpoint"""
+    app = FastAPI()
+
+    @app.post("/login")
+    async def login():
+        if mode == "inline":
+            valid = pwd_context.verify("s3cret", hashed_password)
+        else:
+            try:
+                valid = await hasher.verify("s3cret", hashed_password)
+            except PasswordHasherBusyException:
+                return {"ok": False, "busy": True}
+        return {"ok": valid}
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def percentile(samples: list, fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run(app: FastAPI, logins: int, concurrency: int, probe_interval: float) -> dict:
+    """Probe latencies and login throughput while logins run"""
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench")
+    remaining = logins
+    busy = 0
+    probes = []
+
+    async def login_worker():
+        nonlocal remaining, busy
+        while remaining > 0:
+            remaining -= 1
+            response = await client.post("/login")
+            busy += response.json().get("busy", False)
+
+    async def probe():
+        # Latency is measured from the scheduled send time, so time spent
+        # waiting for a blocked event loop counts against the probe
+        scheduled = time.perf_counter()
+        while True:
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+            await client.get("/ping")
+            probes.append(time.perf_counter() - scheduled)
+            scheduled = max(scheduled + probe_interval, time.perf_counter() - probe_interval)
+
+    try:
+        await client.get("/ping")
+        prober = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        prober.cancel()
+    finally:
+        await client.aclose()
+
+    return {
+        "p50": percentile(probes, 0.50),
+        "p99": percentile(probes, 0.99),
+        "probes": len(probes),
+        "logins_per_second": logins / elapsed,
+        "busy": busy
+    }
+
+
+async def main():
+    """Main entry point for the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    hashed_password = pwd_context.hash("s3cret")
+
+    print(
+        f"{args.logins} logins, {args.concurrency} concurrent, bcrypt rounds "
+        f"{settings.PASSWORD_BCRYPT_ROUNDS}, {settings.PASSWORD_HASH_WORKERS} hashing workers"
+    )
+    for mode in ("inline", "pool"):
+        hasher = PasswordHasher()
+        try:
+            result = await run(
+                build_app(mode, hasher, hashed_password),
+                args.logins, args.concurrency, args.probe_interval
+            )
+        finally:
+            hasher.shutdown()
+        print(
+            f"  {mode:7s} /ping p50 {result['p50'] * 1e3:8.1f} ms  p99 {result['p99'] * 1e3:8.1f} ms"
+            f"  ({result['probes']} probes)  logins {result['logins_per_second']:6.1f}/s"
+            f"  rejected {result['busy']}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
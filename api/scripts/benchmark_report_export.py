@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Memory benchmark for report export.
+
+Exports a synthetic utilization report (no database) and reports the peak
+Python heap (tracemalloc) and wall time of each export path. Rows come from
+an async generator standing in for the server-side cursor, formatted by the
+real report row formatter.
+
+Modes:
+    buffered  - fetch every row, build the report dict, write the CSV into a
+                StringIO, encode it and wrap it in BytesIO, as the reports
+                endpoint used to
+    stream    - row-streaming CSV export
+    gzip      - row-streaming CSV export, gzip-compressed
+    pdf-doc   - whole-document ReportLab build, as the reports endpoint used to
+    pdf-pages - page-chunked PDF export
+
+Usage:
+    python benchmark_report_export.py [--rows 1000000] [--pdf-rows 20000]
+"""
+import argparse
+import asyncio
+import csv
+import io
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+from app.services.report_export import export_stream, gzip_chunks, PDF_AVAILABLE
+from app.services.report_service import ReportService, ReportStream
+
+HEADERS = ["User", "Tasks", "Estimated Hours", "Actual Hours", "Utilization %"]
+
+
+def cursor_row(i: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        assigned_to=f"USR-{i:07d}",
+        full_name=f"User {i}",
+        total_estimated=40 + i % 17,
+        total_actual=35 + i % 23,
+        task_count=1 + i % 9
+    )
+
+
+async def cursor(rows: int):
+    """Rows as a server-side cursor would deliver them"""
+    for i in range(rows):
+        yield cursor_row(i)
+        if i % 1000 == 0:
+            await asyncio.sleep(0)
+
+
+def report(rows: int) -> ReportStream:
+    async def formatted():
+        async for row in cursor(rows):
+            yield ReportService._utilization_row(row)
+
+    return ReportStream(
+        title="Utilization Report", period="2026-01-01 to 2026-12-31",
+        headers=HEADERS, rows=formatted()
+    )
+
+
+async def buffered_csv(rows: int) -> int:
+    results = [row async for row in cursor(rows)]
+    data = await report(0).collect()
+    data["rows"] = [ReportService._utilization_row(row) for row in results]
+
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow([data["title"]])
+    writer.writerow([f"Period: {data['period']}"])
+    writer.writerow([f"Generated: {data['generated_at']}"])
+    writer.writerow([])
+    writer.writerow(data["headers"])
+    for row in data["rows"]:
+        writer.writerow(row)
+    body = io.BytesIO(output.getvalue().encode())
+    return len(body.getvalue())
+
+
+async def buffered_pdf(rows: int) -> int:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Table, Paragraph
+    from reportlab.lib.styles import getSampleStyleSheet
+
+    data = await report(rows).collect()
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    elements = [Paragraph(data["title"], getSampleStyleSheet()["Heading1"])]
+    elements.append(Table([data["headers"]] + data["rows"]))
+    doc.build(elements)
+    return len(buffer.getvalue())
+
+
+async def streamed(chunks) -> int:
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+    return size
+
+
+async def measure(name: str, export) -> None:
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = await export()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {name:10s} peak {peak / 2**20:8.1f} MiB  {elapsed:6.1f} s  output {size / 2**20:7.1f} MiB")
+
+
+async def main():
+    """Main entry point for the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--pdf-rows", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"CSV, {args.rows} rows")
+    await measure("buffered", lambda: buffered_csv(args.rows))
+    await measure("stream", lambda: streamed(export_stream(report(args.rows), "csv")))
+    await measure("gzip", lambda: streamed(gzip_chunks(export_stream(report(args.rows), "csv"))))
+
+    if PDF_AVAILABLE and args.pdf_rows:
+        print(f"PDF, {args.pdf_rows} rows")
+        await measure("pdf-doc", lambda: buffered_pdf(args.pdf_rows))
+        await measure("pdf-pages", lambda: streamed(export_stream(report(args.pdf_rows), "pdf")))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
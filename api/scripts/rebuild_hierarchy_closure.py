@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+CLI script to rebuild the hierarchy closure table from the hierarchy tables.
+
+The API keeps hierarchy_closure in sync on every write; run this to repair
+drift after bulk imports or manual SQL changes.
+
+Usage:
+    python rebuild_hierarchy_closure.py
+"""
+import asyncio
+import sys
+from app.db.base import async_session_maker, engine
+from app.services.hierarchy_closure_service import HierarchyClosureService
+
+
+async def main():
+    """Main entry point for the closure rebuild"""
+    try:
+        async with async_session_maker() as session:
+            rows = await HierarchyClosureService(session).rebuild()
+        print(f"Hierarchy closure rebuilt: {rows} rows")
+    except Exception as e:
+        print(f"Error rebuilding hierarchy closure: {e}")
+        sys.exit(1)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+CLI script to rebuild the hierarchy rollup counters.
+
+The API adjusts hierarchy_rollups on every write; run this to repair drift
+after bulk imports or manual SQL changes. The closure table is rebuilt first
+because the counters are derived from it.
+
+Usage:
+    python rebuild_hierarchy_rollups.py
+"""
+import asyncio
+import sys
+from app.db.base import async_session_maker, engine
+from app.services.hierarchy_closure_service import HierarchyClosureService
+from app.services.hierarchy_rollup_service import HierarchyRollupService
+
+
+async def main():
+    """Main entry point for the rollup rebuild"""
+    try:
+        async with async_session_maker() as session:
+            closure_rows = await HierarchyClosureService(session).rebuild()
+            rollup_rows = await HierarchyRollupService(session).rebuild()
+        print(f"Hierarchy closure rebuilt: {closure_rows} rows")
+        print(f"Hierarchy rollups rebuilt: {rollup_rows} rows")
+    except Exception as e:
+        print(f"Error rebuilding hierarchy rollups: {e}")
+        sys.exit(1)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
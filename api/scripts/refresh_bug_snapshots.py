@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+CLI script to refresh the daily bug snapshots.
+
+Long bug trend ranges read bug_daily_snapshots when
+QA_TRENDS_SNAPSHOTS_ENABLED is set. Run this daily: it rebuilds the days
+from a few days before the last covered day up to yesterday (UTC), so bugs
+closed or deleted since the last run are picked up. Use --full after bulk
+imports or manual SQL changes.
+
+Usage:
+    python refresh_bug_snapshots.py [--lookback-days 7] [--full]
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.db.base import async_session_maker, engine
+from app.models.bug import Bug, BugDailySnapshot
+from app.services.qa_metrics_service import QAMetricsService
+
+
+async def main(lookback_days: int, full: bool):
+    """Main entry point for the snapshot refresh"""
+    try:
+        async with async_session_maker() as session:
+            yesterday = datetime.utcnow().date() - timedelta(days=1)
+            last_covered = None
+            if not full:
+                last_covered = (await session.execute(
+                    select(func.max(BugDailySnapshot.day))
+                )).scalar()
+            
+            if last_covered is not None:
+                start_day = last_covered - timedelta(days=lookback_days)
+            else:
+                first_bug = (await session.execute(
+                    select(func.min(func.timezone('UTC', Bug.created_at)))
+                )).scalar()
+                if first_bug is None:
+                    print("No bugs to snapshot")
+                    return
+                start_day = first_bug.date()
+            
+            if start_day > yesterday:
+                print("Bug snapshots are up to date")
+                return
+            
+            rows = await QAMetricsService(session).refresh_bug_snapshots(start_day, yesterday)
+        print(f"Bug snapshots refreshed from {start_day} to {yesterday}: {rows} rows")
+    except Exception as e:
+        print(f"Error refreshing bug snapshots: {e}")
+        sys.exit(1)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--lookback-days", type=int, default=7,
+                        help="Days before the last covered day to rebuild (default: 7)")
+    parser.add_argument("--full", action="store_true", help="Rebuild every day since the first bug")
+    args = parser.parse_args()
+    asyncio.run(main(args.lookback_days, args.full))
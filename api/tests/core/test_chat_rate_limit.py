@@ -0,0 +1,179 @@
+"""
+Tests for the atomic chat token buckets and the local allowance.
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.config import settings
+from app.middleware.chat_rate_limit_middleware import (
+    BucketsResult,
+    BucketWindow,
+    ChatRateLimitMiddleware,
+    LocalAllowance,
+    TokenBuckets,
+)
+
+WINDOWS = (
+    BucketWindow("minute", 60, 70, 1.0),
+    BucketWindow("hour", 1000, 1000, 1000 / 3600),
+)
+
+
+def _buckets(script_result, lease: int = 0) -> TokenBuckets:
+    redis_client = MagicMock()
+    redis_client.register_script.return_value = AsyncMock(return_value=script_result)
+    return TokenBuckets(redis_client, WINDOWS, lease=lease)
+
+
+@pytest.mark.asyncio
+async def test_both_windows_checked_in_one_script_call():
+    """Minute and hour buckets are evaluated by a single script call."""
+    buckets = _buckets([1, 0, "0", 4, 64, 994], lease=4)
+
+    result = await buckets.consume("USR-1")
+
+    buckets._script.assert_awaited_once_with(
+        keys=["chat:ratelimit:minute:USR-1", "chat:ratelimit:hour:USR-1"],
+        args=[1, 4, 0.5, 0, 70, 1.0, 1000, 1000 / 3600]
+    )
+    assert result == BucketsResult(True, None, 0.0, 4, (64, 994))
+
+
+@pytest.mark.asyncio
+async def test_denial_reports_the_exhausted_window():
+    """A denial names the window that ran out and when to retry."""
+    buckets = _buckets([0, 2, "3.6", 0, 40, 0])
+
+    result = await buckets.consume("USR-1")
+
+    assert not result.allowed
+    assert result.denied_window.name == "hour"
+    assert result.retry_after == pytest.approx(3.6)
+
+
+def test_local_allowance_spends_leased_tokens_then_expires():
+    """Leased tokens are spent locally until used up or expired."""
+    allowance = LocalAllowance(ttl_seconds=2.0)
+
+    with patch("app.middleware.chat_rate_limit_middleware.time.monotonic", return_value=100.0):
+        allowance.grant("USR-1", 2, (64, 994))
+        assert allowance.take("USR-1") == (65, 995)
+        assert allowance.take("USR-1") == (64, 994)
+        assert allowance.take("USR-1") is None
+
+        allowance.grant("USR-1", 2, (64, 994))
+    with patch("app.middleware.chat_rate_limit_middleware.time.monotonic", return_value=102.0):
+        assert allowance.take("USR-1") is None
+        # The lapsed tokens are handed back for the next Redis check to refund
+        assert allowance.checkout("USR-1") == (2, False)
+        assert allowance.checkout("USR-1") == (0, True)
+
+
+def test_concurrent_leases_accumulate():
+    """Leases granted while one is unspent add up instead of replacing it."""
+    allowance = LocalAllowance(ttl_seconds=2.0)
+
+    allowance.grant("USR-1", 2, (64, 994))
+    allowance.grant("USR-1", 2, (58, 988))
+
+    assert [allowance.take("USR-1") for _ in range(5)] == [
+        (61, 991), (60, 990), (59, 989), (58, 988), None
+    ]
+
+
+def test_local_allowance_is_bounded():
+    """The least recently granted users are dropped beyond max_keys."""
+    allowance = LocalAllowance(ttl_seconds=2.0, max_keys=2)
+
+    for user in ("USR-1", "USR-2", "USR-3"):
+        allowance.grant(user, 3, (60, 990))
+
+    assert len(allowance) == 2
+    assert allowance.take("USR-1") is None
+
+
+@pytest.mark.asyncio
+async def test_middleware_serves_leased_tokens_without_redis():
+    """After a lease, the next requests are admitted without a Redis check."""
+    middleware = ChatRateLimitMiddleware(AsyncMock())
+    middleware._consume = AsyncMock(return_value=BucketsResult(True, None, 0.0, 2, (62, 992)))
+    scope = {
+        "type": "http",
+        "path": "/api/v1/chat/messages",
+        "headers": [],
+        "state": {"user": MagicMock(id="USR-1")},
+    }
+
+    for _ in range(4):
+        await middleware(scope, AsyncMock(), AsyncMock())
+
+    assert middleware._consume.await_count == 2
+    assert middleware.app.await_count == 4
+
+
+class _BucketsScript:
+    """TOKEN_BUCKETS_SCRIPT modelled in Python over a settable clock"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.levels = {}
+
+    async def __call__(self, keys, args):
+        cost, lease, headroom, refund = args[:4]
+        windows = list(zip(args[4::2], args[5::2]))
+        levels, denied, retry_after = [], 0, 0.0
+        for i, (key, (capacity, rate)) in enumerate(zip(keys, windows), 1):
+            level, updated = self.levels.get(key, (capacity, self.now))
+            level = min(capacity, level + (self.now - updated) * rate + refund)
+            if level < cost and (cost - level) / rate > retry_after:
+                denied, retry_after = i, (cost - level) / rate
+            levels.append(level)
+        if denied:
+            if refund:
+                self.levels.update((key, (level, self.now)) for key, level in zip(keys, levels))
+            return [0, denied, str(retry_after), 0, *(int(level) for level in levels)]
+
+        if any(level - cost - lease < capacity * headroom for level, (capacity, _) in zip(levels, windows)):
+            lease = 0
+        levels = [level - cost - lease for level in levels]
+        self.levels.update((key, (level, self.now)) for key, level in zip(keys, levels))
+        return [1, 0, "0", lease, *(int(level) for level in levels)]
+
+
+async def _admitted(requests: int, interval: float, hour_limit: int = 20) -> int:
+    """Send requests interval seconds apart; count those admitted"""
+    script = _BucketsScript()
+    redis_client = MagicMock()
+    redis_client.register_script.return_value = script
+    limiter = MagicMock()
+    limiter.get_redis = AsyncMock(return_value=redis_client)
+    scope = {
+        "type": "http",
+        "path": "/api/v1/chat/messages",
+        "headers": [],
+        "state": {"user": MagicMock(id="USR-1")},
+    }
+
+    with patch("app.middleware.chat_rate_limit_middleware.settings.CHAT_RATE_LIMIT_PER_HOUR", hour_limit), \
+            patch("app.middleware.chat_rate_limit_middleware.get_rate_limiter", return_value=limiter), \
+            patch("app.middleware.chat_rate_limit_middleware.time.monotonic", side_effect=lambda: script.now):
+        middleware = ChatRateLimitMiddleware(AsyncMock())
+        for n in range(requests):
+            script.now = n * interval
+            await middleware(scope, AsyncMock(), AsyncMock())
+    return middleware.app.await_count
+
+
+@pytest.mark.asyncio
+async def test_sparse_requests_get_the_full_quota():
+    """Requests slower than one per lease window are not charged for unused leases."""
+    interval = settings.CHAT_RATE_LIMIT_LEASE_SECONDS * 1.5
+
+    assert await _admitted(25, interval) == 20
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("interval", [0.1, 0.5, 1.5])
+async def test_unspent_leases_are_refunded(interval):
+    """Leases taken during quick requests are refunded once they lapse."""
+    assert await _admitted(25, interval) == 20
@@ -0,0 +1,111 @@
+"""
+Tests for the pure ASGI request middlewares.
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core.rate_limit import MemoryRateLimiterBackend, RateLimiter
+from app.middleware.chat_rate_limit_middleware import BucketsResult, ChatRateLimitMiddleware
+from app.middleware.logging_middleware import LoggingMiddleware
+from app.middleware.rate_limit_middleware import RateLimitMiddleware
+
+
+def _memory_limiter() -> RateLimiter:
+    limiter = RateLimiter(fallback=MemoryRateLimiterBackend())
+    limiter.get_redis = AsyncMock(return_value=None)
+    return limiter
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/export")
+    async def export():
+        async def rows():
+            for index in range(3):
+                yield f"row-{index}\n"
+                await asyncio.sleep(0)
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    return app
+
+
+def test_stack_streams_and_sets_headers():
+    """Streaming bodies pass through with request-id and rate limit headers."""
+    app = _app()
+    app.add_middleware(LoggingMiddleware)
+    app.add_middleware(RateLimitMiddleware, requests_per_minute=500, rules=(), limiter=_memory_limiter())
+
+    response = TestClient(app).get("/export")
+
+    assert response.status_code == 200
+    assert response.text == "row-0\nrow-1\nrow-2\n"
+    assert response.headers["X-Request-ID"]
+    assert response.headers["X-RateLimit-Limit"] == "500"
+    assert response.headers["X-RateLimit-Remaining"] == "499"
+
+
+def test_logging_middleware_access_log_and_slow_warning():
+    """Requests are logged with their status; slow ones also warn."""
+    app = _app()
+    app.add_middleware(LoggingMiddleware)
+
+    with patch("app.middleware.logging_middleware.logger") as logger, \
+            patch("app.middleware.logging_middleware.time") as clock:
+        clock.time.side_effect = [100.0, 102.5]
+        response = TestClient(app).get("/ping")
+
+    logger.log_api_request.assert_called_once_with(
+        method="GET", path="/ping", status_code=200, duration_ms=2500.0
+    )
+    assert logger.warning.call_args.kwargs["status_code"] == 200
+    assert response.headers["X-Request-ID"]
+
+
+def test_rejected_request_still_gets_request_id():
+    """429 responses from inner middleware carry the request id."""
+    app = _app()
+    app.add_middleware(RateLimitMiddleware, requests_per_minute=1, rules=(), limiter=_memory_limiter())
+    app.add_middleware(LoggingMiddleware)
+    client = TestClient(app)
+
+    client.get("/ping")
+    response = client.get("/ping")
+
+    assert response.status_code == 429
+    assert response.headers["X-Request-ID"]
+
+
+def test_chat_rate_limit_headers_for_authenticated_user():
+    """Chat responses report both windows' remaining allowance."""
+    app = FastAPI()
+
+    @app.get("/api/v1/chat/messages")
+    async def messages():
+        return {"ok": True}
+
+    app.add_middleware(ChatRateLimitMiddleware)
+
+    async def attach_user(scope, receive, send):
+        scope.setdefault("state", {})["user"] = SimpleNamespace(id="USR-1")
+        await inner(scope, receive, send)
+
+    inner = app.build_middleware_stack()
+    app.middleware_stack = attach_user
+
+    result = BucketsResult(True, None, 0.0, 0, (69, 999))
+    with patch.object(ChatRateLimitMiddleware, "_consume", AsyncMock(return_value=result)):
+        response = TestClient(app).get("/api/v1/chat/messages")
+
+    assert response.status_code == 200
+    assert response.headers["X-RateLimit-Remaining-Minute"] == "69"
+    assert response.headers["X-RateLimit-Remaining-Hour"] == "999"
@@ -0,0 +1,103 @@
+"""
+Tests for the bounded password hashing pool.
+"""
+import asyncio
+import threading
+import pytest
+from passlib.context import CryptContext
+from unittest.mock import MagicMock
+
+from app.core.password_hashing import PasswordHasher, PasswordHasherBusyException
+from app.core.security import authenticate_password
+
+
+def _context(rounds: int = 4) -> CryptContext:
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_run_off_the_event_loop():
+    """Hashing runs on a pool thread and round-trips."""
+    context = _context()
+    threads = []
+
+    def hash_on_worker(password):
+        threads.append(threading.get_ident())
+        return context.hash(password)
+
+    hasher = PasswordHasher(context=context, workers=2, max_queue=2)
+    hasher.context = MagicMock(wraps=context)
+    hasher.context.hash.side_effect = hash_on_worker
+
+    hashed = await hasher.hash("s3cret")
+
+    assert threads and threads[0] != threading.get_ident()
+    assert await hasher.verify("s3cret", hashed)
+    assert not await hasher.verify("wrong", hashed)
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_queue_bound_rejects_excess_work():
+    """Work beyond workers + max_queue is rejected instead of queued."""
+    release = threading.Event()
+    context = MagicMock()
+    context.hash.side_effect = lambda password: release.wait(5) and "hash"
+    hasher = PasswordHasher(context=context, workers=1, max_queue=1)
+
+    running = asyncio.create_task(hasher.hash("a"))
+    queued = asyncio.create_task(hasher.hash("b"))
+    await asyncio.sleep(0.05)
+
+    assert (hasher.in_flight, hasher.queue_depth) == (1, 1)
+    with pytest.raises(PasswordHasherBusyException):
+        await hasher.hash("c")
+
+    release.set()
+    assert await asyncio.gather(running, queued) == ["hash", "hash"]
+    assert (hasher.in_flight, hasher.queue_depth) == (0, 0)
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_queued_work_is_not_run():
+    """Cancelling a caller that is still queued frees its slot."""
+    release = threading.Event()
+    context = MagicMock()
+    context.hash.side_effect = lambda password: release.wait(5) and "hash"
+    hasher = PasswordHasher(context=context, workers=1, max_queue=1)
+
+    running = asyncio.create_task(hasher.hash("a"))
+    queued = asyncio.create_task(hasher.hash("b"))
+    await asyncio.sleep(0.05)
+    queued.cancel()
+    await asyncio.sleep(0)
+
+    assert hasher.queue_depth == 0
+    release.set()
+    await running
+    await asyncio.sleep(0.05)
+    assert context.hash.call_count == 1
+    hasher.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_outdated_hash_is_rehashed_on_login(monkeypatch):
+    """A valid password with outdated cost parameters gets a fresh hash."""
+    hasher = PasswordHasher(context=_context(rounds=5), workers=1, max_queue=1)
+    monkeypatch.setattr("app.core.security.password_hasher", hasher)
+    old_hash = _context(rounds=4).hash("s3cret")
+    user = MagicMock(hashed_password=old_hash)
+
+    assert await authenticate_password(user, "s3cret")
+    assert user.hashed_password != old_hash
+    assert user.hashed_password.startswith("$2b$05$")
+
+    current_hash = user.hashed_password
+    assert await authenticate_password(user, "s3cret")
+    assert user.hashed_password == current_hash
+
+    user.hashed_password = old_hash
+    assert not await authenticate_password(user, "wrong")
+    assert user.hashed_password == old_hash
+    hasher.shutdown()
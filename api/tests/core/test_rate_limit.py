@@ -0,0 +1,211 @@
+"""
+Tests for the shared rate limiting engine and RateLimitMiddleware.
+"""
+import asyncio
+from datetime import timedelta
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from redis.exceptions import RedisError
+
+from app.core.rate_limit import (
+    MemoryRateLimiterBackend,
+    RateLimiter,
+    RateLimitPolicy,
+    RateLimitRule,
+    RedisRateLimiterBackend,
+    default_rate_limit_rules,
+    resolve_policy,
+)
+from app.core.security import create_user_access_token
+from app.main import app as main_app
+from app.middleware.rate_limit_middleware import RateLimitMiddleware
+from app.models.user import User
+from app.services.cache_service import cache_service
+
+
+def _clock(value):
+    """Patch the monotonic clock used by the in-memory backend."""
+    return patch("app.core.rate_limit.time.monotonic", return_value=value)
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_admits_limit_then_denies():
+    """A policy of N per window admits a burst of N, then denies."""
+    backend = MemoryRateLimiterBackend()
+    policy = RateLimitPolicy("default", 3, 60)
+
+    with _clock(1000.0):
+        results = [await backend.hit("key", policy) for _ in range(4)]
+
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results[:3]] == [2, 1, 0]
+    assert results[3].retry_after == pytest.approx(20.0)
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_refills_at_sustained_rate():
+    """One request is re-admitted every window/N seconds."""
+    backend = MemoryRateLimiterBackend()
+    policy = RateLimitPolicy("default", 3, 60)
+
+    with _clock(1000.0):
+        for _ in range(3):
+            await backend.hit("key", policy)
+    with _clock(1020.0):
+        assert (await backend.hit("key", policy)).allowed
+        assert not (await backend.hit("key", policy)).allowed
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_evicts_idle_and_bounds_keys():
+    """Idle keys are dropped and the key map never exceeds max_keys."""
+    backend = MemoryRateLimiterBackend(max_keys=2)
+    policy = RateLimitPolicy("default", 10, 60)
+
+    with _clock(1000.0):
+        await backend.hit("a", policy)
+    with _clock(2000.0):
+        await backend.hit("b", policy)
+    assert len(backend) == 1
+
+    with _clock(2000.0):
+        await backend.hit("c", policy)
+        await backend.hit("d", policy)
+    assert len(backend) == 2
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_full_of_live_keys_keeps_limits():
+    """New keys never evict a live one; they are denied until a key expires."""
+    backend = MemoryRateLimiterBackend(max_keys=3)
+    policy = RateLimitPolicy("default", 2, 60)
+
+    with _clock(1000.0):
+        await backend.hit("attacker", policy)
+        await backend.hit("attacker", policy)
+        assert not (await backend.hit("attacker", policy)).allowed
+        await backend.hit("a", policy)
+        await backend.hit("b", policy)
+
+        sprayed = [await backend.hit(f"spray-{index}", policy) for index in range(5)]
+        assert not any(result.allowed for result in sprayed)
+        assert sprayed[0].retry_after == pytest.approx(30.0)
+        assert not (await backend.hit("attacker", policy)).allowed
+    assert len(backend) == 3
+
+    with _clock(1030.0):
+        assert (await backend.hit("new", policy)).allowed
+        attacker = [await backend.hit("attacker", policy) for _ in range(2)]
+    assert [result.allowed for result in attacker] == [True, False]
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_single_script_call():
+    """The Redis backend evaluates one script per check."""
+    redis_client = MagicMock()
+    script = AsyncMock(return_value=[1, 4, "0", "12.5"])
+    redis_client.register_script.return_value = script
+    backend = RedisRateLimiterBackend(redis_client)
+
+    result = await backend.hit("ratelimit:default:USR-1", RateLimitPolicy("default", 5, 60))
+
+    script.assert_awaited_once_with(keys=["ratelimit:default:USR-1"], args=[12.0, 5, 1])
+    assert result.allowed and result.remaining == 4 and result.reset_after == 12.5
+
+
+@pytest.mark.asyncio
+async def test_limiter_falls_back_to_memory_on_redis_error():
+    """Redis failures are served from the in-memory backend."""
+    backend = MagicMock(spec=RedisRateLimiterBackend)
+    backend.redis = MagicMock()
+    backend.hit = AsyncMock(side_effect=RedisError("down"))
+    limiter = RateLimiter(backend=backend)
+
+    result = await limiter.hit("USR-1", RateLimitPolicy("default", 5, 60))
+
+    assert result.allowed
+    assert limiter.backend is None
+    assert len(limiter.fallback) == 1
+
+
+def test_policy_resolution_by_route_method_and_role():
+    """Route and role rules take precedence over the default policy."""
+    default = RateLimitPolicy("default", 500)
+    rules = default_rate_limit_rules(500)
+
+    assert resolve_policy(rules, default, "/api/v1/auth/login", "POST", None).name == "login"
+    assert resolve_policy(rules, default, "/api/v1/auth/login", "GET", None).name == "default"
+    assert resolve_policy(rules, default, "/api/v1/tasks", "GET", "Admin").limit == 1000
+    assert resolve_policy(rules, default, "/api/v1/tasks", "GET", "Developer") is default
+
+
+def test_middleware_headers_and_429():
+    """The middleware reports limits in headers and rejects over-limit requests."""
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    limiter = RateLimiter(fallback=MemoryRateLimiterBackend())
+    limiter.get_redis = AsyncMock(return_value=None)
+    app.add_middleware(RateLimitMiddleware, requests_per_minute=2, rules=(), limiter=limiter)
+    client = TestClient(app)
+
+    first = client.get("/ping")
+    second = client.get("/ping")
+    third = client.get("/ping")
+
+    assert first.headers["X-RateLimit-Limit"] == "2"
+    assert first.headers["X-RateLimit-Remaining"] == "1"
+    assert second.headers["X-RateLimit-Remaining"] == "0"
+    assert third.status_code == 429
+    assert third.headers["Retry-After"] == "30"
+    assert third.json()["error"]["code"] == "RATE_LIMIT_EXCEEDED"
+
+
+def test_route_rule_uses_separate_bucket():
+    """Requests matching a route rule do not consume the default bucket."""
+    app = FastAPI()
+
+    @app.get("/api/v1/reports/x")
+    async def report():
+        return {"ok": True}
+
+    limiter = RateLimiter(fallback=MemoryRateLimiterBackend())
+    limiter.get_redis = AsyncMock(return_value=None)
+    rules = (RateLimitRule(RateLimitPolicy("reports", 1), path_prefix="/api/v1/reports"),)
+    app.add_middleware(RateLimitMiddleware, requests_per_minute=100, rules=rules, limiter=limiter)
+    client = TestClient(app)
+
+    assert client.get("/api/v1/reports/x").headers["X-RateLimit-Limit"] == "1"
+    assert client.get("/api/v1/reports/x").status_code == 429
+
+
+def test_admin_policy_applies_through_app_middleware():
+    """Bearer tokens are resolved to their user, so the Admin rule applies in the app."""
+    admin = User(id="USR-RL-ADMIN", role="Admin", is_active=True, token_version=1)
+    principal = {"id": admin.id, "role": admin.role, "is_active": True, "token_version": 1}
+    asyncio.run(cache_service.set(
+        cache_service.principal_key(admin.id, 1), principal,
+        ttl=timedelta(minutes=1), tags=[f"principal:{admin.id}"]
+    ))
+    client = TestClient(main_app)
+
+    try:
+        with patch.object(RateLimiter, "get_redis", AsyncMock(return_value=None)):
+            as_admin = client.get(
+                "/api/v1/rate-limit-probe",
+                headers={"Authorization": f"Bearer {create_user_access_token(admin)}"}
+            )
+            forged = client.get("/api/v1/rate-limit-probe", headers={"Authorization": "Bearer forged"})
+            anonymous = client.get("/api/v1/rate-limit-probe")
+    finally:
+        asyncio.run(cache_service.invalidate_principal(admin.id))
+
+    assert as_admin.headers["X-RateLimit-Limit"] == "1000"
+    assert forged.headers["X-RateLimit-Limit"] == "500"
+    assert anonymous.headers["X-RateLimit-Limit"] == "500"
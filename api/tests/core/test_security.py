@@ -0,0 +1,99 @@
+"""
+Tests for access-token resolution and the authenticated-principal cache.
+"""
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import app.models  # noqa: F401 - configure all mappers
+from app.core.security import create_access_token, create_user_access_token, get_user_for_token
+from app.models.user import User
+from app.services.cache_backends import MemoryCacheBackend
+from app.services.cache_service import CacheService
+
+
+@pytest.fixture
+def cache():
+    """Route principal caching through a fresh in-process cache"""
+    cache = CacheService(l1=MemoryCacheBackend())
+    with patch("app.core.security.cache_service", cache):
+        yield cache
+
+
+def _user(token_version: int = 1) -> User:
+    return User(
+        id="USR-1",
+        email="dev@example.com",
+        hashed_password="hash",
+        full_name="Dev",
+        role="Developer",
+        client_id="CLI-1",
+        is_active=True,
+        token_version=token_version,
+        created_at=datetime(2026, 1, 1, tzinfo=timezone.utc)
+    )
+
+
+def _db(user=None):
+    db = AsyncMock()
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = user
+    db.execute.return_value = result
+    db.merge.side_effect = lambda instance, load: instance
+    return db
+
+
+@pytest.mark.asyncio
+async def test_second_lookup_skips_users_query(cache):
+    """A cached principal is attached to the session without a query."""
+    token = create_user_access_token(_user())
+    first_db, second_db = _db(_user()), _db()
+
+    first = await get_user_for_token(token, first_db)
+    second = await get_user_for_token(token, second_db)
+
+    assert first.id == second.id == "USR-1"
+    second_db.execute.assert_not_called()
+    assert second_db.merge.await_args.kwargs == {"load": False}
+    assert second.role == "Developer" and second.client_id == "CLI-1"
+
+
+@pytest.mark.asyncio
+async def test_password_hash_is_not_cached(cache):
+    """The cached principal omits the password hash."""
+    token = create_user_access_token(_user())
+    await get_user_for_token(token, _db(_user()))
+
+    values = await cache.get(cache.principal_key("USR-1", 1))
+    assert "hashed_password" not in values
+    assert values["token_version"] == 1
+
+
+@pytest.mark.asyncio
+async def test_revoked_token_version_is_rejected(cache):
+    """Tokens issued before a version bump resolve to no user."""
+    token = create_user_access_token(_user(token_version=1))
+
+    assert await get_user_for_token(token, _db(_user(token_version=2))) is None
+
+
+@pytest.mark.asyncio
+async def test_invalidation_forces_reload(cache):
+    """Invalidating a principal drops it for every token version."""
+    token = create_user_access_token(_user())
+    await get_user_for_token(token, _db(_user()))
+
+    await cache.invalidate_principal("USR-1")
+    db = _db(_user())
+    await get_user_for_token(token, db)
+
+    db.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_tokens_without_version_claim_count_as_version_one(cache):
+    """Tokens issued before versioning stay valid until the first bump."""
+    token = create_access_token({"sub": "USR-1"})
+
+    assert (await get_user_for_token(token, _db(_user()))).id == "USR-1"
+    assert await get_user_for_token("not-a-token", _db()) is None
@@ -0,0 +1,155 @@
+"""
+Tests for the durable audit queue.
+
+These tests validate:
+- Handing audit logs to the Redis stream in one round trip
+- Direct writes without Redis or over the queue limit
+- Acknowledging entries only after their rows are committed
+- Skipping malformed entries instead of redelivering them forever
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.config import settings
+from app.schemas.chat import ChatAuditLogCreate, IntentType, ActionResult
+from app.services.audit_service import (
+    AUDIT_CONSUMER_GROUP,
+    AUDIT_STREAM_KEY,
+    AuditService,
+)
+
+
+@pytest.fixture
+def audit_data():
+    """Create sample audit log data"""
+    return ChatAuditLogCreate(
+        request_id="req_0001",
+        user_id="USR-001",
+        client_id="CLI-001",
+        session_id="SES-001",
+        query="Email me at jane@example.com",
+        intent_type=IntentType.QUERY,
+        action_result=ActionResult.SUCCESS,
+        response_summary="Done"
+    )
+
+
+@pytest.fixture
+def service():
+    """Create an AuditService with a mocked Redis pipeline"""
+    service = AuditService()
+    service._redis = MagicMock()
+    service.pipe = MagicMock()
+    service.pipe.execute = AsyncMock(return_value=[b"1-0", 1])
+    service._redis.pipeline = MagicMock(return_value=service.pipe)
+    service._write_direct = AsyncMock()
+    return service
+
+
+@pytest.mark.asyncio
+async def test_enqueue_adds_to_stream(service, audit_data):
+    """Test that enqueue is a single pipelined XADD"""
+    await service.enqueue(audit_data)
+
+    key, fields = service.pipe.xadd.call_args.args
+    assert key == AUDIT_STREAM_KEY
+    assert ChatAuditLogCreate.model_validate_json(fields["data"]) == audit_data
+    service.pipe.execute.assert_awaited_once()
+    service._write_direct.assert_not_called()
+    assert service._queue_depth == 1
+
+
+@pytest.mark.asyncio
+async def test_enqueue_writes_directly_without_redis(service, audit_data):
+    """Test the direct write when no queue is attached"""
+    service._redis = None
+
+    await service.enqueue(audit_data)
+
+    service._write_direct.assert_awaited_once_with(audit_data)
+
+
+@pytest.mark.asyncio
+async def test_enqueue_writes_directly_when_queue_full(service, audit_data):
+    """Test that a full queue applies backpressure instead of dropping"""
+    service._queue_depth = settings.CHAT_AUDIT_QUEUE_MAX_LENGTH
+
+    await service.enqueue(audit_data)
+
+    service.pipe.xadd.assert_not_called()
+    service._write_direct.assert_awaited_once_with(audit_data)
+
+
+@pytest.mark.asyncio
+async def test_enqueue_falls_back_when_redis_fails(service, audit_data):
+    """Test the direct write when the stream is unreachable"""
+    service.pipe.execute = AsyncMock(side_effect=ConnectionError("down"))
+
+    await service.enqueue(audit_data)
+
+    service._write_direct.assert_awaited_once_with(audit_data)
+
+
+@pytest.mark.asyncio
+async def test_write_entries_acks_after_insert(service, audit_data):
+    """Test that entries are acknowledged and removed once committed"""
+    service.pipe.execute = AsyncMock(return_value=[1, 1, 0])
+    entries = [(b"1-0", {b"data": audit_data.model_dump_json().encode()})]
+
+    with patch("app.services.audit_service.async_session_maker") as session_maker, \
+         patch.object(service, "_insert_logs", AsyncMock()) as insert_logs:
+        await service._write_entries(entries)
+
+    db, batch = insert_logs.call_args.args
+    session_maker.assert_called_once_with()
+    assert db is session_maker.return_value.__aenter__.return_value
+    assert [log.request_id for log in batch] == ["req_0001"]
+    service.pipe.xack.assert_called_once_with(AUDIT_STREAM_KEY, AUDIT_CONSUMER_GROUP, b"1-0")
+    service.pipe.xdel.assert_called_once_with(AUDIT_STREAM_KEY, b"1-0")
+
+
+@pytest.mark.asyncio
+async def test_write_entries_leaves_entries_pending_on_failure(service, audit_data):
+    """Test that a failed insert is not acknowledged"""
+    entries = [(b"1-0", {b"data": audit_data.model_dump_json().encode()})]
+
+    with patch("app.services.audit_service.async_session_maker"), \
+         patch.object(service, "_insert_logs", AsyncMock(side_effect=RuntimeError("db down"))):
+        with pytest.raises(RuntimeError):
+            await service._write_entries(entries)
+
+    service.pipe.xack.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_write_entries_discards_malformed(service):
+    """Test that an unreadable entry is acknowledged without an insert"""
+    service.pipe.execute = AsyncMock(return_value=[1, 1, 0])
+
+    with patch.object(service, "_insert_logs", AsyncMock()) as insert_logs:
+        await service._write_entries([(b"1-0", {b"data": b"not json"})])
+
+    insert_logs.assert_not_called()
+    service.pipe.xack.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_claim_stale_entries_is_rate_limited(service):
+    """Test that pending entries are reclaimed at most once per interval"""
+    service._redis.xautoclaim = AsyncMock(return_value=[b"0-0", [(b"1-0", {})], []])
+
+    first = await service._claim_stale_entries()
+    second = await service._claim_stale_entries()
+
+    assert first == [(b"1-0", {})]
+    assert second == []
+    service._redis.xautoclaim.assert_awaited_once()
+
+
+def test_build_log_data_masks_pii(service, audit_data):
+    """Test that queued logs are masked before insert"""
+    log_data = service._build_log_data(audit_data)
+
+    assert log_data["query"] == "Email me at [EMAIL]"
+    assert log_data["intent_type"] == "query"
+    assert log_data["action_result"] == "success"
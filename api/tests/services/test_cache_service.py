@@ -0,0 +1,347 @@
+"""
+Tests for the two-tier cache service.
+
+These tests validate:
+- The bounded LRU/TTL in-process backend and its tag index
+- Value serialization for the Redis backend
+- CacheService tiering, tag invalidation and cross-worker fan-out
+- The @cached decorator's argument-based keys and declarative tags
+- User changes evicting the cached member lists of the user's teams
+- Hit/miss/eviction/load metrics and the cache admin endpoints
+"""
+import json
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from redis.exceptions import RedisError
+
+from app.services.cache_backends import (
+    MemoryCacheBackend,
+    RedisCacheBackend,
+    decode_value,
+    encode_value,
+)
+from app.services.cache_metrics import CacheMetrics
+from app.api.v1.endpoints import users
+from app.services.cache_service import CacheService, cached
+from app.services.query_optimization_service import QueryOptimizationService
+
+
+@pytest.fixture
+def l2():
+    """Create a mocked shared cache tier"""
+    backend = AsyncMock(spec=RedisCacheBackend)
+    backend.name = "redis"
+    backend.get.return_value = None
+    return backend
+
+
+@pytest.fixture
+def service(l2):
+    """Create a CacheService with a mocked shared tier and Redis client"""
+    with patch("app.services.cache_service.get_cache_metrics", return_value=CacheMetrics()):
+        cache = CacheService(l1=MemoryCacheBackend(max_entries=8), l2=l2)
+    cache.redis_client = AsyncMock()
+    return cache
+
+
+class TestMemoryCacheBackend:
+    """Test the in-process L1 backend."""
+
+    @pytest.mark.asyncio
+    async def test_lru_eviction_is_bounded(self):
+        """The least recently used entry is evicted beyond max_entries."""
+        backend = MemoryCacheBackend(max_entries=2)
+        await backend.set("a", 1, 60)
+        await backend.set("b", 2, 60)
+        await backend.get("a")
+        await backend.set("c", 3, 60)
+
+        assert await backend.get("b") is None
+        assert await backend.get("a") == 1
+        assert len(backend) == 2
+        assert backend.evictions == 1
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_are_dropped(self):
+        """Entries past their TTL read as misses."""
+        backend = MemoryCacheBackend()
+        with patch("app.services.cache_backends.time.monotonic", return_value=100.0):
+            await backend.set("a", 1, 10)
+        with patch("app.services.cache_backends.time.monotonic", return_value=111.0):
+            assert await backend.get("a") is None
+        assert len(backend) == 0
+
+    @pytest.mark.asyncio
+    async def test_tag_invalidation(self):
+        """Only entries stored under the tag are removed."""
+        backend = MemoryCacheBackend()
+        await backend.set("team_members:1", [1], 60, tags=["team:TEAM-1"])
+        await backend.set("team_members:2", [2], 60, tags=["team:TEAM-2"])
+
+        removed = await backend.invalidate_tags(["team:TEAM-1"])
+
+        assert removed == ["team_members:1"]
+        assert await backend.get("team_members:2") == [2]
+
+
+class TestSerialization:
+    """Test Redis value encoding."""
+
+    def test_round_trip_keeps_types(self):
+        """Datetimes and decimals survive the JSON round trip."""
+        value = [{"joined_at": datetime(2026, 1, 2, 3, 4), "hours": Decimal("1.5")}]
+
+        assert decode_value(encode_value(value)) == value
+
+    def test_unsupported_objects_raise(self):
+        """Objects without a JSON form are rejected."""
+        with pytest.raises(TypeError):
+            encode_value(object())
+
+
+class TestRedisCacheBackend:
+    """Test the shared Redis tier."""
+
+    @pytest.fixture
+    def redis_client(self):
+        client = MagicMock()
+        client.set = AsyncMock()
+        client.register_script.return_value = AsyncMock()
+        return client
+
+    @pytest.mark.asyncio
+    async def test_tagged_set_runs_in_one_script(self, redis_client):
+        """The value and its tag sets are written by one script, without EXPIRE NX/GT."""
+        backend = RedisCacheBackend(redis_client)
+
+        await backend.set("team_members:1", "[1]", 60, tags=["team:TEAM-1", "user:USR-1"])
+
+        redis_client.register_script.return_value.assert_awaited_once_with(
+            keys=[
+                "worky:cache:team_members:1",
+                "worky:cache:tag:team:TEAM-1",
+                "worky:cache:tag:user:USR-1",
+            ],
+            args=["[1]", 60]
+        )
+        assert "NX" not in redis_client.register_script.call_args[0][0]
+        redis_client.set.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_untagged_set_is_a_plain_set(self, redis_client):
+        """Values without tags skip the script."""
+        backend = RedisCacheBackend(redis_client)
+
+        await backend.set("key", "1", 60)
+
+        redis_client.set.assert_awaited_once_with("worky:cache:key", "1", ex=60)
+        redis_client.register_script.return_value.assert_not_awaited()
+
+
+class TestCacheService:
+    """Test tiering and invalidation."""
+
+    @pytest.mark.asyncio
+    async def test_l1_hit_skips_shared_tier(self, service, l2):
+        """Values in L1 are served without a Redis round trip."""
+        await service.set("key", {"a": 1})
+
+        assert await service.get("key") == {"a": 1}
+        l2.get.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_l2_hit_fills_l1(self, service, l2):
+        """Shared-tier hits are decoded and copied into L1."""
+        l2.get.return_value = encode_value({"a": 1})
+
+        assert await service.get("key") == {"a": 1}
+        assert await service.l1.get("key") == {"a": 1}
+
+    @pytest.mark.asyncio
+    async def test_unserializable_value_stays_in_process(self, service, l2):
+        """Values the shared tier cannot encode are kept in L1."""
+        await service.set("key", object())
+
+        assert await service.l1.get("key") is not None
+        l2.set.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_redis_errors_degrade_to_miss(self, service, l2):
+        """Shared-tier read failures are treated as misses."""
+        l2.get.side_effect = RedisError("down")
+
+        assert await service.get("key") is None
+
+    @pytest.mark.asyncio
+    async def test_invalidate_team_cache_matches_entries(self, service, l2):
+        """Team invalidation removes tagged entries and fans out to workers."""
+        await service.set_team_members("TEAM-1", [{"id": "USR-1"}])
+
+        await service.invalidate_team_cache("TEAM-1")
+
+        assert await service.l1.get(service.team_members_key("TEAM-1")) is None
+        l2.invalidate_tags.assert_awaited_once_with(("team:TEAM-1",))
+        messages = [json.loads(call[0][1]) for call in service.redis_client.publish.call_args_list]
+        assert {"origin": service.worker_id, "tags": ["team:TEAM-1"]} in messages
+
+    @pytest.mark.asyncio
+    async def test_clear_pattern_matches_readable_prefix(self, service):
+        """Key prefixes stay readable so pattern clearing matches them."""
+        key = service.eligible_users_key("task", "TSK-1", "developer")
+        await service.set(key, ["USR-1"])
+
+        await service.clear_pattern("eligible_users")
+
+        assert key.startswith("eligible_users:")
+        assert await service.l1.get(key) is None
+
+    @pytest.mark.asyncio
+    async def test_remote_invalidation_evicts_l1(self, service):
+        """Invalidations published by other workers evict local entries."""
+        await service.set("key", 1, tags=["project:PRJ-1"])
+
+        await service._apply_invalidation({"origin": "other", "tags": ["project:PRJ-1"]})
+
+        assert await service.l1.get("key") is None
+
+    @pytest.mark.asyncio
+    async def test_own_invalidation_is_ignored(self, service):
+        """A worker skips its own published invalidations."""
+        await service.set("key", 1)
+
+        await service._apply_invalidation({"origin": service.worker_id, "clear": True})
+
+        assert await service.l1.get("key") == 1
+
+    @pytest.mark.asyncio
+    async def test_memory_only_without_redis(self):
+        """Without a shared tier the service works in-process."""
+        cache = CacheService(l1=MemoryCacheBackend())
+
+        await cache.set("key", 1, ttl=timedelta(minutes=1))
+        await cache.invalidate_tags("unused")
+
+        assert await cache.get("key") == 1
+        assert cache.stats()["backend"] == "memory"
+
+
+class _MembersService:
+    """Service stub exercising the @cached decorator"""
+
+    def __init__(self):
+        self.calls = 0
+
+    @cached(tags=["team:{team_id}"])
+    async def get_members(self, team_id: str, active_only: bool = True):
+        self.calls += 1
+        return [team_id, active_only]
+
+
+class TestCachedDecorator:
+    """Test argument-based keys and declarative tags."""
+
+    @pytest.fixture(autouse=True)
+    def memory_cache(self):
+        """Route the decorator through a fresh in-process cache"""
+        cache = CacheService(l1=MemoryCacheBackend())
+        with patch("app.services.cache_service.cache_service", cache):
+            yield cache
+
+    @pytest.mark.asyncio
+    async def test_key_ignores_service_instance(self):
+        """Calls from different instances with equal arguments share an entry."""
+        first, second = _MembersService(), _MembersService()
+
+        await first.get_members("TEAM-1")
+        result = await second.get_members(team_id="TEAM-1", active_only=True)
+
+        assert result == ["TEAM-1", True]
+        assert second.calls == 0
+
+    @pytest.mark.asyncio
+    async def test_different_arguments_miss(self):
+        """Different arguments produce different keys."""
+        service = _MembersService()
+
+        await service.get_members("TEAM-1")
+        await service.get_members("TEAM-1", active_only=False)
+
+        assert service.calls == 2
+
+    @pytest.mark.asyncio
+    async def test_tag_invalidation_evicts_entry(self, memory_cache):
+        """Entries are tagged from the bound arguments."""
+        service = _MembersService()
+        await service.get_members("TEAM-1")
+        await service.get_members("TEAM-2")
+
+        await memory_cache.invalidate_team_members("TEAM-1")
+        await service.get_members("TEAM-1")
+        await service.get_members("TEAM-2")
+
+        assert service.calls == 3
+
+    @pytest.mark.asyncio
+    async def test_user_deactivation_evicts_team_member_lists(self, memory_cache):
+        """Member lists embed user details, so user changes evict their teams' lists."""
+        member = MagicMock(id="TM-1", role="Developer", joined_at=None)
+        user = MagicMock(id="USR-1", full_name="Ada", email="ada@example.com")
+        team_db = AsyncMock()
+        team_db.execute.return_value = [(member, user)]
+        members = QueryOptimizationService(team_db)
+        await members.get_team_members_optimized("TEAM-1")
+        await members.get_team_members_optimized("TEAM-2")
+
+        users_db = AsyncMock()
+        users_db.execute.side_effect = [
+            MagicMock(fetchone=MagicMock(return_value=(True,))),
+            MagicMock(),
+            MagicMock(scalars=MagicMock(return_value=MagicMock(all=MagicMock(return_value=["TEAM-1"])))),
+        ]
+        with patch("app.api.v1.endpoints.users.cache_service", memory_cache):
+            await users.delete_user("USR-1", db=users_db, current_user=MagicMock(id="USR-ADMIN"))
+        await members.get_team_members_optimized("TEAM-1")
+        await members.get_team_members_optimized("TEAM-2")
+
+        assert team_db.execute.await_count == 3
+
+
+class TestCacheMetrics:
+    """Test cache effectiveness tracking."""
+
+    @pytest.mark.asyncio
+    async def test_hits_misses_and_hot_keys(self, service, l2):
+        """Lookups are counted per namespace; only hits feed hot keys."""
+        key = service.team_members_key("TEAM-1")
+        await service.get(key)
+        await service.set(key, [1, 2])
+        await service.get(key)
+        await service.get(key)
+
+        stats = service.stats()["namespaces"]["team_members"]
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+        assert stats["hit_ratio"] == 0.6667
+        assert stats["avg_entry_bytes"] == len("[1,2]")
+        assert service.metrics.hot_keys(1) == [{"key": key, "namespace": "team_members", "hits": 2}]
+
+    @pytest.mark.asyncio
+    async def test_lru_evictions_are_counted(self, service):
+        """L1 evictions are attributed to the evicted key's namespace."""
+        for index in range(10):
+            await service.set(f"eligible_users:{index}", index)
+
+        assert service.stats()["namespaces"]["eligible_users"]["evictions"] == 2
+
+    def test_load_percentiles(self):
+        """Load latency percentiles are reported in milliseconds."""
+        metrics = CacheMetrics()
+        for millis in range(1, 101):
+            metrics.record_load("team_members:x", millis / 1000)
+
+        stats = metrics.namespace_stats()["team_members"]
+        assert stats["load_p50_ms"] == 51.0
+        assert stats["load_p99_ms"] == 100.0
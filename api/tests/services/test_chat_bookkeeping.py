@@ -0,0 +1,122 @@
+"""
+Tests for the chat service's post-response bookkeeping.
+
+These tests validate:
+- Session update and message store running after the response
+- Ordering of bookkeeping for the same session
+- Inline fallback once too many runs are pending
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.schemas.chat import ChatResponse
+from app.services.chat_service import ChatService
+
+
+@pytest.fixture
+def chat_service():
+    """Create a ChatService with mocked dependencies"""
+    with patch("app.services.chat_service.get_session_service"), \
+         patch("app.services.chat_service.get_intent_classifier"), \
+         patch("app.services.chat_service.get_data_retriever"), \
+         patch("app.services.chat_service.get_retrieval_planner"), \
+         patch("app.services.chat_service.get_llm_service"), \
+         patch("app.services.chat_service.get_action_handler"), \
+         patch("app.services.chat_service.get_audit_service"):
+        service = ChatService()
+    service.metrics = MagicMock()
+    service.audit_service.stop_writer = AsyncMock()
+    return service
+
+
+@pytest.fixture
+def response():
+    """Create a sample chat response"""
+    return ChatResponse(status="success", message="Here you go", data={}, actions=[])
+
+
+def _session(session_id="SES-001"):
+    return MagicMock(session_id=session_id)
+
+
+@pytest.mark.asyncio
+async def test_bookkeeping_runs_after_returning(chat_service, response):
+    """Test that scheduling does not wait for the session writes"""
+    release = asyncio.Event()
+
+    async def slow_store(*args):
+        await release.wait()
+
+    chat_service._update_session_context = AsyncMock()
+    chat_service._store_message = AsyncMock(side_effect=slow_store)
+
+    await chat_service._schedule_bookkeeping(_session(), "USR-001", "hi", MagicMock(), response)
+
+    assert len(chat_service._pending_bookkeeping) == 1
+    release.set()
+    await chat_service.drain()
+    chat_service._update_session_context.assert_awaited_once()
+    chat_service._store_message.assert_awaited_once()
+    assert chat_service._pending_bookkeeping == set()
+    assert chat_service._bookkeeping == {}
+
+
+@pytest.mark.asyncio
+async def test_bookkeeping_for_a_session_runs_in_order(chat_service, response):
+    """Test that a turn's writes start after the previous turn's finished"""
+    order = []
+    release = asyncio.Event()
+
+    async def store(session_id, user_id, query, response):
+        if query == "first":
+            await release.wait()
+        order.append(query)
+
+    chat_service._update_session_context = AsyncMock()
+    chat_service._store_message = AsyncMock(side_effect=store)
+
+    await chat_service._schedule_bookkeeping(_session(), "USR-001", "first", MagicMock(), response)
+    await chat_service._schedule_bookkeeping(_session(), "USR-001", "second", MagicMock(), response)
+    await asyncio.sleep(0)
+    release.set()
+    await chat_service.drain()
+
+    assert order == ["first", "second"]
+
+
+@pytest.mark.asyncio
+async def test_session_load_waits_for_pending_bookkeeping(chat_service, response):
+    """Test that the next turn reads the session after it was stored"""
+    order = []
+
+    async def store(*args):
+        await asyncio.sleep(0.01)
+        order.append("stored")
+
+    async def load(*args, **kwargs):
+        order.append("loaded")
+        return _session(), []
+
+    chat_service._update_session_context = AsyncMock()
+    chat_service._store_message = AsyncMock(side_effect=store)
+    chat_service.session_service.get_session_with_history = AsyncMock(side_effect=load)
+
+    await chat_service._schedule_bookkeeping(_session(), "USR-001", "hi", MagicMock(), response)
+    await chat_service._get_or_create_session(MagicMock(), "SES-001")
+
+    assert order == ["stored", "loaded"]
+
+
+@pytest.mark.asyncio
+async def test_bookkeeping_runs_inline_when_backlogged(chat_service, response):
+    """Test the backpressure limit on pending bookkeeping"""
+    chat_service._update_session_context = AsyncMock()
+    chat_service._store_message = AsyncMock()
+
+    with patch("app.services.chat_service.settings.CHAT_BOOKKEEPING_MAX_PENDING", 0):
+        await chat_service._schedule_bookkeeping(_session(), "USR-001", "hi", MagicMock(), response)
+
+    chat_service._store_message.assert_awaited_once()
+    chat_service.metrics.record_bookkeeping_inline.assert_called_once()
+    assert chat_service._pending_bookkeeping == set()
@@ -0,0 +1,167 @@
+"""
+Tests for the chat response and classification caches.
+
+These tests validate:
+- Response cache hits, misses and request ID rewriting
+- Data version bumps on committed writes to chat data
+- Bypassing the cache while a version bump is in flight
+- Classification caching in the LLM fallback path
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.models.hierarchy import Task
+from app.schemas.chat import ChatResponse, EntityType, ExtractedEntity, IntentType
+from app.services import chat_cache
+from app.services.cache_backends import MemoryCacheBackend
+from app.services.cache_service import CacheService
+from app.services.chat_cache import ChatResponseCache
+from app.services.llm_service import LLMService
+
+
+@pytest.fixture
+def response_cache():
+    """Create a response cache over an in-process cache service"""
+    response_cache = ChatResponseCache(CacheService(l1=MemoryCacheBackend()))
+    response_cache.metrics = MagicMock()
+    return response_cache
+
+
+@pytest.fixture
+def user():
+    """Create a sample user"""
+    return MagicMock(id="USR-001", client_id="CLI-001")
+
+
+def _intent(intent_type=IntentType.QUERY, query="show my tasks", entities=(), temporal=None):
+    return MagicMock(
+        intent_type=intent_type,
+        normalized_query=query,
+        entities=list(entities),
+        temporal_context=temporal
+    )
+
+
+def _response(request_id="req_1"):
+    return ChatResponse(
+        message="You have 2 tasks",
+        data={"tasks": [{"id": "TSK-1"}, {"id": "TSK-2"}]},
+        metadata={"request_id": request_id, "intent_type": "query"}
+    )
+
+
+@pytest.mark.asyncio
+async def test_repeated_query_is_served_from_cache(response_cache, user):
+    """Test a miss, a store and a hit with the new request ID"""
+    key, cached = await response_cache.lookup(user, _intent(), "req_1")
+    assert cached is None
+
+    await response_cache.store(key, _response(), tokens_used=120)
+    _, cached = await response_cache.lookup(user, _intent(query="Show  my tasks?"), "req_2")
+
+    assert cached.message == "You have 2 tasks"
+    assert cached.metadata.request_id == "req_2"
+    response_cache.metrics.record_tokens_saved.assert_called_once_with("response", 120)
+
+
+@pytest.mark.asyncio
+async def test_cache_is_scoped_to_user_entities_and_dates(response_cache, user):
+    """Test that the key separates users, entities and relative dates"""
+    key, _ = await response_cache.lookup(user, _intent(), "req_1")
+    await response_cache.store(key, _response(), tokens_used=120)
+
+    other_user = MagicMock(id="USR-002", client_id="CLI-001")
+    task = ExtractedEntity(entity_type=EntityType.TASK, entity_id="TSK-9")
+
+    assert (await response_cache.lookup(other_user, _intent(), "r"))[1] is None
+    assert (await response_cache.lookup(user, _intent(entities=[task]), "r"))[1] is None
+    assert (await response_cache.lookup(user, _intent(temporal={"date_filter": "today"}), "r"))[1] is None
+
+
+@pytest.mark.asyncio
+async def test_data_change_invalidates_responses(response_cache, user):
+    """Test that a committed write makes earlier responses unreachable"""
+    key, _ = await response_cache.lookup(user, _intent(), "req_1")
+    await response_cache.store(key, _response(), tokens_used=120)
+
+    response_cache.mark_data_changed()
+
+    assert (await response_cache.lookup(user, _intent(), "req_2"))[1] is None
+
+
+@pytest.mark.asyncio
+async def test_only_cacheable_intents_and_llm_answers_are_stored(response_cache, user):
+    """Test that actions bypass the cache and fallback text is not kept"""
+    assert await response_cache.lookup(user, _intent(IntentType.ACTION), "req_1") == (None, None)
+
+    key, _ = await response_cache.lookup(user, _intent(), "req_1")
+    await response_cache.store(key, _response(), tokens_used=0)
+
+    assert (await response_cache.lookup(user, _intent(), "req_2"))[1] is None
+
+
+@pytest.mark.asyncio
+async def test_lookups_bypass_cache_until_version_bump_lands(response_cache, user):
+    """Test the shared version bump and the bypass while it is in flight"""
+    release = asyncio.Event()
+
+    async def incr(key):
+        await release.wait()
+
+    redis_client = MagicMock(incr=AsyncMock(side_effect=incr), get=AsyncMock(return_value="7"))
+    response_cache.cache.redis_client = redis_client
+
+    response_cache.mark_data_changed()
+    assert await response_cache.data_version() is None
+
+    release.set()
+    await asyncio.gather(*response_cache._bump_tasks)
+    assert await response_cache.data_version() == "7"
+    redis_client.incr.assert_awaited_once_with(chat_cache.CHAT_DATA_VERSION_KEY)
+
+
+def test_commit_of_chat_data_bumps_version():
+    """Test the flush/commit hooks for writes to tracked models"""
+    session = MagicMock(new=[Task()], dirty=[], deleted=[], info={})
+    response_cache = MagicMock()
+
+    with patch("app.services.chat_cache.get_chat_response_cache", return_value=response_cache):
+        chat_cache._track_flushed_changes(session, None)
+        chat_cache._publish_committed_changes(session)
+        chat_cache._publish_committed_changes(session)
+
+    response_cache.mark_data_changed.assert_called_once()
+
+
+def test_rollback_discards_tracked_changes():
+    """Test that rolled back writes do not bump the version"""
+    session = MagicMock(new=[Task()], dirty=[], deleted=[], info={})
+    response_cache = MagicMock()
+
+    with patch("app.services.chat_cache.get_chat_response_cache", return_value=response_cache):
+        chat_cache._track_flushed_changes(session, None)
+        chat_cache._discard_rolled_back_changes(session)
+        chat_cache._publish_committed_changes(session)
+
+    response_cache.mark_data_changed.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_llm_classification_is_cached(response_cache):
+    """Test that a repeated classification prompt does not call the LLM"""
+    completion = MagicMock(usage=MagicMock(total_tokens=80))
+    completion.choices = [MagicMock(message=MagicMock(content='{"intent_type": "QUERY"}'))]
+
+    with patch("app.services.llm_service.get_encoding"):
+        service = LLMService()
+    service.response_cache = response_cache
+    service.client = MagicMock()
+    service.client.chat.completions.create = AsyncMock(return_value=completion)
+
+    first = await service.classify_intent("Classify: compare PRJ-1 vs PRJ-2")
+    second = await service.classify_intent("Classify: compare PRJ-1 vs PRJ-2")
+
+    assert first == second == '{"intent_type": "QUERY"}'
+    service.client.chat.completions.create.assert_awaited_once()
+    response_cache.metrics.record_tokens_saved.assert_called_once_with("classification", 80)
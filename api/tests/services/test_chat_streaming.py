@@ -0,0 +1,118 @@
+"""
+Tests for streaming chat responses.
+
+These tests validate:
+- Event order for streamed queries (intent, data, tokens, response)
+- Non-streaming intents producing only intent and response
+- Closing the upstream LLM stream when the consumer goes away
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.schemas.chat import ChatRequest, ChatResponse, IntentType
+from app.services.chat_service import ChatService
+from app.services.llm_service import LLMService
+
+
+def _intent(intent_type):
+    return MagicMock(intent_type=intent_type, confidence=0.9, entities=[])
+
+
+@pytest.fixture
+def chat_service():
+    """Create a ChatService with mocked dependencies"""
+    with patch("app.services.chat_service.get_session_service"), \
+         patch("app.services.chat_service.get_intent_classifier"), \
+         patch("app.services.chat_service.get_data_retriever"), \
+         patch("app.services.chat_service.get_retrieval_planner"), \
+         patch("app.services.chat_service.get_llm_service"), \
+         patch("app.services.chat_service.get_action_handler"), \
+         patch("app.services.chat_service.get_audit_service"):
+        service = ChatService()
+    service.metrics = MagicMock()
+    service.response_cache = MagicMock(lookup=AsyncMock(return_value=(None, None)), store=AsyncMock())
+    service._start_turn = AsyncMock()
+    service._finish_turn = AsyncMock()
+    service._retrieve_data = AsyncMock(return_value={"tasks": [{"id": "TSK-1", "title": "Fix login"}]})
+    service.llm_service.extract_data_views = MagicMock(return_value={"cards": [], "table": None})
+    service.llm_service.parse_structured_output = MagicMock(
+        side_effect=lambda text, data: {"text": text, "actions": []}
+    )
+    service.llm_service.count_tokens = MagicMock(return_value=3)
+    return service
+
+
+@pytest.fixture
+def chat_request():
+    """Create a sample chat request"""
+    return ChatRequest(query="Show my tasks", session_id="SES-001")
+
+
+@pytest.mark.asyncio
+async def test_stream_query_emits_stages_in_order(chat_service, chat_request):
+    """Test that data and tokens are sent before the final response"""
+    async def tokens(**kwargs):
+        for text in ("You have ", "one task."):
+            yield text
+
+    chat_service._start_turn.return_value = (MagicMock(), [], _intent(IntentType.QUERY))
+    chat_service.llm_service.stream_response = tokens
+
+    events = [event async for event in chat_service.stream_query(MagicMock(), MagicMock(), chat_request)]
+
+    assert [name for name, _ in events] == ["intent", "data", "token", "token", "response"]
+    assert events[1][1]["data"] == {"tasks": [{"id": "TSK-1", "title": "Fix login"}]}
+    assert events[-1][1]["message"] == "You have one task."
+    chat_service._finish_turn.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stream_query_other_intents_send_final_response(chat_service, chat_request):
+    """Test that non-query intents skip the data and token events"""
+    chat_service._start_turn.return_value = (MagicMock(), [], _intent(IntentType.NAVIGATION))
+    chat_service._handle_intent = AsyncMock(return_value=ChatResponse(message="Opening project"))
+
+    events = [event async for event in chat_service.stream_query(MagicMock(), MagicMock(), chat_request)]
+
+    assert [name for name, _ in events] == ["intent", "response"]
+    chat_service._retrieve_data.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_stream_query_reports_failures_as_response(chat_service, chat_request):
+    """Test that an error ends the stream with an error response"""
+    chat_service._start_turn.side_effect = RuntimeError("redis down")
+    chat_service._create_audit_log = AsyncMock()
+
+    events = [event async for event in chat_service.stream_query(MagicMock(), MagicMock(), chat_request)]
+
+    assert [name for name, _ in events] == ["response"]
+    assert events[0][1]["status"] == "error"
+
+
+@pytest.mark.asyncio
+async def test_closing_stream_closes_upstream_llm_call():
+    """Test that a consumer going away closes the LLM HTTP stream"""
+    def chunk(text):
+        return MagicMock(choices=[MagicMock(delta=MagicMock(content=text))])
+
+    class FakeStream:
+        def __init__(self):
+            self.close = AsyncMock()
+
+        async def __aiter__(self):
+            for text in ("Hello", " there", "!"):
+                yield chunk(text)
+
+    upstream = FakeStream()
+    with patch("app.services.llm_service.get_encoding"):
+        service = LLMService()
+    service.client = MagicMock()
+    service.client.chat.completions.create = AsyncMock(return_value=upstream)
+
+    stream = service.stream_response("hi", {})
+    assert await stream.__anext__() == "Hello"
+    await stream.aclose()
+
+    assert service.client.chat.completions.create.call_args.kwargs["stream"] is True
+    upstream.close.assert_awaited_once()
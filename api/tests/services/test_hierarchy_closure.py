@@ -0,0 +1,289 @@
+"""
+Tests for the hierarchy closure table service.
+
+These tests validate:
+- Flush-time maintenance of closure rows (create, soft delete, restore, re-parent)
+- Live descendants of a soft-deleted entity staying linked to the live ancestors
+- descendants()/ancestors() query construction
+- HierarchyService rollups and client filtering on top of the closure table
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy import (
+    Boolean, Column, Integer, MetaData, String, Table, create_engine, event, select
+)
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.client import Client
+from app.models.hierarchy import Program, Project, Usecase, UserStory, Task, Subtask
+from app.services.hierarchy_closure_service import (
+    HIERARCHY_LEVELS,
+    HierarchyClosureService,
+    _maintain_closure,
+    _rebuild_stmts,
+    closure_table,
+)
+from app.services.hierarchy_rollup_service import _maintain_rollups
+from app.services.hierarchy_service import HierarchyService
+
+
+def _sql(stmt) -> str:
+    """Compile a statement to PostgreSQL SQL text."""
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def _mock_session(new=(), dirty=(), deleted=()):
+    """Create a mock ORM session exposing pre-flush state."""
+    session = MagicMock()
+    session.new = list(new)
+    session.dirty = list(dirty)
+    session.deleted = list(deleted)
+    return session
+
+
+def _persisted_task(**values) -> Task:
+    """Create a Task whose values look loaded from the database."""
+    task = Task()
+    for field, value in values.items():
+        set_committed_value(task, field, value)
+    return task
+
+
+class TestClosureMaintenance:
+    """Test flush-time closure maintenance."""
+
+    def test_new_entity_inserts_self_and_ancestor_rows(self):
+        """A created task is linked under its user story's ancestors."""
+        task = Task(id="TSK-000001", user_story_id="UST-000001", is_deleted=False)
+        session = _mock_session(new=[task])
+
+        _maintain_closure(session, None)
+
+        connection = session.connection.return_value
+        assert connection.execute.call_count == 1
+        sql = _sql(connection.execute.call_args[0][0])
+        assert sql.startswith("INSERT INTO hierarchy_closure")
+        assert "UNION ALL" in sql
+
+    def test_parents_are_inserted_before_children(self):
+        """Entities created in the same flush are linked root to leaf."""
+        subtask = Subtask(id="SUB-000001", task_id="TSK-000001", is_deleted=False)
+        task = Task(id="TSK-000001", user_story_id="UST-000001", is_deleted=False)
+        session = _mock_session(new=[subtask, task])
+
+        _maintain_closure(session, None)
+
+        calls = session.connection.return_value.execute.call_args_list
+        inserted_ids = [call[0][0].compile().params for call in calls]
+        assert "TSK-000001" in inserted_ids[0].values()
+        assert "SUB-000001" in inserted_ids[1].values()
+
+    def test_soft_delete_removes_only_the_entity_rows(self):
+        """Soft deleting an entity drops its own rows, not its subtree's."""
+        task = _persisted_task(id="TSK-000001", user_story_id="UST-000001", is_deleted=False)
+        task.is_deleted = True
+        session = _mock_session(dirty=[task])
+
+        _maintain_closure(session, None)
+
+        connection = session.connection.return_value
+        assert connection.execute.call_count == 1
+        sql = _sql(connection.execute.call_args[0][0])
+        assert sql.startswith("DELETE FROM hierarchy_closure")
+        assert "SELECT" not in sql
+
+    def test_restore_rebuilds_entity_and_subtree_levels(self):
+        """Restoring an entity rebuilds the rows of its level and each level below."""
+        task = _persisted_task(id="TSK-000001", user_story_id="UST-000001", is_deleted=True)
+        task.is_deleted = False
+        session = _mock_session(dirty=[task])
+
+        _maintain_closure(session, None)
+
+        statements = [_sql(call[0][0]) for call in session.connection.return_value.execute.call_args_list]
+        assert [stmt.split()[0] for stmt in statements] == ["DELETE", "INSERT", "DELETE", "INSERT"]
+        assert "FROM tasks" in statements[1]
+        assert "FROM subtasks" in statements[3]
+
+    def test_reparent_detaches_and_attaches_subtree(self):
+        """Changing the parent FK re-links the subtree under the new parent."""
+        task = _persisted_task(id="TSK-000001", user_story_id="UST-000001", is_deleted=False)
+        task.user_story_id = "UST-000002"
+        session = _mock_session(dirty=[task])
+
+        _maintain_closure(session, None)
+
+        calls = session.connection.return_value.execute.call_args_list
+        assert len(calls) == 2
+        assert _sql(calls[0][0][0]).startswith("DELETE FROM hierarchy_closure")
+        assert _sql(calls[1][0][0]).startswith("INSERT INTO hierarchy_closure")
+
+    def test_unrelated_flush_is_ignored(self):
+        """Flushes without hierarchy entities do not touch the closure."""
+        session = _mock_session(new=[MagicMock()])
+
+        _maintain_closure(session, None)
+
+        session.connection.assert_not_called()
+
+
+@pytest.fixture
+def closure_db():
+    """
+    SQLite session holding the hierarchy and closure tables (keys and flags
+    only), with the closure listener maintaining rows on flush.
+    """
+    metadata = MetaData()
+    for table in [model.__table__ for _, model, _ in HIERARCHY_LEVELS] + [closure_table]:
+        Table(table.name, metadata, *[
+            Column(
+                column.name,
+                type(column.type) if isinstance(column.type, (Boolean, Integer)) else String,
+                primary_key=column.primary_key
+            )
+            for column in table.columns
+        ])
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+
+    # The rollup listener writes PostgreSQL upserts
+    event.remove(Session, "after_flush", _maintain_rollups)
+    session = Session(engine)
+    try:
+        yield session
+    finally:
+        session.close()
+        event.listen(Session, "after_flush", _maintain_rollups)
+
+
+def _tree(session):
+    """Create a live Client -> ... -> Subtask chain, one entity per level."""
+    entities = [
+        Client(id="CLI-1", name="Client"),
+        Program(id="PRG-1", client_id="CLI-1", name="Program"),
+        Project(id="PRJ-1", program_id="PRG-1", name="Project"),
+        Usecase(id="UC-1", project_id="PRJ-1", name="Usecase"),
+        UserStory(id="UST-1", usecase_id="UC-1", name="Story"),
+        Task(id="TSK-1", user_story_id="UST-1", name="Task"),
+        Subtask(id="SUB-1", task_id="TSK-1", name="Subtask"),
+    ]
+    for entity in entities:
+        entity.is_deleted = False
+        session.add(entity)
+        session.flush()
+    return entities
+
+
+def _closure_rows(session):
+    return sorted(session.execute(select(
+        closure_table.c.ancestor_id, closure_table.c.descendant_id, closure_table.c.depth
+    )).all())
+
+
+class TestClosureSoftDelete:
+    """Test closure rows around soft deletes, against a database."""
+
+    def test_descendants_stay_linked_to_live_ancestors(self, closure_db):
+        """A soft-deleted use case's tasks are still found under its project."""
+        usecase = _tree(closure_db)[3]
+        closure = HierarchyClosureService(closure_db)
+
+        usecase.is_deleted = True
+        closure_db.flush()
+
+        tasks = closure_db.execute(closure.descendants_query("project", "PRJ-1", "task")).scalars().all()
+        ancestors = closure_db.execute(closure.ancestors_query("subtask", "SUB-1")).scalars().all()
+        assert tasks == ["TSK-1"]
+        assert sorted(ancestors) == ["CLI-1", "PRG-1", "PRJ-1", "TSK-1", "UST-1"]
+        assert not closure_db.execute(closure.descendants_query("usecase", "UC-1")).all()
+
+    def test_restore_relinks_subtree(self, closure_db):
+        """Restoring gives back the rows from before the delete, as does a rebuild."""
+        entities = _tree(closure_db)
+        usecase, story = entities[3], entities[4]
+        before = _closure_rows(closure_db)
+
+        usecase.is_deleted = True
+        closure_db.flush()
+        usecase.is_deleted = False
+        closure_db.flush()
+        assert _closure_rows(closure_db) == before
+
+        story.is_deleted = True
+        closure_db.flush()
+        incremental = _closure_rows(closure_db)
+        for stmt in _rebuild_stmts():
+            closure_db.execute(stmt)
+        assert _closure_rows(closure_db) == incremental
+        assert ("UC-1", "TSK-1", 2) in incremental
+
+
+class TestClosureQueries:
+    """Test closure lookup query construction."""
+
+    def test_descendants_query_filters_type_and_excludes_self(self):
+        """Descendant subqueries filter by type and skip the depth-0 row."""
+        service = HierarchyClosureService(AsyncMock(spec=AsyncSession))
+
+        sql = _sql(service.descendants_query("project", "PRJ-000001", "task"))
+
+        assert "hierarchy_closure.ancestor_id" in sql
+        assert "hierarchy_closure.descendant_type" in sql
+        assert "hierarchy_closure.depth >" in sql
+
+    def test_ancestors_query_include_self(self):
+        """include_self keeps the depth-0 row."""
+        service = HierarchyClosureService(AsyncMock(spec=AsyncSession))
+
+        sql = _sql(service.ancestors_query("task", "TSK-000001", include_self=True))
+
+        assert "hierarchy_closure.descendant_id" in sql
+        assert "depth" not in sql
+
+
+class TestHierarchyServiceClosureUsage:
+    """Test HierarchyService call sites backed by the closure table."""
+
+    @pytest.mark.asyncio
+    async def test_rollup_counts_fill_missing_levels(self):
+        """Rollup counts include zeroes for empty descendant levels."""
+        db = AsyncMock(spec=AsyncSession)
+        result = MagicMock()
+        result.all.return_value = [
+            MagicMock(ancestor_id='PRJ-000001', descendant_type='usecase', dimension='status', value='Draft', count=2),
+            MagicMock(ancestor_id='PRJ-000001', descendant_type='task', dimension='status', value='To Do', count=5),
+        ]
+        db.execute.return_value = result
+        service = HierarchyService(db)
+
+        counts = await service._get_rollup_counts('project', 'PRJ-000001')
+
+        assert counts == {'usecases': 2, 'user_stories': 0, 'tasks': 5, 'subtasks': 0}
+
+    @pytest.mark.asyncio
+    async def test_descendant_task_ids_use_closure(self):
+        """Descendant task lookup is a single closure query."""
+        service = HierarchyService(AsyncMock(spec=AsyncSession))
+
+        with patch.object(
+            service.closure, 'descendants',
+            new_callable=AsyncMock, return_value=['TSK-000001', 'TSK-000002']
+        ) as mock_descendants:
+            task_ids = await service._get_descendant_task_ids('client', 'CLI-000001')
+
+        assert task_ids == ['TSK-000001', 'TSK-000002']
+        mock_descendants.assert_awaited_once_with('client', 'CLI-000001', descendant_type='task')
+
+    @pytest.mark.asyncio
+    async def test_client_filter_uses_closure_subquery(self):
+        """Non-client entity searches are scoped through the closure table."""
+        service = HierarchyService(AsyncMock(spec=AsyncSession))
+
+        query = await service._apply_client_filter(select(Subtask), Subtask, 'subtask', 'CLI-000001')
+
+        sql = _sql(query)
+        assert "hierarchy_closure" in sql
+        assert "JOIN" not in sql
@@ -0,0 +1,303 @@
+"""
+Tests for the hierarchy rollup counters.
+
+These tests validate:
+- Flush-time counter maintenance (create, field update, soft delete, restore, re-parent)
+- The counters read query and folding rows into per-entity statistics
+- Single and batched statistics lookups issuing one round-trip
+"""
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.models.hierarchy import Task
+from app.models.user import User
+from app.services.hierarchy_rollup_service import (
+    HierarchyRollupService,
+    _maintain_rollups,
+    rollup_query,
+    shape_statistics,
+)
+from app.services.hierarchy_service import HierarchyService
+
+
+def _sql(stmt) -> str:
+    """Compile a statement to PostgreSQL SQL text."""
+    return str(stmt.compile(dialect=postgresql.dialect()))
+
+
+def _mock_session(new=(), dirty=(), deleted=()):
+    """Create a mock ORM session exposing pre-flush state."""
+    session = MagicMock()
+    session.new = list(new)
+    session.dirty = list(dirty)
+    session.deleted = list(deleted)
+    return session
+
+
+def _persisted_task(**values) -> Task:
+    """Create a Task whose values look loaded from the database."""
+    task = Task()
+    defaults = {'is_deleted': False, 'status': 'To Do', 'priority': 'Medium', 'phase_id': None}
+    for field, value in {**defaults, **values}.items():
+        set_committed_value(task, field, value)
+    return task
+
+
+def _executed(session) -> list:
+    """Compiled parameters of every statement run on the session connection."""
+    calls = session.connection.return_value.execute.call_args_list
+    return [call[0][0].compile(dialect=postgresql.dialect()).params for call in calls]
+
+
+def _row(ancestor_id, descendant_type, dimension, value, count, phase_name=None, phase_color=None):
+    """Create a counters row."""
+    row = MagicMock()
+    row.ancestor_id = ancestor_id
+    row.descendant_type = descendant_type
+    row.dimension = dimension
+    row.value = value
+    row.count = count
+    row.phase_name = phase_name
+    row.phase_color = phase_color
+    return row
+
+
+def _mock_db(rows):
+    """Create a mock session whose execute() returns the given rows."""
+    db = AsyncMock(spec=AsyncSession)
+    result = MagicMock()
+    result.all.return_value = rows
+    db.execute.return_value = result
+    return db
+
+
+class TestRollupMaintenance:
+    """Test flush-time counter maintenance."""
+
+    def test_new_entity_increments_ancestors(self):
+        """A created task adds its status/priority to every ancestor in one upsert."""
+        task = Task(id="TSK-000001", user_story_id="UST-000001", is_deleted=False,
+                    status="To Do", priority="High")
+        session = _mock_session(new=[task])
+
+        _maintain_rollups(session, None)
+
+        connection = session.connection.return_value
+        assert connection.execute.call_count == 1
+        sql = _sql(connection.execute.call_args[0][0])
+        assert sql.startswith("INSERT INTO hierarchy_rollups")
+        assert "ON CONFLICT" in sql
+        params = _executed(session)[0]
+        assert "To Do" in params.values() and "High" in params.values()
+
+    def test_status_change_moves_one_count(self):
+        """A status update subtracts the old value and adds the new one."""
+        task = _persisted_task(id="TSK-000001", user_story_id="UST-000001")
+        task.status = "Done"
+        session = _mock_session(dirty=[task])
+
+        _maintain_rollups(session, None)
+
+        old, new = _executed(session)
+        assert -1 in old.values() and "To Do" in old.values()
+        assert 1 in new.values() and "Done" in new.values()
+        assert "ancestor_id_1" not in old
+        # Through the task's own closure rows, which reach past a deleted parent
+        assert old["descendant_id_1"] == new["descendant_id_1"] == "TSK-000001"
+        assert old["depth_1"] == new["depth_1"] == 0
+
+    def test_unchanged_entity_is_ignored(self):
+        """Dirty entities without counted changes do not touch the counters."""
+        task = _persisted_task(id="TSK-000001", user_story_id="UST-000001", name="Task")
+        task.name = "Renamed"
+        session = _mock_session(dirty=[task])
+
+        _maintain_rollups(session, None)
+
+        session.connection.assert_not_called()
+
+    def test_soft_delete_removes_only_the_entity_count(self):
+        """Soft deleting subtracts the entity alone, then clears its counters."""
+        task = _persisted_task(id="TSK-000001", user_story_id="UST-000001")
+        task.is_deleted = True
+        session = _mock_session(dirty=[task])
+
+        _maintain_rollups(session, None)
+
+        calls = session.connection.return_value.execute.call_args_list
+        assert len(calls) == 2
+        subtract = _executed(session)[0]
+        assert subtract["descendant_id_1"] == "UST-000001"
+        # Its live descendants stay counted on the ancestors
+        assert "ancestor_id_1" not in subtract
+        assert _sql(calls[1][0][0]).startswith("DELETE FROM hierarchy_rollups")
+
+    def test_hard_delete_removes_subtree_counts(self):
+        """Deleting the row subtracts the entity and its subtree, which leave the closure with it."""
+        task = _persisted_task(id="TSK-000001", user_story_id="UST-000001")
+        session = _mock_session(deleted=[task])
+
+        _maintain_rollups(session, None)
+
+        subtract, clear = _executed(session)
+        assert subtract["descendant_id_1"] == "UST-000001"
+        assert subtract["ancestor_id_1"] == "TSK-000001"
+        assert clear["ancestor_id_1"] == "TSK-000001"
+
+    def test_restore_recounts_entity_and_adds_it_back(self):
+        """Restoring recounts the entity's counters and adds the entity alone to its ancestors."""
+        task = _persisted_task(id="TSK-000001", user_story_id="UST-000001", is_deleted=True)
+        task.is_deleted = False
+        session = _mock_session(dirty=[task])
+
+        _maintain_rollups(session, None)
+
+        calls = session.connection.return_value.execute.call_args_list
+        assert len(calls) == 3
+        clear, recount, add = [_sql(call[0][0]) for call in calls]
+        assert clear.startswith("DELETE FROM hierarchy_rollups")
+        assert recount.startswith("INSERT INTO hierarchy_rollups")
+        clear_params, recount_params, add_params = _executed(session)
+        assert clear_params["ancestor_id_1"] == recount_params["ancestor_id_1"] == "TSK-000001"
+        assert add_params["descendant_id_1"] == "TSK-000001"
+        assert "ancestor_id_1" not in add_params
+        assert 1 in add_params.values() and "To Do" in add_params.values()
+
+    def test_reparent_carries_subtree_counts(self):
+        """Re-parenting moves the subtree's counters from old to new ancestors."""
+        task = _persisted_task(id="TSK-000001", user_story_id="UST-000001")
+        task.user_story_id = "UST-000002"
+        session = _mock_session(dirty=[task])
+
+        _maintain_rollups(session, None)
+
+        old, new = _executed(session)
+        assert old["descendant_id_1"] == "UST-000001" and old["ancestor_id_1"] == "TSK-000001"
+        # The task's closure rows already lead to the new ancestors
+        assert new["descendant_id_1"] == "TSK-000001" and new["ancestor_id_1"] == "TSK-000001"
+
+
+class TestRollupQuery:
+    """Test counters query construction."""
+
+    def test_query_reads_counters_only(self):
+        """Statistics come from the counters table, not the hierarchy tables."""
+        sql = _sql(rollup_query('project', ['PRJ-000001']))
+
+        assert "FROM hierarchy_rollups LEFT OUTER JOIN phases" in sql
+        assert "tasks" not in sql
+        assert "hierarchy_closure" not in sql
+
+
+class TestShapeStatistics:
+    """Test folding counter rows into statistics."""
+
+    def test_rows_are_folded_per_entity(self):
+        """Status, level and phase rows land on the matching entity."""
+        rows = [
+            _row('UST-000001', 'task', 'status', 'Done', 3),
+            _row('UST-000001', 'task', 'status', 'To Do', 1),
+            _row('UST-000001', 'subtask', 'status', 'To Do', 2),
+            _row('UST-000001', 'task', 'phase', 'PHS-000001', 2, 'Development', '#4A90E2'),
+            _row('UST-000001', 'subtask', 'phase', 'PHS-000002', 5, 'Testing', '#00AA00'),
+            _row('UST-000002', 'subtask', 'status', 'Done', 7),
+        ]
+
+        stats = shape_statistics('userstory', ['UST-000001', 'UST-000002'], rows)
+
+        first = stats['UST-000001']
+        assert first['status_counts'] == {'Done': 3, 'To Do': 1}
+        assert first['rollup_counts'] == {'tasks': 4, 'subtasks': 2}
+        assert [p['phase'] for p in first['phase_distribution']] == ['Testing', 'Development']
+        assert first['completion_percentage'] == 75.0
+        assert first['total_items'] == 4
+
+        second = stats['UST-000002']
+        assert second['status_counts'] == {}
+        assert second['rollup_counts'] == {'tasks': 0, 'subtasks': 7}
+        assert second['completion_percentage'] == 0.0
+
+    def test_task_has_no_phase_distribution(self):
+        """Tasks report subtask statuses but no phase distribution."""
+        rows = [
+            _row('TSK-000001', 'subtask', 'status', 'Done', 1),
+            _row('TSK-000001', 'subtask', 'phase', 'PHS-000001', 1, 'Development', '#4A90E2'),
+        ]
+
+        stats = shape_statistics('task', ['TSK-000001'], rows)['TSK-000001']
+
+        assert stats['rollup_counts'] == {'subtasks': 1}
+        assert stats['phase_distribution'] is None
+        assert stats['completion_percentage'] == 100.0
+
+
+class TestRollupService:
+    """Test statistics lookups."""
+
+    @pytest.mark.asyncio
+    async def test_batch_is_a_single_round_trip(self):
+        """Statistics for many siblings come from one execute() call."""
+        db = _mock_db([_row('PRJ-000002', 'usecase', 'status', 'Draft', 2)])
+        service = HierarchyRollupService(db)
+
+        stats = await service.get_statistics_batch('project', ['PRJ-000001', 'PRJ-000002'])
+
+        assert db.execute.await_count == 1
+        assert set(stats) == {'PRJ-000001', 'PRJ-000002'}
+        assert stats['PRJ-000002']['rollup_counts']['usecases'] == 2
+
+    @pytest.mark.asyncio
+    async def test_empty_batch_skips_query(self):
+        """No IDs means no query."""
+        db = _mock_db([])
+
+        assert await HierarchyRollupService(db).get_statistics_batch('project', []) == {}
+        db.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_subtask_reports_own_status(self):
+        """Subtask statistics are the subtask's own status."""
+        row = MagicMock(id='SUB-000001', status='Done')
+        db = _mock_db([row])
+
+        stats = await HierarchyRollupService(db).get_statistics('subtask', 'SUB-000001')
+
+        assert stats['status_counts'] == {'Done': 1}
+        assert stats['rollup_counts'] == {}
+
+    @pytest.mark.asyncio
+    async def test_children_statistics_batches_siblings(self):
+        """Children statistics load child IDs, then one rollup for all of them."""
+        db = _mock_db([('UST-000001',), ('UST-000002',)])
+        service = HierarchyService(db)
+        user = MagicMock(spec=User)
+
+        with patch.object(service, '_verify_entity_access', new_callable=AsyncMock):
+            with patch.object(
+                service.rollups, 'get_statistics_batch',
+                new_callable=AsyncMock, return_value={}
+            ) as mock_batch:
+                await service.get_children_statistics('usecase', 'USC-000001', user)
+
+        mock_batch.assert_awaited_once_with('userstory', ['UST-000001', 'UST-000002'])
+
+    @pytest.mark.asyncio
+    async def test_entity_statistics_share_one_rollup_query(self):
+        """get_entity_statistics issues a single counters query for all helpers."""
+        db = _mock_db([
+            _row('UST-000001', 'task', 'status', 'Done', 1),
+        ])
+        service = HierarchyService(db)
+        user = MagicMock(spec=User)
+
+        with patch.object(service, '_verify_entity_access', new_callable=AsyncMock):
+            stats = await service.get_entity_statistics('userstory', 'UST-000001', user)
+
+        assert db.execute.await_count == 1
+        assert stats['status_counts'] == {'Done': 1}
+        assert stats['rollup_counts'] == {'tasks': 1, 'subtasks': 0}
+        assert stats['phase_distribution'] == []
+        assert stats['completion_percentage'] == 100.0
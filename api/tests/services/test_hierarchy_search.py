@@ -9,13 +9,14 @@ These tests validate the search_entities method including:
 - Client-level filtering for non-Admin users
 """
 import pytest
-from uuid import uuid4, UUID
+from uuid import uuid4
 from unittest.mock import AsyncMock, MagicMock, patch
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.services.hierarchy_service import HierarchyService
 from app.models.client import Client
-from app.models.hierarchy import Program, Project, Usecase, UserStory, Task, Subtask
+from app.models.hierarchy import Program, Project
 from app.models.user import User
 
 
@@ -86,183 +87,174 @@ def sample_project(sample_program):
     return project
 
 
+def _search_rows(count, total, entity_type="program"):
+    """Create ranked rows as returned by the search UNION ALL query."""
+    rows = []
+    for i in range(count):
+        row = MagicMock()
+        row.entity_type = entity_type
+        row.id = f"PRG-{i:06d}"
+        row.name = f"Program {i}"
+        row.status = "Active"
+        row.description = f"Description {i}"
+        row.total_count = total
+        rows.append(row)
+    return rows
+
+
+def _mock_result(rows):
+    """Create a mock execute() result returning the given rows."""
+    result = MagicMock()
+    result.all.return_value = rows
+    return result
+
+
 class TestSearchEntities:
     """Test class for search_entities method."""
     
     @pytest.mark.asyncio
-    async def test_search_entities_basic(self, mock_db, admin_user, sample_client, sample_program):
+    async def test_search_entities_basic(self, mock_db, admin_user):
         """Test basic search functionality."""
         service = HierarchyService(mock_db)
+        row = _search_rows(1, 1, entity_type="client")[0]
+        row.id = "CLI-000001"
+        row.name = "Acme Corporation"
+        row.status = None
+        mock_db.execute.return_value = _mock_result([row])
         
-        # Mock the _search_entity_type method to return sample results
-        with patch.object(service, '_search_entity_type', new_callable=AsyncMock) as mock_search:
-            mock_search.return_value = [
-                {
-                    "entity_type": "client",
-                    "id": str(sample_client.id),
-                    "name": "Acme Corporation",
-                    "status": None,
-                    "description": "Test client for search"
-                }
-            ]
+        # Mock _generate_hierarchy_paths
+        with patch.object(service, '_generate_hierarchy_paths', new_callable=AsyncMock) as mock_paths:
+            mock_paths.return_value = {"CLI-000001": "Acme Corporation"}
             
-            # Mock _generate_hierarchy_path
-            with patch.object(service, '_generate_hierarchy_path', new_callable=AsyncMock) as mock_path:
-                mock_path.return_value = "Acme Corporation"
-                
-                # Execute search with specific entity type
-                result = await service.search_entities(
-                    query="Acme",
-                    entity_types=['client'],  # Specify entity type to get predictable results
-                    current_user=admin_user,
-                    page=1,
-                    page_size=50
-                )
-                
-                # Verify results
-                assert result['total'] == 1
-                assert result['page'] == 1
-                assert result['page_size'] == 50
-                assert len(result['results']) == 1
-                assert result['results'][0]['name'] == "Acme Corporation"
-                assert result['results'][0]['hierarchy_path'] == "Acme Corporation"
-    
-    @pytest.mark.asyncio
-    async def test_search_entities_with_type_filter(self, mock_db, admin_user):
-        """Test search with entity type filtering."""
-        service = HierarchyService(mock_db)
-        
-        # Mock the _search_entity_type method
-        with patch.object(service, '_search_entity_type', new_callable=AsyncMock) as mock_search:
-            mock_search.return_value = []
-            
-            # Execute search with type filter
+            # Execute search with specific entity type
             result = await service.search_entities(
-                query="test",
-                entity_types=['program', 'project'],
+                query="Acme",
+                entity_types=['client'],  # Specify entity type to get predictable results
                 current_user=admin_user,
                 page=1,
                 page_size=50
             )
             
-            # Verify that only specified types were searched
-            assert mock_search.call_count == 2
-            call_args = [call[0][0] for call in mock_search.call_args_list]
-            assert 'program' in call_args
-            assert 'project' in call_args
+            # Verify results
+            assert result['total'] == 1
+            assert result['page'] == 1
+            assert result['page_size'] == 50
+            assert len(result['results']) == 1
+            assert result['results'][0]['name'] == "Acme Corporation"
+            assert result['results'][0]['hierarchy_path'] == "Acme Corporation"
+            mock_paths.assert_awaited_once_with([("client", "CLI-000001")])
+    
+    @pytest.mark.asyncio
+    async def test_search_entities_with_type_filter(self, mock_db, admin_user):
+        """Test search with entity type filtering."""
+        service = HierarchyService(mock_db)
+        mock_db.execute.return_value = _mock_result([])
+        
+        # Execute search with type filter
+        result = await service.search_entities(
+            query="test",
+            entity_types=['program', 'project'],
+            current_user=admin_user,
+            page=1,
+            page_size=50
+        )
+        
+        # Verify that only specified types were searched, in a single query
+        assert result['total'] == 0
+        assert mock_db.execute.await_count == 1
+        sql = str(mock_db.execute.call_args[0][0].compile(dialect=postgresql.dialect()))
+        assert "FROM programs" in sql
+        assert "FROM projects" in sql
+        assert "FROM tasks" not in sql
+        assert sql.count("UNION ALL") == 1
     
     @pytest.mark.asyncio
     async def test_search_entities_pagination(self, mock_db, admin_user):
         """Test search pagination."""
         service = HierarchyService(mock_db)
         
-        # Create mock results (10 items)
-        mock_results = [
-            {
-                "entity_type": "program",
-                "id": str(uuid4()),
-                "name": f"Program {i}",
-                "status": "Active",
-                "description": f"Description {i}"
-            }
-            for i in range(10)
-        ]
-        
-        with patch.object(service, '_search_entity_type', new_callable=AsyncMock) as mock_search:
-            mock_search.return_value = mock_results
+        with patch.object(service, '_generate_hierarchy_paths', new_callable=AsyncMock) as mock_paths:
+            mock_paths.return_value = {}
+            
+            # Test page 1 with page_size 5 (the query returns one page of 10 matches)
+            mock_db.execute.return_value = _mock_result(_search_rows(5, 10))
+            result = await service.search_entities(
+                query="Program",
+                entity_types=['program'],
+                current_user=admin_user,
+                page=1,
+                page_size=5
+            )
+            
+            assert result['total'] == 10
+            assert result['page'] == 1
+            assert result['page_size'] == 5
+            assert len(result['results']) == 5
+            assert result['total_pages'] == 2
+            
+            # Test page 2: LIMIT/OFFSET are applied in SQL
+            result = await service.search_entities(
+                query="Program",
+                entity_types=['program'],
+                current_user=admin_user,
+                page=2,
+                page_size=5
+            )
             
-            with patch.object(service, '_generate_hierarchy_path', new_callable=AsyncMock) as mock_path:
-                mock_path.return_value = "Test Path"
-                
-                # Test page 1 with page_size 5
-                result = await service.search_entities(
-                    query="Program",
-                    entity_types=['program'],
-                    current_user=admin_user,
-                    page=1,
-                    page_size=5
-                )
-                
-                assert result['total'] == 10
-                assert result['page'] == 1
-                assert result['page_size'] == 5
-                assert len(result['results']) == 5
-                assert result['total_pages'] == 2
-                
-                # Test page 2
-                result = await service.search_entities(
-                    query="Program",
-                    entity_types=['program'],
-                    current_user=admin_user,
-                    page=2,
-                    page_size=5
-                )
-                
-                assert len(result['results']) == 5
-                assert result['page'] == 2
+            assert len(result['results']) == 5
+            assert result['page'] == 2
+            query = mock_db.execute.call_args[0][0]
+            assert query._limit == 5
+            assert query._offset == 5
 
 
 class TestSearchEntityType:
     """Test class for _search_entity_type helper method."""
     
     @pytest.mark.asyncio
-    async def test_search_client_by_name(self, mock_db, admin_user, sample_client):
+    async def test_search_client_by_name(self, mock_db, admin_user):
         """Test searching clients by name."""
         service = HierarchyService(mock_db)
         
-        # Mock database query result
-        mock_result = MagicMock()
-        mock_result.scalars.return_value.all.return_value = [sample_client]
-        mock_db.execute.return_value = mock_result
-        
-        # Execute search
-        results = await service._search_entity_type(
+        # Build the branch query
+        query = await service._search_entity_type(
             entity_type='client',
             query='Acme',
             current_user=admin_user
         )
         
-        # Verify results
-        assert len(results) == 1
-        assert results[0]['entity_type'] == 'client'
-        assert results[0]['name'] == 'Acme Corporation'
-        assert results[0]['id'] == str(sample_client.id)
+        # Verify full-text, trigram and substring matching on clients
+        sql = str(query.compile(dialect=postgresql.dialect()))
+        params = query.compile(dialect=postgresql.dialect()).params
+        assert "FROM clients" in sql
+        assert "clients.search_vector @@ to_tsquery" in sql
+        assert "similarity(clients.name" in sql
+        assert "acme:*" in params.values()
+        assert "%Acme%" in params.values()
     
     @pytest.mark.asyncio
-    async def test_search_task_by_title(self, mock_db, admin_user):
-        """Test searching tasks by title."""
+    async def test_search_task_by_title(self, mock_db, developer_user):
+        """Test searching tasks by title is scoped to the user's client."""
         service = HierarchyService(mock_db)
         
-        # Create sample task
-        task = Task(
-            id=uuid4(),
-            user_story_id=uuid4(),
-            title="Implement search feature",
-            description="Add search functionality",
-            status="In Progress",
-            is_deleted=False
+        query = await service._search_entity_type(
+            entity_type='task',
+            query='search feature',
+            current_user=developer_user
         )
         
-        # Mock database query result
-        mock_result = MagicMock()
-        mock_result.scalars.return_value.all.return_value = [task]
-        mock_db.execute.return_value = mock_result
+        sql = str(query.compile(dialect=postgresql.dialect()))
+        params = query.compile(dialect=postgresql.dialect()).params
+        assert "FROM tasks" in sql
+        assert "hierarchy_closure" in sql
+        assert "search:* & feature:*" in params.values()
+    
+    @pytest.mark.asyncio
+    async def test_search_unknown_type_returns_none(self, mock_db, admin_user):
+        """Unknown entity types contribute no branch."""
+        service = HierarchyService(mock_db)
         
-        # Mock _apply_client_filter
-        with patch.object(service, '_apply_client_filter', new_callable=AsyncMock) as mock_filter:
-            mock_filter.return_value = MagicMock()
-            
-            # Execute search
-            results = await service._search_entity_type(
-                entity_type='task',
-                query='search',
-                current_user=admin_user
-            )
-            
-            # Verify results
-            assert len(results) == 1
-            assert results[0]['entity_type'] == 'task'
-            assert results[0]['name'] == 'Implement search feature'
+        assert await service._search_entity_type('bug', 'x', admin_user) is None
 
 
 class TestHierarchyPath:
@@ -302,6 +294,45 @@ class TestHierarchyPath:
             
             # Verify empty path
             assert path == ""
+    
+    @pytest.mark.asyncio
+    async def test_breadcrumbs_resolved_in_one_query(self, mock_db):
+        """A page of results resolves every breadcrumb with one closure query."""
+        service = HierarchyService(mock_db)
+        rows = []
+        for descendant_id, ancestor_type, ancestor_id, name in [
+            ("PRJ-000001", "client", "CLI-000001", "Acme"),
+            ("PRJ-000001", "project", "PRJ-000001", "Web"),
+            ("CLI-000001", "client", "CLI-000001", "Acme"),
+        ]:
+            row = MagicMock(descendant_id=descendant_id, ancestor_type=ancestor_type, ancestor_id=ancestor_id)
+            row.name = name
+            rows.append(row)
+        mock_db.execute.return_value = _mock_result(rows)
+        
+        paths = await service._generate_hierarchy_paths([
+            ("project", "PRJ-000001"), ("client", "CLI-000001"), ("task", "TSK-000404")
+        ])
+        
+        assert paths == {"PRJ-000001": "Acme > Web", "CLI-000001": "Acme"}
+        assert mock_db.execute.await_count == 1
+    
+    @pytest.mark.asyncio
+    async def test_breadcrumbs_are_memoized(self, mock_db):
+        """Breadcrumbs already resolved by the service are not queried again."""
+        service = HierarchyService(mock_db)
+        
+        with patch.object(service.closure, 'ancestor_paths', new_callable=AsyncMock) as mock_paths:
+            mock_paths.return_value = {
+                "PRJ-000001": [{"type": "project", "id": "PRJ-000001", "name": "Web"}]
+            }
+            await service._get_breadcrumbs([("project", "PRJ-000001"), ("task", "TSK-000404")])
+            breadcrumb = await service._get_breadcrumb_for_entity("project", "PRJ-000001")
+            await service._get_breadcrumbs([("task", "TSK-000404"), ("usecase", "USC-000001")])
+        
+        assert breadcrumb[0]["name"] == "Web"
+        assert mock_paths.await_count == 2
+        mock_paths.assert_awaited_with(["USC-000001"])
 
 
 def test_hierarchy_service_search_initialization():
@@ -0,0 +1,99 @@
+"""
+Tests for Intent Classifier.
+
+These tests validate the single-pass query scanner against the
+classification rules it replaces:
+- Identical Intents to the per-pattern implementation on recorded queries
+- Overlapping keywords and substring cues
+- Entity ID order and case
+"""
+import importlib.util
+from pathlib import Path
+
+import pytest
+
+from app.schemas.chat import EntityType, IntentType
+from app.services.intent_classifier import IntentClassifier
+
+BENCHMARK = Path(__file__).resolve().parents[2] / "scripts" / "benchmark_intent_classifier.py"
+
+
+@pytest.fixture(scope="module")
+def benchmark():
+    """Load the benchmark script with the previous implementation"""
+    spec = importlib.util.spec_from_file_location("benchmark_intent_classifier", BENCHMARK)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def classifier():
+    """Create an IntentClassifier"""
+    return IntentClassifier()
+
+
+@pytest.mark.asyncio
+async def test_matches_previous_classifier_on_recorded_queries(benchmark):
+    """Test that every recorded query classifies exactly as before"""
+    checked = await benchmark.compare(benchmark.RECORDED_QUERIES)
+
+    assert checked == len(benchmark.RECORDED_QUERIES) * len(benchmark.CONTEXTS)
+
+
+def test_scan_reports_overlapping_keywords(classifier):
+    """Test that keywords inside longer keywords are still found"""
+    features = classifier.scanner.scan("Show me more details.")
+
+    # "more details" (clarification) and "details" (navigation) overlap,
+    # as do "show me" (navigation) and "show" (query)
+    assert (IntentType.CLARIFICATION, 0) in features.keyword_patterns
+    assert (IntentType.NAVIGATION, 1) in features.keyword_patterns
+    assert (IntentType.NAVIGATION, 0) in features.keyword_patterns
+    assert (IntentType.QUERY, 0) in features.keyword_patterns
+    # "how" inside "show" is a question cue
+    assert {"navigation", "listing", "question"} <= features.signals
+
+
+def test_scan_checks_word_boundaries_only_for_keywords(classifier):
+    """Test that cue words match inside words but keywords do not"""
+    features = classifier.scanner.scan("Follow the settings.")
+
+    assert features.keyword_patterns == set()
+    assert "action" in features.signals
+    assert features.priorities == {"low"}
+
+
+def test_scan_entity_ids_keep_case_and_position(classifier):
+    """Test entity IDs are reported in query order with their original text"""
+    features = classifier.scanner.scan("İs tsk-7 blocked by PRJ-12 or TSK-8x?")
+
+    assert features.entity_ids == [("task_id", "tsk-7"), ("project_id", "PRJ-12")]
+
+
+@pytest.mark.asyncio
+async def test_classify_groups_entities_by_type(classifier):
+    """Test entities are grouped by type in PATTERNS order"""
+    intent = await classifier.classify("Link BUG-3 to TSK-1 and PRJ-2 on 2024-01-05")
+
+    assert [(e.entity_type, e.entity_id) for e in intent.entities] == [
+        (EntityType.PROJECT, "PRJ-2"),
+        (EntityType.TASK, "TSK-1"),
+        (EntityType.BUG, "BUG-3"),
+    ]
+    assert intent.temporal_context["date_filter"] == "specific"
+    assert intent.intent_type == IntentType.ACTION
+
+
+def test_status_filter_follows_status_order(classifier):
+    """Test the first status in STATUS_VALUES order wins, not the first in the query"""
+    context = classifier._extract_temporal_context("Rejected or pending bugs this week.")
+
+    assert context["status_filter"] == "pending"
+    assert context["date_filter"] == "this_week"
+
+
+def test_is_complex_query_scans_when_called_alone(classifier):
+    """Test helpers still work without a precomputed scan"""
+    assert classifier._is_complex_query("Tasks and bugs or stories.")
+    assert not classifier._is_complex_query("Tasks and bugs.")
@@ -0,0 +1,261 @@
+"""
+Tests for the token-budgeted chat prompt builder.
+
+These tests validate:
+- Small prompts sent in full, with an exact input token count
+- Large tables cut to their top rows with an aggregate footer
+- History kept newest first within its share of the budget
+- Unused history budget passed on to the data
+- Encoders and fixed prompt parts tokenized only once
+- The chat service passing CHAT_MAX_CONTEXT_MESSAGES of history to the builder
+"""
+import pytest
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.config import settings
+from app.schemas.chat import ChatMessageResponse, ChatRequest, IntentType
+from app.services import prompt_builder
+from app.services.chat_service import ChatService
+from app.services.llm_service import LLMService
+from app.services.prompt_builder import MESSAGE_OVERHEAD_TOKENS, PromptBuilder
+from app.services.retrieval_planner import INCOMPLETE_DATA_KEY
+
+
+class _ByteEncoding:
+    """One token per UTF-8 byte, so budgets are easy to reason about"""
+    
+    def __init__(self):
+        self.encoded = []
+    
+    def encode(self, text):
+        self.encoded.append(text)
+        return list(text.encode())
+    
+    def decode(self, tokens):
+        return bytes(tokens).decode(errors="ignore")
+
+
+SYSTEM_PROMPT = "You are a helpful assistant."
+
+
+def _builder(max_tokens=2000, history_share=0.25, table_rows=20, max_context_messages=10):
+    with patch("app.services.prompt_builder.get_chat_metrics"):
+        return PromptBuilder(
+            _ByteEncoding(),
+            max_tokens=max_tokens,
+            history_share=history_share,
+            table_rows=table_rows,
+            max_context_messages=max_context_messages
+        )
+
+
+def _tasks(count):
+    return [
+        {
+            "id": f"TSK-{i}",
+            "title": f"Task number {i}",
+            "status": "Done" if i % 3 == 0 else "To Do",
+            "priority": "High" if i % 2 == 0 else "Low",
+            "description": "Long description " * 20,
+        }
+        for i in range(count)
+    ]
+
+
+def test_small_prompt_is_sent_in_full():
+    """Test a prompt under budget keeps all rows and counts tokens exactly"""
+    builder = _builder()
+    
+    messages, input_tokens = builder.build(
+        SYSTEM_PROMPT, "show my tasks", {"tasks": _tasks(3)}, IntentType.QUERY,
+        [{"role": "user", "content": "hello"}]
+    )
+    
+    user_prompt = messages[1]["content"]
+    assert messages[0] == {"role": "system", "content": SYSTEM_PROMPT}
+    assert "User: hello" in user_prompt
+    assert "Tasks (3 rows):" in user_prompt
+    assert "TSK-2 | Task number 2" in user_prompt
+    assert "All 3 rows" not in user_prompt
+    assert input_tokens == (
+        len(SYSTEM_PROMPT.encode()) + len(user_prompt.encode()) + 2 * MESSAGE_OVERHEAD_TOKENS
+    )
+
+
+def test_large_table_is_cut_to_top_rows_with_footer():
+    """Test rows past the budget are dropped and counted in the footer"""
+    builder = _builder(max_tokens=1500)
+    
+    messages, input_tokens = builder.build(SYSTEM_PROMPT, "show tasks", {"tasks": _tasks(200)})
+    
+    user_prompt = messages[1]["content"]
+    assert input_tokens <= 1500
+    assert "TSK-0 |" in user_prompt
+    assert "TSK-199" not in user_prompt
+    assert "Tasks (200 rows, first " in user_prompt
+    assert "All 200 rows by status: To Do 133, Done 67; by priority: High 100, Low 100" in user_prompt
+    builder.metrics.record_prompt_compressed.assert_any_call("data")
+
+
+def test_table_rows_are_capped_even_when_they_fit():
+    """Test CHAT_PROMPT_TABLE_ROWS limits rows under a generous budget"""
+    builder = _builder(max_tokens=100000, table_rows=5)
+    
+    messages, _ = builder.build(SYSTEM_PROMPT, "show tasks", {"tasks": _tasks(50)})
+    
+    user_prompt = messages[1]["content"]
+    assert "Tasks (50 rows, first 5 shown):" in user_prompt
+    assert "TSK-4 |" in user_prompt
+    assert "TSK-5 |" not in user_prompt
+
+
+def test_history_keeps_newest_messages_within_share():
+    """Test old messages are dropped first when history is over its share"""
+    builder = _builder(max_tokens=1000, history_share=0.2, max_context_messages=6)
+    history = [{"role": "user", "content": f"message {i} " + "x" * 40} for i in range(12)]
+    
+    messages, _ = builder.build(SYSTEM_PROMPT, "and now?", {}, conversation_context=history)
+    
+    user_prompt = messages[1]["content"]
+    assert "message 11" in user_prompt
+    assert "message 5" not in user_prompt
+    assert user_prompt.index("message 10") < user_prompt.index("message 11")
+    builder.metrics.record_prompt_compressed.assert_any_call("history")
+
+
+def test_unused_history_budget_goes_to_data():
+    """Test a table gets more rows when there is no history"""
+    history = [{"role": "user", "content": "y" * 400}]
+    
+    with_history, _ = _builder(max_tokens=2000, history_share=0.5).build(
+        SYSTEM_PROMPT, "show tasks", {"tasks": _tasks(100)}, conversation_context=history
+    )
+    without_history, _ = _builder(max_tokens=2000, history_share=0.5).build(
+        SYSTEM_PROMPT, "show tasks", {"tasks": _tasks(100)}
+    )
+    
+    assert without_history[1]["content"].count("TSK-") > with_history[1]["content"].count("TSK-")
+
+
+def test_statistics_and_incomplete_note_are_included():
+    """Test statistics are sent as compact JSON and partial data is flagged"""
+    builder = _builder()
+    data = {
+        "task_statistics": {"total_tasks": 4, "by_status": {"Done": 4}},
+        INCOMPLETE_DATA_KEY: ["bug_statistics"],
+    }
+    
+    messages, _ = builder.build(SYSTEM_PROMPT, "task report", data, IntentType.REPORT)
+    
+    user_prompt = messages[1]["content"]
+    assert 'Task Statistics: {"total_tasks":4,"by_status":{"Done":4}}' in user_prompt
+    assert "bug_statistics could not be retrieved in time" in user_prompt
+    assert INCOMPLETE_DATA_KEY not in user_prompt
+
+
+def test_empty_data_is_reported():
+    """Test a prompt without data says so"""
+    messages, _ = _builder().build(SYSTEM_PROMPT, "show tasks", {"tasks": []})
+    
+    assert "No relevant data found in the database." in messages[1]["content"]
+
+
+def test_fixed_parts_are_tokenized_once():
+    """Test the system prompt is encoded on the first build only"""
+    builder = _builder()
+    
+    builder.build(SYSTEM_PROMPT, "first", {})
+    builder.build(SYSTEM_PROMPT, "second", {})
+    
+    assert builder.encoding.encoded.count(SYSTEM_PROMPT) == 1
+
+
+def test_prompt_sizes_are_recorded():
+    """Test each prompt section size goes to the metrics"""
+    builder = _builder()
+    
+    _, input_tokens = builder.build(SYSTEM_PROMPT, "show tasks", {"tasks": _tasks(2)})
+    
+    recorded = {c.args[0]: c.args[1] for c in builder.metrics.record_prompt_tokens.call_args_list}
+    assert recorded["system"] == len(SYSTEM_PROMPT.encode())
+    assert recorded["history"] == 0
+    assert recorded["data"] > 0
+    assert recorded["total"] == input_tokens
+
+
+def test_encoders_are_loaded_once_per_model():
+    """Test get_encoding caches encoders and falls back for unknown models"""
+    prompt_builder.get_encoding.cache_clear()
+    try:
+        with patch("app.services.prompt_builder.tiktoken") as tiktoken:
+            tiktoken.encoding_for_model.side_effect = KeyError("unknown")
+            
+            first = prompt_builder.get_encoding("my-model")
+            second = prompt_builder.get_encoding("my-model")
+        
+        assert first is second
+        tiktoken.encoding_for_model.assert_called_once_with("my-model")
+        tiktoken.get_encoding.assert_called_once_with("cl100k_base")
+    finally:
+        prompt_builder.get_encoding.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_chat_history_reaches_builder_up_to_max_context_messages():
+    """Test that a query sees CHAT_MAX_CONTEXT_MESSAGES of stored history"""
+    stored = [
+        ChatMessageResponse(
+            id=f"MSG-{i}", session_id="SES-001", user_id="USR-1",
+            role="user" if i % 2 == 0 else "assistant", content=f"Message {i}",
+            created_at=datetime(2026, 1, 1)
+        )
+        for i in range(settings.CHAT_MAX_CONTEXT_MESSAGES + 2)
+    ]
+    session = MagicMock(last_intent=None, mentioned_entities=[])
+    
+    with patch("app.services.chat_service.get_session_service"), \
+         patch("app.services.chat_service.get_intent_classifier"), \
+         patch("app.services.chat_service.get_data_retriever"), \
+         patch("app.services.chat_service.get_retrieval_planner"), \
+         patch("app.services.chat_service.get_llm_service"), \
+         patch("app.services.chat_service.get_action_handler"), \
+         patch("app.services.chat_service.get_audit_service"), \
+         patch("app.services.llm_service.get_chat_metrics"), \
+         patch("app.services.llm_service.get_chat_response_cache"), \
+         patch("app.services.llm_service.get_encoding", return_value=_ByteEncoding()), \
+         patch("app.services.prompt_builder.get_chat_metrics"):
+        service = ChatService()
+        service.llm_service = LLMService()
+    
+    service.metrics = MagicMock()
+    service.response_cache = MagicMock(lookup=AsyncMock(return_value=(None, None)), store=AsyncMock())
+    service.session_service.get_session_with_history = AsyncMock(
+        side_effect=lambda session_id, limit: (session, stored[-limit:])
+    )
+    service.intent_classifier.classify_with_llm_fallback = AsyncMock(
+        return_value=MagicMock(intent_type=IntentType.QUERY, confidence=0.9, entities=[])
+    )
+    service._retrieve_data = AsyncMock(return_value={"tasks": _tasks(2)})
+    service._finish_turn = AsyncMock()
+    
+    llm = service.llm_service
+    llm.client = MagicMock()
+    llm.client.chat.completions.create = AsyncMock(return_value=MagicMock(
+        choices=[MagicMock(message=MagicMock(content="Two tasks."), finish_reason="stop")],
+        usage=None
+    ))
+    llm.prompt_builder = _builder(max_tokens=20000)
+    
+    with patch.object(llm.prompt_builder, "build", wraps=llm.prompt_builder.build) as build:
+        response = await service.process_query(
+            MagicMock(), MagicMock(id="USR-1"), ChatRequest(query="Show my tasks", session_id="SES-001")
+        )
+    
+    assert response.message == "Two tasks."
+    conversation_context = build.call_args.args[4]
+    assert len(conversation_context) == settings.CHAT_MAX_CONTEXT_MESSAGES == 10
+    assert conversation_context[-1] == {"role": "assistant", "content": "Message 11"}
+    messages = llm.client.chat.completions.create.call_args.kwargs["messages"]
+    prompt = "\n".join(message["content"] for message in messages)
+    assert prompt.count("Message ") == 10
@@ -0,0 +1,257 @@
+"""
+Tests for the SQL-side QA metrics.
+
+These tests validate:
+- Each metric is one aggregate query, not a load of every row
+- Bug breakdowns map from GROUPING SETS rows by grouping value
+- Bug ages are bucketed with width_bucket into the report ranges
+- Test coverage counts test cases in SQL, scoped through the test run
+- Bug trends bucket in SQL by day, week or month, optionally from snapshots
+"""
+import pytest
+from datetime import date, datetime
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.qa_metrics_service import QAMetricsService, next_bucket, truncate_day
+
+
+def _db(rows=None, one=None):
+    result = MagicMock()
+    result.all.return_value = rows or []
+    result.one.return_value = one
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=result)
+    return db
+
+
+def _sql(db, call=-1):
+    statement = db.execute.call_args_list[call][0][0]
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def _bug_row(grouping, count, severity=None, priority=None, status=None, **totals):
+    return SimpleNamespace(
+        grouping=grouping, count=count, severity=severity, priority=priority, status=status,
+        open_bugs=totals.get("open_bugs"), closed_bugs=totals.get("closed_bugs"),
+        resolution_days=totals.get("resolution_days")
+    )
+
+
+@pytest.mark.asyncio
+async def test_bug_summary_is_one_grouping_sets_query():
+    """Test the summary aggregates in SQL and maps breakdowns by GROUPING()"""
+    db = _db(rows=[
+        _bug_row(3, 3, severity="High"),
+        _bug_row(3, 1),
+        _bug_row(5, 4, priority="P1"),
+        _bug_row(6, 1, status="Open"),
+        _bug_row(6, 3, status="Closed"),
+        _bug_row(7, 4, open_bugs=1, closed_bugs=3, resolution_days=Decimal("2.456")),
+    ])
+    
+    summary = await QAMetricsService(db).get_bug_summary(project_id="PRJ-1")
+    
+    sql = _sql(db)
+    assert db.execute.await_count == 1
+    assert "GROUPING SETS" in sql
+    assert "count(*) FILTER (WHERE bugs.status IN" in sql
+    assert "avg(EXTRACT(epoch FROM bugs.closed_at - bugs.created_at)" in sql
+    assert "bugs.project_id" in sql
+    assert summary == {
+        "total_bugs": 4,
+        "open_bugs": 1,
+        "closed_bugs": 3,
+        "resolution_rate": 75.0,
+        "average_resolution_time": 2.46,
+        "by_severity": {"High": 3, "Unknown": 1},
+        "by_priority": {"P1": 4},
+        "by_status": {"Open": 1, "Closed": 3},
+    }
+
+
+@pytest.mark.asyncio
+async def test_bug_summary_without_bugs_is_zeroed():
+    """Test an empty scope returns the zeroed summary shape"""
+    summary = await QAMetricsService(_db()).get_bug_summary()
+    
+    assert summary["total_bugs"] == 0
+    assert summary["resolution_rate"] == 0
+    assert summary["average_resolution_time"] == 0
+    assert summary["by_status"] == {}
+
+
+@pytest.mark.asyncio
+async def test_bug_aging_buckets_with_width_bucket():
+    """Test open bug ages are bucketed in SQL into the report ranges"""
+    db = _db(rows=[
+        SimpleNamespace(grouping=1, age_bucket=0, severity=None, count=2, average_age=None),
+        SimpleNamespace(grouping=1, age_bucket=3, severity=None, count=2, average_age=None),
+        SimpleNamespace(grouping=2, age_bucket=None, severity="Critical", count=3, average_age=Decimal("40.04")),
+        SimpleNamespace(grouping=2, age_bucket=None, severity=None, count=1, average_age=2.0),
+        SimpleNamespace(grouping=3, age_bucket=None, severity=None, count=4, average_age=30.5),
+    ])
+    
+    report = await QAMetricsService(db).get_bug_aging()
+    
+    sql = _sql(db)
+    assert "width_bucket(" in sql
+    assert "ARRAY[8, 31, 91]" in sql
+    assert "GROUPING SETS" in sql
+    assert report == {
+        "age_ranges": [
+            {"range": "0-7 days", "count": 2, "percentage": 50.0},
+            {"range": "8-30 days", "count": 0, "percentage": 0},
+            {"range": "31-90 days", "count": 0, "percentage": 0},
+            {"range": "90+ days", "count": 2, "percentage": 50.0},
+        ],
+        "average_age_by_severity": {"Critical": 40.0, "Unknown": 2.0},
+    }
+
+
+@pytest.mark.asyncio
+async def test_test_execution_summary_counts_in_one_query():
+    """Test executions and test cases are counted in a single statement"""
+    db = _db(one=SimpleNamespace(
+        total_executions=10, passed=6, failed=3, blocked=1, skipped=0,
+        executed_test_cases=4, total_test_cases=8
+    ))
+    
+    summary = await QAMetricsService(db).get_test_execution_summary(
+        test_run_id="RUN-1", project_id="PRJ-1"
+    )
+    
+    sql = _sql(db)
+    assert db.execute.await_count == 1
+    assert "count(DISTINCT test_executions.test_case_id)" in sql
+    assert "(SELECT count(*)" in sql
+    assert "test_runs.project_id" in sql
+    assert summary == {
+        "total_executions": 10,
+        "passed": 6,
+        "failed": 3,
+        "blocked": 1,
+        "skipped": 0,
+        "pass_rate": 60.0,
+        "fail_rate": 30.0,
+        "execution_coverage": 50.0,
+        "total_test_cases": 8,
+        "executed_test_cases": 4,
+    }
+
+
+@pytest.mark.asyncio
+async def test_test_execution_summary_without_scope_skips_join():
+    """Test executions are not joined to test cases without hierarchy filters"""
+    db = _db(one=SimpleNamespace(
+        total_executions=0, passed=0, failed=0, blocked=0, skipped=0,
+        executed_test_cases=0, total_test_cases=0
+    ))
+    
+    summary = await QAMetricsService(db).get_test_execution_summary()
+    
+    assert "JOIN" not in _sql(db)
+    assert summary["pass_rate"] == 0
+    assert summary["execution_coverage"] == 0
+
+
+def test_trend_buckets_follow_date_trunc():
+    """Test bucket starts match PostgreSQL date_trunc for weeks and months"""
+    assert truncate_day(date(2026, 10, 16), "day") == date(2026, 10, 16)
+    assert truncate_day(date(2026, 10, 16), "week") == date(2026, 10, 12)
+    assert truncate_day(date(2026, 10, 16), "month") == date(2026, 10, 1)
+    assert next_bucket(date(2026, 10, 12), "week") == date(2026, 10, 19)
+    assert next_bucket(date(2026, 12, 1), "month") == date(2027, 1, 1)
+    assert next_bucket(date(2026, 1, 31), "day") == date(2026, 2, 1)
+
+
+@pytest.mark.asyncio
+async def test_bug_trends_are_one_series_query():
+    """Test trends come from one generate_series query with a running open count"""
+    db = _db(rows=[
+        SimpleNamespace(bucket=datetime(2026, 10, 1), created=Decimal(3), resolved=Decimal(0), open=Decimal(5)),
+        SimpleNamespace(bucket=datetime(2026, 11, 1), created=0, resolved=2, open=3),
+    ])
+    
+    with patch("app.services.qa_metrics_service.settings") as settings:
+        settings.QA_TRENDS_SNAPSHOTS_ENABLED = False
+        trends = await QAMetricsService(db).get_bug_trends(
+            date(2026, 10, 16), date(2026, 11, 3), "month", project_id="PRJ-1"
+        )
+    
+    sql = _sql(db)
+    assert db.execute.await_count == 1
+    assert "generate_series(" in sql
+    assert "INTERVAL '1 month'" in sql
+    assert "date_trunc(" in sql
+    assert "OVER (ORDER BY" in sql
+    assert "bug_daily_snapshots" not in sql
+    assert trends == {
+        "dates": ["2026-10-01", "2026-11-01"],
+        "created": [3, 0],
+        "resolved": [0, 2],
+        "open": [5, 3],
+    }
+
+
+@pytest.mark.asyncio
+async def test_bug_trends_end_before_start_is_empty():
+    """Test an inverted range returns empty series without a query"""
+    db = _db()
+    
+    trends = await QAMetricsService(db).get_bug_trends(date(2026, 10, 16), date(2026, 10, 1))
+    
+    assert trends == {"dates": [], "created": [], "resolved": [], "open": []}
+    db.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_long_bug_trends_read_covered_days_from_snapshots():
+    """Test covered days come from snapshots and the rest from bugs"""
+    db = _db(one=(date(2026, 1, 1), date(2026, 10, 14)))
+    
+    with patch("app.services.qa_metrics_service.settings") as settings:
+        settings.QA_TRENDS_SNAPSHOTS_ENABLED = True
+        settings.QA_TRENDS_SNAPSHOT_MIN_DAYS = 90
+        await QAMetricsService(db).get_bug_trends(date(2025, 10, 1), date(2026, 10, 16), "week")
+    
+    statement = db.execute.call_args_list[1][0][0]
+    params = statement.compile(dialect=postgresql.dialect()).params
+    assert db.execute.await_count == 2
+    assert "bug_daily_snapshots" in _sql(db, 0)
+    assert "FROM bug_daily_snapshots" in _sql(db, 1)
+    assert date(2026, 1, 1) in params.values()
+    assert date(2026, 10, 15) in params.values()
+
+
+@pytest.mark.asyncio
+async def test_short_bug_trends_skip_snapshots():
+    """Test ranges under QA_TRENDS_SNAPSHOT_MIN_DAYS always scan bugs"""
+    db = _db()
+    
+    with patch("app.services.qa_metrics_service.settings") as settings:
+        settings.QA_TRENDS_SNAPSHOTS_ENABLED = True
+        settings.QA_TRENDS_SNAPSHOT_MIN_DAYS = 90
+        await QAMetricsService(db).get_bug_trends(date(2026, 10, 1), date(2026, 10, 16))
+    
+    assert db.execute.await_count == 1
+    assert "bug_daily_snapshots" not in _sql(db)
+
+
+@pytest.mark.asyncio
+async def test_refresh_bug_snapshots_rebuilds_days_and_marks_coverage():
+    """Test a refresh replaces the days and marks each one as covered"""
+    db = _db()
+    db.execute.return_value.rowcount = 12
+    db.commit = AsyncMock()
+    
+    rows = await QAMetricsService(db).refresh_bug_snapshots(date(2026, 10, 1), date(2026, 10, 15))
+    
+    assert rows == 12
+    assert _sql(db, 0).startswith("DELETE FROM bug_daily_snapshots")
+    assert "GROUP BY" in _sql(db, 1)
+    assert "ON CONFLICT DO NOTHING" in _sql(db, 2)
+    db.commit.assert_awaited_once()
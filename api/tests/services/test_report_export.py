@@ -0,0 +1,104 @@
+"""
+Tests for streaming report export.
+
+These tests validate:
+- CSV is sent in bounded chunks while rows are still being read
+- Gzip output decompresses to the plain export
+- PDF pages are drawn a page of rows at a time
+- XLSX needs openpyxl and is refused up front without it
+"""
+import io
+import re
+import zlib
+import pytest
+from unittest.mock import patch
+
+from app.services.report_export import export_stream, gzip_chunks, _PdfPages, PDF_AVAILABLE
+from app.services.report_service import ReportStream
+
+HEADERS = ["User", "Tasks", "Estimated Hours", "Actual Hours", "Utilization %"]
+
+
+def _report(count, consumed=None):
+    async def rows():
+        for i in range(count):
+            if consumed is not None:
+                consumed.append(i)
+            yield [f"User {i}", "2", "10.0", "8.0", "80.0%"]
+    
+    return ReportStream(
+        title="Utilization Report", period="2026-10-01 to 2026-10-15",
+        headers=HEADERS, rows=rows(), generated_at="2026-10-16 09:00:00"
+    )
+
+
+async def _read(chunks):
+    return b"".join([chunk async for chunk in chunks])
+
+
+@pytest.mark.asyncio
+async def test_csv_is_sent_in_chunks_as_rows_arrive():
+    """Test the first CSV chunk is sent before every row is read"""
+    consumed = []
+    
+    with patch("app.services.report_export.settings") as settings:
+        settings.REPORT_CSV_CHUNK_BYTES = 1024
+        chunks = export_stream(_report(1000, consumed), "csv")
+        first = await chunks.__anext__()
+        assert len(consumed) < 100
+        rest = await _read(chunks)
+    
+    lines = (first + rest).decode().splitlines()
+    assert lines[:5] == [
+        "Utilization Report",
+        "Period: 2026-10-01 to 2026-10-15",
+        "Generated: 2026-10-16 09:00:00",
+        "",
+        ",".join(HEADERS),
+    ]
+    assert len(lines) == 1005
+    assert lines[-1] == "User 999,2,10.0,8.0,80.0%"
+
+
+@pytest.mark.asyncio
+async def test_gzip_chunks_round_trip():
+    """Test gzip output is a valid gzip stream of the export"""
+    plain = await _read(export_stream(_report(200), "csv"))
+    compressed = await _read(gzip_chunks(export_stream(_report(200), "csv")))
+    
+    assert compressed[:2] == b"\x1f\x8b"
+    assert zlib.decompress(compressed, 31).splitlines()[4:] == plain.splitlines()[4:]
+    assert len(compressed) < len(plain)
+
+
+@pytest.mark.skipif(not PDF_AVAILABLE, reason="reportlab not installed")
+@pytest.mark.asyncio
+async def test_pdf_is_drawn_page_by_page():
+    """Test every row lands on a page sized to fit it"""
+    pages = _PdfPages(io.BytesIO(), _report(0))
+    first_page = pages.capacity()
+    pages.pages = 1
+    other_pages = pages.capacity()
+    
+    with patch.object(_PdfPages, "draw_page", autospec=True, side_effect=_PdfPages.draw_page) as draw_page:
+        pdf = await _read(export_stream(_report(first_page + other_pages + 1), "pdf"))
+    
+    assert pdf.startswith(b"%PDF")
+    assert [len(call.args[1]) for call in draw_page.call_args_list] == [first_page, other_pages, 1]
+    assert first_page < other_pages
+
+
+@pytest.mark.skipif(not PDF_AVAILABLE, reason="reportlab not installed")
+@pytest.mark.asyncio
+async def test_empty_pdf_has_header_page():
+    """Test a report without rows still renders one page"""
+    pdf = await _read(export_stream(_report(0), "pdf"))
+    
+    assert len(re.findall(rb"/Type /Page\b", pdf)) == 1
+
+
+def test_xlsx_without_openpyxl_is_refused_up_front():
+    """Test a missing optional dependency fails before the response starts"""
+    with patch("app.services.report_export.XLSX_AVAILABLE", False):
+        with pytest.raises(ImportError, match="openpyxl"):
+            export_stream(_report(1), "xlsx")
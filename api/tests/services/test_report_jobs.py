@@ -0,0 +1,236 @@
+"""
+Tests for background report jobs.
+
+These tests validate:
+- Submitted jobs are built by the worker pool into a stored file
+- The submitter is notified when the job completes or fails
+- Identical requests reuse a fresh file or join the build in progress
+- Files are kept a full TTL after their last reuse, as jobs report
+- Unknown reports and invalid parameters are rejected; a full queue answers 503
+- Failed jobs record a generic error, not the exception text
+- Jobs still waiting at shutdown are marked failed
+"""
+import asyncio
+import os
+import time
+from datetime import date, datetime, timezone
+
+import pytest
+import pytest_asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.core.exceptions import ValidationException
+from app.services.report_jobs import (
+    ReportJobService, ArtifactStore, ReportJobQueueFullException, COMPLETED, FAILED, QUEUED,
+    FAILURE_MESSAGE
+)
+from app.services.report_service import ReportStream
+
+
+def _report(rows):
+    async def formatted():
+        for row in rows:
+            yield row
+    
+    return ReportStream(
+        title="Project Health Report", period="Current status",
+        headers=["Project", "Health Score"], rows=formatted(), generated_at="2026-10-16 09:00:00"
+    )
+
+
+@asynccontextmanager
+async def _session():
+    yield MagicMock()
+
+
+@pytest.fixture
+def report_service():
+    """ReportService stand-in whose project health report is a fixed stream"""
+    with patch("app.services.report_jobs.ReportService") as service_class:
+        service = service_class.return_value
+        service.generate_project_health_report = AsyncMock(
+            side_effect=lambda **params: _report([["Portal", "82.5"]])
+        )
+        yield service
+
+
+@pytest.fixture
+def notify():
+    with patch(
+        "app.services.report_jobs.NotificationService.notify_report_job_finished",
+        new_callable=AsyncMock
+    ) as notify:
+        yield notify
+
+
+@pytest_asyncio.fixture
+async def jobs(tmp_path):
+    service = ReportJobService(
+        store=ArtifactStore(str(tmp_path)),
+        cache=MagicMock(redis_client=None),
+        session_factory=_session
+    )
+    yield service
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_job_is_built_stored_and_notified(jobs, report_service, notify):
+    """Test a submitted job is built in the background and its user notified"""
+    job = await jobs.submit("USR-1", "project-health", "csv", {"project_id": "PRJ-1"})
+    assert job["status"] == QUEUED
+    
+    await jobs._queue.join()
+    
+    done = await jobs.get_job(job["job_id"])
+    assert done["status"] == COMPLETED
+    assert done["cached"] is False
+    content = jobs.store.path(done["artifact"]).read_text()
+    assert content.splitlines()[-1] == "Portal,82.5"
+    report_service.generate_project_health_report.assert_awaited_once_with(project_id="PRJ-1")
+    
+    kwargs = notify.await_args.kwargs
+    assert kwargs["user_id"] == "USR-1"
+    assert kwargs["succeeded"] is True
+    assert kwargs["download_url"] == f"/api/v1/reports/jobs/{job['job_id']}/download"
+
+
+@pytest.mark.asyncio
+async def test_identical_request_reuses_fresh_file(jobs, report_service, notify):
+    """Test a repeat request within the freshness window is served from the stored file"""
+    first = await jobs.submit("USR-1", "project-health", "csv", {"project_id": "PRJ-1"})
+    await jobs._queue.join()
+    
+    second = await jobs.submit("USR-2", "project-health", "csv", {"project_id": "PRJ-1"})
+    other_format = await jobs.submit("USR-2", "project-health", "json", {"project_id": "PRJ-1"})
+    
+    assert second["status"] == COMPLETED
+    assert second["cached"] is True
+    assert second["artifact"] == (await jobs.get_job(first["job_id"]))["artifact"]
+    assert other_format["status"] == QUEUED
+    await jobs._queue.join()
+    assert report_service.generate_project_health_report.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_reused_file_is_kept_for_the_new_job(jobs, report_service, notify):
+    """Test reusing a file restarts its age, so it lasts as long as the new job reports"""
+    first = await jobs.submit("USR-1", "project-health", "csv", {"project_id": "PRJ-1"})
+    await jobs._queue.join()
+    first = await jobs.get_job(first["job_id"])
+    path = jobs.store.path(first["artifact"])
+    assert datetime.fromisoformat(first["expires_at"]).timestamp() == pytest.approx(
+        path.stat().st_mtime + jobs.ttl
+    )
+    
+    # Built most of a TTL ago, but still within the freshness window
+    built_at = time.time() - jobs.ttl + 60
+    os.utime(path, (built_at, built_at))
+    second = await jobs.submit("USR-2", "project-health", "csv", {"project_id": "PRJ-1"})
+    
+    assert second["cached"] is True
+    expires_at = datetime.fromisoformat(second["expires_at"])
+    assert expires_at.timestamp() == pytest.approx(time.time() + jobs.ttl, abs=5)
+    assert expires_at.tzinfo == timezone.utc
+    assert jobs.store.purge(jobs.ttl - 120) == 0
+    assert path.is_file()
+
+
+@pytest.mark.asyncio
+async def test_identical_request_joins_build_in_progress(jobs, report_service, notify):
+    """Test requests identical to a queued build are finished by that build"""
+    first = await jobs.submit("USR-1", "project-health", "pdf", {})
+    second = await jobs.submit("USR-2", "project-health", "pdf", {})
+    
+    await jobs._queue.join()
+    
+    report_service.generate_project_health_report.assert_awaited_once()
+    first, second = await jobs.get_job(first["job_id"]), await jobs.get_job(second["job_id"])
+    assert first["status"] == second["status"] == COMPLETED
+    assert first["artifact"] == second["artifact"]
+    assert sorted(call.kwargs["user_id"] for call in notify.await_args_list) == ["USR-1", "USR-2"]
+
+
+@pytest.mark.asyncio
+async def test_failed_build_is_reported_and_not_reused(jobs, report_service, notify):
+    """Test a failing build marks the job failed and the next request rebuilds"""
+    report_service.generate_project_health_report.side_effect = ValueError("Project PRJ-9 not found")
+    
+    job = await jobs.submit("USR-1", "project-health", "csv", {"project_id": "PRJ-9"})
+    await jobs._queue.join()
+    
+    failed = await jobs.get_job(job["job_id"])
+    assert failed["status"] == FAILED
+    assert failed["error"] == FAILURE_MESSAGE
+    assert notify.await_args.kwargs["succeeded"] is False
+    assert "PRJ-9 not found" not in str(notify.await_args)
+    
+    retry = await jobs.submit("USR-1", "project-health", "csv", {"project_id": "PRJ-9"})
+    assert retry["status"] == QUEUED
+    await jobs._queue.join()
+    assert report_service.generate_project_health_report.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_unknown_report_or_parameter_is_rejected(jobs):
+    """Test only known reports and their parameters are accepted"""
+    with pytest.raises(ValidationException):
+        await jobs.submit("USR-1", "payroll", "csv", {})
+    with pytest.raises(ValidationException):
+        await jobs.submit("USR-1", "project-health", "csv", {"weeks_ahead": 4})
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("report,params,field", [
+    ("occupancy-forecast", {"weeks_ahead": 0}, "weeks_ahead"),
+    ("occupancy-forecast", {"weeks_ahead": 53}, "weeks_ahead"),
+    ("sprint-velocity", {"sprint_count": 51}, "sprint_count"),
+    ("utilization", {"start_date": "2026-13-01"}, "start_date"),
+    ("project-tree", {}, "project_id"),
+])
+async def test_invalid_parameter_is_rejected(jobs, report, params, field):
+    """Test parameters outside the endpoint's constraints are rejected with their field"""
+    with pytest.raises(ValidationException) as exc_info:
+        await jobs.submit("USR-1", report, "csv", params)
+    
+    assert exc_info.value.status_code == 422
+    assert [error["field"] for error in exc_info.value.details["errors"]] == [field]
+
+
+@pytest.mark.asyncio
+async def test_parameters_are_parsed_for_the_build(jobs, notify):
+    """Test query-string parameters reach the report method as typed values with defaults"""
+    with patch("app.services.report_jobs.ReportService") as service_class:
+        service = service_class.return_value
+        service.generate_utilization_report = AsyncMock(side_effect=lambda **params: _report([]))
+        service.generate_sprint_velocity_report = AsyncMock(side_effect=lambda **params: _report([]))
+        
+        await jobs.submit("USR-1", "utilization", "csv", {"start_date": "2026-09-01", "end_date": None})
+        await jobs.submit("USR-1", "sprint-velocity", "csv", {"sprint_count": "5"})
+        await jobs._queue.join()
+    
+    service.generate_utilization_report.assert_awaited_once_with(start_date=date(2026, 9, 1), end_date=None)
+    service.generate_sprint_velocity_report.assert_awaited_once_with(project_id=None, sprint_count=5)
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_rejected(jobs):
+    """Test submissions beyond REPORT_JOB_MAX_QUEUE get a 503"""
+    jobs._queue = asyncio.Queue(maxsize=1)
+    
+    with patch.object(jobs, "_start_workers"):
+        await jobs.submit("USR-1", "project-health", "csv", {"project_id": "PRJ-1"})
+        with pytest.raises(ReportJobQueueFullException):
+            await jobs.submit("USR-1", "project-health", "csv", {"project_id": "PRJ-2"})
+
+
+@pytest.mark.asyncio
+async def test_stop_fails_jobs_not_yet_built(jobs):
+    """Test jobs still waiting at shutdown are marked failed"""
+    with patch.object(jobs, "_start_workers"):
+        job = await jobs.submit("USR-1", "project-health", "csv", {})
+    
+    await jobs.stop()
+    
+    assert (await jobs.get_job(job["job_id"]))["status"] == FAILED
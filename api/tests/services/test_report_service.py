@@ -0,0 +1,149 @@
+"""
+Tests for the async report service.
+
+These tests validate:
+- Reports stream select() statements from a server-side cursor
+- The project tree report is one grouped query for every level
+- Tree rows map from the grouping level to project, use case and story rows
+- Rows are formatted as they are read and the cursor is closed afterwards
+- Malformed report dates are rejected by the endpoints with a 422
+"""
+import pytest
+from datetime import date
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.dialects import postgresql
+
+from app.api.v1.endpoints import reports
+from app.core.security import get_current_user
+from app.db.base import get_db
+from app.services.report_service import ReportService
+
+
+class _Cursor:
+    """Async result of AsyncSession.stream over fixed rows"""
+    
+    def __init__(self, rows):
+        self._rows = iter(rows)
+        self.closed = False
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self):
+        try:
+            return next(self._rows)
+        except StopIteration:
+            raise StopAsyncIteration
+    
+    async def close(self):
+        self.closed = True
+
+
+def _db(rows=None):
+    db = MagicMock()
+    db.cursor = _Cursor(rows or [])
+    db.stream = AsyncMock(return_value=db.cursor)
+    return db
+
+
+def _statement(db):
+    return db.stream.call_args[0][0]
+
+
+def _sql(db):
+    return str(_statement(db).compile(dialect=postgresql.dialect()))
+
+
+def _tree_row(level, total, completed, usecase=None, story=None):
+    return SimpleNamespace(
+        level=level, project_name="Portal", project_status="Active",
+        usecase_name=usecase, usecase_status="Draft" if usecase else None,
+        story_name=story, story_status="Backlog" if story else None,
+        total_tasks=total, completed_tasks=completed
+    )
+
+
+@pytest.mark.asyncio
+async def test_project_tree_report_is_one_grouped_query():
+    """Test every tree level comes from one GROUPING SETS query"""
+    db = _db(rows=[
+        _tree_row(3, 4, 1),
+        _tree_row(1, 4, 1, usecase="Checkout"),
+        _tree_row(0, 3, 1, usecase="Checkout", story="Pay by card"),
+        _tree_row(0, 1, 0, usecase="Checkout", story="Pay later"),
+        _tree_row(1, 0, 0, usecase="Search"),
+    ])
+    
+    report = await (await ReportService(db).generate_project_tree_report("PRJ-1")).collect()
+    
+    sql = _sql(db)
+    assert db.stream.await_count == 1
+    assert "GROUPING SETS(" in sql
+    assert "FILTER (WHERE tasks.status" in sql
+    assert report["title"] == "Project Tree Report - Portal"
+    assert report["rows"] == [
+        ["0", "Project", "Portal", "Active", "4", "25.0%"],
+        ["1", "Use Case", "  Checkout", "Draft", "4", "25.0%"],
+        ["2", "User Story", "    Pay by card", "Backlog", "3", "33.3%"],
+        ["2", "User Story", "    Pay later", "Backlog", "1", "0.0%"],
+        ["1", "Use Case", "  Search", "Draft", "0", "0.0%"],
+    ]
+
+
+@pytest.mark.asyncio
+async def test_project_tree_report_missing_project():
+    """Test a project without rows is reported as not found"""
+    db = _db()
+    
+    with pytest.raises(ValueError, match="PRJ-404"):
+        await ReportService(db).generate_project_tree_report("PRJ-404")
+    assert db.cursor.closed
+
+
+@pytest.mark.asyncio
+async def test_utilization_report_streams_rows():
+    """Test a dated report streams a select with an inclusive end day"""
+    db = _db(rows=[SimpleNamespace(
+        assigned_to="USR-1", full_name="Ada", total_estimated=10, total_actual=8, task_count=2
+    )])
+    
+    report = await ReportService(db).generate_utilization_report(date(2026, 10, 1), date(2026, 10, 15))
+    
+    statement = _statement(db)
+    params = statement.compile(dialect=postgresql.dialect()).params
+    assert statement.get_execution_options()["yield_per"] > 0
+    assert params["created_at_2"].isoformat() == "2026-10-16"
+    assert report.period == "2026-10-01 to 2026-10-15"
+    assert not db.cursor.closed
+    
+    assert [row async for row in report.rows] == [["Ada", "2", "10.0", "8.0", "80.0%"]]
+    assert db.cursor.closed
+
+
+@pytest.mark.asyncio
+async def test_bug_density_report_groups_by_bug_project():
+    """Test bug density counts live bugs per project with FILTER aggregates"""
+    db = _db()
+    
+    await ReportService(db).generate_bug_density_report(project_id="PRJ-1")
+    
+    sql = _sql(db)
+    assert "JOIN projects ON bugs.project_id = projects.id" in sql
+    assert "count(bugs.id) FILTER (WHERE bugs.severity" in sql
+
+
+def test_malformed_report_date_is_rejected():
+    """Test a bad start_date is a validation error, not a server error"""
+    app = FastAPI()
+    app.include_router(reports.router)
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id="USR-1")
+    app.dependency_overrides[get_db] = lambda: MagicMock()
+    
+    response = TestClient(app).get("/utilization", params={"start_date": "2026-13-45"})
+    
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["query", "start_date"]
@@ -0,0 +1,255 @@
+"""
+Tests for the chat retrieval planner and the grouped statistics queries.
+
+These tests validate:
+- Lookups running concurrently on separate sessions
+- Lookups past the time budget marked incomplete, finished ones kept
+- The row budget shared by the list queries of a request
+- Entity lookups merged in plan order, lists replacing them
+- Task and bug statistics answered by one GROUPING SETS query
+"""
+import asyncio
+import pytest
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from app.schemas.chat import ChatResponse, EntityType, ExtractedEntity, IntentType
+from app.services.cache_backends import MemoryCacheBackend
+from app.services.cache_service import CacheService
+from app.services.chat_cache import ChatResponseCache
+from app.services.data_retriever import DataRetriever
+from app.services.retrieval_planner import INCOMPLETE_DATA_KEY, RetrievalPlanner
+
+
+class _SessionFactory:
+    """Hands out a distinct mock session per lookup"""
+    
+    def __init__(self):
+        self.sessions = []
+    
+    @asynccontextmanager
+    async def __call__(self):
+        db = MagicMock(bind=None)
+        self.sessions.append(db)
+        yield db
+
+
+@pytest.fixture
+def sessions():
+    return _SessionFactory()
+
+
+@pytest.fixture
+def retriever():
+    """Create a data retriever with mocked queries"""
+    retriever = MagicMock(spec=DataRetriever)
+    retriever.RESOLVED_KEYS = DataRetriever.RESOLVED_KEYS
+    retriever.can_resolve.return_value = True
+    return retriever
+
+
+@pytest.fixture
+def planner(retriever, sessions):
+    """Create a planner over the mocked retriever"""
+    with patch("app.services.retrieval_planner.get_chat_metrics"):
+        planner = RetrievalPlanner(data_retriever=retriever, session_factory=sessions)
+    planner.timeout = 0.5
+    planner.max_rows = 60
+    planner.max_concurrency = 4
+    return planner
+
+
+@pytest.fixture
+def user():
+    """Create a sample user"""
+    return MagicMock(id="USR-001", client_id="CLI-001")
+
+
+def _intent(intent_type=IntentType.QUERY, query="show my tasks", entities=(), temporal=None):
+    return MagicMock(
+        intent_type=intent_type,
+        normalized_query=query,
+        entities=list(entities),
+        temporal_context=temporal or {}
+    )
+
+
+def _serialize(obj):
+    return {"id": obj}
+
+
+@pytest.mark.asyncio
+async def test_lookups_run_concurrently_on_separate_sessions(planner, retriever, sessions, user):
+    """Test every lookup is in flight at once, each on its own session"""
+    started = []
+    release = asyncio.Event()
+    
+    async def stats(db, user, **kwargs):
+        started.append(db)
+        if len(started) == 2:
+            release.set()
+        await release.wait()
+        return {"total": len(started)}
+    
+    retriever.get_task_statistics.side_effect = stats
+    retriever.get_bug_statistics.side_effect = stats
+    
+    data = await planner.retrieve(user, _intent(IntentType.REPORT, "task and bug report"), _serialize)
+    
+    assert set(data) == {"task_statistics", "bug_statistics"}
+    assert len(started) == 2
+    assert started[0] is not started[1]
+    assert set(started) == set(sessions.sessions)
+
+
+@pytest.mark.asyncio
+async def test_slow_lookup_is_marked_incomplete(planner, retriever, user):
+    """Test a lookup past the budget is cancelled and named incomplete"""
+    planner.timeout = 0.05
+    cancelled = asyncio.Event()
+    
+    async def slow(db, user, **kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+    
+    retriever.get_task_statistics.return_value = {"total_tasks": 3}
+    retriever.get_bug_statistics.side_effect = slow
+    
+    data = await planner.retrieve(user, _intent(IntentType.REPORT, "task and bug report"), _serialize)
+    
+    assert data["task_statistics"] == {"total_tasks": 3}
+    assert "bug_statistics" not in data
+    assert data[INCOMPLETE_DATA_KEY] == ["bug_statistics"]
+    planner.metrics.record_retrieval_step.assert_any_call("bug_statistics", "timeout")
+    
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+
+@pytest.mark.asyncio
+async def test_failed_lookup_does_not_drop_the_others(planner, retriever, user):
+    """Test an erroring lookup is reported and the rest is returned"""
+    retriever.get_tasks_by_filters = AsyncMock(return_value=["TSK-1"])
+    retriever.get_bugs_by_filters = AsyncMock(side_effect=RuntimeError("boom"))
+    
+    data = await planner.retrieve(user, _intent(query="open tasks and bugs"), _serialize)
+    
+    assert data["tasks"] == [{"id": "TSK-1"}]
+    assert data[INCOMPLETE_DATA_KEY] == ["bugs"]
+    planner.metrics.record_retrieval_step.assert_any_call("bugs", "error")
+
+
+@pytest.mark.asyncio
+async def test_list_queries_share_the_row_budget(planner, retriever, user):
+    """Test the row budget is split and unsupported filters are dropped"""
+    planner.max_rows = 30
+    retriever.get_tasks_by_filters = AsyncMock(return_value=[])
+    retriever.get_bugs_by_filters = AsyncMock(return_value=[])
+    retriever.get_projects_by_filters = AsyncMock(return_value=[])
+    temporal = {"status_filter": "Open", "start_date": "2026-01-01"}
+    
+    await planner.retrieve(user, _intent(query="tasks, bugs and projects", temporal=temporal), _serialize)
+    
+    _, kwargs = retriever.get_tasks_by_filters.call_args
+    assert kwargs == {"limit": 10, "status": "Open", "start_date": "2026-01-01"}
+    _, kwargs = retriever.get_bugs_by_filters.call_args
+    assert kwargs == {"limit": 10, "status": "Open"}
+    _, kwargs = retriever.get_projects_by_filters.call_args
+    assert kwargs == {"limit": 10, "status": "Open"}
+
+
+@pytest.mark.asyncio
+async def test_entities_merge_and_lists_replace_them(planner, retriever, user):
+    """Test entity lookups merge in plan order and a list replaces its key"""
+    entities = [
+        ExtractedEntity(entity_type=EntityType.BUG, entity_id="BUG-1"),
+        ExtractedEntity(entity_type=EntityType.BUG, entity_id="BUG-2"),
+        ExtractedEntity(entity_type=EntityType.TASK, entity_id="TSK-9"),
+    ]
+    
+    async def resolve(db, user, entity):
+        if entity.entity_id == "BUG-1":
+            await asyncio.sleep(0.01)
+        return [entity.entity_id]
+    
+    retriever.resolve_entity.side_effect = resolve
+    retriever.get_tasks_by_filters = AsyncMock(return_value=["TSK-1", "TSK-2"])
+    
+    data = await planner.retrieve(user, _intent(query="tasks for these", entities=entities), _serialize)
+    
+    assert data["bugs"] == [{"id": "BUG-1"}, {"id": "BUG-2"}]
+    assert data["tasks"] == [{"id": "TSK-1"}, {"id": "TSK-2"}]
+
+
+@pytest.mark.asyncio
+async def test_incomplete_responses_are_not_cached(user):
+    """Test a response over partial data is not stored"""
+    response_cache = ChatResponseCache(CacheService(l1=MemoryCacheBackend()))
+    response_cache.metrics = MagicMock()
+    intent = _intent()
+    
+    key, _ = await response_cache.lookup(user, intent, "req_1")
+    response = ChatResponse(
+        message="Partial answer",
+        data={"tasks": [], INCOMPLETE_DATA_KEY: ["bugs"]}
+    )
+    await response_cache.store(key, response, tokens_used=50)
+    
+    _, cached = await response_cache.lookup(user, intent, "req_2")
+    assert cached is None
+
+
+def _compiled(db):
+    statement = db.execute.call_args[0][0]
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.asyncio
+async def test_task_statistics_use_one_grouping_sets_query(user):
+    """Test task breakdowns come from one query, split by GROUPING()"""
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=[
+        ("To Do", None, 1, 4),
+        ("Done", None, 1, 2),
+        (None, "High", 2, 5),
+        (None, "Low", 2, 1),
+        (None, None, 3, 6),
+    ])))
+    
+    stats = await DataRetriever().get_task_statistics(db, user)
+    
+    assert db.execute.await_count == 1
+    assert "GROUPING SETS" in _compiled(db)
+    assert stats == {
+        "total_tasks": 6,
+        "by_status": {"To Do": 4, "Done": 2},
+        "by_priority": {"High": 5, "Low": 1},
+    }
+
+
+@pytest.mark.asyncio
+async def test_bug_statistics_use_one_grouping_sets_query(user):
+    """Test bug breakdowns come from one query, split by GROUPING()"""
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=MagicMock(all=MagicMock(return_value=[
+        ("New", None, None, 3, 2),
+        (None, "Critical", None, 5, 1),
+        (None, "Minor", None, 5, 1),
+        (None, None, "P1", 6, 2),
+        (None, None, None, 7, 2),
+    ])))
+    
+    stats = await DataRetriever().get_bug_statistics(db, user)
+    
+    assert db.execute.await_count == 1
+    assert "GROUPING SETS" in _compiled(db)
+    assert stats == {
+        "total_bugs": 2,
+        "by_status": {"New": 2},
+        "by_severity": {"Critical": 1, "Minor": 1},
+        "by_priority": {"P1": 2},
+    }
@@ -8,11 +8,17 @@ These tests validate the core functionality of the SessionService including:
 - Session expiration and cleanup
 """
 import pytest
+import msgpack
 from datetime import datetime
 from unittest.mock import AsyncMock, MagicMock, patch
 from uuid import uuid4
 
-from app.services.session_service import SessionService, get_session_service
+from app.services.session_service import (
+    ACTIVE_SESSIONS_KEY,
+    SessionService,
+    get_session_service,
+    _encode
+)
 from app.schemas.chat import (
     SessionContext,
     SessionEntity,
@@ -27,6 +33,9 @@ def session_service():
     """Create a SessionService instance with mocked Redis"""
     service = SessionService()
     service.redis_client = AsyncMock()
+    service.pipe = MagicMock()
+    service.pipe.execute = AsyncMock(return_value=[True, 1])
+    service.redis_client.pipeline = MagicMock(return_value=service.pipe)
     return service
 
 
@@ -88,9 +97,6 @@ def sample_message(sample_session_id, sample_user_id):
 @pytest.mark.asyncio
 async def test_create_session(session_service, sample_session_id, sample_user_id, sample_client_id):
     """Test session creation"""
-    # Mock Redis setex
-    session_service.redis_client.setex = AsyncMock(return_value=True)
-    
     # Create session
     session_context = await session_service.create_session(
         session_id=sample_session_id,
@@ -107,20 +113,32 @@ async def test_create_session(session_service, sample_session_id, sample_user_id
     assert session_context.mentioned_entities == []
     assert session_context.last_intent is None
     
-    # Verify Redis was called
-    session_service.redis_client.setex.assert_called_once()
+    # Verify the session was stored and marked active in one transaction
+    session_service.redis_client.pipeline.assert_called_once_with(transaction=True)
+    session_service.pipe.set.assert_called_once()
+    session_service.pipe.zadd.assert_called_once()
+    assert session_service.pipe.zadd.call_args.args[0] == ACTIVE_SESSIONS_KEY
+    session_service.pipe.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_session_round_trips_through_msgpack(session_service, sample_session_id, sample_session_context):
+    """Test that a stored session decodes back to the same context"""
+    session_service.redis_client.get = AsyncMock(return_value=_encode(sample_session_context))
+    
+    retrieved_session = await session_service.get_session(sample_session_id)
+    
+    assert retrieved_session == sample_session_context
+    assert isinstance(msgpack.unpackb(_encode(sample_session_context)), dict)
 
 
 @pytest.mark.asyncio
 async def test_get_session_found(session_service, sample_session_id, sample_session_context):
-    """Test retrieving an existing session"""
+    """Test retrieving a session stored as JSON before msgpack"""
     # Mock Redis get to return session data
-    import json
-    session_data = sample_session_context.model_dump(mode='json')
-    session_data['created_at'] = session_data['created_at'].isoformat()
-    session_data['last_activity'] = session_data['last_activity'].isoformat()
+    session_data = sample_session_context.model_dump_json().encode()
     
-    session_service.redis_client.get = AsyncMock(return_value=json.dumps(session_data))
+    session_service.redis_client.get = AsyncMock(return_value=session_data)
     
     # Get session
     retrieved_session = await session_service.get_session(sample_session_id)
@@ -130,6 +148,7 @@ async def test_get_session_found(session_service, sample_session_id, sample_sess
     assert retrieved_session.session_id == sample_session_context.session_id
     assert retrieved_session.user_id == sample_session_context.user_id
     assert retrieved_session.client_id == sample_session_context.client_id
+    assert retrieved_session.created_at == sample_session_context.created_at
 
 
 @pytest.mark.asyncio
@@ -145,33 +164,65 @@ async def test_get_session_not_found(session_service, sample_session_id):
     assert retrieved_session is None
 
 
+@pytest.mark.asyncio
+async def test_get_session_with_history(session_service, sample_session_id, sample_session_context, sample_message):
+    """Test loading session and history in one pipelined round trip"""
+    session_service.pipe.execute = AsyncMock(return_value=[
+        _encode(sample_session_context), [_encode(sample_message)], True, True, 0
+    ])
+    
+    session, history = await session_service.get_session_with_history(sample_session_id, limit=5)
+    
+    assert session == sample_session_context
+    assert history == [sample_message]
+    session_service.pipe.lrange.assert_called_once_with(f"chat:messages:{sample_session_id}", -5, -1)
+    assert session_service.pipe.expire.call_count == 2
+    assert session_service.pipe.zadd.call_args.kwargs == {"xx": True}
+    session_service.pipe.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_get_session_with_history_not_found(session_service, sample_session_id):
+    """Test that a missing session returns no history"""
+    session_service.pipe.execute = AsyncMock(return_value=[None, [], False, False, 0])
+    
+    assert await session_service.get_session_with_history(sample_session_id) == (None, [])
+
+
 @pytest.mark.asyncio
 async def test_store_message(session_service, sample_session_id, sample_message):
     """Test storing a message in conversation history"""
-    # Mock Redis operations
-    session_service.redis_client.rpush = AsyncMock(return_value=1)
-    session_service.redis_client.ltrim = AsyncMock(return_value=True)
-    session_service.redis_client.expire = AsyncMock(return_value=True)
-    
     # Store message
     result = await session_service.store_message(sample_session_id, sample_message)
     
-    # Verify message was stored
+    # Verify push, trim and expire went out in one transaction
+    assert result is True
+    session_service.redis_client.pipeline.assert_called_once_with(transaction=True)
+    session_service.pipe.rpush.assert_called_once()
+    session_service.pipe.ltrim.assert_called_once()
+    session_service.pipe.expire.assert_called_once()
+    session_service.pipe.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_store_messages_batches_push(session_service, sample_session_id, sample_message):
+    """Test storing several messages with a single push"""
+    reply = sample_message.model_copy(update={"id": "MSG-002", "role": "assistant"})
+    
+    result = await session_service.store_messages(sample_session_id, [sample_message, reply])
+    
     assert result is True
-    session_service.redis_client.rpush.assert_called_once()
-    session_service.redis_client.ltrim.assert_called_once()
-    session_service.redis_client.expire.assert_called_once()
+    key, *values = session_service.pipe.rpush.call_args.args
+    assert key == f"chat:messages:{sample_session_id}"
+    assert len(values) == 2
+    session_service.pipe.execute.assert_awaited_once()
 
 
 @pytest.mark.asyncio
 async def test_get_conversation_history(session_service, sample_session_id, sample_message):
     """Test retrieving conversation history"""
     # Mock Redis lrange to return message data
-    import json
-    message_data = sample_message.model_dump(mode='json')
-    message_data['created_at'] = message_data['created_at'].isoformat()
-    
-    session_service.redis_client.lrange = AsyncMock(return_value=[json.dumps(message_data)])
+    session_service.redis_client.lrange = AsyncMock(return_value=[_encode(sample_message)])
     
     # Get conversation history
     messages = await session_service.get_conversation_history(sample_session_id)
@@ -180,6 +231,7 @@ async def test_get_conversation_history(session_service, sample_session_id, samp
     assert len(messages) == 1
     assert messages[0].id == sample_message.id
     assert messages[0].content == sample_message.content
+    assert messages[0].created_at == sample_message.created_at
 
 
 @pytest.mark.asyncio
@@ -226,24 +278,23 @@ async def test_resolve_entity_type_specific(session_service, sample_session_id):
 @pytest.mark.asyncio
 async def test_delete_session(session_service, sample_session_id):
     """Test session deletion"""
-    # Mock Redis delete
-    session_service.redis_client.delete = AsyncMock(return_value=2)
+    # Mock Redis delete and zrem results
+    session_service.pipe.execute = AsyncMock(return_value=[2, 1])
     
     # Delete session
     result = await session_service.delete_session(sample_session_id)
     
-    # Verify session was deleted
+    # Verify session was deleted and dropped from the active set
     assert result is True
-    session_service.redis_client.delete.assert_called_once()
+    session_service.pipe.delete.assert_called_once()
+    session_service.pipe.zrem.assert_called_once_with(ACTIVE_SESSIONS_KEY, sample_session_id)
 
 
 @pytest.mark.asyncio
 async def test_update_session(session_service, sample_session_id, sample_session_context):
     """Test session update"""
-    # Mock get_session and setex
+    # Mock get_session
     with patch.object(session_service, 'get_session', return_value=sample_session_context):
-        session_service.redis_client.setex = AsyncMock(return_value=True)
-        
         # Update session with new intent
         new_entity = SessionEntity(
             entity_type=EntityType.BUG,
@@ -259,21 +310,49 @@ async def test_update_session(session_service, sample_session_id, sample_session
         
         # Verify update was successful
         assert result is True
-        session_service.redis_client.setex.assert_called_once()
+        session_service.pipe.set.assert_called_once()
+        assert sample_session_context.mentioned_entities[-1] == new_entity
+
+
+@pytest.mark.asyncio
+async def test_update_session_with_loaded_context_skips_read(session_service, sample_session_id, sample_session_context):
+    """Test that a caller-provided session is not read again"""
+    session_service.redis_client.get = AsyncMock()
+    
+    result = await session_service.update_session(
+        session_id=sample_session_id,
+        last_intent=IntentType.REPORT,
+        session_context=sample_session_context
+    )
+    
+    assert result is True
+    session_service.redis_client.get.assert_not_called()
+    assert msgpack.unpackb(session_service.pipe.set.call_args.args[1])["last_intent"] == "report"
+
+
+@pytest.mark.asyncio
+async def test_cleanup_expired_sessions_counts_active_set(session_service):
+    """Test counting active sessions without scanning the keyspace"""
+    session_service.pipe.execute = AsyncMock(return_value=[3, 7])
+    
+    active = await session_service.cleanup_expired_sessions()
+    
+    assert active == 7
+    session_service.pipe.zremrangebyscore.assert_called_once()
+    session_service.pipe.zcard.assert_called_once_with(ACTIVE_SESSIONS_KEY)
+    session_service.redis_client.scan.assert_not_called()
 
 
 @pytest.mark.asyncio
 async def test_extend_session_ttl(session_service, sample_session_id):
     """Test extending session TTL"""
-    # Mock Redis expire
-    session_service.redis_client.expire = AsyncMock(return_value=True)
-    
     # Extend TTL
     result = await session_service.extend_session_ttl(sample_session_id)
     
     # Verify TTL was extended
     assert result is True
-    assert session_service.redis_client.expire.call_count == 2  # Called for both session and messages keys
+    assert session_service.pipe.expire.call_count == 2  # Called for both session and messages keys
+    session_service.pipe.execute.assert_awaited_once()
 
 
 def test_get_session_service_singleton():
@@ -0,0 +1,67 @@
+-- Migration: Hierarchy closure table for O(1) descendant and ancestor lookups
+-- Stores one row per (ancestor, descendant) pair of live entities in the
+-- Client -> Program -> Project -> Usecase -> UserStory -> Task -> Subtask tree,
+-- including a depth-0 self row for every entity. The API keeps it in sync on
+-- every write; re-running this file (or api/scripts/rebuild_hierarchy_closure.py)
+-- rebuilds it from the hierarchy tables.
+-- Date: 2026-10-16
+
+CREATE TABLE IF NOT EXISTS hierarchy_closure (
+    ancestor_id VARCHAR(20) NOT NULL,
+    descendant_id VARCHAR(20) NOT NULL,
+    ancestor_type VARCHAR(20) NOT NULL,
+    descendant_type VARCHAR(20) NOT NULL,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_hierarchy_closure_ancestor_type ON hierarchy_closure(ancestor_id, descendant_type);
+CREATE INDEX IF NOT EXISTS idx_hierarchy_closure_descendant ON hierarchy_closure(descendant_id, depth);
+
+-- Backfill from existing data (root to leaf so each level reuses its parent's rows)
+BEGIN;
+
+DELETE FROM hierarchy_closure;
+
+INSERT INTO hierarchy_closure (ancestor_type, ancestor_id, descendant_type, descendant_id, depth)
+SELECT 'client', id, 'client', id, 0 FROM clients WHERE is_deleted = false
+UNION ALL SELECT 'program', id, 'program', id, 0 FROM programs WHERE is_deleted = false
+UNION ALL SELECT 'project', id, 'project', id, 0 FROM projects WHERE is_deleted = false
+UNION ALL SELECT 'usecase', id, 'usecase', id, 0 FROM usecases WHERE is_deleted = false
+UNION ALL SELECT 'userstory', id, 'userstory', id, 0 FROM user_stories WHERE is_deleted = false
+UNION ALL SELECT 'task', id, 'task', id, 0 FROM tasks WHERE is_deleted = false
+UNION ALL SELECT 'subtask', id, 'subtask', id, 0 FROM subtasks WHERE is_deleted = false;
+
+INSERT INTO hierarchy_closure (ancestor_type, ancestor_id, descendant_type, descendant_id, depth)
+SELECT c.ancestor_type, c.ancestor_id, 'program', p.id, c.depth + 1
+FROM hierarchy_closure c JOIN programs p ON p.client_id = c.descendant_id
+WHERE p.is_deleted = false;
+
+INSERT INTO hierarchy_closure (ancestor_type, ancestor_id, descendant_type, descendant_id, depth)
+SELECT c.ancestor_type, c.ancestor_id, 'project', p.id, c.depth + 1
+FROM hierarchy_closure c JOIN projects p ON p.program_id = c.descendant_id
+WHERE p.is_deleted = false;
+
+INSERT INTO hierarchy_closure (ancestor_type, ancestor_id, descendant_type, descendant_id, depth)
+SELECT c.ancestor_type, c.ancestor_id, 'usecase', u.id, c.depth + 1
+FROM hierarchy_closure c JOIN usecases u ON u.project_id = c.descendant_id
+WHERE u.is_deleted = false;
+
+INSERT INTO hierarchy_closure (ancestor_type, ancestor_id, descendant_type, descendant_id, depth)
+SELECT c.ancestor_type, c.ancestor_id, 'userstory', us.id, c.depth + 1
+FROM hierarchy_closure c JOIN user_stories us ON us.usecase_id = c.descendant_id
+WHERE us.is_deleted = false;
+
+INSERT INTO hierarchy_closure (ancestor_type, ancestor_id, descendant_type, descendant_id, depth)
+SELECT c.ancestor_type, c.ancestor_id, 'task', t.id, c.depth + 1
+FROM hierarchy_closure c JOIN tasks t ON t.user_story_id = c.descendant_id
+WHERE t.is_deleted = false;
+
+INSERT INTO hierarchy_closure (ancestor_type, ancestor_id, descendant_type, descendant_id, depth)
+SELECT c.ancestor_type, c.ancestor_id, 'subtask', s.id, c.depth + 1
+FROM hierarchy_closure c JOIN subtasks s ON s.task_id = c.descendant_id
+WHERE s.is_deleted = false;
+
+COMMIT;
+
+ANALYZE hierarchy_closure;
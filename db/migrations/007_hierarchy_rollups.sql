@@ -0,0 +1,46 @@
+-- Migration: Hierarchy rollup counters for constant-time entity statistics
+-- Stores, for every live ancestor, how many live descendants of each type carry
+-- a given status, priority or phase (NULL status/priority stored as ''). The API
+-- adjusts the counters on every write; re-running this file (or
+-- api/scripts/rebuild_hierarchy_rollups.py) rebuilds them from hierarchy_closure,
+-- so apply 006_hierarchy_closure.sql first.
+-- Date: 2026-10-16
+
+CREATE TABLE IF NOT EXISTS hierarchy_rollups (
+    ancestor_id VARCHAR(20) NOT NULL,
+    descendant_type VARCHAR(20) NOT NULL,
+    dimension VARCHAR(20) NOT NULL,
+    value VARCHAR(50) NOT NULL,
+    ancestor_type VARCHAR(20) NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (ancestor_id, descendant_type, dimension, value)
+);
+
+-- Backfill from existing data
+BEGIN;
+
+DELETE FROM hierarchy_rollups;
+
+INSERT INTO hierarchy_rollups (ancestor_id, ancestor_type, descendant_type, dimension, value, count)
+SELECT c.ancestor_id, c.ancestor_type, c.descendant_type, f.dimension, f.value, COUNT(*)
+FROM hierarchy_closure c
+JOIN (
+    SELECT id, 'status' AS dimension, COALESCE(status, '') AS value FROM programs
+    UNION ALL SELECT id, 'status', COALESCE(status, '') FROM projects
+    UNION ALL SELECT id, 'status', COALESCE(status, '') FROM usecases
+    UNION ALL SELECT id, 'priority', COALESCE(priority, '') FROM usecases
+    UNION ALL SELECT id, 'status', COALESCE(status, '') FROM user_stories
+    UNION ALL SELECT id, 'priority', COALESCE(priority, '') FROM user_stories
+    UNION ALL SELECT id, 'phase', phase_id FROM user_stories WHERE phase_id IS NOT NULL
+    UNION ALL SELECT id, 'status', COALESCE(status, '') FROM tasks
+    UNION ALL SELECT id, 'priority', COALESCE(priority, '') FROM tasks
+    UNION ALL SELECT id, 'phase', phase_id FROM tasks WHERE phase_id IS NOT NULL
+    UNION ALL SELECT id, 'status', COALESCE(status, '') FROM subtasks
+    UNION ALL SELECT id, 'phase', phase_id FROM subtasks WHERE phase_id IS NOT NULL
+) f ON f.id = c.descendant_id
+WHERE c.depth > 0
+GROUP BY c.ancestor_id, c.ancestor_type, c.descendant_type, f.dimension, f.value;
+
+COMMIT;
+
+ANALYZE hierarchy_rollups;
@@ -0,0 +1,65 @@
+-- Migration: Full-text and trigram search indexes for hierarchy search
+-- Adds a generated, weighted search_vector (name = A, descriptions = B) with a
+-- GIN index to every hierarchy table, plus pg_trgm GIN indexes on name for
+-- substring (ILIKE) and typo-tolerant (%) matches used by /hierarchy/search.
+-- Date: 2026-10-16
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE clients ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(short_description, '') || ' ' || coalesce(long_description, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_clients_search_vector ON clients USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_clients_name_trgm ON clients USING GIN (name gin_trgm_ops);
+
+ALTER TABLE programs ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(short_description, '') || ' ' || coalesce(long_description, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_programs_search_vector ON programs USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_programs_name_trgm ON programs USING GIN (name gin_trgm_ops);
+
+ALTER TABLE projects ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(short_description, '') || ' ' || coalesce(long_description, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_projects_search_vector ON projects USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_projects_name_trgm ON projects USING GIN (name gin_trgm_ops);
+
+ALTER TABLE usecases ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(short_description, '') || ' ' || coalesce(long_description, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_usecases_search_vector ON usecases USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_usecases_name_trgm ON usecases USING GIN (name gin_trgm_ops);
+
+ALTER TABLE user_stories ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(short_description, '') || ' ' || coalesce(long_description, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_user_stories_search_vector ON user_stories USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_user_stories_name_trgm ON user_stories USING GIN (name gin_trgm_ops);
+
+ALTER TABLE tasks ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(short_description, '') || ' ' || coalesce(long_description, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_tasks_search_vector ON tasks USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_tasks_name_trgm ON tasks USING GIN (name gin_trgm_ops);
+
+ALTER TABLE subtasks ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(short_description, '') || ' ' || coalesce(long_description, '')), 'B')
+    ) STORED;
+CREATE INDEX IF NOT EXISTS idx_subtasks_search_vector ON subtasks USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_subtasks_name_trgm ON subtasks USING GIN (name gin_trgm_ops);
+
+ANALYZE clients, programs, projects, usecases, user_stories, tasks, subtasks;
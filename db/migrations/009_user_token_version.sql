@@ -0,0 +1,7 @@
+-- Migration: Token version for access-token revocation and principal caching
+-- Access tokens carry the user's token_version in a "ver" claim. Bumping the
+-- column (password change, deactivation) revokes every token issued before, and
+-- the API caches authenticated users keyed by (user_id, token_version).
+-- Date: 2026-10-16
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INTEGER NOT NULL DEFAULT 1;
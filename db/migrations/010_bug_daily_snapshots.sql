@@ -0,0 +1,74 @@
+-- Migration: Daily bug activity snapshots for long bug trend ranges
+-- Stores, per UTC day and hierarchy scope, how many live bugs were created and
+-- resolved (NULL scope columns stored as ''). Every covered day also has a row
+-- with an empty scope and zero counts, marking it as covered. The API reads the
+-- table only when QA_TRENDS_SNAPSHOTS_ENABLED is set; refresh recent days daily
+-- with api/scripts/refresh_bug_snapshots.py. Re-running this file rebuilds all days.
+-- Date: 2026-10-16
+
+CREATE TABLE IF NOT EXISTS bug_daily_snapshots (
+    day DATE NOT NULL,
+    client_id VARCHAR(20) NOT NULL,
+    program_id VARCHAR(20) NOT NULL,
+    project_id VARCHAR(20) NOT NULL,
+    usecase_id VARCHAR(20) NOT NULL,
+    user_story_id VARCHAR(20) NOT NULL,
+    task_id VARCHAR(20) NOT NULL,
+    subtask_id VARCHAR(20) NOT NULL,
+    created_count INTEGER NOT NULL DEFAULT 0,
+    resolved_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, client_id, program_id, project_id, usecase_id, user_story_id, task_id, subtask_id)
+);
+
+-- Scoped trend reads filter on one hierarchy column over a day range
+CREATE INDEX IF NOT EXISTS idx_bug_daily_snapshots_project ON bug_daily_snapshots (project_id, day);
+CREATE INDEX IF NOT EXISTS idx_bug_daily_snapshots_client ON bug_daily_snapshots (client_id, day);
+
+-- Backfill from existing data, up to yesterday (UTC)
+BEGIN;
+
+DELETE FROM bug_daily_snapshots;
+
+INSERT INTO bug_daily_snapshots (
+    day, client_id, program_id, project_id, usecase_id, user_story_id, task_id, subtask_id,
+    created_count, resolved_count
+)
+SELECT e.day, e.client_id, e.program_id, e.project_id, e.usecase_id, e.user_story_id, e.task_id, e.subtask_id,
+       SUM(e.created), SUM(e.resolved)
+FROM (
+    SELECT (created_at AT TIME ZONE 'UTC')::date AS day,
+           COALESCE(client_id, '') AS client_id, COALESCE(program_id, '') AS program_id,
+           COALESCE(project_id, '') AS project_id, COALESCE(usecase_id, '') AS usecase_id,
+           COALESCE(user_story_id, '') AS user_story_id, COALESCE(task_id, '') AS task_id,
+           COALESCE(subtask_id, '') AS subtask_id,
+           1 AS created, 0 AS resolved
+    FROM bugs
+    WHERE is_deleted = FALSE AND created_at IS NOT NULL
+    UNION ALL
+    SELECT (closed_at AT TIME ZONE 'UTC')::date,
+           COALESCE(client_id, ''), COALESCE(program_id, ''), COALESCE(project_id, ''),
+           COALESCE(usecase_id, ''), COALESCE(user_story_id, ''), COALESCE(task_id, ''),
+           COALESCE(subtask_id, ''),
+           0, 1
+    FROM bugs
+    WHERE is_deleted = FALSE AND closed_at IS NOT NULL
+) e
+WHERE e.day < (now() AT TIME ZONE 'UTC')::date
+GROUP BY e.day, e.client_id, e.program_id, e.project_id, e.usecase_id, e.user_story_id, e.task_id, e.subtask_id;
+
+-- Mark every day from the first bug up to yesterday as covered
+INSERT INTO bug_daily_snapshots (
+    day, client_id, program_id, project_id, usecase_id, user_story_id, task_id, subtask_id,
+    created_count, resolved_count
+)
+SELECT d::date, '', '', '', '', '', '', '', 0, 0
+FROM generate_series(
+    (SELECT MIN(created_at AT TIME ZONE 'UTC')::date FROM bugs),
+    (now() AT TIME ZONE 'UTC')::date - 1,
+    INTERVAL '1 day'
+) AS d
+ON CONFLICT DO NOTHING;
+
+COMMIT;
+
+ANALYZE bug_daily_snapshots;
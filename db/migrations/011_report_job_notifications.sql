@@ -0,0 +1,9 @@
+-- Migration: Notification types for background report jobs
+-- Users are notified in-app when a report they submitted as a job is ready
+-- to download (report_ready) or could not be built (report_failed).
+-- ALTER TYPE ... ADD VALUE cannot run inside a transaction block on older
+-- PostgreSQL versions, so run this file without wrapping it in BEGIN/COMMIT.
+-- Date: 2026-10-16
+
+ALTER TYPE notification_type ADD VALUE IF NOT EXISTS 'report_ready';
+ALTER TYPE notification_type ADD VALUE IF NOT EXISTS 'report_failed';
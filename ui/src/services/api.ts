@@ -281,6 +281,10 @@ const api = {
       current_password: currentPassword,
       new_password: newPassword
     })
+    // Tokens issued before the change are revoked; keep this session signed in
+    if (response.data.access_token) {
+      localStorage.setItem('token', response.data.access_token)
+    }
     return response.data
   },
 